@@ -11,21 +11,33 @@ import os
 # typing : permet de spécifier les types de données attendus dans les fonctions
 from typing import List, Tuple
 
-# pygame : bibliothèque pour créer des jeux et gérer le son et les images
-# Ici, on l'utilise uniquement pour la lecture audio
-import pygame
-
-# Importer les fonctions de notre propre module webhook
-# Ces fonctions permettent d'envoyer des fichiers et des données à un service web
-from utils.webhook import send_file_to_webhook, send_parts_count_to_webhook
+# pygame (lecture audio) et requests (via utils.webhook) sont des bibliothèques lourdes :
+# elles ne sont importées qu'au moment où on en a réellement besoin (voir utils/audio_preview.py
+# et send_all_chunks), pour ne pas ralentir l'ouverture de la fenêtre
 
 # threading : permet d'exécuter des tâches en parallèle (en arrière-plan)
 # Utile pour ne pas bloquer l'interface utilisateur pendant des opérations longues
 import threading
 
-# time : permet de travailler avec le temps, notamment de faire des pauses
+# Bus d'événements : permet aux threads de travail de mettre à jour l'interface sans risque
+from gui.ui_bus import UIEventBus
+
+# Profil de la session, complété pendant l'envoi (voir utils/session_profile.py)
+from utils.session_profile import attach_profile, close_profile
+
+# Annulation de l'envoi en cours (bouton « Annuler l'envoi » ou fermeture de la vue)
+from utils.cancellation import CancelToken, CancelledError
+
+# Temps restant de l'envoi et historique des envois (voir utils/cost_model.py)
+from utils.cost_model import cost_model, Estimate, EtaTracker, KIND_UPLOAD
+from utils.manifest import part_size
+
+# time : mesure de la durée de l'envoi
 import time
 
+# Préécoute partagée par toutes les vues : décodage en flux, à partir de n'importe quelle position
+from utils.audio_preview import preview_engine
+
 # ===== CONSTANTES =====
 # URL du webhook pour l'envoi du nombre de parties
 # Un webhook est une URL qui permet de recevoir des données depuis une application externe
@@ -33,15 +45,38 @@ import time
 # Remplacez cette URL par votre propre webhook Make.com
 PARTS_COUNT_WEBHOOK_URL = "INSÉRER_URL_WEBHOOK_ICI"
 
+# URL du webhook qui reçoit le manifeste de la session, avant les morceaux
+# Le manifeste liste tous les morceaux attendus (ordre, positions, durées, tailles, empreintes)
+# pour que le scénario puisse traiter chaque morceau dès son arrivée
+# Mettez None pour ne pas envoyer de manifeste
+MANIFEST_WEBHOOK_URL = "INSÉRER_URL_WEBHOOK_ICI"
+
+# Hauteur (en pixels) de la forme d'onde affichée sous la liste
+WAVEFORM_HEIGHT = 70
+
+# Rafraîchissement du curseur de lecture sur la forme d'onde (en millisecondes)
+CURSOR_INTERVAL_MS = 50
+
+# Pendant un glissement sur la forme d'onde, délai minimal entre deux sauts (en millisecondes)
+SCRUB_INTERVAL_MS = 80
+
+# ===== LECTURE DES ANALYSES AUDIO =====
+def load_part_analysis(path: str):
+    """Renvoie l'analyse en cache d'un morceau (niveaux, parole, forme d'onde) ou None"""
+    try:
+        # Import local : le module d'analyse dépend de numpy, chargé seulement si nécessaire
+        from utils.audio_analysis import load_analysis
+    except ImportError:
+        return None
+    return load_analysis(path)
+
 # ===== DÉFINITION DE LA CLASSE PRINCIPALE =====
 # Cette classe représente la vue qui affiche et gère les morceaux audio
 # Elle hérite de ttk.Frame, ce qui signifie qu'elle est un conteneur d'éléments d'interface
 class AudioChunksView(ttk.Frame):
     # Le constructeur de la classe, appelé lorsqu'on crée une nouvelle instance
-    def __init__(self, master, chunks: List[Tuple[str, int, float]], webhook_url: str, num_parts: int = None):
-        # Afficher un message de débogage pour suivre l'exécution
-        print("Initialisation de AudioChunksView")
-        
+    def __init__(self, master, chunks: List[Tuple[str, int, float]], webhook_url: str, num_parts: int = None,
+                 session=None, offset_map=None, profile=None):
         # Appeler le constructeur de la classe parente (ttk.Frame)
         # 'master' est le widget parent qui contiendra cette vue
         super().__init__(master)
@@ -59,26 +94,45 @@ class AudioChunksView(ttk.Frame):
         # Variable pour suivre le lecteur audio actuellement actif
         self.current_player = None
         
+        # Identifiant de la ligne en cours de lecture dans la liste (None si aucune)
+        self.playing_row = None
+        
+        # Rafraîchissement du curseur de lecture et saut différé pendant un glissement
+        self._cursor_after_id = None
+        self._scrub_after_id = None
+        self._scrub_target = None
+        
         # Nombre de morceaux choisi par l'utilisateur (peut être différent du nombre réel de morceaux)
         self.num_parts = num_parts
         
-        # Afficher le nombre de morceaux reçus pour le débogage
-        print(f"Nombre de morceaux reçus : {len(chunks)}")
+        # Session de l'espace de travail qui contient les morceaux. Elle arrive protégée
+        # de l'éviction et le reste pendant toute la vie de la vue (écoute, envoi) :
+        # elle n'est libérée, puis supprimée, qu'à la fermeture de la vue
+        self.session = session
         
-        # Initialiser le module de son de pygame pour pouvoir lire les fichiers audio
-        pygame.mixer.init()
+        # Correspondance des temps avec l'enregistrement original (si les silences ont été supprimés)
+        self.offset_map = offset_map
+        
+        # Profil de la session (voir utils/session_profile.py), terminé à la fermeture de la vue
+        self.profile = profile
+        
+        # Jeton d'annulation de l'envoi en cours (None si aucun envoi n'est en cours)
+        self.cancel_token = None
+        
+        # Jetons de tous les envois lancés depuis cette vue, annulés à sa fermeture
+        # (y compris l'envoi différé du nombre de parties, après la fin de l'envoi)
+        self._cancel_tokens: List[CancelToken] = []
+        
+        # Récupérer le bus d'événements partagé de la fenêtre
+        # Les threads d'envoi ne touchent jamais directement aux widgets :
+        # ils déposent leurs mises à jour sur ce bus, appliquées par le thread Tk
+        self.ui_bus = UIEventBus.for_widget(self)
         
         # Appeler la méthode qui va créer tous les éléments de l'interface
         self.create_widgets()
         
-        # Confirmer que les widgets ont été créés
-        print("Widgets créés")
-        
     # Méthode pour créer tous les éléments de l'interface utilisateur
     def create_widgets(self):
-        # Afficher un message de débogage
-        print("Création des widgets")
-        
         # ===== CONFIGURATION DE LA DISPOSITION GÉNÉRALE =====
         # Configurer la grille principale pour qu'elle s'adapte à la taille de la fenêtre
         # weight=1 signifie que la colonne/ligne s'étendra proportionnellement
@@ -131,232 +185,311 @@ class AudioChunksView(ttk.Frame):
         list_frame.grid_columnconfigure(0, weight=1)  # La colonne 0 s'étendra
         list_frame.grid_rowconfigure(0, weight=1)     # La ligne 0 s'étendra
         
-        # ===== SYSTÈME DE DÉFILEMENT (SCROLLING) =====
-        # Créer un canvas qui servira de zone défilante
-        # Un canvas est un widget qui peut contenir d'autres widgets et permet le défilement
-        canvas = tk.Canvas(list_frame)
+        # ===== LISTE VIRTUALISÉE DES MORCEAUX =====
+        # Un Treeview ne crée pas de widget par ligne : Tk ne dessine que les lignes
+        # visibles. Avec 100 à 300 parties, la liste se construit instantanément
+        # et le défilement reste fluide (contrairement à un cadre + 6 widgets par morceau)
+        columns = ("part", "duration", "file", "level", "speech", "status", "play", "stop")
+        self.tree = ttk.Treeview(
+            list_frame,            # Parent: le cadre de liste
+            columns=columns,       # Colonnes affichées
+            show='headings',       # Pas de colonne d'arborescence, seulement les en-têtes
+            selectmode='browse'    # Une seule ligne sélectionnée à la fois
+        )
         
-        # Créer une barre de défilement verticale
+        # Titres et largeurs des colonnes
+        headings = {
+            "part": ("Partie", 80, 'w'),
+            "duration": ("Durée", 110, 'w'),
+            "file": ("Fichier", 200, 'w'),
+            "level": ("Niveau", 90, 'e'),
+            "speech": ("Parole", 70, 'e'),
+            "status": ("Statut", 140, 'w'),
+            "play": ("", 40, 'center'),
+            "stop": ("", 40, 'center')
+        }
+        for column, (text, width, anchor) in headings.items():
+            self.tree.heading(column, text=text)
+            # Seule la colonne du nom de fichier s'étire avec la fenêtre
+            self.tree.column(column, width=width, anchor=anchor, stretch=(column == "file"))
+        
+        # Créer une barre de défilement verticale liée au Treeview
         scrollbar = ttk.Scrollbar(
             list_frame,              # Parent: le cadre de liste
             orient="vertical",        # Orientation verticale
-            command=canvas.yview      # Lier la barre au défilement vertical du canvas
+            command=self.tree.yview   # Lier la barre au défilement vertical de la liste
         )
+        self.tree.configure(yscrollcommand=scrollbar.set)
         
-        # Créer un cadre qui contiendra les widgets des morceaux
-        # Ce cadre sera placé à l'intérieur du canvas
-        self.scrollable_frame = ttk.Frame(canvas)
-        
-        # Configurer le défilement: quand la taille du cadre change, mettre à jour
-        # la région de défilement du canvas
-        self.scrollable_frame.bind(
-            "<Configure>",  # Événement: quand la configuration du widget change
-            # Fonction lambda qui met à jour la région de défilement
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        # Créer une fenêtre dans le canvas qui affichera le cadre défilable
-        # (0, 0) sont les coordonnées, anchor="nw" signifie que le point d'ancrage
-        # est le coin supérieur gauche (north-west)
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        
-        # Lier la position de la barre de défilement à la vue du canvas
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Placer le canvas et la barre de défilement dans le cadre de liste
-        # Le canvas s'étend dans toutes les directions
-        canvas.grid(row=0, column=0, sticky='nsew')
-        # La barre de défilement s'étend verticalement (north-south)
+        # Placer la liste et la barre de défilement dans le cadre de liste
+        self.tree.grid(row=0, column=0, sticky='nsew')
         scrollbar.grid(row=0, column=1, sticky='ns')
         
-        # ===== AJOUT DES MORCEAUX À L'INTERFACE =====
-        print("Ajout des morceaux à l'interface")
+        # ===== FORME D'ONDE DU MORCEAU SÉLECTIONNÉ =====
+        # Un seul canevas sous la liste, redessiné quand la sélection change
+        self.waveform = tk.Canvas(list_frame, height=WAVEFORM_HEIGHT, background='white',
+                                  highlightthickness=0)
+        self.waveform.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(5, 0))
+        self.waveform.bind("<Configure>", lambda e: self.draw_waveform())
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.draw_waveform())
+        # Un clic sur la forme d'onde lit le morceau à partir de cet endroit,
+        # un glissement déplace la lecture en continu
+        self.waveform.bind("<Button-1>", self.on_waveform_click)
+        self.waveform.bind("<B1-Motion>", self.on_waveform_drag)
+        
+        # ===== INTERACTIONS AVEC LES LIGNES =====
+        # Un clic sur les colonnes ▶️ / ⏹️ lance ou arrête la lecture de cette ligne
+        self.tree.bind("<ButtonRelease-1>", self.on_tree_click)
+        # Un double-clic ou la touche Entrée lit le morceau sélectionné
+        self.tree.bind("<Double-1>", lambda e: self.play_selected())
+        self.tree.bind("<Return>", lambda e: self.play_selected())
+        
+        # Associer l'identifiant de chaque ligne au chemin de son fichier (et à sa durée)
+        self.paths_by_row = {}
+        self.durations_by_row = {}
+        
+        # Analyses audio par ligne (lues depuis le cache écrit après le découpage)
+        self.analysis_by_row = {}
         
-        # Parcourir tous les morceaux et créer un cadre pour chacun
+        # ===== AJOUT DES MORCEAUX À L'INTERFACE =====
+        # Parcourir tous les morceaux et ajouter une ligne pour chacun
         for path, num, duration in self.chunks:
-            # Afficher un message de débogage
-            print(f"Ajout du morceau {num}")
-            # Créer un cadre pour ce morceau avec ses contrôles
-            self.create_chunk_frame(path, num, duration)
-        
-    # Méthode pour créer l'interface d'un morceau audio individuel
-    def create_chunk_frame(self, path: str, num: int, duration: float):
-        """Crée un cadre pour afficher un morceau audio avec ses contrôles"""
-        # ===== CADRE PRINCIPAL DU MORCEAU =====
-        # Créer un cadre pour contenir tous les éléments d'un morceau
-        chunk_frame = ttk.Frame(self.scrollable_frame)  # Parent: le cadre défilable
-        
-        # Configurer le cadre pour qu'il s'étende horizontalement
-        # fill='x' signifie que le cadre s'étendra horizontalement
-        # padx et pady ajoutent des marges autour du cadre
-        chunk_frame.pack(fill='x', padx=5, pady=2)
-        
-        # Configurer la colonne du milieu (celle qui contient le nom du fichier)
-        # pour qu'elle s'étende et prenne tout l'espace disponible
-        chunk_frame.grid_columnconfigure(1, weight=1)
-        
-        # ===== SECTION INFORMATIONS (À GAUCHE) =====
-        # Créer un cadre pour les informations sur le morceau (numéro et durée)
-        info_frame = ttk.Frame(chunk_frame)
-        
-        # Placer ce cadre à gauche du cadre principal
-        # sticky='w' signifie que le cadre sera aligné à gauche (west)
-        # padx=(0, 10) ajoute une marge de 10 pixels à droite du cadre
-        info_frame.grid(row=0, column=0, sticky='w', padx=(0, 10))
-        
-        # Créer une étiquette pour afficher le numéro de la partie
-        name_label = ttk.Label(
-            info_frame,                    # Parent: le cadre d'informations
-            text=f"Partie {num}",          # Texte: "Partie 1", "Partie 2", etc.
-            font=('TkDefaultFont', 10, 'bold')  # Police en gras pour mettre en évidence
-        )
-        # Placer l'étiquette en haut du cadre d'informations, alignée à gauche
-        name_label.pack(anchor='w')
-        
-        # Créer une étiquette pour afficher la durée du morceau
-        duration_label = ttk.Label(
-            info_frame,                         # Parent: le cadre d'informations
-            text=f"Durée: {int(duration)} secondes"  # Texte: durée arrondie en secondes
-        )
-        # Placer l'étiquette sous l'étiquette du nom, alignée à gauche
-        duration_label.pack(anchor='w')
-        
-        # ===== SECTION NOM DU FICHIER (AU MILIEU) =====
-        # Créer une étiquette pour afficher le nom du fichier
-        file_label = ttk.Label(
-            chunk_frame,                    # Parent: le cadre principal du morceau
-            text=os.path.basename(path),    # Texte: juste le nom du fichier, sans le chemin
-            anchor='w'                      # Alignement du texte à gauche
-        )
-        # Placer l'étiquette au milieu du cadre principal
-        # sticky='ew' permet à l'étiquette de s'étendre horizontalement
-        file_label.grid(row=0, column=1, sticky='ew')
-        
-        # ===== SECTION CONTRÔLES AUDIO (À DROITE) =====
-        # Créer un cadre pour les boutons de contrôle audio (lecture et arrêt)
-        controls_frame = ttk.Frame(chunk_frame)
-        
-        # Placer ce cadre à droite du cadre principal
-        # sticky='e' signifie que le cadre sera aligné à droite (east)
-        controls_frame.grid(row=0, column=2, sticky='e')
-        
-        # Créer un bouton de lecture
-        play_button = ttk.Button(
-            controls_frame,                 # Parent: le cadre de contrôles
-            text="▶️",                    # Texte: icône de lecture (triangle)
-            width=3,                        # Largeur fixe pour uniformité
-            # Fonction à appeler quand on clique: jouer ce morceau spécifique
-            # Lambda est utilisé pour créer une fonction qui capture la variable 'path'
-            command=lambda: self.play_audio(path)
-        )
-        # Placer le bouton à gauche dans le cadre de contrôles
-        # side='left' place le widget à gauche des autres widgets dans le même conteneur
-        # padx ajoute une marge horizontale autour du bouton
-        play_button.pack(side='left', padx=2)
-        
-        # Créer un bouton d'arrêt
-        stop_button = ttk.Button(
-            controls_frame,                 # Parent: le cadre de contrôles
-            text="⏹️",                    # Texte: icône d'arrêt (carré)
-            width=3,                        # Largeur fixe pour uniformité
-            command=self.stop_audio         # Fonction à appeler: arrêter la lecture
+            self.add_chunk_row(path, num, duration)
+        
+    # Méthode pour ajouter la ligne d'un morceau audio individuel
+    def add_chunk_row(self, path: str, num: int, duration: float):
+        """Ajoute une ligne pour un morceau audio dans la liste"""
+        # L'identifiant de la ligne est le numéro du morceau, ce qui permet
+        # de retrouver la ligne pour mettre à jour son statut pendant l'envoi
+        row_id = str(num)
+        
+        # Statistiques audio du morceau, si l'analyse a pu être faite
+        analysis = load_part_analysis(path)
+        if analysis:
+            self.analysis_by_row[row_id] = analysis
+            level = f"{analysis['rms_dbfs']:.1f} dB"
+            speech = f"{analysis['speech_ratio'] * 100:.0f} %"
+        else:
+            level = speech = "—"
+        
+        self.tree.insert('', 'end', iid=row_id, values=(
+            f"Partie {num}",                  # "Partie 1", "Partie 2", etc.
+            f"{int(duration)} secondes",      # Durée arrondie en secondes
+            os.path.basename(path),           # Juste le nom du fichier, sans le chemin
+            level,                            # Niveau moyen (RMS) en dBFS
+            speech,                           # Proportion de parole détectée
+            "Prêt",                           # Statut initial
+            "▶️",                             # Icône de lecture
+            "⏹️"                              # Icône d'arrêt
+        ))
+        self.paths_by_row[row_id] = path
+        self.durations_by_row[row_id] = duration
+        
+    # Méthode pour dessiner la forme d'onde du morceau sélectionné
+    def draw_waveform(self):
+        """Dessine les pics min/max du morceau sélectionné dans le canevas"""
+        self.waveform.delete('all')
+        selection = self.tree.selection()
+        analysis = self.analysis_by_row.get(selection[0]) if selection else None
+        if not analysis or not analysis['peaks']:
+            return
+        
+        width = self.waveform.winfo_width()
+        middle = WAVEFORM_HEIGHT / 2
+        peaks = analysis['peaks']
+        step = width / len(peaks)
+        # Une ligne verticale par point, du minimum au maximum de l'amplitude
+        for index, (low, high) in enumerate(peaks):
+            x = index * step + step / 2
+            self.waveform.create_line(
+                x, middle - high * middle,
+                x, middle - low * middle + 1,
+                fill='#3b7dd8', width=max(1, step - 1)
+            )
+        self.draw_cursor()
+        
+    # Méthode pour placer le curseur de lecture sur la forme d'onde
+    def draw_cursor(self):
+        """Dessine la position de lecture si le morceau affiché est celui qui joue"""
+        self.waveform.delete('cursor')
+        selection = self.tree.selection()
+        if not selection or selection[0] != self.playing_row:
+            return
+        position = preview_engine.position()
+        duration = self.durations_by_row.get(self.playing_row)
+        if position is None or not duration:
+            return
+        x = min(1.0, position / duration) * self.waveform.winfo_width()
+        self.waveform.create_line(x, 0, x, WAVEFORM_HEIGHT, fill='#d83b3b', width=2, tags='cursor')
+        
+    # Méthode appelée régulièrement pendant la lecture
+    def _update_cursor(self):
+        """Déplace le curseur tant qu'un morceau de cette vue est en lecture"""
+        self._cursor_after_id = None
+        if self.playing_row is None:
+            return
+        self.draw_cursor()
+        self._cursor_after_id = self.after(CURSOR_INTERVAL_MS, self._update_cursor)
+        
+    # Méthode pour convertir un clic sur la forme d'onde en position dans le morceau
+    def _waveform_position(self, event):
+        """Renvoie (ligne affichée, position en secondes) sous le pointeur, ou None"""
+        selection = self.tree.selection()
+        width = self.waveform.winfo_width()
+        if not selection or width <= 0:
+            return None
+        row_id = selection[0]
+        fraction = min(max(event.x / width, 0.0), 1.0)
+        return row_id, fraction * self.durations_by_row.get(row_id, 0)
+        
+    # Méthode appelée lors d'un clic sur la forme d'onde
+    def on_waveform_click(self, event):
+        """Lit le morceau affiché à partir de la position cliquée"""
+        target = self._waveform_position(event)
+        if target is None:
+            return
+        row_id, seconds = target
+        if row_id == self.playing_row:
+            preview_engine.seek(seconds)
+        else:
+            self.play_audio(self.paths_by_row[row_id], row_id, seconds)
+        
+    # Méthode appelée pendant un glissement sur la forme d'onde
+    def on_waveform_drag(self, event):
+        """Suit le pointeur : les sauts sont regroupés pour ne pas relancer ffmpeg en continu"""
+        target = self._waveform_position(event)
+        if target is None or target[0] != self.playing_row:
+            return
+        self._scrub_target = target[1]
+        if self._scrub_after_id is None:
+            self._scrub_after_id = self.after(SCRUB_INTERVAL_MS, self._apply_scrub)
+        
+    def _apply_scrub(self):
+        """Saute à la dernière position demandée pendant le glissement"""
+        self._scrub_after_id = None
+        if self._scrub_target is not None and self.playing_row is not None:
+            preview_engine.seek(self._scrub_target)
+        self._scrub_target = None
+        
+    # Méthode appelée lors d'un clic dans la liste
+    def on_tree_click(self, event):
+        """Lance ou arrête la lecture si le clic tombe sur une colonne de contrôle"""
+        row_id = self.tree.identify_row(event.y)
+        if not row_id:
+            return
+        # identify_column renvoie '#1', '#2'... dans l'ordre des colonnes affichées
+        column = self.tree.column(self.tree.identify_column(event.x), 'id')
+        if column == "play":
+            self.play_audio(self.paths_by_row[row_id], row_id)
+        elif column == "stop":
+            self.stop_audio()
+        
+    # Méthode pour lire le morceau sélectionné
+    def play_selected(self):
+        """Lit le morceau actuellement sélectionné dans la liste"""
+        selection = self.tree.selection()
+        if selection:
+            self.play_audio(self.paths_by_row[selection[0]], selection[0])
+        
+    # Méthode pour changer le statut d'une ligne depuis n'importe quel thread
+    def set_row_status(self, num: int, status: str):
+        """Met à jour la colonne Statut d'un morceau"""
+        row_id = str(num)
+        self.ui_bus.post(
+            (id(self), 'row', row_id),                       # Une clé par ligne
+            lambda: self.tree.set(row_id, "status", status)  # Appliqué par le thread Tk
         )
-        # Placer le bouton à droite du bouton de lecture
-        stop_button.pack(side='left', padx=2)
         
     # Méthode pour envoyer tous les morceaux audio au webhook
     def send_all_chunks(self):
         """Envoie tous les morceaux au webhook"""
+        # Pendant un envoi, le bouton sert à l'annuler
+        if self.cancel_token is not None:
+            self.cancel_send()
+            return
+        
+        # Jeton propre à cet envoi : annulé par le bouton ou à la fermeture de la vue
+        cancel_token = self.cancel_token = CancelToken()
+        self._cancel_tokens.append(cancel_token)
+        
         # ===== FONCTION INTERNE POUR L'ENVOI EN ARRIÈRE-PLAN =====
         # Cette fonction sera exécutée dans un thread séparé pour ne pas bloquer l'interface
         def send_in_thread():
-            # Désactiver le bouton d'envoi pendant l'opération pour éviter les envois multiples
-            self.send_button.config(state='disabled')
+            # Importer le module d'envoi ici (il charge requests) : inutile tant qu'on n'envoie rien
+            from utils.webhook import send_chunks_to_webhook, send_parts_count_to_webhook
             
-            # Calculer le nombre total de morceaux à envoyer
-            total_chunks = len(self.chunks)
+            # ===== TEMPS RESTANT PRÉVU =====
+            # Prévision tirée de l'historique des envois, corrigée au fil des morceaux envoyés
+            try:
+                total_bytes = sum(part_size(path) for path, _, _ in self.chunks)
+            except OSError:
+                total_bytes = 0  # Morceau manquant : l'envoi le signalera
+            upload_seconds, samples = cost_model.predict_upload(total_bytes, len(self.chunks))
+            eta = EtaTracker(Estimate(0.0, upload_seconds, total_bytes, samples))
+            eta.start(KIND_UPLOAD)
+            sent_parts = []
             
-            # ===== GÉNÉRATION D'UN IDENTIFIANT UNIQUE =====
-            # Importer les modules nécessaires ici pour éviter de les charger si on n'utilise pas cette fonction
-            import uuid
-            import time
+            def show_status(text):
+                fraction = len(sent_parts) / len(self.chunks) if self.chunks else None
+                self.set_status(f"{text} — {eta.describe(fraction)}")
             
-            # Créer un identifiant unique composé du timestamp actuel et d'un UUID court
-            # Cela permet d'identifier de manière unique cette session d'envoi
-            # et d'éviter que des fichiers de sessions précédentes soient traités par erreur
-            session_id = f"{int(time.time())}_{str(uuid.uuid4())[:8]}"
+            def show_part_status(num, status):
+                if status == "Envoyé":
+                    sent_parts.append(num)
+                self.set_row_status(num, status)
             
+            started = time.monotonic()
             # ===== ENVOI DE CHAQUE MORCEAU =====
-            # Parcourir tous les morceaux un par un
-            for path, num, duration in self.chunks:
-                # Mettre à jour l'étiquette de statut pour informer l'utilisateur
-                self.status_label.config(
-                    text=f"Envoi du morceau {num}/{total_chunks}..."
+            # La fonction send_chunks_to_webhook génère un identifiant de session unique,
+            # prépare les métadonnées de chaque morceau et les envoie un par un
+            # La session de profilage (si activée) couvre aussi l'envoi
+            with attach_profile(self.profile):
+                success, message = send_chunks_to_webhook(
+                    self.webhook_url,   # URL du webhook
+                    self.chunks,        # Liste des morceaux à envoyer
+                    self.num_parts,     # Nombre de parties choisi par l'utilisateur
+                    # Mettre à jour l'étiquette de statut avant chaque envoi
+                    # (avec le temps restant prévu)
+                    status_callback=show_status,
+                    # Mettre à jour la colonne Statut de chaque morceau
+                    part_status_callback=show_part_status,
+                    # Les copies temporaires de l'envoi restent dans la session
+                    work_dir=self.session.path if self.session else None,
+                    # Le manifeste de la session est envoyé avant les morceaux
+                    manifest_url=MANIFEST_WEBHOOK_URL,
+                    # Positions des morceaux dans l'enregistrement original
+                    offset_map=self.offset_map,
+                    # Le bouton « Annuler l'envoi » interrompt la requête en cours
+                    cancel_token=cancel_token
                 )
-                # Forcer la mise à jour de l'interface pour que le changement soit visible immédiatement
-                self.update_idletasks()
-                
-                # ===== VÉRIFICATION DE L'EXISTENCE DU FICHIER =====
-                # Vérifier que le fichier existe toujours avant d'essayer de l'envoyer
-                # (il pourrait avoir été supprimé entre-temps)
-                if not os.path.exists(path):
-                    # Afficher un message d'erreur si le fichier n'existe plus
-                    self.status_label.config(
-                        text=f"Erreur: Le fichier {os.path.basename(path)} n'existe plus"
-                    )
-                    # Réactiver le bouton d'envoi pour permettre à l'utilisateur de réessayer
-                    self.send_button.config(state='normal')
-                    return  # Arrêter l'envoi
-                
-                # ===== PRÉPARATION DES MÉTADONNÉES =====
-                # Créer un dictionnaire avec toutes les informations sur ce morceau
-                # Ces informations seront envoyées avec le fichier au webhook
-                metadata = {
-                    'part_number': num,                    # Numéro de ce morceau
-                    'total_parts': total_chunks,          # Nombre total de morceaux
-                    'duration_seconds': duration,          # Durée en secondes
-                    'filename': os.path.basename(path),    # Nom du fichier
-                    'user_selected_parts': self.num_parts,  # Nombre de parties choisi par l'utilisateur
-                    'session_id': session_id,              # Identifiant unique de cette session
-                    'timestamp': int(time.time())          # Horodatage actuel
-                }
-                
-                # ===== AFFICHAGE D'INFORMATIONS DE DÉBOGAGE =====
-                # Ces informations sont utiles pour comprendre ce qui se passe
-                print(f"Envoi du fichier: {path}")
-                print(f"Métadonnées: {metadata}")
-                
-                # ===== ENVOI DU FICHIER AU WEBHOOK =====
-                # Appeler la fonction qui envoie le fichier au webhook
-                # Elle renvoie un booléen indiquant le succès et un message
-                success, message = send_file_to_webhook(
-                    self.webhook_url,  # URL du webhook
-                    path,               # Chemin du fichier à envoyer
-                    metadata           # Métadonnées à envoyer avec le fichier
-                )
-                
-                # ===== GESTION DES ERREURS =====
-                # Si l'envoi a échoué, afficher un message d'erreur et arrêter
-                if not success:
-                    self.status_label.config(
-                        text=f"Erreur lors de l'envoi du morceau {num}: {message}"
-                    )
-                    # Réactiver le bouton d'envoi
-                    self.send_button.config(state='normal')
-                    return  # Arrêter l'envoi
+            
+            # Remettre le bouton d'envoi dans son état normal
+            self.ui_bus.call(self._end_send, cancel_token)
+            
+            # ===== GESTION DES ERREURS =====
+            # Si l'envoi a échoué (ou a été annulé), afficher le message et arrêter
+            # Le bouton permet alors à l'utilisateur de réessayer
+            if not success:
+                self.set_status(message)
+                return  # Arrêter l'envoi
             
             # ===== FINALISATION DE L'ENVOI =====
             # Si on arrive ici, c'est que tous les morceaux ont été envoyés avec succès
-            self.status_label.config(text="Tous les morceaux ont été envoyés !")
-            # Réactiver le bouton d'envoi
-            self.send_button.config(state='normal')
+            self.set_status("Tous les morceaux ont été envoyés !")
+            
+            # Ajouter cet envoi à l'historique : il affine les prochaines prévisions
+            cost_model.record_upload(total_bytes, len(self.chunks), time.monotonic() - started)
             
             # ===== ENVOI DU NOMBRE DE PARTIES CHOISI =====
             # Fonction interne pour envoyer le nombre de parties après un délai
             def send_parts_count():
                 # Attendre 30 secondes avant d'envoyer le nombre de parties
                 # Cela laisse le temps au serveur de traiter les fichiers audio
-                time.sleep(30)
+                # (la fermeture de la vue pendant l'attente annule cet envoi)
+                try:
+                    cancel_token.sleep(30)
+                except CancelledError:
+                    return
                 
                 # Vérifier que le nombre de parties est défini
                 if self.num_parts is not None:
@@ -368,37 +501,71 @@ class AudioChunksView(ttk.Frame):
                     
                     # Mettre à jour le statut en fonction du résultat
                     if success:
-                        self.status_label.config(
-                            text="Nombre de parties envoyé au webhook"
-                        )
+                        self.set_status("Nombre de parties envoyé au webhook")
                     else:
-                        self.status_label.config(
-                            text=f"Erreur lors de l'envoi du nombre de parties : {message}"
-                        )
+                        self.set_status(f"Erreur lors de l'envoi du nombre de parties : {message}")
             
             # Lancer l'envoi du nombre de parties dans un thread séparé
             # daemon=True signifie que ce thread s'arrêtera automatiquement quand le programme principal se terminera
             threading.Thread(target=send_parts_count, daemon=True).start()
         
+        # Pendant l'opération, le bouton d'envoi devient un bouton d'annulation
+        # (on est encore dans le thread Tk ici, on peut donc modifier le widget directement)
+        self.send_button.config(text="Annuler l'envoi")
+        
         # ===== LANCEMENT DE L'ENVOI =====
         # Lancer l'envoi dans un thread séparé pour ne pas bloquer l'interface
         # L'utilisateur pourra continuer à utiliser l'application pendant l'envoi
         threading.Thread(target=send_in_thread, daemon=True).start()
         
+    # Méthode pour annuler l'envoi en cours
+    def cancel_send(self):
+        """Interrompt l'envoi en cours (la requête en cours est abandonnée)"""
+        if self.cancel_token is not None and not self.cancel_token.cancelled:
+            self.cancel_token.cancel()
+            self.send_button.config(state='disabled')
+            self.set_status("Annulation de l'envoi...")
+        
+    # Méthode appelée dans le thread Tk à la fin d'un envoi (réussi, échoué ou annulé)
+    def _end_send(self, cancel_token: CancelToken):
+        """Remet le bouton d'envoi dans son état normal"""
+        if self.cancel_token is cancel_token:
+            self.cancel_token = None
+        self.send_button.config(text="Envoyer au webhook", state='normal')
+        
+    # Méthode pour mettre à jour le statut depuis n'importe quel thread
+    def set_status(self, text: str):
+        """Affiche un message de statut (les messages rapprochés sont fusionnés)"""
+        # La clé identifie l'étiquette : seul le dernier texte déposé entre deux
+        # rafraîchissements de l'interface sera réellement affiché
+        self.ui_bus.post((id(self), 'status'), self.status_label.config, {'text': text})
+        
     # Méthode pour jouer un fichier audio
-    def play_audio(self, path: str):
-        """Joue un fichier audio"""
+    def play_audio(self, path: str, row_id: str = None, offset: float = 0.0):
+        """Joue un fichier audio, à partir de offset secondes"""
         # ===== LECTURE AUDIO =====
         # D'abord arrêter toute lecture en cours pour éviter la superposition des sons
         self.stop_audio()
         
-        # Charger le fichier audio dans le lecteur pygame
-        # pygame.mixer.music est le module de pygame qui gère la lecture audio
-        pygame.mixer.music.load(path)
+        # Démarrer la lecture : le morceau est décodé en flux, sans être chargé en entier
+        # À la fin du morceau, le statut de la ligne est remis à jour par le thread Tk
+        preview_engine.play(
+            path,
+            offset,
+            on_end=lambda: self.ui_bus.post((id(self), 'playback_end'), self._on_playback_end, row_id)
+        )
+        
+        # Indiquer dans la liste quel morceau est en cours de lecture
+        if row_id is not None:
+            self.playing_row = row_id
+            self.tree.set(row_id, "status", "Lecture")
+            self._update_cursor()
         
-        # Démarrer la lecture du fichier audio
-        # Sans paramètres, play() joue le fichier une seule fois
-        pygame.mixer.music.play()
+    # Méthode appelée dans le thread Tk quand un morceau a été lu jusqu'au bout
+    def _on_playback_end(self, row_id):
+        """Remet la ligne à l'état « Prêt » si elle est toujours celle en lecture"""
+        if row_id is not None and row_id == self.playing_row:
+            self.stop_audio()
         
     # Méthode pour arrêter la lecture audio
     def stop_audio(self):
@@ -406,18 +573,46 @@ class AudioChunksView(ttk.Frame):
         # Arrêter immédiatement toute lecture audio en cours
         # Cette fonction est appelée soit directement par le bouton d'arrêt,
         # soit avant de jouer un nouveau fichier
-        pygame.mixer.music.stop()
+        # Si rien n'a jamais été lu, il n'y a rien à arrêter
+        preview_engine.stop()
+        if self._cursor_after_id is not None:
+            self.after_cancel(self._cursor_after_id)
+            self._cursor_after_id = None
+        self.waveform.delete('cursor')
+        
+        # Remettre le statut de la ligne qui était en lecture
+        if self.playing_row is not None and self.tree.exists(self.playing_row):
+            if self.tree.set(self.playing_row, "status") == "Lecture":
+                self.tree.set(self.playing_row, "status", "Prêt")
+        self.playing_row = None
         
     # Méthode pour nettoyer les ressources lors de la fermeture de l'application
     def destroy(self):
         """Nettoie les ressources lors de la fermeture"""
         # ===== NETTOYAGE DES RESSOURCES =====
         # Arrêter toute lecture audio en cours
+        # Le module audio de pygame reste initialisé : il est partagé par toutes les vues
         self.stop_audio()
-        
-        # Fermer proprement le module audio de pygame
-        # Cela libère les ressources audio utilisées par l'application
-        pygame.mixer.quit()
+        if self._scrub_after_id is not None:
+            self.after_cancel(self._scrub_after_id)
+            self._scrub_after_id = None
+        
+        # Arrêter les envois encore en cours : sans cela, ils continueraient
+        # après la fermeture de la vue, sur des fichiers en cours de suppression
+        for cancel_token in self._cancel_tokens:
+            cancel_token.cancel()
+        self._cancel_tokens = []
+        
+        # Supprimer les morceaux et fichiers intermédiaires, en arrière-plan
+        # pour ne pas bloquer l'interface pendant la suppression de gros fichiers
+        if self.session:
+            self.session.unpin()
+            self.session.release()
+            self.session = None
+        
+        # Terminer le profil de la session et écrire son rapport (si le profilage est activé)
+        close_profile(self.profile)
+        self.profile = None
         
         # Appeler la méthode destroy de la classe parente (ttk.Frame)
         # pour s'assurer que toutes les ressources sont correctement libérées
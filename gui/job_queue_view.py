@@ -0,0 +1,186 @@
+import os
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from utils.job_queue import Job, JobScheduler, STATE_ENCODING, STATE_UPLOADING
+from utils.conversion_plan import INPUT_EXTENSIONS
+
+# Intervalle de rafraîchissement du tableau des tâches (en millisecondes)
+REFRESH_INTERVAL_MS = 500
+
+class JobQueueView(ttk.Frame):
+    """Onglet permettant de mettre plusieurs enregistrements en file d'attente"""
+
+    def __init__(self, master, webhook_url, parts_count_webhook_url=None, manifest_webhook_url=None):
+        super().__init__(master)
+
+        self.scheduler = JobScheduler(
+            webhook_url,
+            parts_count_webhook_url,
+            manifest_webhook_url=manifest_webhook_url
+        )
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        self.create_widgets()
+
+        # Démarrer le rafraîchissement périodique du tableau
+        self._refresh_after_id = None
+        self.refresh()
+
+    def create_widgets(self):
+        # Options appliquées aux prochaines tâches ajoutées
+        options_frame = ttk.LabelFrame(self, text="Options des nouvelles tâches", padding="10")
+        options_frame.grid(row=0, column=0, sticky='ew', padx=10, pady=5)
+
+        self.quality_mapping = {
+            "Basse qualité (plus petit fichier)": "128k",
+            "Qualité standard": "192k",
+            "Haute qualité": "256k",
+            "Qualité supérieure (plus grand fichier)": "320k"
+        }
+        self.quality_var = tk.StringVar(value="Qualité standard")
+        ttk.Label(options_frame, text="Qualité audio :").pack(side='left', padx=5)
+        ttk.Combobox(
+            options_frame,
+            textvariable=self.quality_var,
+            values=list(self.quality_mapping.keys()),
+            state="readonly",
+            width=30
+        ).pack(side='left', padx=5)
+
+        self.num_parts_var = tk.StringVar(value="2")
+        ttk.Label(options_frame, text="Nombre de parties :").pack(side='left', padx=5)
+        ttk.Entry(options_frame, textvariable=self.num_parts_var, width=10).pack(side='left', padx=5)
+
+        self.trim_silence_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            options_frame,
+            text="Supprimer les longs silences",
+            variable=self.trim_silence_var
+        ).pack(side='left', padx=5)
+
+        # Bouton d'ajout et résumé des limites de l'ordonnanceur
+        actions_frame = ttk.Frame(self)
+        actions_frame.grid(row=1, column=0, sticky='ew', padx=10, pady=5)
+        actions_frame.grid_columnconfigure(0, weight=1)
+
+        self.summary_label = ttk.Label(actions_frame, text="")
+        self.summary_label.grid(row=0, column=0, sticky='w', padx=5)
+
+        ttk.Button(
+            actions_frame,
+            text="Annuler la sélection",
+            command=self.cancel_selected
+        ).grid(row=0, column=1, padx=5)
+
+        ttk.Button(
+            actions_frame,
+            text="Ajouter des fichiers",
+            command=self.add_files,
+            style="Accent.TButton"
+        ).grid(row=0, column=2, padx=5)
+
+        # Tableau des tâches
+        table_frame = ttk.Frame(self)
+        table_frame.grid(row=2, column=0, sticky='nsew', padx=10, pady=5)
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+
+        columns = ("file", "state", "encode", "upload", "total", "remaining", "message")
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        headings = {
+            "file": ("Fichier", 220),
+            "state": ("État", 120),
+            "encode": ("Encodage", 80),
+            "upload": ("Envoi", 80),
+            "total": ("Total", 80),
+            "remaining": ("Reste (estimé)", 100),
+            "message": ("Détail", 300)
+        }
+        for column, (text, width) in headings.items():
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, anchor='w')
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar.grid(row=0, column=1, sticky='ns')
+
+    def add_files(self):
+        file_paths = filedialog.askopenfilenames(
+            title="Sélectionner des fichiers vidéo ou audio",
+            filetypes=[
+                ("Fichiers vidéo et audio", " ".join(f"*{ext}" for ext in INPUT_EXTENSIONS)),
+                ("Tous les fichiers", "*.*")
+            ]
+        )
+        if not file_paths:
+            return
+
+        try:
+            num_parts = int(self.num_parts_var.get())
+            if num_parts < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Erreur", "Le nombre de parties doit être supérieur à 0")
+            return
+
+        bitrate = self.quality_mapping[self.quality_var.get()]
+        trim_silence = self.trim_silence_var.get()
+        for file_path in file_paths:
+            job = self.scheduler.submit(Job(file_path, bitrate, num_parts, trim_silence))
+            self.tree.insert('', 'end', iid=str(job.id), values=(os.path.basename(file_path),))
+
+        self.refresh()
+
+    def cancel_selected(self):
+        """Annule les tâches sélectionnées (ffmpeg et l'envoi en cours sont arrêtés)"""
+        selected = set(self.tree.selection())
+        for job in list(self.scheduler.jobs):
+            if str(job.id) in selected:
+                job.cancel()
+        self.refresh()
+
+    @staticmethod
+    def _format_duration(seconds):
+        if seconds is None:
+            return ""
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes}:{seconds:02d}"
+
+    def refresh(self):
+        """Met à jour le tableau à partir de l'état des tâches (dans le thread Tk)"""
+        if self._refresh_after_id:
+            self.after_cancel(self._refresh_after_id)
+
+        for job in list(self.scheduler.jobs):
+            if not self.tree.exists(str(job.id)):
+                continue
+            self.tree.item(str(job.id), values=(
+                job.filename,
+                job.state,
+                self._format_duration(job.stage_duration(STATE_ENCODING)),
+                self._format_duration(job.stage_duration(STATE_UPLOADING)),
+                self._format_duration(job.total_duration()),
+                self._format_duration(job.remaining_seconds()),
+                job.message
+            ))
+
+        active = sum(1 for job in self.scheduler.jobs if job.state == STATE_ENCODING)
+        uploading = sum(1 for job in self.scheduler.jobs if job.state == STATE_UPLOADING)
+        self.summary_label.config(
+            text=f"Encodages : {active}/{self.scheduler.cpu_slots}  —  "
+                 f"Envois : {uploading}/{self.scheduler.network_slots}"
+        )
+
+        self._refresh_after_id = self.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def destroy(self):
+        if self._refresh_after_id:
+            self.after_cancel(self._refresh_after_id)
+            self._refresh_after_id = None
+        # Ne pas laisser les tâches tourner après la fermeture de la fenêtre
+        for job in list(self.scheduler.jobs):
+            job.cancel()
+        super().destroy()
@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, PhotoImage
-from PIL import Image, ImageTk
 import os
 from gui.theme import ModernTheme
+from utils.bandwidth import bandwidth_limiter, office_hours_profiles
 
 class Sidebar(ttk.Frame):
     def __init__(self, master, notebook):
@@ -40,16 +40,14 @@ class Sidebar(ttk.Frame):
         logo_frame = ttk.Frame(self, style="Sidebar.TFrame")
         logo_frame.pack(fill='x', pady=(20, 30))
         
-        # Charger et redimensionner le logo
-        self.logo_image = self.load_and_resize_logo()
-        
-        # Afficher le logo
-        logo_label = ttk.Label(
+        # Emplacement du logo : l'image (qui nécessite PIL) est chargée par show_logo()
+        # après le premier affichage de la fenêtre
+        self.logo_image = None
+        self.logo_label = ttk.Label(
             logo_frame,
-            image=self.logo_image,
             background=ModernTheme.SIDEBAR_COLOR
         )
-        logo_label.pack(pady=10)
+        self.logo_label.pack(pady=10)
         
         # Lier l'événement de redimensionnement
         self.master.bind("<Configure>", self.on_window_resize)
@@ -57,7 +55,8 @@ class Sidebar(ttk.Frame):
         # Boutons de navigation
         self.buttons = []
         pages = [
-            ("🎥 Post Webinar", 0)
+            ("🎥 Post Webinar", 0),
+            ("📋 File d'attente", 1)
         ]
         
         for text, index in pages:
@@ -73,6 +72,9 @@ class Sidebar(ttk.Frame):
         # Séparateur
         ttk.Separator(self).pack(fill='x', pady=20)
         
+        # Plafond de débit d'envoi, commun à tous les envois en cours
+        self.create_bandwidth_selector()
+        
         # Version
         version_label = ttk.Label(
             self,
@@ -82,6 +84,58 @@ class Sidebar(ttk.Frame):
         )
         version_label.pack(side='bottom', pady=10)
         
+    def create_bandwidth_selector(self):
+        """Liste permettant de changer le débit d'envoi pendant que les envois tournent"""
+        # Libellé affiché -> (débit par défaut en octets/s, plages horaires)
+        self.bandwidth_choices = {
+            "Illimité": (None, []),
+            "Heures de bureau (512 Ko/s)": (None, office_hours_profiles()),
+            "2 Mo/s": (2 * 1024 * 1024, []),
+            "1 Mo/s": (1024 * 1024, []),
+            "512 Ko/s": (512 * 1024, []),
+            "256 Ko/s": (256 * 1024, [])
+        }
+        initial = "Illimité"
+        if bandwidth_limiter.default_limit or bandwidth_limiter.profiles:
+            # Réglage passé en ligne de commande : le proposer tel quel
+            initial = "Ligne de commande"
+            self.bandwidth_choices = {
+                initial: (bandwidth_limiter.default_limit, bandwidth_limiter.profiles),
+                **self.bandwidth_choices
+            }
+        
+        ttk.Label(
+            self,
+            text="Débit d'envoi",
+            foreground="white",
+            background=ModernTheme.SIDEBAR_COLOR
+        ).pack(fill='x', padx=10)
+        
+        self.bandwidth_var = tk.StringVar(value=initial)
+        combo = ttk.Combobox(
+            self,
+            textvariable=self.bandwidth_var,
+            values=list(self.bandwidth_choices.keys()),
+            state="readonly",
+            width=24
+        )
+        combo.pack(fill='x', padx=10, pady=5)
+        combo.bind("<<ComboboxSelected>>", self.on_bandwidth_selected)
+        
+    def on_bandwidth_selected(self, event=None):
+        """Applique immédiatement le débit choisi, y compris aux envois déjà commencés"""
+        limit, profiles = self.bandwidth_choices[self.bandwidth_var.get()]
+        bandwidth_limiter.set_profiles(profiles)
+        bandwidth_limiter.set_limit(limit)
+        
+    def show_logo(self):
+        """Charge et affiche le logo"""
+        try:
+            self.logo_image = self.load_and_resize_logo()
+            self.logo_label.configure(image=self.logo_image)
+        except Exception as e:
+            print(f"Erreur lors du chargement du logo: {e}")
+        
     def switch_page(self, index):
         # Vérifier que l'index est valide avant de changer de page
         if index < len(self.notebook.tabs()):
@@ -89,6 +143,8 @@ class Sidebar(ttk.Frame):
     
     def load_and_resize_logo(self, width=150):
         """Charge et redimensionne le logo en fonction de la largeur spécifiée"""
+        from PIL import Image, ImageTk
+        
         # Si l'image originale n'est pas encore chargée, la charger une seule fois
         if not hasattr(self, '_original_logo'):
             # Chemin vers le logo
@@ -138,8 +194,9 @@ class Sidebar(ttk.Frame):
         # Obtenir la largeur actuelle de la sidebar
         sidebar_width = self.winfo_width()
         
-        # Ne pas redimensionner si la largeur est trop petite ou nulle
-        if sidebar_width < 50:
+        # Ne pas redimensionner si la largeur est trop petite ou nulle,
+        # ni avant que le logo ait été affiché une première fois
+        if sidebar_width < 50 or self.logo_image is None:
             return
             
         # Arrondir la largeur au multiple de 10 le plus proche pour réduire le nombre de redimensionnements
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from itertools import count
+
+# Nombre de rafraîchissements de l'interface par seconde
+FRAME_RATE = 25
+
+class UIEventBus:
+    """
+    File d'événements entre les threads de travail et la boucle Tk.
+
+    Tkinter n'est pas thread-safe : seuls les appels faits depuis le thread principal
+    sont sûrs. Les threads de travail déposent donc leurs mises à jour ici, et le
+    thread Tk les applique à fréquence fixe via after().
+
+    - post(key, ...) : mise à jour fusionnable. Si plusieurs événements de même clé
+      arrivent entre deux rafraîchissements, seul le dernier est appliqué.
+    - call(...) : action ponctuelle (création de widget, fin de traitement...),
+      toujours exécutée, dans l'ordre d'arrivée.
+    - dialog(...) : boîte de dialogue modale. Elle est ouverte hors du rafraîchissement
+      (after_idle) : sa boucle d'attente ne bloque pas les autres mises à jour.
+    """
+
+    def __init__(self, widget, frame_rate=FRAME_RATE):
+        self.widget = widget
+        self.interval_ms = max(1, int(1000 / frame_rate))
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = count()
+        self._after_id = None
+        self._drain()
+
+    @classmethod
+    def for_widget(cls, widget):
+        """
+        Renvoie le bus partagé de la fenêtre principale (créé au premier appel).
+        Doit être appelé depuis le thread Tk, par exemple dans un constructeur de vue.
+        """
+        root = widget.winfo_toplevel()
+        bus = getattr(root, '_ui_event_bus', None)
+        if bus is None:
+            bus = cls(root)
+            root._ui_event_bus = bus
+        return bus
+
+    def post(self, key, callback, *args):
+        """Dépose une mise à jour fusionnable (utilisable depuis n'importe quel thread)"""
+        with self._lock:
+            self._events.pop(key, None)
+            self._events[key] = (callback, args)
+
+    def call(self, callback, *args):
+        """Dépose une action à exécuter dans le thread Tk (jamais fusionnée)"""
+        with self._lock:
+            self._events[('call', next(self._sequence))] = (callback, args)
+
+    def dialog(self, callback, *args):
+        """Dépose l'ouverture d'une boîte de dialogue modale (messagebox.showerror...)"""
+        self.call(self.widget.after_idle, callback, *args)
+
+    def _drain(self):
+        """Applique les événements en attente (exécuté dans le thread Tk)"""
+        with self._lock:
+            events = list(self._events.values())
+            self._events.clear()
+
+        # Programmer le prochain rafraîchissement avant d'appliquer les événements :
+        # si l'un d'eux attend (boîte de dialogue modale), les rafraîchissements
+        # continuent pendant l'attente au lieu de geler l'interface
+        try:
+            self._after_id = self.widget.after(self.interval_ms, self._drain)
+        except Exception:
+            # La fenêtre principale a été détruite
+            self._after_id = None
+
+        for callback, args in events:
+            try:
+                callback(*args)
+            except Exception as e:
+                # Un widget détruit entre-temps ne doit pas arrêter le rafraîchissement
+                print(f"Erreur lors de la mise à jour de l'interface : {e}")
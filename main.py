@@ -1,11 +1,27 @@
+import sys
+
+# Le profil de démarrage doit être installé avant tous les autres imports pour les mesurer
+if "--startup-profile" in sys.argv:
+    from utils.startup_profile import StartupProfiler
+    STARTUP_PROFILER = StartupProfiler.install()
+else:
+    STARTUP_PROFILER = None
+
+import argparse
 import tkinter as tk
 from tkinter import ttk
 import os
-from PIL import Image, ImageTk
-from src.mp4_converter import MP4ToMP3Converter
 from gui.theme import ModernTheme
 from gui.sidebar import Sidebar
 
+# Les modules lourds (PIL, pygame, requests, vues des onglets) sont importés
+# seulement quand ils sont nécessaires, pour que la fenêtre apparaisse au plus vite
+
+def mark_startup(label):
+    """Enregistre une étape du démarrage si le profil de démarrage est actif"""
+    if STARTUP_PROFILER:
+        STARTUP_PROFILER.mark(label)
+
 class MainApplication:
     def __init__(self):
         # Définir les variables de configuration avant de créer la fenêtre principale
@@ -14,13 +30,11 @@ class MainApplication:
         
         self.root = tk.Tk()
         self.root.title("BAW Marketing Tools")
+        mark_startup("fenêtre créée")
         
         # Améliorer la résolution pour les écrans haute densité
         self.configure_high_dpi()
         
-        # Définir l'icône de l'application
-        self.set_app_icon()
-        
         # Définir une taille minimale
         self.root.minsize(800, 600)
         
@@ -54,23 +68,58 @@ class MainApplication:
         self.sidebar = Sidebar(self.root, self.notebook)
         self.sidebar.grid(row=0, column=0, sticky='ns')
         
-        # Onglet Automatisation Post Webinar
-        webinar_frame = ttk.Frame(self.notebook, style="Card.TFrame", padding=20)
-        self.notebook.add(webinar_frame, text="Automatisation Post Webinar")
+        # Les onglets sont créés vides : leur contenu est construit après le premier affichage
+        self.webinar_frame = ttk.Frame(self.notebook, style="Card.TFrame", padding=20)
+        self.notebook.add(self.webinar_frame, text="Automatisation Post Webinar")
+        
+        self.queue_frame = ttk.Frame(self.notebook, style="Card.TFrame", padding=20)
+        self.notebook.add(self.queue_frame, text="File d'attente")
         
+        # Message affiché pendant la construction des onglets
+        self.loading_label = ttk.Label(self.webinar_frame, text="Chargement...")
+        self.loading_label.pack(pady=20)
+        
+    def create_deferred_widgets(self):
+        """Construit le contenu des onglets, une fois la fenêtre affichée"""
+        from src.mp4_converter import MP4ToMP3Converter, WEBHOOK_URL
+        from gui.audio_chunks_view import PARTS_COUNT_WEBHOOK_URL, MANIFEST_WEBHOOK_URL
+        from gui.job_queue_view import JobQueueView
+        
+        self.loading_label.destroy()
+        
+        # Onglet Automatisation Post Webinar
         # Titre de la section
         title = ttk.Label(
-            webinar_frame,
+            self.webinar_frame,
             text="Convertisseur MP4 vers MP3",
             style="Title.TLabel"
         )
         title.pack(pady=(0, 20))
         
         # Ajout du convertisseur MP4
-        converter = MP4ToMP3Converter(webinar_frame)
+        converter = MP4ToMP3Converter(self.webinar_frame)
         converter.pack(expand=True, fill='both')
         
-
+        # Onglet File d'attente (plusieurs enregistrements à la suite)
+        queue_title = ttk.Label(
+            self.queue_frame,
+            text="File d'attente des enregistrements",
+            style="Title.TLabel"
+        )
+        queue_title.pack(pady=(0, 20))
+        
+        job_queue = JobQueueView(self.queue_frame, WEBHOOK_URL, PARTS_COUNT_WEBHOOK_URL, MANIFEST_WEBHOOK_URL)
+        job_queue.pack(expand=True, fill='both')
+        mark_startup("onglets construits")
+        
+        # Le logo et l'icône ne sont pas nécessaires au premier affichage : ils sont chargés en dernier
+        self.sidebar.show_logo()
+        self.set_app_icon()
+        mark_startup("prêt")
+        
+        if STARTUP_PROFILER:
+            STARTUP_PROFILER.uninstall()
+            STARTUP_PROFILER.print_report("startup_profile.json")
         
     def configure_high_dpi(self):
         """Configure l'application pour une meilleure résolution sur les écrans haute densité"""
@@ -91,6 +140,8 @@ class MainApplication:
             # Chemin vers le logo
             logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo_baw.png")
             
+            from PIL import Image, ImageTk
+            
             # Charger l'image avec PIL et la redimensionner immédiatement à une taille optimale pour l'icône
             # Une taille plus petite pour l'icône améliore les performances
             icon = Image.open(logo_path)
@@ -119,10 +170,180 @@ class MainApplication:
             tk.set_tk_strictMotif(True)
     
     def run(self):
-        # Définir la priorité des événements pour améliorer les performances
-        self.root.update_idletasks()
+        # Afficher immédiatement la fenêtre (barre latérale et onglets vides)
+        self.root.update()
+        mark_startup("premier affichage")
+        
+        # Construire le contenu des onglets dès que la boucle Tk est libre
+        self.root.after_idle(self.create_deferred_widgets)
+        
+        # Supprimer en arrière-plan les fichiers laissés par une session interrompue
+        self.root.after_idle(sweep_workspace)
         self.root.mainloop()
 
+def sweep_workspace():
+    """Supprime les dossiers de travail orphelins (exécuté en arrière-plan)"""
+    from utils.workspace import get_workspace
+    count = get_workspace().sweep_orphans()
+    if count:
+        print(f"{count} dossier(s) de travail orphelin(s) en cours de suppression")
+
+def run_watch_mode(args):
+    """Surveille un dossier et traite automatiquement les nouveaux enregistrements, sans interface"""
+    from utils.job_queue import JobScheduler
+    from utils.watch_folder import FolderWatcher
+    from src.mp4_converter import WEBHOOK_URL
+    from gui.audio_chunks_view import PARTS_COUNT_WEBHOOK_URL, MANIFEST_WEBHOOK_URL
+    
+    # Mode mémoire : les morceaux passent de ffmpeg à l'envoi sans être écrits sur le disque
+    memory_pool = None
+    if args.in_memory:
+        from utils.buffer_pool import BufferPool
+        memory_pool = BufferPool(args.memory_limit_mb * 1024 * 1024)
+    
+    # Encodage réparti : les réencodages en MP3 sont confiés aux travailleurs, morceau par morceau
+    encode_dispatcher = None
+    if args.encode_worker:
+        from utils.encode_dispatcher import EncodeDispatcher
+        encode_dispatcher = EncodeDispatcher(args.encode_worker, shared_storage=args.shared_storage,
+                                             token=args.encode_worker_token or os.environ.get("BAW_WORKER_TOKEN"))
+        print(encode_dispatcher.describe())
+    
+    scheduler = JobScheduler(
+        WEBHOOK_URL,
+        PARTS_COUNT_WEBHOOK_URL,
+        cpu_slots=args.max_encodes,
+        network_slots=args.max_uploads,
+        memory_pool=memory_pool,
+        manifest_webhook_url=MANIFEST_WEBHOOK_URL,
+        encode_dispatcher=encode_dispatcher
+    )
+    watcher = FolderWatcher(
+        args.watch,
+        scheduler,
+        bitrate=args.bitrate,
+        num_parts=args.parts,
+        state_path=args.state_file,
+        trim_silence=args.trim_silence
+    )
+    sweep_workspace()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Arrêt de la surveillance")
+
+def parse_args():
+    from utils.bandwidth import parse_profile
+    from utils.resource_governor import parse_cpu_list, DEFAULT_NICE, IO_PRIORITIES, DEFAULT_IO_PRIORITY
+    parser = argparse.ArgumentParser(description="BAW Marketing Tools")
+    parser.add_argument("--watch", metavar="DOSSIER",
+                        help="Surveiller un dossier et traiter les nouveaux MP4 sans interface")
+    parser.add_argument("--parts", type=int, default=2,
+                        help="Nombre de parties par enregistrement (mode surveillance)")
+    parser.add_argument("--bitrate", default="192k",
+                        help="Bitrate MP3 (mode surveillance)")
+    parser.add_argument("--max-encodes", type=int, default=None,
+                        help="Nombre maximum d'encodages simultanés (par défaut : nombre de cœurs "
+                             "disponibles, quota du conteneur compris)")
+    parser.add_argument("--max-uploads", type=int, default=2,
+                        help="Nombre maximum d'envois simultanés")
+    parser.add_argument("--max-parallel-parts", type=int, default=None,
+                        help="Nombre maximum de requêtes d'envoi de morceaux en parallèle ; le nombre "
+                             "réel s'adapte au réseau mesuré (par défaut : 4)")
+    parser.add_argument("--state-file", default=None,
+                        help="Fichier d'état des enregistrements déjà traités")
+    parser.add_argument("--trim-silence", action="store_true",
+                        help="Supprimer les longs silences avant l'encodage (mode surveillance)")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="Garder les morceaux en mémoire entre le découpage et l'envoi (mode surveillance)")
+    parser.add_argument("--memory-limit-mb", type=int, default=512,
+                        help="Plafond de mémoire des morceaux en Mo ; au-delà, ils sont écrits sur le disque")
+    parser.add_argument("--encode-worker", action="append", default=[], metavar="URL",
+                        help="Travailleur d'encodage (python -m utils.encode_worker), par exemple "
+                             "http://127.0.0.1:8770 ; les morceaux sont répartis entre les travailleurs "
+                             "(mode surveillance, option répétable)")
+    parser.add_argument("--shared-storage", action="store_true",
+                        help="Les travailleurs lancés avec --shared-storage lisent les enregistrements au "
+                             "même chemin (même machine ou dossier partagé) au lieu de recevoir chaque segment")
+    parser.add_argument("--encode-worker-token", default=None,
+                        help="Jeton d'accès des travailleurs d'encodage (par défaut : variable BAW_WORKER_TOKEN)")
+    parser.add_argument("--webhook-rate", type=float, default=None,
+                        help="Nombre moyen de requêtes par seconde vers chaque webhook (partagé par tous les envois)")
+    parser.add_argument("--webhook-burst", type=int, default=None,
+                        help="Nombre de requêtes pouvant partir d'un coup vers un webhook")
+    parser.add_argument("--upload-limit-kbps", type=float, default=None,
+                        help="Débit d'envoi maximum en Ko/s, partagé par tous les envois (par défaut : illimité)")
+    parser.add_argument("--upload-profile", action="append", default=[], type=parse_profile,
+                        metavar="HH:MM-HH:MM=KO/S",
+                        help="Débit d'envoi pendant une plage horaire, par exemple 08:00-19:00=500 "
+                             "(0 = illimité ; option répétable)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Enregistrer les traces des étapes (JSON lines) et les métriques Prometheus "
+                             "dans ~/baw_traces")
+    parser.add_argument("--trace-dir", default=None,
+                        help="Enregistrer les traces dans ce dossier (implique --trace)")
+    parser.add_argument("--trace-instance", default=None,
+                        help="Nom ajouté aux fichiers de traces et de métriques "
+                             "(par défaut : gui ou watch selon le mode)")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Afficher le temps d'import des modules et des étapes du démarrage")
+    parser.add_argument("--ffmpeg-nice", type=int, default=DEFAULT_NICE,
+                        help="Priorité des processus ffmpeg, de 0 (normale) à 19 (la plus basse)")
+    parser.add_argument("--ffmpeg-io-priority", choices=IO_PRIORITIES, default=DEFAULT_IO_PRIORITY,
+                        help="Priorité d'accès au disque des processus ffmpeg")
+    parser.add_argument("--ffmpeg-cpus", type=parse_cpu_list, default=None, metavar="LISTE",
+                        help="Cœurs autorisés pour ffmpeg, par exemple 0-3 ou 0,2 (par défaut : tous)")
+    parser.add_argument("--ffmpeg-threads", type=int, default=None,
+                        help="Nombre maximum de threads par processus ffmpeg "
+                             "(par défaut : nombre de cœurs disponibles)")
+    parser.add_argument("--no-ffmpeg-limits", action="store_true",
+                        help="Lancer ffmpeg sans baisser sa priorité ni limiter ses threads")
+    parser.add_argument("--history-file", default=None,
+                        help="Historique des traitements utilisé pour les estimations de durée "
+                             "(par défaut : ~/baw_history.jsonl)")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Ne pas enregistrer l'historique (estimations par défaut seulement)")
+    parser.add_argument("--profile", choices=("sample", "cprofile"), default=None,
+                        help="Profiler chaque conversion ou tâche (Python et processus ffmpeg) "
+                             "et enregistrer un rapport par session")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Dossier des rapports de profilage (par défaut : profiles)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    app = MainApplication()
-    app.run()
+    args = parse_args()
+    if args.webhook_rate or args.webhook_burst:
+        # Import seulement si nécessaire : utils.webhook charge requests
+        from utils.webhook import configure_rate_limit, DEFAULT_RATE_PER_SECOND, DEFAULT_BURST
+        configure_rate_limit(None, args.webhook_rate or DEFAULT_RATE_PER_SECOND,
+                             args.webhook_burst or DEFAULT_BURST)
+    if args.max_parallel_parts:
+        from utils.upload_controller import upload_controller
+        upload_controller.configure(args.max_parallel_parts)
+    if args.upload_limit_kbps or args.upload_profile:
+        from utils.bandwidth import bandwidth_limiter
+        bandwidth_limiter.set_limit(args.upload_limit_kbps * 1024 if args.upload_limit_kbps else None)
+        bandwidth_limiter.set_profiles(args.upload_profile)
+    if args.trace or args.trace_dir:
+        # Un nom par mode : l'interface et la surveillance de dossier lancées en même
+        # temps n'écrivent pas dans les mêmes fichiers
+        from utils.tracing import configure_tracing, DEFAULT_TRACE_DIR
+        try:
+            configure_tracing(args.trace_dir or DEFAULT_TRACE_DIR,
+                              args.trace_instance or ("watch" if args.watch else "gui"))
+        except OSError as e:
+            print(f"Traces désactivées : {e}")
+    if not args.no_history:
+        from utils.cost_model import configure_history, DEFAULT_HISTORY_PATH
+        configure_history(args.history_file or DEFAULT_HISTORY_PATH)
+    from utils.resource_governor import resource_governor
+    resource_governor.configure(args.ffmpeg_nice, args.ffmpeg_io_priority, args.ffmpeg_cpus,
+                                args.ffmpeg_threads, enabled=not args.no_ffmpeg_limits)
+    if args.profile:
+        from utils.session_profile import session_profiler
+        session_profiler.enable(args.profile, args.profile_dir)
+    if args.watch:
+        run_watch_mode(args)
+    else:
+        app = MainApplication()
+        app.run()
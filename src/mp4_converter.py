@@ -3,9 +3,17 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
 from utils.audio_processor import AudioProcessor
+from utils.conversion_plan import plan_conversion, execute_plan, INPUT_EXTENSIONS
 from gui.audio_chunks_view import AudioChunksView
-import subprocess
+from gui.ui_bus import UIEventBus
+from utils.workspace import get_workspace, estimate_job_bytes
+from utils.tracing import tracer
+from utils.session_profile import session_profiler, attach_profile, close_profile
+from utils.cancellation import CancelToken, CancelledError, check_cancelled
+from utils.cost_model import cost_model, EtaTracker, KIND_ENCODE
+from utils.manifest import part_size
 import tempfile
+import time
 
 # URL du webhook Make.com
 # Remplacez cette URL par votre propre webhook Make.com
@@ -112,6 +120,22 @@ class MP4ToMP3Converter(ttk.Frame):
         ttk.Label(split_frame, text="Nombre de parties :").pack(side='left', padx=5)
         ttk.Entry(split_frame, textvariable=self.num_parts_var, width=10).pack(side='left', padx=5)
         
+        # Suppression des longs silences (salle d'attente, pauses, fin d'enregistrement)
+        self.trim_silence_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            options_frame,
+            text="Supprimer les longs silences",
+            variable=self.trim_silence_var
+        ).grid(row=2, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        
+        # Durée et taille prévues d'après l'historique des traitements (voir utils/cost_model.py)
+        self.estimate_label = ttk.Label(options_frame, text="")
+        self.estimate_label.grid(row=3, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        self._estimate_after_id = None
+        self._estimate_generation = 0
+        for variable in (self.input_file, self.bitrate_var, self.num_parts_var, self.trim_silence_var):
+            variable.trace_add("write", lambda *args: self.schedule_estimate())
+        
         # Barre de progression
         progress_frame = ttk.Frame(self.scrollable_frame)
         progress_frame.grid(row=2, column=0, sticky='ew', padx=10, pady=5)
@@ -137,26 +161,78 @@ class MP4ToMP3Converter(ttk.Frame):
         self.chunks_view = None
         self.is_converting = False
         
+        # Jeton d'annulation de la conversion en cours (le bouton devient « Annuler »)
+        self.cancel_token = None
+        
+        # Bus des mises à jour de l'interface envoyées par le thread de conversion
+        self.ui_bus = UIEventBus.for_widget(self)
+        
     def select_input_file(self):
         file_path = filedialog.askopenfilename(
-            title="Sélectionner un fichier MP4",
-            filetypes=[("Fichiers MP4", "*.mp4")]
+            title="Sélectionner un fichier vidéo ou audio",
+            filetypes=[
+                ("Fichiers vidéo et audio", " ".join(f"*{ext}" for ext in INPUT_EXTENSIONS)),
+                ("Tous les fichiers", "*.*")
+            ]
         )
         if file_path:
             self.input_file.set(file_path)
             
+    def schedule_estimate(self):
+        """Recalcule l'estimation peu après le dernier changement de paramètre"""
+        if self._estimate_after_id:
+            self.after_cancel(self._estimate_after_id)
+        self._estimate_after_id = self.after(300, self._start_estimate)
+        
+    def _start_estimate(self):
+        self._estimate_after_id = None
+        self._estimate_generation += 1
+        input_path = self.input_file.get()
+        try:
+            num_parts = int(self.num_parts_var.get())
+        except ValueError:
+            num_parts = 0
+        if not input_path or num_parts < 1:
+            self.estimate_label.config(text="")
+            return
+        self.estimate_label.config(text="Estimation en cours...")
+        # ffprobe peut prendre un moment : l'estimation est calculée hors du thread Tk
+        threading.Thread(
+            target=self._compute_estimate,
+            args=(self._estimate_generation, input_path, self.bitrate_var.get(), num_parts,
+                  self.trim_silence_var.get()),
+            daemon=True
+        ).start()
+        
+    def _compute_estimate(self, generation, input_path, bitrate, num_parts, trim_silence):
+        try:
+            text = cost_model.estimate_file(input_path, bitrate, num_parts, trim_silence).describe()
+        except Exception as e:
+            text = f"Estimation impossible : {e}"
+        self.ui_bus.call(self._show_estimate, generation, text)
+        
+    def _show_estimate(self, generation, text):
+        # Ignorer le résultat d'une estimation dont les paramètres ont changé depuis
+        if generation == self._estimate_generation:
+            self.estimate_label.config(text=text)
+            
     def update_progress(self, value, text):
+        # Peut être appelée depuis un thread de travail : la mise à jour est
+        # déposée sur le bus et appliquée par le thread Tk (les doublons sont fusionnés)
+        self.ui_bus.post((id(self), 'progress'), self._apply_progress, value, text)
+        
+    def _apply_progress(self, value, text):
         self.progress_var.set(value)
         self.status_label.config(text=text)
-        self.update_idletasks()
         
     def start_conversion(self):
         if not self.input_file.get():
-            messagebox.showwarning("Attention", "Veuillez sélectionner un fichier MP4")
+            messagebox.showwarning("Attention", "Veuillez sélectionner un fichier vidéo ou audio")
             return
             
+        # Pendant une conversion, le bouton sert à l'annuler
         if self.is_converting:
-            messagebox.showinfo("Info", "Conversion en cours...")
+            self.cancel_conversion()
             return
             
         # Nettoyer la vue des morceaux précédente
@@ -164,42 +240,108 @@ class MP4ToMP3Converter(ttk.Frame):
             self.chunks_view.destroy()
             self.chunks_view = None
             
-        convert_thread = threading.Thread(target=self.convert_to_mp3)
+        # Lire les paramètres ici, dans le thread Tk, plutôt que depuis le thread de conversion
+        self.is_converting = True
+        self.cancel_token = CancelToken()
+        self.convert_button.config(text="Annuler")
+        convert_thread = threading.Thread(
+            target=self._run_conversion,
+            args=(self.input_file.get(), self.bitrate_var.get(), self.num_parts_var.get(),
+                  self.trim_silence_var.get()),
+            kwargs={'cancel_token': self.cancel_token}
+        )
         convert_thread.start()
         
-    def convert_to_mp3(self):
-        try:
-            self.is_converting = True
+    def cancel_conversion(self):
+        """Annule la conversion en cours : ffmpeg est arrêté et les fichiers supprimés"""
+        if self.cancel_token and not self.cancel_token.cancelled:
+            self.cancel_token.cancel()
             self.convert_button.config(state='disabled')
+            self._apply_progress(self.progress_var.get(), "Annulation...")
+        
+    def _run_conversion(self, input_path, *args, cancel_token=None):
+        """Thread de conversion, profilé si le profilage est activé (voir --profile)"""
+        profile = session_profiler.open(os.path.basename(input_path))
+        with attach_profile(profile):
+            shown = self.convert_to_mp3(input_path, *args, profile=profile, cancel_token=cancel_token)
+        # En cas de succès, le profil continue pendant l'envoi : la vue des morceaux le termine
+        if not shown:
+            close_profile(profile)
+        
+    def convert_to_mp3(self, input_path, bitrate, num_parts_text, trim_silence=False, profile=None,
+                       cancel_token=None):
+        """Convertit, découpe et analyse ; renvoie True si les morceaux sont affichés"""
+        session = None
+        offset_map = None
+        # Les étapes mesurées de la conversion (sonde, extraction, découpage) y sont rattachées
+        conversion_span = tracer.start('conversion', file=os.path.basename(input_path), bitrate=bitrate)
+        try:
             self.update_progress(0, "Démarrage de la conversion...")
             
-            input_path = self.input_file.get()
-            output_filename = os.path.splitext(os.path.basename(input_path))[0] + '.mp3'
+            # Tous les fichiers intermédiaires vont dans une session de l'espace de travail,
+            # qui sera supprimée à la fermeture de la vue des morceaux
+            session = get_workspace().create_session(estimate_job_bytes(input_path, bitrate))
             
-            # Utiliser un dossier temporaire pour la conversion
-            with tempfile.TemporaryDirectory() as temp_dir:
-                output_path = os.path.join(temp_dir, output_filename)
+            # Utiliser un dossier temporaire de la session pour le fichier audio complet
+            with tempfile.TemporaryDirectory(dir=session.path) as temp_dir:
+                # Repérer les longs silences : ils ne seront ni encodés ni envoyés
+                if trim_silence:
+                    self.update_progress(0, "Détection des silences...")
+                    try:
+                        from utils.silence_trim import detect_silences
+                        offset_map = detect_silences(input_path, cancel_token=cancel_token)
+                    except CancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"Détection des silences impossible : {e}")
+                    if offset_map:
+                        print(f"Silences supprimés : {offset_map}")
                 
-                # Convertir directement avec ffmpeg
-                self.update_progress(20, "Extraction de l'audio...")
-                
-                # Construire la commande ffmpeg
-                cmd = [
-                    AudioProcessor.get_ffmpeg_path(),
-                    '-i', input_path,  # Fichier d'entrée
-                    '-vn',  # Pas de vidéo
-                    '-acodec', 'libmp3lame',  # Codec MP3
-                    '-b:a', self.bitrate_var.get(),  # Bitrate
-                    '-y',  # Écraser le fichier de sortie si existe
-                    output_path
-                ]
+                # Choisir la conversion la moins coûteuse : fichier utilisé tel quel,
+                # piste audio copiée sans réencodage, ou réencodage en MP3
+                plan = plan_conversion(
+                    input_path, bitrate, reencode_required=bool(offset_map),
+                    num_parts=int(num_parts_text) if str(num_parts_text).strip().isdigit() else None
+                )
+                print(f"Conversion de {os.path.basename(input_path)} : {plan.reason}")
                 
-                # Exécuter ffmpeg
+                # Prévoir la durée restante d'après l'historique des traitements
+                input_duration = None
+                eta = None
                 try:
-                    subprocess.run(cmd, capture_output=True, check=True)
-                except subprocess.CalledProcessError as e:
-                    raise Exception(f"Erreur lors de la conversion : {e.stderr}")
+                    input_duration = AudioProcessor.get_audio_duration(input_path)
+                    eta = EtaTracker(cost_model.estimate(
+                        input_duration, plan.action, bitrate, max(1, int(num_parts_text))
+                    ))
+                    eta.start(KIND_ENCODE)
+                except Exception as e:
+                    print(f"Estimation impossible : {e}")
                 
+                def eta_suffix(fraction):
+                    return f" — {eta.describe(fraction)}" if eta else ""
+                
+                # L'extraction occupe les 60 premiers pourcents de la barre de progression
+                self.update_progress(0, plan.describe())
+                encode_started = time.monotonic()
+                
+                def on_extract_progress(progress):
+                    percent = progress.percent or 0
+                    self.update_progress(
+                        percent * 0.6,
+                        f"{plan.describe()} {progress.describe()}{eta_suffix(percent / 100 * 0.8)}"
+                    )
+                
+                # Avec un fichier utilisé tel quel, output_path est le fichier d'entrée
+                output_path = execute_plan(
+                    plan,
+                    input_path,
+                    temp_dir,
+                    bitrate,
+                    progress_callback=on_extract_progress,
+                    offset_map=offset_map,
+                    cancel_token=cancel_token
+                )
+
                 self.update_progress(60, "Conversion terminée, découpage en cours...")
                 
                 # Le fichier original est toujours conservé
@@ -207,50 +349,118 @@ class MP4ToMP3Converter(ttk.Frame):
                 
                 # Découper le fichier selon le mode choisi
                 try:
-                    num_parts = int(self.num_parts_var.get())
+                    num_parts = int(num_parts_text)
                     if num_parts < 1:
                         raise ValueError("Le nombre de parties doit être supérieur à 0")
-                    chunks = AudioProcessor.split_audio(output_path, num_parts=num_parts)
+                    chunks = AudioProcessor.split_audio(
+                        output_path,
+                        num_parts=num_parts,
+                        output_dir=session.make_dir("parts"),
+                        progress_callback=lambda done, total: self.update_progress(
+                            60 + 30 * done / total,
+                            f"Découpage en cours... ({done}/{total}){eta_suffix(0.8 + 0.2 * done / total)}"
+                        ),
+                        cancel_token=cancel_token
+                    )
                 except ValueError as e:
-                    messagebox.showerror("Erreur", str(e))
+                    conversion_span.fail(e)
+                    session.release()
+                    self.ui_bus.dialog(messagebox.showerror, "Erreur", str(e))
                     return
                 
-                # Afficher les morceaux
-                self.update_progress(100, "Conversion terminée !")
-                
-                # Nettoyer la vue précédente si elle existe
-                if self.chunks_view:
-                    self.chunks_view.destroy()
-                    self.chunks_view = None
+                # Analyser les morceaux (forme d'onde, niveaux, parole) en une seule passe
+                # L'analyse est facultative : un échec n'empêche pas l'affichage des morceaux
+                self.update_progress(90, "Analyse audio...")
+                try:
+                    from utils.audio_analysis import analyze_parts
+                    analyze_parts(output_path, chunks, cancel_token=cancel_token)
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Analyse audio impossible : {e}")
                 
-                # S'assurer que le conteneur est vide
-                for widget in self.chunks_container.winfo_children():
-                    widget.destroy()
+                # Dernière occasion d'annuler avant d'afficher les morceaux
+                check_cancelled(cancel_token)
                 
-                # Créer la nouvelle vue des morceaux
-                self.chunks_view = AudioChunksView(
-                    self.chunks_container,
-                    chunks,
-                    WEBHOOK_URL,
-                    num_parts=int(self.num_parts_var.get())  # Passer le nombre de morceaux choisi par l'utilisateur
-                )
-                self.chunks_view.pack(fill='both', expand=True)
+                # Ajouter cette conversion à l'historique des traitements
+                if input_duration:
+                    cost_model.record_encode(
+                        input_duration, plan.action, bitrate, num_parts,
+                        time.monotonic() - encode_started,
+                        sum(part_size(c[0]) for c in chunks),
+                        trimmed=bool(offset_map)
+                    )
                 
-                # Forcer la mise à jour de l'interface
-                self.chunks_container.update_idletasks()
+                # La session reste protégée de l'éviction tant que la vue des morceaux
+                # est ouverte (écoute, envoi) : la vue la libère à sa fermeture
                 
-                messagebox.showinfo(
-                    "Succès",
-                    "Conversion terminée ! Les fichiers sont prêts à être envoyés au webhook."
-                )
+                # Afficher les morceaux
+                self.update_progress(100, "Conversion terminée !")
+                self.ui_bus.call(self.show_chunks, chunks, num_parts, session, offset_map, profile)
+                return True
                 
+        except CancelledError as e:
+            # Annulation demandée : ffmpeg est déjà arrêté, supprimer les fichiers de la session
+            conversion_span.fail(e)
+            if session:
+                session.release()
+            self.update_progress(0, "Conversion annulée")
+            
         except Exception as e:
+            conversion_span.fail(e)
+            if session:
+                session.release()
             self.update_progress(0, "Erreur lors de la conversion")
-            messagebox.showerror(
+            self.ui_bus.dialog(
+                messagebox.showerror,
                 "Erreur",
                 f"Une erreur est survenue lors de la conversion :\n{str(e)}"
             )
             
         finally:
-            self.is_converting = False
-            self.convert_button.config(state='normal')
+            conversion_span.end()
+            self.ui_bus.call(self._end_conversion)
+            
+    def _end_conversion(self):
+        self.is_converting = False
+        self.cancel_token = None
+        self.convert_button.config(text="Convertir", state='normal')
+        
+    def destroy(self):
+        """Arrête la conversion en cours à la fermeture de la fenêtre"""
+        if self._estimate_after_id:
+            self.after_cancel(self._estimate_after_id)
+            self._estimate_after_id = None
+        if self.cancel_token:
+            self.cancel_token.cancel()
+        super().destroy()
+        
+    def show_chunks(self, chunks, num_parts, session=None, offset_map=None, profile=None):
+        """Affiche la vue des morceaux (exécutée dans le thread Tk)"""
+        # Nettoyer la vue précédente si elle existe
+        if self.chunks_view:
+            self.chunks_view.destroy()
+            self.chunks_view = None
+        
+        # S'assurer que le conteneur est vide
+        for widget in self.chunks_container.winfo_children():
+            widget.destroy()
+        
+        # Créer la nouvelle vue des morceaux
+        self.chunks_view = AudioChunksView(
+            self.chunks_container,
+            chunks,
+            WEBHOOK_URL,
+            num_parts=num_parts,  # Passer le nombre de morceaux choisi par l'utilisateur
+            session=session,      # La vue supprimera les fichiers à sa fermeture
+            offset_map=offset_map,# Positions dans l'original si les silences ont été supprimés
+            profile=profile       # Profil de la session, complété pendant l'envoi
+        )
+        self.chunks_view.pack(fill='both', expand=True)
+        
+        # Ouvrir le message hors du rafraîchissement de l'interface (voir UIEventBus.dialog)
+        self.after_idle(
+            messagebox.showinfo,
+            "Succès",
+            "Conversion terminée ! Les fichiers sont prêts à être envoyés au webhook."
+        )
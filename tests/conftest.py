@@ -0,0 +1,9 @@
+# ===== CONFIGURATION DES TESTS =====
+# Les modules du projet (utils, gui, src) sont importés depuis la racine du dépôt,
+# comme le fait main.py : la racine est ajoutée au chemin de recherche
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,58 @@
+# Tests du plafond de débit d'envoi (utils/bandwidth.py)
+from datetime import datetime
+
+import pytest
+
+from utils.bandwidth import BURST_SECONDS, BandwidthLimiter, BandwidthProfile, parse_profile
+
+
+def test_unlimited_never_waits():
+    limiter = BandwidthLimiter()
+    assert all(limiter.reserve(10 * 1024 * 1024) == 0.0 for _ in range(10))
+
+
+def test_burst_then_wait_proportional_to_bytes():
+    limiter = BandwidthLimiter(1000)
+    # Une demi-seconde de débit part sans attendre
+    assert limiter.reserve(500) == 0.0
+    assert limiter.reserve(int(1000 * BURST_SECONDS) - 500 + 500) == pytest.approx(0.0, abs=0.05)
+    # Au-delà, chaque octet attend son tour : 500 octets réservés de plus = 0,5 s
+    assert limiter.reserve(500) == pytest.approx(0.5, abs=0.05)
+    assert limiter.reserve(1000) == pytest.approx(1.0, abs=0.05)
+
+
+def test_changing_limit_resets_backlog():
+    limiter = BandwidthLimiter(100)
+    for _ in range(5):
+        limiter.reserve(1000)
+    assert limiter.reserve(1) > 10
+    limiter.set_limit(1000)
+    assert limiter.reserve(100) == 0.0
+    limiter.set_limit(None)
+    assert limiter.reserve(10 ** 9) == 0.0
+
+
+def test_profile_overrides_default_limit():
+    limiter = BandwidthLimiter(5000, [BandwidthProfile("08:00", "19:00", 1000, days=[0])])
+    monday_noon = datetime(2024, 1, 1, 12, 0)
+    monday_night = datetime(2024, 1, 1, 22, 0)
+    tuesday_noon = datetime(2024, 1, 2, 12, 0)
+    assert limiter.current_limit(monday_noon) == 1000
+    assert limiter.current_limit(monday_night) == 5000
+    assert limiter.current_limit(tuesday_noon) == 5000
+
+
+def test_profile_across_midnight_belongs_to_previous_day():
+    profile = BandwidthProfile("22:00", "06:00", 1000, days=[0])
+    assert profile.matches(datetime(2024, 1, 1, 23, 0))      # Lundi soir
+    assert profile.matches(datetime(2024, 1, 2, 5, 0))       # Nuit de lundi à mardi
+    assert not profile.matches(datetime(2024, 1, 2, 23, 0))  # Mardi soir
+    assert not profile.matches(datetime(2024, 1, 1, 12, 0))
+
+
+def test_parse_profile():
+    profile = parse_profile("08:00-19:00=500")
+    assert profile.bytes_per_second == 500 * 1024
+    assert parse_profile("08:00-19:00=0").bytes_per_second is None
+    with pytest.raises(ValueError):
+        parse_profile("tous les jours")
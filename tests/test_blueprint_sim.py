@@ -0,0 +1,99 @@
+# Tests du simulateur des scénarios Make.com (utils/blueprint_sim.py)
+import random
+
+import pytest
+
+from utils.blueprint_sim import (
+    Blueprint, LatencyTable, compare_part_counts, simulate_run, simulate_session
+)
+
+# Latences fixes (sigma = 0) pour des durées exactes
+LATENCIES = {
+    "gateway:CustomWebHook": {"median": 1.0},
+    "http:ActionSendData": {"median": 2.0},
+    "google-drive:*": {"median": 0.5},
+    "openai-gpt-3:CreateTranscription": {"median": 3.0, "per_audio_second": 0.1},
+}
+
+# Webhook, compteur, puis un routeur à trois routes :
+# - une requête HTTP, seulement au premier passage du compteur
+# - une recherche de fichiers (un paquet par morceau) puis une transcription par paquet
+# - une pause, seulement après le premier passage (jamais exécutée ici)
+RECEIVER = {
+    'name': "Récepteur",
+    'metadata': {'scenario': {'sequential': True}},
+    'flow': [
+        {'id': 1, 'module': "gateway:CustomWebHook"},
+        {'id': 2, 'module': "util:FunctionIncrement"},
+        {'id': 3, 'module': "builtin:BasicRouter", 'routes': [
+            {'flow': [{'id': 4, 'module': "http:ActionSendData", 'filter': {
+                'name': "Premier passage", 'conditions': [[{'a': "{{2.i}}", 'o': "number:equal", 'b': "1"}]]
+            }}]},
+            {'flow': [
+                {'id': 5, 'module': "google-drive:SearchFiles", 'mapper': {'limit': "{{1.parts_count}}"}},
+                {'id': 6, 'module': "openai-gpt-3:CreateTranscription"},
+            ]},
+            {'flow': [{'id': 7, 'module': "util:FunctionSleep", 'mapper': {'duration': 5}, 'filter': {
+                'conditions': [[{'a': "{{2.i}}", 'o': "number:greater", 'b': "1"}]]
+            }}]},
+        ]},
+    ],
+}
+
+
+def _counter(sleep_seconds=0):
+    flow = [{'id': 1, 'module': "gateway:CustomWebHook"}]
+    if sleep_seconds:
+        flow.append({'id': 2, 'module': "util:FunctionSleep", 'mapper': {'duration': sleep_seconds}})
+    return Blueprint({'name': "Compteur", 'metadata': {'scenario': {'sequential': True}}, 'flow': flow})
+
+
+def test_blueprint_tree_is_loaded():
+    blueprint = Blueprint(RECEIVER)
+    assert blueprint.sequential
+    assert [m.id for m in blueprint.modules()] == [1, 2, 3, 4, 5, 6, 7]
+    assert blueprint.modules()[4].is_iterator
+    assert blueprint.modules()[3].label == "4 http:ActionSendData (Premier passage)"
+
+
+def test_run_follows_routes_filters_and_iterators():
+    result = simulate_run(Blueprint(RECEIVER), {'parts_count': 3}, LatencyTable(LATENCIES),
+                          random.Random(0), audio_seconds=60.0)
+    # Webhook 1 s, puis les routes l'une après l'autre : HTTP 2 s, recherche 0,5 s et
+    # trois transcriptions de 3 s + 0,1 s par seconde d'audio (20 s chacune) ; pause filtrée
+    assert result.sequential_seconds == pytest.approx(1 + 2 + 0.5 + 3 * 5)
+    assert result.critical_path_seconds == pytest.approx(1 + 0.5 + 3 * 5)
+    # Le routeur est gratuit ; la pause filtrée n'est pas comptée
+    assert result.operations == 7
+    assert result.module_seconds["6 openai-gpt-3:CreateTranscription"] == pytest.approx(15.0)
+    assert "7 util:FunctionSleep" not in result.module_seconds
+
+
+def test_session_adds_uploads_and_parts_count_delay():
+    session = simulate_session(Blueprint(RECEIVER), _counter(), parts=2, audio_seconds=60.0,
+                               latencies=LatencyTable(LATENCIES), rng=random.Random(0),
+                               upload_seconds_per_part=10.0, parts_count_delay=30.0)
+    # Le scénario principal démarre 30 s après le dernier envoi (20 s)
+    receiver_seconds = 1 + 2 + 0.5 + 2 * (3 + 0.1 * 30)
+    assert session.receiver.sequential_seconds == pytest.approx(receiver_seconds)
+    assert session.turnaround == pytest.approx(50 + receiver_seconds)
+    assert session.operations == 2 * 1 + 6
+    assert not session.race
+
+
+def test_slow_counter_races_the_main_scenario():
+    session = simulate_session(Blueprint(RECEIVER), _counter(sleep_seconds=100), parts=2, audio_seconds=60.0,
+                               latencies=LatencyTable(LATENCIES), rng=random.Random(0),
+                               upload_seconds_per_part=10.0, parts_count_delay=30.0)
+    assert session.race
+
+
+def test_compare_part_counts_on_exported_blueprints():
+    report = compare_part_counts([1, 4], audio_seconds=3600.0, bitrate="192k", runs=5, seed=1)
+    assert [row['parts'] for row in report] == [1, 4]
+    # Une heure à 192 kb/s (86 Mo) dépasse la limite de transcription en un seul morceau
+    assert not report[0]['fits_transcription'] and report[1]['fits_transcription']
+    for row in report:
+        assert row['turnaround_p50'] <= row['turnaround_p95']
+        assert row['critical_path_seconds'] <= row['receiver_seconds'] + 1e-9
+        assert row['operations'] > 0
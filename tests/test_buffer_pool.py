@@ -0,0 +1,63 @@
+# Tests du réservoir de tampons (utils/buffer_pool.py)
+import pytest
+
+from utils.buffer_pool import BufferPool, MemoryCeilingError
+
+
+def _total(pool):
+    return pool.in_use + pool._free_bytes()
+
+
+def test_acquire_under_ceiling_and_refuse_beyond():
+    pool = BufferPool(ceiling_bytes=1000)
+    first = pool.acquire(600, "1.mp3")
+    assert first is not None and pool.in_use == 600
+    assert pool.acquire(500, "2.mp3") is None
+    second = pool.acquire(400, "2.mp3")
+    assert second is not None and pool.in_use == 1000
+
+
+def test_release_keeps_buffer_for_reuse():
+    pool = BufferPool(ceiling_bytes=1000)
+    part = pool.acquire(500, "1.mp3")
+    buffer = part.buffer
+    part.release()
+    assert pool.in_use == 0 and pool._free_bytes() == 500
+    # Un morceau plus petit reprend le même tampon
+    again = pool.acquire(300, "2.mp3")
+    assert again.buffer is buffer and pool.in_use == 500 and pool._free_bytes() == 0
+
+
+def test_new_allocation_drops_kept_buffers_to_stay_under_ceiling():
+    pool = BufferPool(ceiling_bytes=1000)
+    parts = [pool.acquire(300, f"{n}.mp3") for n in (1, 2)]
+    for part in parts:
+        part.release()
+    assert pool._free_bytes() == 600
+    part = pool.acquire(700, "big.mp3")
+    assert part is not None
+    assert _total(pool) <= pool.ceiling_bytes
+
+
+def test_grow_keeps_content_and_accounting():
+    pool = BufferPool(ceiling_bytes=1000)
+    part = pool.acquire(100, "1.mp3")
+    part.buffer[:3] = b"abc"
+    part.length = 3
+    pool.grow(part, 400)
+    assert bytes(part.view()) == b"abc" and len(part.buffer) == 400
+    assert pool.in_use == 400 and _total(pool) <= pool.ceiling_bytes
+    with pytest.raises(MemoryCeilingError):
+        pool.grow(part, 2000)
+    part.release()
+    assert pool.in_use == 0
+
+
+def test_reused_buffer_larger_than_request_respects_ceiling():
+    pool = BufferPool(ceiling_bytes=1000)
+    pool.acquire(800, "1.mp3").release()
+    # Plafond abaissé : 150 octets tiennent, mais le tampon conservé en fait 800
+    pool.ceiling_bytes = 500
+    part = pool.acquire(150, "2.mp3")
+    assert part is not None and len(part.buffer) == 150
+    assert pool.in_use == 150 and _total(pool) <= pool.ceiling_bytes
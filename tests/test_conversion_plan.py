@@ -0,0 +1,89 @@
+# Tests du choix de conversion (utils/conversion_plan.py)
+import pytest
+
+import utils.conversion_plan as conversion_plan
+from utils.conversion_plan import (
+    ACTION_ENCODE, ACTION_REMUX, ACTION_USE_SOURCE, audio_mime_type, plan_conversion
+)
+
+# Une heure d'audio
+DURATION = 3600.0
+
+
+def _info(codec, bitrate, format_names, has_video=False, duration=DURATION):
+    return {'format_names': format_names, 'codec': codec, 'bitrate': bitrate,
+            'duration': duration, 'has_video': has_video}
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    """Remplace ffprobe : probe(info) fixe la description renvoyée (une exception est levée)"""
+    described = {}
+
+    def fake_probe_media(path):
+        if isinstance(described['info'], Exception):
+            raise described['info']
+        return described['info']
+
+    monkeypatch.setattr(conversion_plan, 'probe_media', fake_probe_media)
+
+    def set_info(info):
+        described['info'] = info
+
+    return set_info
+
+
+@pytest.mark.parametrize("path, info, action, extension", [
+    # Fichier déjà au bon format : utilisé tel quel
+    ("in.mp3", _info('mp3', 128000, ('mp3',)), ACTION_USE_SOURCE, '.mp3'),
+    ("in.m4a", _info('aac', 128000, ('mov', 'mp4', 'm4a')), ACTION_USE_SOURCE, '.m4a'),
+    # Piste acceptée dans une vidéo : copiée sans réencodage
+    ("in.mp4", _info('aac', 128000, ('mov', 'mp4'), has_video=True), ACTION_REMUX, '.m4a'),
+    ("in.mp4", _info('mp3', 128000, ('mov', 'mp4'), has_video=True), ACTION_REMUX, '.mp3'),
+    # Bitrate légèrement au-dessus du choix (arrondi de l'encodeur) : toléré
+    ("in.mp3", _info('mp3', 135000, ('mp3',)), ACTION_USE_SOURCE, '.mp3'),
+    # Bitrate trop élevé, codec non accepté : réencodé en MP3
+    ("in.mp3", _info('mp3', 320000, ('mp3',)), ACTION_ENCODE, '.mp3'),
+    ("in.wav", _info('pcm_s16le', 1411200, ('wav',)), ACTION_ENCODE, '.mp3'),
+    ("in.mp4", _info('opus', 96000, ('mov', 'mp4'), has_video=True), ACTION_ENCODE, '.mp3'),
+])
+def test_decision_table(probe, path, info, action, extension):
+    probe(info)
+    plan = plan_conversion(path, '128k')
+    assert (plan.action, plan.extension) == (action, extension)
+
+
+def test_reencode_required_skips_probe(probe):
+    probe(AssertionError("ffprobe ne doit pas être appelé"))
+    assert plan_conversion("in.mp3", '128k', reencode_required=True).action == ACTION_ENCODE
+
+
+def test_probe_failure_falls_back_to_encode(probe):
+    probe(Exception("ffprobe introuvable"))
+    plan = plan_conversion("in.mp4", '128k')
+    assert plan.action == ACTION_ENCODE and "ffprobe introuvable" in plan.reason
+
+
+def test_m4a_parts_must_fit_one_request(probe):
+    # 128 kb/s pendant une heure : environ 57 Mo
+    probe(_info('aac', 128000, ('mov', 'mp4'), has_video=True))
+    assert plan_conversion("in.mp4", '128k', num_parts=2).action == ACTION_ENCODE
+    assert plan_conversion("in.mp4", '128k', num_parts=4).action == ACTION_REMUX
+    # Un morceau MP3 peut être coupé en plusieurs requêtes : aucune vérification
+    probe(_info('mp3', 128000, ('mp3',)))
+    assert plan_conversion("in.mp3", '128k', num_parts=1).action == ACTION_USE_SOURCE
+
+
+def test_unknown_m4a_part_size_is_reencoded(probe):
+    probe(_info('aac', None, ('mov', 'mp4'), has_video=True))
+    assert plan_conversion("in.mp4", '128k', num_parts=4).action == ACTION_ENCODE
+    # Sans vidéo, la taille du fichier donne celle de la piste
+    probe(_info('aac', None, ('mov', 'mp4', 'm4a')))
+    assert plan_conversion(__file__, '128k', num_parts=4).extension == '.m4a'
+
+
+@pytest.mark.parametrize("name, mime", [
+    ("1.mp3", 'audio/mpeg'), ("1.M4A", 'audio/mp4'), (".wav", 'audio/wav'), ("1.ogg", 'audio/mpeg'),
+])
+def test_audio_mime_type(name, mime):
+    assert audio_mime_type(name) == mime
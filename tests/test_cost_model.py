@@ -0,0 +1,75 @@
+# Tests du modèle de coût (utils/cost_model.py)
+import json
+
+import pytest
+
+from utils.cost_model import (
+    DEFAULT_PART_SECONDS, DEFAULT_SPEED, DEFAULT_THROUGHPUT, DEFAULT_UPLOAD_PART_SECONDS,
+    CostModel, _fit_line, _fit_two
+)
+
+
+def test_fit_line_recovers_line():
+    xs = [1.0, 2.0, 3.0, 4.0]
+    a, b = _fit_line(xs, [5 + 2 * x for x in xs])
+    assert a == pytest.approx(5.0) and b == pytest.approx(2.0)
+    assert _fit_line([3.0, 3.0, 3.0], [1.0, 2.0, 3.0]) is None
+
+
+def test_fit_two_recovers_coefficients():
+    x1 = [1.0, 2.0, 3.0, 5.0]
+    x2 = [10.0, 5.0, 40.0, 20.0]
+    a, b = _fit_two(x1, x2, [2 * u + 0.5 * v for u, v in zip(x1, x2)])
+    assert a == pytest.approx(2.0) and b == pytest.approx(0.5)
+    # x2 proportionnel à x1 : système dégénéré
+    assert _fit_two([1.0, 2.0], [2.0, 4.0], [1.0, 2.0]) is None
+
+
+def test_defaults_without_history():
+    model = CostModel()
+    seconds, samples = model.predict_encode(4000.0, "encode", 4)
+    assert samples == 0
+    assert seconds == pytest.approx(4000.0 / DEFAULT_SPEED["encode"] + 4 * DEFAULT_PART_SECONDS)
+    upload, _ = model.predict_upload(DEFAULT_THROUGHPUT * 10, 2)
+    assert upload == pytest.approx(10 + 2 * DEFAULT_UPLOAD_PART_SECONDS)
+    assert model.predict_output_bytes(100.0, "encode", "128k") == 100 * 128 * 1000 // 8
+
+
+def test_encode_prediction_fits_history():
+    model = CostModel()
+    for duration in (600.0, 1800.0, 3600.0):
+        model.record_encode(duration, "encode", "128k", 4, 3 + duration / 50, int(duration * 16000))
+    # Une autre façon de convertir n'est pas mélangée à celle-ci
+    model.record_encode(3600.0, "remux", "128k", 4, 1.0, 1)
+    seconds, samples = model.predict_encode(7200.0, "encode", 4)
+    assert samples == 3
+    assert seconds == pytest.approx(3 + 7200.0 / 50)
+
+
+def test_output_bytes_use_median_ratio():
+    model = CostModel()
+    for ratio in (1.0, 1.1, 5.0):
+        model.record_encode(100.0, "encode", "128k", 1, 1.0, int(100 * 16000 * ratio))
+    assert model.predict_output_bytes(100.0, "encode", "128k") == pytest.approx(100 * 16000 * 1.1, rel=1e-3)
+
+
+def test_upload_prediction_fits_history():
+    model = CostModel()
+    for parts, nbytes in ((1, 10 ** 6), (2, 5 * 10 ** 6), (4, 3 * 10 ** 6), (3, 8 * 10 ** 6)):
+        model.record_upload(nbytes, parts, 1.5 * parts + nbytes / 10 ** 6)
+    seconds, samples = model.predict_upload(20 * 10 ** 6, 5)
+    assert samples == 4
+    assert seconds == pytest.approx(1.5 * 5 + 20)
+
+
+def test_history_file_is_reloaded(tmp_path):
+    path = tmp_path / "history.jsonl"
+    model = CostModel(str(path))
+    model.record_upload(1000, 1, 2.0)
+    # Une ligne tronquée (arrêt brutal) est ignorée
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"kind": "upl')
+    reloaded = CostModel(str(path))
+    assert len(reloaded._records) == 1
+    assert reloaded._records[0]['throughput_bps'] == 500
+    assert json.loads(path.read_text(encoding='utf-8').splitlines()[0])['kind'] == "upload"
@@ -0,0 +1,229 @@
+# Tests des nouvelles tentatives, du repli local et de l'annulation du répartiteur
+# (utils/encode_dispatcher.py), et d'un encodage réparti sur deux travailleurs
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import utils.encode_dispatcher as encode_dispatcher
+from utils import encode_worker
+from utils.audio_processor import AudioProcessor
+from utils.cancellation import CancelledError, CancelToken
+from utils.encode_dispatcher import (
+    MAX_WORKER_FAILURES, EncodeDispatcher, RemoteWorker, WorkerBusyError, WorkerError
+)
+from utils.manifest import load_part_digest
+
+REMOTE_MP3 = b"remote mp3"
+LOCAL_MP3 = b"local mp3"
+
+
+def _worker(url, slots=1):
+    worker = RemoteWorker(url)
+    worker.alive = True
+    worker.slots = slots
+    worker.shared_storage = True
+    return worker
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    """Répartiteur sans appel réseau : les travailleurs sont ajoutés par chaque test"""
+    monkeypatch.setattr(AudioProcessor, 'get_ffmpeg_path', staticmethod(lambda: 'ffmpeg'))
+    local_runs = []
+
+    def fake_run_ffmpeg_to_file(cmd, output_path, cancel_token=None):
+        local_runs.append(cmd)
+        with open(output_path, 'wb') as f:
+            f.write(LOCAL_MP3)
+        return hashlib.sha256(LOCAL_MP3).hexdigest()
+
+    monkeypatch.setattr(encode_dispatcher, 'run_ffmpeg_to_file', fake_run_ffmpeg_to_file)
+    instance = EncodeDispatcher([], shared_storage=True)
+    instance.local_runs = local_runs
+    return instance
+
+
+def _fake_request(monkeypatch, behaviour):
+    """Remplace la requête au travailleur : behaviour(worker) lève une erreur ou renvoie None"""
+    calls = []
+
+    def fake(worker, partial_path, cancel_token, params, bitrate, segment_path=None):
+        calls.append(worker.url)
+        behaviour(worker)
+        with open(partial_path, 'wb') as f:
+            f.write(REMOTE_MP3)
+        return hashlib.sha256(REMOTE_MP3).hexdigest()
+
+    monkeypatch.setattr(EncodeDispatcher, '_request', staticmethod(fake))
+    return calls
+
+
+def _encode(dispatcher, tmp_path, number=1):
+    return dispatcher._encode_part(str(tmp_path / "input.mp4"), str(tmp_path), None, '128k',
+                                   number, 0.0, 60.0, CancelToken())
+
+
+def test_failed_part_is_retried_on_another_worker(dispatcher, monkeypatch, tmp_path):
+    bad, good = _worker("http://bad"), _worker("http://good")
+    dispatcher.workers += [bad, good]
+
+    def behaviour(worker):
+        if worker is bad:
+            raise WorkerError("ffmpeg a échoué")
+
+    calls = _fake_request(monkeypatch, behaviour)
+    path, number, duration = _encode(dispatcher, tmp_path)
+    assert open(path, 'rb').read() == REMOTE_MP3
+    assert (number, duration) == (1, 60.0)
+    assert "http://good" in calls and not dispatcher.local_runs
+    assert bad.failures == 1 and bad.alive
+    assert bad.active == 0 and good.active == 0
+    # L'empreinte calculée pendant la réception est reprise par le manifeste
+    assert load_part_digest(path) == hashlib.sha256(REMOTE_MP3).hexdigest()
+    assert not os.path.exists(path + encode_dispatcher.PARTIAL_SUFFIX)
+
+
+def test_failing_worker_is_dropped_then_local_fallback(dispatcher, monkeypatch, tmp_path):
+    bad = _worker("http://bad")
+    dispatcher.workers.append(bad)
+
+    def behaviour(worker):
+        raise WorkerError("connexion refusée")
+
+    calls = _fake_request(monkeypatch, behaviour)
+    for number in range(1, MAX_WORKER_FAILURES + 1):
+        path, _, _ = _encode(dispatcher, tmp_path, number)
+        assert open(path, 'rb').read() == LOCAL_MP3
+        assert load_part_digest(path) == hashlib.sha256(LOCAL_MP3).hexdigest()
+    assert not bad.alive
+    # Écarté : le morceau suivant ne lui est plus proposé
+    calls.clear()
+    _encode(dispatcher, tmp_path, MAX_WORKER_FAILURES + 1)
+    assert calls == []
+    assert len(dispatcher.local_runs) == MAX_WORKER_FAILURES + 1
+
+
+def test_busy_worker_falls_back_to_local_without_failure(dispatcher, monkeypatch, tmp_path):
+    busy = _worker("http://busy")
+    dispatcher.workers.append(busy)
+    monkeypatch.setattr(encode_dispatcher, 'BUSY_TIMEOUT_SECONDS', 0.05)
+    monkeypatch.setattr(encode_dispatcher, 'SLOT_WAIT_SECONDS', 0.01)
+
+    def behaviour(worker):
+        raise WorkerBusyError("aucune place libre")
+
+    calls = _fake_request(monkeypatch, behaviour)
+    path, _, _ = _encode(dispatcher, tmp_path)
+    assert open(path, 'rb').read() == LOCAL_MP3
+    assert len(calls) >= 2
+    # Occupé n'est pas en panne : le travailleur reste utilisable
+    assert busy.alive and busy.failures == 0 and busy.active == 0
+
+
+def test_no_worker_encodes_locally(dispatcher, monkeypatch, tmp_path):
+    calls = _fake_request(monkeypatch, lambda worker: None)
+    path, _, _ = _encode(dispatcher, tmp_path)
+    assert open(path, 'rb').read() == LOCAL_MP3
+    assert calls == [] and len(dispatcher.local_runs) == 1
+
+
+class StallingWorker(BaseHTTPRequestHandler):
+    """Faux travailleur : lit le segment, envoie un premier bloc de MP3 puis ne répond plus"""
+    protocol_version = 'HTTP/1.1'
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length']) if 'Content-Length' in self.headers else None
+        StallingWorker.received.append((length, self.rfile.read(length) if length else b''))
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.write(b"4\r\nID3x\r\n")
+        self.wfile.flush()
+        time.sleep(5)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stalling_worker():
+    StallingWorker.received = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StallingWorker)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield _worker(f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+def test_cancel_interrupts_a_stalled_response(stalling_worker, tmp_path):
+    segment = tmp_path / "1.mka"
+    segment.write_bytes(b"segment" * 1000)
+    token = CancelToken()
+    threading.Timer(0.3, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(CancelledError):
+        EncodeDispatcher._request(stalling_worker, str(tmp_path / "1.mp3.partial"), token,
+                                  {'duration': "60.000"}, '128k', str(segment))
+    # La lecture bloquée s'arrête tout de suite, sans attendre le travailleur
+    assert time.monotonic() - started < 2
+    # Le segment est envoyé avec sa taille, pas par blocs
+    assert StallingWorker.received == [(7000, b"segment" * 1000)]
+
+
+def test_cancelled_segment_is_not_sent(stalling_worker, tmp_path):
+    segment = tmp_path / "1.mka"
+    segment.write_bytes(b"segment")
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(CancelledError):
+        EncodeDispatcher._request(stalling_worker, str(tmp_path / "1.mp3.partial"), token,
+                                  {'duration': "60.000"}, '128k', str(segment))
+    assert all(body == b"" for _, body in StallingWorker.received)
+
+
+@pytest.mark.skipif(not (shutil.which('ffmpeg') and shutil.which('ffprobe')), reason="ffmpeg absent")
+@pytest.mark.parametrize("shared_storage", [True, False])
+def test_two_workers_encode_all_parts(tmp_path, shared_storage):
+    source = tmp_path / "webinaire.wav"
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=8',
+                    '-y', str(source)], check=True)
+    servers, served = [], []
+    for number in (1, 2):
+        server = encode_worker.serve(port=0, slots=1, name=f"w{number}", shared_roots=[str(tmp_path)])
+        acquire = server.worker.try_acquire
+
+        def counting_acquire(acquire=acquire, name=server.worker.name):
+            served.append(name)
+            return acquire()
+
+        server.worker.try_acquire = counting_acquire
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    try:
+        dispatcher = EncodeDispatcher([f"http://127.0.0.1:{s.server_address[1]}" for s in servers],
+                                      shared_storage=shared_storage)
+        assert dispatcher.capacity == 2
+        chunks = dispatcher.encode_parts(str(source), 4, '64k', str(tmp_path / "parts"))
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    assert [number for _, number, _ in chunks] == [1, 2, 3, 4]
+    assert sum(duration for _, _, duration in chunks) == pytest.approx(8.0, abs=0.1)
+    for path, _, _ in chunks:
+        content = open(path, 'rb').read()
+        assert content and load_part_digest(path) == hashlib.sha256(content).hexdigest()
+    assert set(served) == {"w1", "w2"}
+    # Aucun segment ni fichier partiel ne reste dans le dossier des morceaux
+    assert sorted(os.listdir(tmp_path / "parts")) == sorted(
+        name for n in range(1, 5) for name in (f"{n}.mp3", f"{n}.mp3.sha256")
+    )
@@ -0,0 +1,92 @@
+# Tests de l'exécution de ffmpeg : progression et sortie écrite avec empreinte (utils/ffmpeg_runner.py)
+import hashlib
+import subprocess
+import sys
+
+import pytest
+
+from utils.ffmpeg_runner import (
+    PIPE_BLOCK_SIZE, FFmpegProgress, _parse_speed, run_ffmpeg, run_ffmpeg_to_file
+)
+
+# Plus grand qu'un bloc de lecture, pour que l'empreinte couvre plusieurs blocs
+CONTENT = bytes(range(256)) * (PIPE_BLOCK_SIZE // 128)
+
+
+def _command(script):
+    """Un faux ffmpeg : Python écrit sur sa sortie (le dernier argument reste 'pipe:1')"""
+    return [sys.executable, '-c', script, 'pipe:1']
+
+
+def test_output_is_written_and_hashed(tmp_path):
+    output = tmp_path / "1.mp3"
+    script = f"import sys; sys.stdout.buffer.write(bytes(range(256)) * {PIPE_BLOCK_SIZE // 128})"
+    digest = run_ffmpeg_to_file(_command(script), str(output))
+    assert output.read_bytes() == CONTENT
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_failure_raises_with_stderr(tmp_path):
+    script = "import sys; sys.stderr.write('Invalid data found'); sys.exit(1)"
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_ffmpeg_to_file(_command(script), str(tmp_path / "1.mp3"))
+    assert 'Invalid data found' in error.value.stderr
+
+
+# Sortie -progress d'un encodage de 60 s : vitesse inconnue au premier bloc
+PROGRESS_OUTPUT = """out_time_us=N/A
+speed=N/A
+progress=continue
+out_time_us=30000000
+speed=12.5x
+progress=continue
+out_time_ms=60000000
+speed=15x
+progress=end
+"""
+
+
+def _fake_ffmpeg(tmp_path, output, returncode=0):
+    """Exécutable qui écrit une sortie -progress toute faite, quels que soient ses arguments"""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\nimport sys\nsys.stdout.write({output!r})\n"
+                    f"sys.stdout.flush()\nsys.exit({returncode})\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.mark.parametrize("value, speed", [("12.3x", 12.3), (" 0.98x", 0.98), ("N/A", None)])
+def test_parse_speed(value, speed):
+    assert _parse_speed(value) == speed
+
+
+def test_percent_and_eta():
+    progress = FFmpegProgress(duration=100.0)
+    assert progress.eta is None
+    progress.out_time = 40.0
+    progress.speed = 2.0
+    assert progress.percent == pytest.approx(40.0)
+    assert progress.eta == pytest.approx(30.0)
+    assert progress.describe() == "40 % — 2.0× temps réel — reste 0:30"
+    progress.out_time = 150.0
+    assert progress.percent == 100.0
+    progress.out_time, progress.finished = 0.0, True
+    assert progress.percent == 100.0
+    assert FFmpegProgress().percent is None
+
+
+def test_progress_blocks_are_reported(tmp_path):
+    reports = []
+    run_ffmpeg([_fake_ffmpeg(tmp_path, PROGRESS_OUTPUT), '-i', 'in.mp4', 'out.mp3'], duration=60.0,
+               progress_callback=lambda p: reports.append((p.out_time, p.speed, p.percent, p.finished)))
+    assert reports == [
+        (0.0, None, 0.0, False),
+        (30.0, 12.5, pytest.approx(50.0), False),
+        # out_time_ms est lui aussi en microsecondes
+        (60.0, 15.0, 100.0, True),
+    ]
+
+
+def test_failed_run_raises(tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        run_ffmpeg([_fake_ffmpeg(tmp_path, "progress=end\n", returncode=1), 'out.mp3'])
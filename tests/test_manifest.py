@@ -0,0 +1,99 @@
+# Tests du manifeste de session et de l'aller-retour avec le récepteur local
+# (utils/manifest.py, utils/local_receiver.py)
+import hashlib
+import json
+import os
+import threading
+
+import pytest
+
+from utils.buffer_pool import BufferPool
+from utils.local_receiver import LocalReceiver, serve
+from utils.manifest import MESSAGE_TYPE_MANIFEST, build_manifest, load_part_digest, save_part_digest
+from utils.silence_trim import OffsetMap
+from utils.webhook import send_chunks_to_webhook
+
+MP3 = b"mp3 " * 1000
+M4A = b"m4a " * 500
+
+
+def _parts(tmp_path):
+    """Un morceau MP3 avec son empreinte enregistrée, un M4A sans (calculée à l'envoi)"""
+    mp3, m4a = tmp_path / "1.mp3", tmp_path / "2.m4a"
+    mp3.write_bytes(MP3)
+    m4a.write_bytes(M4A)
+    save_part_digest(str(mp3), hashlib.sha256(MP3).hexdigest())
+    return [(str(mp3), 1, 30.0), (str(m4a), 2, 15.5)]
+
+
+def test_manifest_lists_parts_in_order(tmp_path):
+    manifest = build_manifest("s1", _parts(tmp_path), num_parts=2)
+    assert manifest['message_type'] == MESSAGE_TYPE_MANIFEST
+    assert (manifest['total_parts'], manifest['user_selected_parts']) == (2, 2)
+    assert manifest['total_duration_seconds'] == 45.5
+    assert manifest['total_size_bytes'] == len(MP3) + len(M4A)
+    first, second = manifest['parts']
+    assert (first['filename'], first['start_offset_seconds'], first['size_bytes']) == ("1.mp3", 0.0, len(MP3))
+    assert first['sha256'] == hashlib.sha256(MP3).hexdigest()
+    assert (second['start_offset_seconds'], second['sha256']) == (30.0, None)
+    json.dumps(manifest)
+
+
+def test_stale_digest_is_ignored(tmp_path):
+    chunks = _parts(tmp_path)
+    path = chunks[0][0]
+    os.utime(path + ".sha256", (1, 1))
+    assert load_part_digest(path) is None
+
+
+def test_memory_part_and_original_offsets(tmp_path):
+    part = BufferPool(ceiling_bytes=10 ** 6).acquire(len(MP3), "1.mp3")
+    part.buffer[:len(MP3)] = MP3
+    part.length = len(MP3)
+    save_part_digest(part, hashlib.sha256(MP3).hexdigest())
+    offset_map = OffsetMap([(0.0, 10.0), (20.0, 30.0)], 40.0)
+    manifest = build_manifest("s1", [(part, 1, 20.0)], offset_map=offset_map)
+    entry = manifest['parts'][0]
+    assert (entry['size_bytes'], entry['sha256']) == (len(MP3), hashlib.sha256(MP3).hexdigest())
+    assert (entry['original_start_offset_seconds'], entry['original_end_offset_seconds']) == (0.0, 30.0)
+    assert manifest['original_duration_seconds'] == 40.0
+
+
+@pytest.mark.parametrize("session_id", ["../escape", "..", "a/b", "a\\b", ""])
+def test_receiver_rejects_unsafe_session_id(tmp_path, session_id):
+    receiver = LocalReceiver(str(tmp_path / "received"))
+    with pytest.raises(ValueError):
+        receiver.handle_json({'message_type': MESSAGE_TYPE_MANIFEST, 'session_id': session_id, 'parts': []})
+    assert os.listdir(tmp_path) == ["received"]
+
+
+def test_receiver_checks_parts_against_manifest(tmp_path):
+    receiver = LocalReceiver(str(tmp_path / "received"))
+    manifest = build_manifest("s1", _parts(tmp_path))
+    assert receiver.handle_json(manifest)[0] == 200
+    assert receiver.handle_part({'session_id': 's1', 'part_number': 1}, "1.mp3", MP3[:-1])[0] == 422
+    assert receiver.handle_part({'session_id': 's1', 'part_number': 3}, "3.mp3", MP3)[0] == 422
+    assert receiver.handle_part({'session_id': 's1', 'part_number': 1}, "1.mp3", MP3)[0] == 200
+    assert not receiver.sessions['s1'].complete
+
+
+def test_round_trip_through_local_receiver(tmp_path):
+    output = tmp_path / "received"
+    server = serve(0, str(output))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    chunks = _parts(tmp_path)
+    try:
+        success, message = send_chunks_to_webhook(url, chunks, num_parts=2, session_id="s1",
+                                                  work_dir=str(tmp_path), manifest_url=url)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert success, message
+
+    session_dir = output / "s1"
+    assert json.loads((session_dir / "session_complete.json").read_text())['parts'] == [1, 2]
+    assert (session_dir / "001_1.mp3").read_bytes() == MP3
+    assert (session_dir / "002_2.m4a").read_bytes() == M4A
+    # L'empreinte du M4A, calculée pendant l'envoi, est gardée à côté du morceau
+    assert load_part_digest(chunks[1][0]) == hashlib.sha256(M4A).hexdigest()
@@ -0,0 +1,123 @@
+# Tests du pipeline d'étapes (utils/pipeline.py)
+import threading
+import time
+
+import pytest
+
+from utils.cancellation import CancelledError
+from utils.pipeline import Pipeline, Stage, StageError
+
+
+def test_run_returns_every_item_through_all_stages():
+    pipeline = Pipeline([
+        Stage("double", lambda x: x * 2, workers=3),
+        Stage("plus_un", lambda x: x + 1, workers=2)
+    ])
+    assert sorted(pipeline.run(range(20))) == sorted(x * 2 + 1 for x in range(20))
+    metrics = {m['stage']: m for m in pipeline.metrics()}
+    assert metrics['double']['processed'] == 20
+    assert metrics['plus_un']['emitted'] == 20
+
+
+def test_fan_out_passes_each_result_to_next_stage():
+    pipeline = Pipeline([
+        Stage("split", lambda n: [n] * n, fan_out=True),
+        Stage("identity", lambda x: x)
+    ])
+    assert sorted(pipeline.run([1, 2, 3])) == [1, 2, 2, 3, 3, 3]
+
+
+def test_end_of_stream_reaches_results_after_close():
+    pipeline = Pipeline([Stage("a", lambda x: x, workers=2), Stage("b", lambda x: x, workers=3)]).start()
+    for item in range(5):
+        pipeline.submit(item)
+    pipeline.close()
+    # results() s'arrête d'elle-même : la fin du flux a traversé toutes les étapes
+    assert sorted(pipeline.results()) == list(range(5))
+    pipeline.join(timeout=5)
+    assert not any(thread.is_alive() for thread in pipeline._threads)
+
+
+def test_submit_after_close_is_refused():
+    pipeline = Pipeline([Stage("a", lambda x: x)]).start()
+    pipeline.close()
+    with pytest.raises(RuntimeError):
+        pipeline.submit(1)
+
+
+def test_items_submitted_concurrently_with_close_are_never_lost():
+    pipeline = Pipeline([Stage("a", lambda x: x, workers=2, queue_size=1)]).start()
+    accepted = []
+    lock = threading.Lock()
+
+    def submitter(offset):
+        for item in range(offset, offset + 200):
+            try:
+                pipeline.submit(item)
+            except RuntimeError:
+                return
+            with lock:
+                accepted.append(item)
+
+    threads = [threading.Thread(target=submitter, args=(i * 1000,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    pipeline.close()
+    for thread in threads:
+        thread.join()
+    # Tout élément accepté par submit est traité, même soumis pendant la fermeture
+    assert sorted(pipeline.results()) == sorted(accepted)
+
+
+def test_error_drops_item_and_is_reported():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("trois")
+        return x
+
+    pipeline = Pipeline([Stage("check", fail_on_three), Stage("next", lambda x: x)])
+    results = pipeline.run(range(6), raise_on_error=False)
+    assert sorted(results) == [0, 1, 2, 4, 5]
+    assert len(pipeline.errors) == 1
+    error = pipeline.errors[0]
+    assert error.stage == "check" and error.item == 3 and isinstance(error.error, ValueError)
+
+    with pytest.raises(StageError):
+        Pipeline([Stage("check", fail_on_three)]).run(range(6))
+
+
+def test_on_error_callback_receives_errors():
+    received = []
+    pipeline = Pipeline([Stage("fail", lambda x: 1 / 0)], on_error=received.append)
+    assert pipeline.run([1, 2]) == []
+    assert len(received) == 2 and pipeline.errors == []
+
+
+def test_cancel_skips_remaining_items_and_still_ends_stream():
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(x):
+        started.set()
+        release.wait(5)
+        return x
+
+    pipeline = Pipeline([Stage("slow", slow, queue_size=0)], on_error=lambda e: None).start()
+    for item in range(5):
+        pipeline.submit(item)
+    pipeline.close()
+    assert started.wait(5)
+    pipeline.cancel()
+    release.set()
+    # L'élément en cours se termine, les autres sont signalés sans être traités
+    assert list(pipeline.results()) == [0]
+    metric = pipeline.metrics()[0]
+    assert metric['processed'] == 1 and metric['failed'] == 4
+
+
+def test_cancelled_items_are_reported_as_cancelled_errors():
+    pipeline = Pipeline([Stage("a", lambda x: x)])
+    pipeline.cancel()
+    assert pipeline.run([1, 2], raise_on_error=False) == []
+    assert all(isinstance(e.error, CancelledError) for e in pipeline.errors)
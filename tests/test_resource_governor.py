@@ -0,0 +1,84 @@
+# Tests du quota CPU des conteneurs et du plafond de threads de ffmpeg (utils/resource_governor.py)
+import os
+
+import pytest
+
+import utils.resource_governor as resource_governor
+from utils.resource_governor import ResourceGovernor, cgroup_cpu_limit, parse_cpu_list
+
+
+@pytest.fixture
+def cgroup(monkeypatch, tmp_path):
+    """Fichiers cgroup factices : write(v2=..., v1_quota=..., v1_period=...)"""
+    paths = {
+        'v2': tmp_path / "cpu.max",
+        'v1_quota': tmp_path / "cpu.cfs_quota_us",
+        'v1_period': tmp_path / "cpu.cfs_period_us",
+    }
+    monkeypatch.setattr(resource_governor, 'CGROUP_V2_CPU_MAX', str(paths['v2']))
+    monkeypatch.setattr(resource_governor, 'CGROUP_V1_QUOTA', str(paths['v1_quota']))
+    monkeypatch.setattr(resource_governor, 'CGROUP_V1_PERIOD', str(paths['v1_period']))
+
+    def write(**contents):
+        for key, text in contents.items():
+            paths[key].write_text(text)
+
+    return write
+
+
+@pytest.mark.parametrize("contents, limit", [
+    ({}, None),
+    ({'v2': "max 100000\n"}, None),
+    ({'v2': "150000 100000\n"}, 1.5),
+    ({'v2': "200000"}, 2.0),
+    ({'v1_quota': "50000\n", 'v1_period': "100000\n"}, 0.5),
+    ({'v1_quota': "-1\n", 'v1_period': "100000\n"}, None),
+    # Un fichier v2 illisible laisse la place au v1
+    ({'v2': "n/a", 'v1_quota': "300000", 'v1_period': "100000"}, 3.0),
+])
+def test_cgroup_cpu_limit(cgroup, contents, limit):
+    cgroup(**contents)
+    assert cgroup_cpu_limit() == limit
+
+
+def test_available_cpus_follow_quota(cgroup, monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+    if hasattr(os, 'sched_getaffinity'):
+        monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(16)))
+    cgroup(v2="150000 100000")
+    assert resource_governor.available_cpus() == 2
+
+
+def test_threads_are_shared_between_encodes(monkeypatch):
+    monkeypatch.setattr(resource_governor, 'available_cpus', lambda: 8)
+    governor = ResourceGovernor()
+    assert governor.thread_cap() == 8
+    with governor.shared_by(3):
+        assert governor.thread_cap() == 2
+        with governor.shared_by(16):
+            assert governor.thread_cap() == 1
+        assert governor.thread_cap() == 2
+    assert governor.thread_cap() == 8
+    assert ResourceGovernor(cpu_affinity=[0, 1]).thread_cap() == 2
+    assert ResourceGovernor(threads=5).thread_cap(4) == 5
+
+
+def test_command_places_threads_before_output(monkeypatch):
+    monkeypatch.setattr(resource_governor, 'available_cpus', lambda: 4)
+    governor = ResourceGovernor()
+    cmd = ['ffmpeg', '-i', 'in.mp4', '-acodec', 'libmp3lame', 'out.mp3']
+    assert governor.command(cmd) == cmd[:-1] + ['-threads', '4', 'out.mp3']
+    # Une commande qui fixe déjà ses threads, ou un régulateur désactivé, n'est pas modifiée
+    explicit = ['ffmpeg', '-threads', '1', '-i', 'in.mp4', 'out.mp3']
+    assert governor.command(explicit) == explicit
+    assert ResourceGovernor(enabled=False).command(cmd) == cmd
+    assert cmd[-1] == 'out.mp3'
+
+
+def test_invalid_settings_are_refused():
+    with pytest.raises(ValueError):
+        ResourceGovernor(io_priority="urgent")
+    assert ResourceGovernor(nice=40).nice == 19
+    assert parse_cpu_list("0-1,6") == [0, 1, 6]
+    with pytest.raises(ValueError):
+        parse_cpu_list("a-b")
@@ -0,0 +1,40 @@
+# Tests de la correspondance des temps après suppression des silences (utils/silence_trim.py)
+import pytest
+
+from utils.silence_trim import OffsetMap
+
+# Passages conservés : 0-10 s, 20-30 s et 50-60 s d'un enregistrement de 70 s
+SEGMENTS = [(0.0, 10.0), (20.0, 30.0), (50.0, 60.0)]
+
+
+@pytest.mark.parametrize("trimmed, original", [
+    (0.0, 0.0),
+    (5.0, 5.0),
+    (10.0, 20.0),    # Début du deuxième passage, pas fin du premier
+    (15.0, 25.0),
+    (25.0, 55.0),
+    (29.999, 59.999),
+    (30.0, 60.0),    # Fin du fichier raccourci
+    (45.0, 60.0),    # Au-delà : fin du dernier passage
+])
+def test_to_original(trimmed, original):
+    assert OffsetMap(SEGMENTS, 70.0).to_original(trimmed) == pytest.approx(original)
+
+
+def test_without_segments_times_are_unchanged():
+    assert OffsetMap([], 70.0).to_original(12.5) == 12.5
+
+
+def test_durations():
+    offset_map = OffsetMap(SEGMENTS, 70.0)
+    assert offset_map.trimmed_duration == pytest.approx(30.0)
+    assert offset_map.removed_seconds == pytest.approx(40.0)
+
+
+def test_list_round_trip():
+    offset_map = OffsetMap(SEGMENTS, 70.0)
+    items = offset_map.to_list()
+    assert [item['trimmed_start_seconds'] for item in items] == [0.0, 10.0, 20.0]
+    restored = OffsetMap.from_list(items, 70.0)
+    assert restored.segments == SEGMENTS
+    assert restored.to_original(15.0) == pytest.approx(25.0)
@@ -0,0 +1,77 @@
+# Tests des étapes mesurées et des métriques Prometheus (utils/tracing.py)
+import json
+import os
+
+import pytest
+
+from utils.cancellation import CancelledError
+from utils.tracing import DURATION_BUCKETS, Tracer
+
+
+def _spans(directory):
+    [name] = [n for n in os.listdir(directory) if n.startswith("spans-")]
+    with open(os.path.join(directory, name), encoding='utf-8') as f:
+        return name, [json.loads(line) for line in f]
+
+
+def _metrics(directory, instance):
+    with open(os.path.join(directory, f"metrics-{instance}.prom"), encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_disabled_tracer_writes_nothing(tmp_path):
+    tracer = Tracer()
+    with tracer.span('extract') as span:
+        span.set(bytes=10)
+    tracer.flush()
+    assert not tracer.enabled and os.listdir(tmp_path) == []
+
+
+def test_nested_spans_are_linked(tmp_path):
+    tracer = Tracer(str(tmp_path), instance="gui")
+    with tracer.span('upload', session="s1") as parent:
+        with tracer.span('upload_attempt', part=1) as child:
+            child.set(bytes=100, status_code=200)
+    name, (first, second) = _spans(tmp_path)
+    assert name.startswith("spans-gui-")
+    assert first['name'] == 'upload_attempt' and second['name'] == 'upload'
+    assert first['parent_id'] == parent.span_id and first['trace_id'] == second['trace_id']
+    assert first['bytes'] == 100 and first['attrs'] == {'part': 1, 'status_code': 200}
+    assert tracer.current() is None
+
+
+def test_errors_and_cancellations_are_recorded(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    with pytest.raises(ValueError):
+        with tracer.span('probe'):
+            raise ValueError("fichier illisible")
+    with pytest.raises(CancelledError):
+        with tracer.span('extract'):
+            raise CancelledError()
+    _, (failed, cancelled) = _spans(tmp_path)
+    assert failed['outcome'] == 'error' and failed['error'] == "ValueError: fichier illisible"
+    assert cancelled['outcome'] == 'cancelled'
+
+
+def test_metrics_file(tmp_path):
+    tracer = Tracer(str(tmp_path), instance="watch 1")
+    for nbytes in (100, 250):
+        with tracer.span('split') as span:
+            span.set(bytes=nbytes)
+    with tracer.span('split') as span:
+        span.outcome = 'http_429'
+    tracer.flush()
+
+    # Le nom d'instance est nettoyé pour servir de nom de fichier et d'étiquette
+    lines = _metrics(tmp_path, "watch_1")
+    labels = 'instance="watch_1",stage="split",outcome="ok"'
+    assert f'baw_stage_duration_seconds_count{{{labels}}} 2' in lines
+    assert f'baw_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'baw_stage_bytes_total{{{labels}}} 350' in lines
+    assert 'baw_stage_bytes_total{instance="watch_1",stage="split",outcome="http_429"} 0' in lines
+    # Tranches cumulatives : chaque tranche compte aussi les étapes des précédentes
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines
+               if line.startswith(f'baw_stage_duration_seconds_bucket{{{labels},le="') and '+Inf' not in line]
+    assert len(buckets) == len(DURATION_BUCKETS)
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+    assert not os.path.exists(os.path.join(tmp_path, "metrics-watch_1.prom.tmp"))
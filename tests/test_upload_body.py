@@ -0,0 +1,73 @@
+# Tests du corps multipart lu en flux (utils/upload_body.py)
+import hashlib
+import re
+
+import pytest
+
+from utils.cancellation import CancelledError, CancelToken
+from utils.upload_body import DIGEST_FIELD_PREFIX, MultipartBody
+
+CONTENT = bytes(range(256)) * 1000   # Plus grand qu'un bloc de lecture
+
+
+def _sources(tmp_path):
+    path = tmp_path / "1.mp3"
+    path.write_bytes(CONTENT)
+    return [str(path), memoryview(CONTENT)]
+
+
+def _read_all(body, size=8192):
+    blocks = []
+    while True:
+        block = body.read(size)
+        if not block:
+            return b''.join(bytes(b) for b in blocks)
+        blocks.append(block)
+
+
+@pytest.mark.parametrize("digests", [(), ('sha256',), ('sha256', 'md5')])
+def test_length_matches_bytes_produced(tmp_path, digests):
+    for source in _sources(tmp_path):
+        body = MultipartBody({'part_number': 1, 'title': 'Webinaire é'}, 'file', '1.mp3', source,
+                             'audio/mpeg', digests=digests)
+        expected = len(body)
+        assert len(_read_all(body)) == expected
+
+
+def test_file_content_and_fields_are_sent(tmp_path):
+    body = MultipartBody({'a': 'x', 'skipped': None}, 'file', '1.mp3', memoryview(CONTENT))
+    data = _read_all(body)
+    assert CONTENT in data
+    assert b'name="a"' in data and b'name="skipped"' not in data
+    assert data.endswith(f'--{body.boundary}--\r\n'.encode())
+
+
+def test_tail_contains_digests_of_sent_content(tmp_path):
+    for source in _sources(tmp_path):
+        body = MultipartBody({}, 'file', '1.mp3', source, digests=('sha256', 'md5'))
+        assert body.hexdigests() == {}
+        data = _read_all(body, size=1000)
+        expected = {'sha256': hashlib.sha256(CONTENT).hexdigest(), 'md5': hashlib.md5(CONTENT).hexdigest()}
+        assert body.hexdigests() == expected
+        for algorithm, value in expected.items():
+            field = re.search(rf'name="{DIGEST_FIELD_PREFIX}{algorithm}"\r\n\r\n(\w+)\r\n'.encode(), data)
+            assert field and field.group(1).decode() == value
+        # Les empreintes sont après le fichier
+        assert data.index(CONTENT) < data.index(f'{DIGEST_FIELD_PREFIX}sha256'.encode())
+
+
+def test_throttle_sees_every_byte(tmp_path):
+    seen = []
+    body = MultipartBody({'a': 1}, 'file', '1.mp3', memoryview(CONTENT), throttle=seen.append,
+                         digests=('sha256',))
+    _read_all(body)
+    assert sum(seen) == len(body)
+
+
+def test_cancel_interrupts_reading():
+    token = CancelToken()
+    body = MultipartBody({}, 'file', '1.mp3', memoryview(CONTENT), cancel_token=token)
+    body.read(1000)
+    token.cancel()
+    with pytest.raises(CancelledError):
+        body.read(1000)
@@ -0,0 +1,84 @@
+# Tests du régulateur d'envoi (utils/upload_controller.py)
+import pytest
+
+from utils.cancellation import CancelledError, CancelToken
+from utils.upload_controller import (
+    CONNECT_TIMEOUT, MAX_READ_TIMEOUT, MIN_READ_TIMEOUT, TIMEOUT_SAFETY,
+    RESULT_ERROR, RESULT_OK, RESULT_THROTTLED, RESULT_TIMEOUT, UploadController
+)
+
+
+def test_additive_increase_up_to_max():
+    controller = UploadController(max_concurrency=3)
+    assert controller.limit == 1
+    # Sans mesure de durée, chaque succès ajoute 1 / concurrence
+    controller.record(0, 0, RESULT_OK)
+    assert controller.concurrency == pytest.approx(2.0)
+    controller.record(0, 0, RESULT_OK)
+    assert controller.concurrency == pytest.approx(2.5)
+    for _ in range(20):
+        controller.record(0, 0, RESULT_OK)
+    assert controller.limit == 3
+
+
+@pytest.mark.parametrize("result", [RESULT_ERROR, RESULT_TIMEOUT, RESULT_THROTTLED])
+def test_multiplicative_decrease(result):
+    controller = UploadController(max_concurrency=4)
+    controller.concurrency = 4.0
+    controller.record(1000, 1.0, result)
+    assert controller.concurrency == pytest.approx(2.0)
+    controller.record(1000, 1.0, result)
+    controller.record(1000, 1.0, result)
+    assert controller.limit == 1
+
+
+def test_throttled_caps_further_growth():
+    controller = UploadController(max_concurrency=4)
+    controller.concurrency = 4.0
+    controller.record(1000, 1.0, RESULT_THROTTLED)
+    for _ in range(20):
+        controller.record(0, 0, RESULT_OK)
+    # Le webhook a refusé à 4 : le régulateur ne dépasse plus le niveau d'alors (2)
+    assert controller.limit == 2
+
+
+def test_extra_slot_without_throughput_gain_is_dropped():
+    controller = UploadController(max_concurrency=4)
+    controller.record(1000, 1.0, RESULT_OK)   # 1 place : 1000 o/s
+    assert controller.limit == 2
+    controller.record(1000, 1.0, RESULT_OK)   # 2 places : toujours 1000 o/s au total
+    assert controller.limit == 1
+    for _ in range(10):
+        controller.record(0, 0, RESULT_OK)
+    assert controller.limit == 1
+
+
+def test_timeout_follows_measured_throughput():
+    controller = UploadController()
+    assert controller.timeout(10 ** 6) == (CONNECT_TIMEOUT, float(MAX_READ_TIMEOUT))
+    controller.record(10 ** 6, 1.0, RESULT_OK)
+    connect, read = controller.timeout(50 * 10 ** 6)
+    assert connect == CONNECT_TIMEOUT
+    assert read == pytest.approx(50 * TIMEOUT_SAFETY)
+    assert controller.timeout(1)[1] == MIN_READ_TIMEOUT
+    assert controller.timeout(10 ** 12)[1] == MAX_READ_TIMEOUT
+
+
+def test_slot_respects_limit_and_cancellation():
+    controller = UploadController()
+    token = CancelToken()
+    with controller.slot():
+        token.cancel()
+        # La seule place est prise : l'attente s'arrête sur l'annulation
+        with pytest.raises(CancelledError):
+            with controller.slot(token):
+                pass
+    with controller.slot():
+        pass
+
+
+def test_reset_forgets_measurements():
+    controller = UploadController()
+    controller.record(1000, 1.0, RESULT_OK)
+    controller.reset()
+    assert controller.limit == 1 and controller.throughput is None
@@ -0,0 +1,130 @@
+# Tests de la surveillance d'un dossier (utils/watch_folder.py)
+import os
+
+import pytest
+
+import utils.watch_folder as watch_folder
+from utils.job_queue import STATE_DONE, STATE_FAILED
+from utils.watch_folder import FolderWatcher, WatchState
+
+
+class FakeScheduler:
+    """Ordonnanceur qui garde les tâches soumises sans les exécuter"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job):
+        self.jobs.append(job)
+
+
+class Clock:
+    """Horloge avancée à la main par le test"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watch_folder.time, 'time', clock)
+    return clock
+
+
+def _watcher(tmp_path):
+    return FolderWatcher(str(tmp_path), FakeScheduler(), stable_seconds=10,
+                         state_path=str(tmp_path / "state.json"))
+
+
+def test_state_survives_restart(tmp_path):
+    state_path = str(tmp_path / "state.json")
+    state = WatchState(state_path)
+    done = WatchState.key(str(tmp_path / "a.mp4"), 100, 50.0)
+    failed = WatchState.key(str(tmp_path / "b.mp4"), 100, 50.0)
+    state.record(done, STATE_DONE)
+    state.record(failed, STATE_FAILED, "ffmpeg a échoué")
+
+    reloaded = WatchState(state_path)
+    assert reloaded.is_known(done)
+    # Un échec sera retenté au prochain démarrage
+    assert not reloaded.is_known(failed)
+    assert reloaded.entries[failed]['message'] == "ffmpeg a échoué"
+    assert not os.path.exists(state_path + ".tmp")
+
+
+def test_new_version_of_a_file_is_not_known(tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    path = str(tmp_path / "a.mp4")
+    state.record(WatchState.key(path, 100, 50.0), STATE_DONE)
+    assert not state.is_known(WatchState.key(path, 200, 50.0))
+    assert not state.is_known(WatchState.key(path, 100, 60.0))
+
+
+def test_unreadable_state_starts_empty(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{pas du json", encoding='utf-8')
+    assert WatchState(str(path)).entries == {}
+
+
+def test_file_is_submitted_once_stable(tmp_path, clock):
+    watcher = _watcher(tmp_path)
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"x" * 10)
+    watcher._scan_folder()
+
+    watcher._check_candidates()
+    clock.now += 9
+    watcher._check_candidates()
+    assert watcher.scheduler.jobs == []
+
+    clock.now += 1
+    watcher._check_candidates()
+    assert [job.input_path for job in watcher.scheduler.jobs] == [str(video)]
+    assert watcher._candidates == {}
+
+
+def test_growing_file_restarts_the_wait(tmp_path, clock):
+    watcher = _watcher(tmp_path)
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"x" * 10)
+    watcher._scan_folder()
+    watcher._check_candidates()
+
+    clock.now += 8
+    with open(video, 'ab') as f:
+        f.write(b"y" * 10)
+    watcher._check_candidates()
+    clock.now += 8
+    watcher._check_candidates()
+    assert watcher.scheduler.jobs == []
+    clock.now += 2
+    watcher._check_candidates()
+    assert len(watcher.scheduler.jobs) == 1
+
+
+def test_empty_known_or_deleted_files_are_skipped(tmp_path, clock):
+    watcher = _watcher(tmp_path)
+    (tmp_path / "empty.mp4").write_bytes(b"")
+    known = tmp_path / "known.mp4"
+    known.write_bytes(b"x")
+    stat = os.stat(known)
+    watcher.state.record(WatchState.key(str(known), stat.st_size, stat.st_mtime), STATE_DONE)
+    deleted = tmp_path / "deleted.mp4"
+    deleted.write_bytes(b"x")
+    (tmp_path / ".hidden.mp4").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    watcher._scan_folder()
+    assert sorted(os.path.basename(path) for path in watcher._candidates) == [
+        "deleted.mp4", "empty.mp4", "known.mp4"
+    ]
+
+    watcher._check_candidates()
+    deleted.unlink()
+    clock.now += 10
+    watcher._check_candidates()
+    assert watcher.scheduler.jobs == []
+    assert "deleted.mp4" not in {os.path.basename(path) for path in watcher._candidates}
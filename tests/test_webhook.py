@@ -0,0 +1,102 @@
+# Tests de l'envoi au webhook et du limiteur de débit par URL (utils/webhook.py)
+import pytest
+
+import utils.webhook as webhook
+from utils.cancellation import CancelledError, CancelToken
+from utils.webhook import (
+    MAX_CHUNK_SIZE_MB, MAX_RETRY_AFTER, RateLimiter, TokenBucket, _retry_after_seconds, send_file_to_webhook
+)
+
+
+class Clock:
+    """Horloge monotone avancée à la main par le test"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(webhook.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    """Requêtes envoyées : aucune ne part sur le réseau"""
+    sent = []
+
+    def fake_post(url, **kwargs):
+        sent.append(url)
+        raise AssertionError("aucune requête ne devait partir")
+
+    monkeypatch.setattr(webhook.requests, 'post', fake_post)
+    return sent
+
+
+def test_oversized_m4a_is_refused_without_sending(tmp_path, posts):
+    path = tmp_path / "1.m4a"
+    with open(path, 'wb') as f:
+        # Fichier creux : aucune écriture réelle de 20 Mo
+        f.truncate((MAX_CHUNK_SIZE_MB + 1) * 1024 * 1024)
+    success, message = send_file_to_webhook("http://webhook", str(path), {}, work_dir=str(tmp_path))
+    assert not success
+    assert "MP3" in message
+    assert posts == []
+    # Aucun fichier temporaire n'a été créé
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1.m4a"]
+
+
+def test_bucket_lets_a_burst_through_then_spaces_requests(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Seau vide : une requête toutes les 0,5 s, dans l'ordre d'arrivée
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    # Le seau se remplit de nouveau pendant une longue attente
+    clock.now += 10
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_pause_empties_the_bucket(clock):
+    bucket = TokenBucket(rate=1.0, burst=3)
+    bucket.pause(30)
+    assert bucket.reserve() == pytest.approx(30.0)
+    assert bucket.reserve() == pytest.approx(31.0)
+
+
+def test_cancel_interrupts_the_wait(clock):
+    bucket = TokenBucket(rate=0.001, burst=1)
+    bucket.reserve()
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(CancelledError):
+        bucket.acquire(token)
+
+
+def test_limiter_keeps_one_bucket_per_url():
+    limiter = RateLimiter(rate=1.0, burst=2)
+    limiter.configure("http://a", 5.0, 10)
+    first = limiter.bucket("http://a")
+    assert limiter.bucket("http://a") is first
+    assert (first.rate, first.burst) == (5.0, 10)
+    assert (limiter.bucket("http://b").rate, limiter.bucket("http://b").burst) == (1.0, 2)
+
+    # Un nouveau défaut s'applique aux URL sans réglage propre, pas aux autres
+    limiter.configure(None, 0.5, 1)
+    assert limiter.bucket("http://b").rate == 0.5
+    assert limiter.bucket("http://a") is first
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (None, None), ("12", 12.0), ("-5", 0.0), ("100000", MAX_RETRY_AFTER), ("demain", None),
+])
+def test_retry_after(value, seconds):
+    class Response:
+        headers = {'Retry-After': value} if value else {}
+
+    assert _retry_after_seconds(Response()) == seconds
@@ -0,0 +1,87 @@
+# Tests de l'espace de travail : quota, éviction et nettoyage des instances arrêtées (utils/workspace.py)
+import os
+
+import pytest
+
+import utils.workspace as workspace
+from utils.workspace import LOCK_SUFFIX, WorkspaceLockError, WorkspaceManager, WorkspaceQuotaError
+
+
+@pytest.fixture
+def managers(tmp_path):
+    """Crée des gestionnaires sur le disque seulement, fermés à la fin du test"""
+    created = []
+
+    def make(quota_bytes=1000):
+        manager = WorkspaceManager(root=str(tmp_path / "workspace"), quota_bytes=quota_bytes, ram_root=None)
+        created.append(manager)
+        return manager
+
+    yield make
+    for manager in created:
+        manager.shutdown()
+
+
+def _fill(session, nbytes, name="1.mp3"):
+    with open(os.path.join(session.path, name), 'wb') as f:
+        f.write(b"x" * nbytes)
+
+
+def test_oldest_unused_session_is_evicted(managers):
+    manager = managers()
+    old, recent = manager.create_session(), manager.create_session()
+    _fill(old, 400)
+    _fill(recent, 400)
+    old.unpin()
+    recent.unpin()
+    old.last_used, recent.last_used = 1.0, 2.0
+
+    manager.create_session(300)
+    assert not os.path.exists(old.path) and old.released
+    assert os.path.exists(recent.path)
+    assert old not in manager.sessions
+
+
+def test_pinned_session_is_never_evicted(managers):
+    manager = managers()
+    busy = manager.create_session()
+    _fill(busy, 800)
+    with pytest.raises(WorkspaceQuotaError):
+        manager.create_session(300)
+    assert os.path.exists(busy.path)
+    with pytest.raises(WorkspaceQuotaError):
+        manager.create_session(2000)
+
+
+def test_reserved_space_counts_before_it_is_written(managers):
+    manager = managers()
+    manager.create_session(800)
+    assert manager.usage() == 800
+    with pytest.raises(WorkspaceQuotaError):
+        manager.create_session(300)
+
+
+def test_orphans_are_swept_but_live_instances_kept(managers):
+    live = managers()
+    live_session = live.create_session()
+    orphan_dir = os.path.join(live.root, "1_1_dead")
+    os.makedirs(orphan_dir)
+    open(orphan_dir + LOCK_SUFFIX, 'w').close()
+
+    current = managers()
+    assert current.sweep_orphans() == 1
+    current.wait_for_cleanup()
+    assert not os.path.exists(orphan_dir) and not os.path.exists(orphan_dir + LOCK_SUFFIX)
+    assert os.path.exists(live_session.path)
+
+
+@pytest.mark.skipif(workspace.fcntl is None, reason="verrou fcntl indisponible")
+def test_refused_lock_creates_no_directory(managers):
+    manager = managers()
+    os.makedirs(manager.root)
+    lock_path = os.path.join(manager.root, manager.instance_id + LOCK_SUFFIX)
+    with open(lock_path, 'a+') as other:
+        workspace.fcntl.flock(other.fileno(), workspace.fcntl.LOCK_EX | workspace.fcntl.LOCK_NB)
+        with pytest.raises(WorkspaceLockError):
+            manager.create_session()
+    assert not os.path.exists(os.path.join(manager.root, manager.instance_id))
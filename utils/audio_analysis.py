@@ -0,0 +1,275 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# json : permet d'enregistrer les résultats d'analyse à côté des morceaux
+import json
+
+# subprocess : permet de lancer ffmpeg pour décoder l'audio
+import subprocess
+
+# time : permet de mesurer la durée du décodage (profilage)
+import time
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Dict, List, Optional, Tuple
+
+# numpy : calcul vectorisé sur les échantillons audio (beaucoup plus rapide qu'une boucle Python)
+import numpy as np
+
+# Importer notre classe de traitement audio (pour trouver ffmpeg)
+from .audio_processor import AudioProcessor
+from .ffmpeg_runner import wait_process
+from .resource_governor import popen_governed
+from .buffer_pool import MemoryPart
+from .cancellation import CancelToken, check_cancelled
+
+# ===== CONSTANTES =====
+# Fréquence d'échantillonnage utilisée pour l'analyse (en Hz)
+# 8 kHz suffit pour mesurer des niveaux et détecter la parole, et décode 5 fois moins de données
+ANALYSIS_SAMPLE_RATE = 8000
+
+# Durée d'une trame d'analyse (en secondes) : 20 ms est la durée classique pour la parole
+FRAME_SECONDS = 0.02
+FRAME_SAMPLES = int(ANALYSIS_SAMPLE_RATE * FRAME_SECONDS)
+
+# Nombre de points (min/max) conservés pour dessiner la forme d'onde d'un morceau
+WAVEFORM_POINTS = 200
+
+# Une trame est considérée comme « active » (parole probable) si son énergie dépasse
+# le bruit de fond d'au moins SPEECH_MARGIN_DB, et dans tous les cas SPEECH_MIN_DBFS
+SPEECH_MARGIN_DB = 12
+SPEECH_MIN_DBFS = -45
+
+# Nombre de trames lues à chaque fois depuis ffmpeg (environ 10 secondes d'audio)
+READ_FRAMES = 500
+
+# Suffixe du fichier de cache créé à côté de chaque morceau
+ANALYSIS_SUFFIX = ".analysis.json"
+
+# Version du format du cache (à incrémenter si le calcul change)
+ANALYSIS_VERSION = 1
+
+
+# ===== DÉCODAGE EN FLUX =====
+def iter_pcm_frames(file_path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE,
+                    frame_samples: int = FRAME_SAMPLES, read_frames: int = READ_FRAMES,
+                    cancel_token: Optional[CancelToken] = None):
+    """
+    Décode un fichier audio avec ffmpeg et renvoie les échantillons par blocs de trames.
+    Le fichier n'est jamais chargé entièrement en mémoire.
+    L'annulation de cancel_token (optionnel) tue ffmpeg et lève CancelledError.
+
+    Yields:
+        np.ndarray: Tableau (nombre_de_trames, frame_samples) d'échantillons entre -1 et 1
+    """
+    cmd = [
+        AudioProcessor.get_ffmpeg_path(),
+        '-v', 'error',             # N'afficher que les erreurs
+        '-i', file_path,           # Fichier d'entrée
+        '-vn',                     # Ignorer une éventuelle piste vidéo
+        '-ac', '1',                # Mono
+        '-ar', str(sample_rate),   # Fréquence d'échantillonnage réduite
+        '-f', 's16le',             # PCM 16 bits brut
+        'pipe:1'                   # Écrire sur la sortie standard
+    ]
+    started = time.monotonic()
+    process = popen_governed(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             stdin=subprocess.DEVNULL)
+    block_bytes = frame_samples * read_frames * 2
+    remainder = b''
+    forget_cancel = cancel_token.on_cancel(process.kill) if cancel_token else None
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            check_cancelled(cancel_token)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % (frame_samples * 2)
+            remainder = data[usable:]
+            if usable:
+                samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+                yield samples.reshape(-1, frame_samples)
+
+        # Compléter la dernière trame incomplète avec du silence
+        if len(remainder) >= 2:
+            remainder = remainder[:len(remainder) - len(remainder) % 2]
+            samples = np.frombuffer(remainder, dtype='<i2').astype(np.float32) / 32768.0
+            padded = np.zeros(frame_samples, dtype=np.float32)
+            padded[:len(samples)] = samples
+            yield padded.reshape(1, -1)
+
+        stderr = process.stderr.read()
+        if wait_process(process, cmd, started) != 0:
+            raise Exception(f"Erreur ffmpeg lors du décodage : {stderr.decode(errors='replace')}")
+    finally:
+        if forget_cancel:
+            forget_cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def to_dbfs(value: float) -> float:
+    """Convertit un niveau linéaire (0-1) en décibels relatifs au maximum (dBFS)"""
+    return float(20 * np.log10(max(value, 1e-10)))
+
+
+def frame_energies(frames: np.ndarray) -> np.ndarray:
+    """Énergie moyenne (carré des échantillons) de chaque trame d'un bloc"""
+    return np.square(frames).mean(axis=1)
+
+
+def speech_frames(energies: np.ndarray) -> np.ndarray:
+    """
+    Détection d'activité vocale par l'énergie : renvoie un tableau de booléens
+    (True = parole probable) pour chaque trame. Le bruit de fond est estimé par le
+    10e centile des niveaux de trame, ce qui s'adapte au niveau de l'enregistrement.
+    """
+    if len(energies) == 0:
+        return np.zeros(0, dtype=bool)
+    frame_db = 10 * np.log10(np.maximum(energies, 1e-10))
+    noise_floor = float(np.percentile(frame_db, 10))
+    threshold = max(noise_floor + SPEECH_MARGIN_DB, SPEECH_MIN_DBFS)
+    return frame_db > threshold
+
+
+# ===== ACCUMULATION DES STATISTIQUES D'UN MORCEAU =====
+class _PartAccumulator:
+    """Accumule les statistiques par trame d'un morceau pendant le décodage"""
+
+    def __init__(self):
+        self.mins: List[np.ndarray] = []
+        self.maxs: List[np.ndarray] = []
+        self.energies: List[np.ndarray] = []
+
+    def add(self, frames: np.ndarray):
+        # Une seule passe vectorisée par bloc : min, max et énergie de chaque trame
+        self.mins.append(frames.min(axis=1))
+        self.maxs.append(frames.max(axis=1))
+        self.energies.append(frame_energies(frames))
+
+    def result(self) -> dict:
+        if not self.energies:
+            return {
+                'version': ANALYSIS_VERSION,
+                'peaks': [],
+                'rms_dbfs': to_dbfs(0),
+                'peak_dbfs': to_dbfs(0),
+                'speech_ratio': 0.0
+            }
+
+        mins = np.concatenate(self.mins)
+        maxs = np.concatenate(self.maxs)
+        energies = np.concatenate(self.energies)
+
+        # Forme d'onde : regrouper les trames en WAVEFORM_POINTS paquets (min des min, max des max)
+        points = min(WAVEFORM_POINTS, len(energies))
+        edges = np.linspace(0, len(energies), points + 1).astype(int)
+        peak_mins = np.minimum.reduceat(mins, edges[:-1])
+        peak_maxs = np.maximum.reduceat(maxs, edges[:-1])
+
+        # Niveaux globaux
+        rms = float(np.sqrt(energies.mean()))
+        peak = float(max(abs(mins.min()), abs(maxs.max())))
+
+        # Détection d'activité vocale par l'énergie (voir speech_frames)
+        speech_ratio = float(speech_frames(energies).mean())
+
+        return {
+            'version': ANALYSIS_VERSION,
+            'peaks': [[round(float(lo), 3), round(float(hi), 3)] for lo, hi in zip(peak_mins, peak_maxs)],
+            'rms_dbfs': round(to_dbfs(rms), 1),
+            'peak_dbfs': round(to_dbfs(peak), 1),
+            'speech_ratio': round(speech_ratio, 3)
+        }
+
+
+# ===== ANALYSE DES MORCEAUX =====
+def analyze_parts(source_path: str, chunks: List[Tuple[str, int, float]],
+                  cancel_token: Optional[CancelToken] = None) -> Dict[int, dict]:
+    """
+    Analyse tous les morceaux en une seule passe de décodage du fichier complet.
+    Les morceaux étant consécutifs, chaque trame est attribuée au morceau
+    correspondant grâce aux durées cumulées.
+
+    Args:
+        source_path: Fichier audio complet dont sont issus les morceaux
+        chunks: Liste de tuples (chemin, numéro, durée) renvoyée par split_audio
+        cancel_token: Jeton d'annulation (optionnel)
+
+    Returns:
+        Dict[int, dict]: Résultats d'analyse par numéro de morceau (également
+        enregistrés dans un fichier .analysis.json à côté de chaque morceau)
+    """
+    # Étape 1: Calculer l'indice de la première trame de chaque morceau
+    boundaries = []
+    elapsed = 0.0
+    for _, _, duration in chunks:
+        elapsed += duration
+        boundaries.append(int(round(elapsed / FRAME_SECONDS)))
+
+    accumulators = [_PartAccumulator() for _ in chunks]
+
+    # Étape 2: Décoder une seule fois et répartir les trames entre les morceaux
+    frame_index = 0
+    part = 0
+    for frames in iter_pcm_frames(source_path, cancel_token=cancel_token):
+        offset = 0
+        while offset < len(frames) and chunks:
+            # Les trames au-delà de la fin théorique vont au dernier morceau
+            end = boundaries[part] if part < len(chunks) - 1 else frame_index + len(frames)
+            take = min(len(frames) - offset, max(end - frame_index, 0))
+            if take:
+                accumulators[part].add(frames[offset:offset + take])
+                offset += take
+                frame_index += take
+            if frame_index >= end and part < len(chunks) - 1:
+                part += 1
+
+    # Étape 3: Enregistrer les résultats à côté de chaque morceau
+    results = {}
+    for (path, num, duration), accumulator in zip(chunks, accumulators):
+        result = accumulator.result()
+        result['duration'] = duration
+        save_analysis(path, result)
+        results[num] = result
+    return results
+
+
+def analyze_file(file_path: str) -> dict:
+    """Analyse un seul fichier audio et enregistre le résultat à côté de lui"""
+    accumulator = _PartAccumulator()
+    for frames in iter_pcm_frames(file_path):
+        accumulator.add(frames)
+    result = accumulator.result()
+    save_analysis(file_path, result)
+    return result
+
+
+# ===== CACHE DES RÉSULTATS =====
+def save_analysis(file_path: str, result: dict):
+    """Enregistre le résultat d'analyse dans <fichier>.analysis.json"""
+    # Un morceau en mémoire garde son analyse avec lui
+    if isinstance(file_path, MemoryPart):
+        file_path.analysis = result
+        return
+    try:
+        with open(file_path + ANALYSIS_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+    except OSError as e:
+        print(f"Impossible d'enregistrer l'analyse de {file_path}: {e}")
+
+
+def load_analysis(file_path: str) -> Optional[dict]:
+    """Relit le résultat d'analyse d'un fichier s'il existe et est à jour, sinon None"""
+    cache_path = file_path + ANALYSIS_SUFFIX
+    try:
+        if os.path.getmtime(cache_path) < os.path.getmtime(file_path):
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        return result if result.get('version') == ANALYSIS_VERSION else None
+    except (OSError, ValueError):
+        return None
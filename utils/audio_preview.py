@@ -0,0 +1,208 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# subprocess : ffmpeg décode le morceau et envoie le son brut sur sa sortie
+import subprocess
+
+# threading : un thread alimente le haut-parleur pendant la lecture (et seulement pendant)
+import threading
+
+# time : position de lecture
+import time
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, Optional
+
+# Chemin de ffmpeg (dossier bin/ de l'application ou PATH)
+from .audio_processor import AudioProcessor
+
+# pygame est une bibliothèque lourde : elle n'est importée qu'à la première lecture
+
+# ===== CONSTANTES =====
+# Format du son décodé (celui demandé au module audio de pygame)
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BYTES_PER_SAMPLE = 2           # Entiers signés sur 16 bits
+
+# Taille du tampon du module audio (en échantillons) : petit pour démarrer vite
+MIXER_BUFFER = 512
+
+# Le premier bloc est court : la lecture commence dès qu'il est décodé
+FIRST_BLOCK_SECONDS = 0.05
+BLOCK_SECONDS = 0.25
+
+# Intervalle de vérification de la file du haut-parleur (en secondes)
+POLL_SECONDS = 0.01
+
+
+# ===== LECTURE EN COURS =====
+class _Playback:
+    """Une lecture : processus ffmpeg, thread d'alimentation et position de départ"""
+
+    def __init__(self, path: str, offset: float, on_end: Optional[Callable[[], None]]):
+        self.path = path
+        self.offset = offset
+        self.on_end = on_end
+        self.stopped = threading.Event()
+        self.started: Optional[float] = None   # Instant où le premier bloc a été joué
+        self.process: Optional[subprocess.Popen] = None
+        self.thread: Optional[threading.Thread] = None
+
+
+# ===== MOTEUR DE PRÉÉCOUTE =====
+class PreviewEngine:
+    """
+    Préécoute des morceaux, partagée par toutes les vues.
+
+    Le module audio de pygame est initialisé une seule fois, à la première lecture.
+    Le morceau n'est jamais chargé en entier : ffmpeg le décode en flux à partir
+    de la position demandée (-ss avant -i : ffmpeg saute directement à la bonne
+    trame grâce à l'index du fichier quand il en a un, table des échantillons M4A
+    ou table Xing des MP3, sinon d'après le débit). Les blocs décodés sont mis en
+    file sur un canal réservé au fur et à mesure.
+
+    Changer de position (seek) relance simplement le décodage à la nouvelle position.
+    Sans lecture en cours, aucun thread ni processus ne tourne.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pygame = None
+        self._channel = None
+        self._frequency = SAMPLE_RATE
+        self._channels = CHANNELS
+        self._playback: Optional[_Playback] = None
+
+    def _ensure_mixer(self):
+        """Importe pygame et initialise le module audio au premier appel"""
+        if self._pygame is None:
+            import pygame
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=CHANNELS, buffer=MIXER_BUFFER)
+            # Le module a pu être initialisé ailleurs avec un autre format : s'y adapter
+            self._frequency, _size, self._channels = pygame.mixer.get_init()
+            pygame.mixer.set_reserved(1)
+            self._channel = pygame.mixer.Channel(0)
+            self._pygame = pygame
+
+    # ----- Commandes -----
+    def play(self, path: str, offset: float = 0.0, on_end: Optional[Callable[[], None]] = None):
+        """
+        Lit un morceau à partir de offset secondes (la lecture en cours est arrêtée).
+        on_end est appelé, depuis le thread de lecture, quand le morceau se termine
+        de lui-même (pas après stop ni seek).
+        """
+        self.stop()
+        self._ensure_mixer()
+
+        playback = _Playback(path, max(0.0, offset), on_end)
+        cmd = [
+            AudioProcessor.get_ffmpeg_path(),
+            '-nostdin',
+            '-loglevel', 'error',
+            '-ss', f"{playback.offset:.3f}",     # Avant -i : saut direct, sans tout décoder
+            '-i', path,
+            '-vn',
+            '-threads', '1',
+            '-f', 's16le',                       # Son brut, au format du module audio
+            '-ac', str(self._channels),
+            '-ar', str(self._frequency),
+            'pipe:1'
+        ]
+        # Priorité normale : la préécoute doit répondre tout de suite
+        playback.process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL
+        )
+        playback.thread = threading.Thread(target=self._feed, args=(playback,), daemon=True,
+                                           name="audio-preview")
+        with self._lock:
+            self._playback = playback
+        playback.thread.start()
+
+    def seek(self, seconds: float):
+        """Reprend la lecture en cours à une autre position (sans effet si rien ne joue)"""
+        with self._lock:
+            playback = self._playback
+        if playback is not None:
+            self.play(playback.path, seconds, playback.on_end)
+
+    def stop(self):
+        """Arrête la lecture en cours (ffmpeg et le thread de lecture se terminent)"""
+        with self._lock:
+            playback, self._playback = self._playback, None
+            if playback is None:
+                return
+            playback.stopped.set()
+            if self._channel is not None:
+                self._channel.stop()
+        # Débloque le thread s'il attend une sortie de ffmpeg
+        playback.process.kill()
+
+    # ----- État -----
+    @property
+    def playing_path(self) -> Optional[str]:
+        """Morceau en cours de lecture, ou None"""
+        with self._lock:
+            return self._playback.path if self._playback else None
+
+    def position(self) -> Optional[float]:
+        """Position de lecture en secondes depuis le début du morceau, ou None"""
+        with self._lock:
+            playback = self._playback
+        if playback is None:
+            return None
+        if playback.started is None:
+            return playback.offset
+        return playback.offset + time.monotonic() - playback.started
+
+    # ----- Thread de lecture -----
+    def _feed(self, playback: _Playback):
+        """Lit la sortie de ffmpeg par blocs et les met en file sur le canal"""
+        frame_bytes = BYTES_PER_SAMPLE * self._channels
+        size = int(self._frequency * FIRST_BLOCK_SECONDS) * frame_bytes
+        finished = False
+        try:
+            while not playback.stopped.is_set():
+                # Un bloc joue et un autre attend déjà : patienter
+                if self._channel.get_busy() and self._channel.get_queue() is not None:
+                    playback.stopped.wait(POLL_SECONDS)
+                    continue
+
+                data = playback.process.stdout.read(size)
+                size = int(self._frequency * BLOCK_SECONDS) * frame_bytes
+                if not data:
+                    finished = True
+                    break
+                # Ne garder que des trames complètes
+                data = data[:len(data) - len(data) % frame_bytes]
+                if not data:
+                    continue
+                sound = self._pygame.mixer.Sound(buffer=data)
+
+                with self._lock:
+                    # stop() a pu être appelé pendant la lecture de ffmpeg
+                    if playback.stopped.is_set():
+                        break
+                    if self._channel.get_busy():
+                        self._channel.queue(sound)
+                    else:
+                        self._channel.play(sound)
+                        if playback.started is None:
+                            playback.started = time.monotonic()
+
+            # Fin du morceau : attendre que les derniers blocs soient joués
+            while finished and not playback.stopped.is_set() and self._channel.get_busy():
+                playback.stopped.wait(POLL_SECONDS)
+        finally:
+            playback.process.kill()
+            playback.process.stdout.close()
+            playback.process.wait()
+
+        with self._lock:
+            ended = finished and not playback.stopped.is_set()
+            if self._playback is playback:
+                self._playback = None
+        if ended and playback.on_end:
+            playback.on_end()
+
+
+# Moteur unique du programme : le module audio n'est jamais réinitialisé
+preview_engine = PreviewEngine()
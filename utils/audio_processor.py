@@ -6,7 +6,7 @@ import os
 import math
 
 # typing : permet de spécifier les types de données attendus dans les fonctions
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple, Union
 
 # tempfile : permet de créer des fichiers et dossiers temporaires qui seront automatiquement supprimés
 import tempfile
@@ -20,6 +20,26 @@ import json
 # sys : fournit des variables et fonctions liées au système d'exploitation
 import sys
 
+# Importer notre fonction d'exécution de ffmpeg avec suivi de la progression
+from .ffmpeg_runner import run_ffmpeg, run_ffmpeg_to_file, run_ffmpeg_to_memory, FFmpegProgress
+
+# Morceaux gardés en mémoire (mode sans fichier intermédiaire)
+from .buffer_pool import BufferPool, MemoryCeilingError, MemoryPart
+
+# Empreinte de chaque morceau, enregistrée dès sa création (reprise par le manifeste)
+from .manifest import save_part_digest
+
+# Mesure des étapes (durée, octets et résultat de chaque étape)
+from .tracing import Span, trace_span, tracer
+
+# Annulation d'un traitement en cours
+from .cancellation import CancelToken, check_cancelled
+
+# ===== CONSTANTES =====
+# Formats de morceaux que ffmpeg sait écrire dans un tube (mode mémoire) :
+# extension -> format ffmpeg
+PIPE_FORMATS = {'.mp3': 'mp3'}
+
 # ===== DÉFINITION DE LA CLASSE PRINCIPALE =====
 # Une classe est comme une boîte qui contient des outils (fonctions) et des données
 class AudioProcessor:
@@ -142,12 +162,13 @@ class AudioProcessor:
         # Étape 3: Exécuter la commande et traiter le résultat
         try:
             # Exécuter la commande ffprobe
-            result = subprocess.run(
-                cmd,                  # La commande à exécuter
-                capture_output=True,  # Capturer la sortie
-                text=True,            # Convertir la sortie en texte
-                check=True            # Lever une exception si la commande échoue
-            )
+            with trace_span('probe', file=os.path.basename(file_path)):
+                result = subprocess.run(
+                    cmd,                  # La commande à exécuter
+                    capture_output=True,  # Capturer la sortie
+                    text=True,            # Convertir la sortie en texte
+                    check=True            # Lever une exception si la commande échoue
+                )
             
             # Convertir la sortie JSON en dictionnaire Python
             data = json.loads(result.stdout)
@@ -161,6 +182,116 @@ class AudioProcessor:
         except Exception as e:  # Pour toute autre erreur
             raise Exception(f"Erreur lors de la lecture de la durée : {str(e)}")
     
+    @staticmethod
+    def extract_audio(
+        input_path: str,
+        output_path: str,
+        bitrate: str = "192k",
+        progress_callback: Optional[Callable[[FFmpegProgress], None]] = None,
+        offset_map=None,
+        cancel_token: Optional[CancelToken] = None
+    ) -> str:
+        """
+        Extrait la piste audio d'une vidéo et l'encode en MP3.
+        C'est l'étape la plus coûteuse en CPU de toute la chaîne de traitement.
+
+        Args:
+            input_path: Chemin du fichier vidéo d'entrée (MP4)
+            output_path: Chemin du fichier MP3 à créer
+            bitrate: Bitrate cible (par défaut 192k)
+            progress_callback: Fonction appelée avec la progression réelle de ffmpeg (optionnel)
+            offset_map: Passages à conserver (OffsetMap, voir utils/silence_trim.py).
+                S'il est fourni, les longs silences ne sont pas encodés (optionnel)
+            cancel_token: Jeton d'annulation (optionnel) : son annulation arrête ffmpeg
+                et lève CancelledError
+
+        Returns:
+            str: Chemin du fichier MP3 créé
+        """
+        # Étape 1: Construire la commande ffmpeg
+        cmd = [
+            AudioProcessor.get_ffmpeg_path(),  # Chemin vers l'exécutable ffmpeg
+            '-i', input_path,                  # Fichier d'entrée
+            '-vn',                             # Pas de vidéo
+            '-acodec', 'libmp3lame',           # Codec MP3
+            '-b:a', bitrate,                   # Bitrate
+            '-y',                              # Écraser le fichier de sortie s'il existe
+            output_path                        # Fichier de sortie
+        ]
+
+        # Ne garder que les passages demandés, mis bout à bout
+        duration = None
+        if offset_map:
+            cmd[-2:-2] = ['-af', offset_map.select_filter()]
+            # La durée encodée est celle des passages conservés
+            duration = offset_map.trimmed_duration
+
+        # Étape 2: Connaître la durée totale pour calculer un vrai pourcentage
+        if progress_callback and duration is None:
+            try:
+                duration = AudioProcessor.get_audio_duration(input_path)
+            except Exception as e:
+                # Sans durée, on affiche quand même la vitesse d'encodage
+                print(f"Durée inconnue pour {input_path}: {str(e)}")
+
+        # Étape 3: Exécuter ffmpeg en suivant sa progression
+        try:
+            with trace_span('extract', file=os.path.basename(input_path), bitrate=bitrate,
+                            trimmed=bool(offset_map)) as span:
+                run_ffmpeg(cmd, duration=duration, progress_callback=progress_callback,
+                           cancel_token=cancel_token)
+                span.set(bytes=os.path.getsize(output_path))
+            return output_path
+        except subprocess.CalledProcessError as e:  # Si ffmpeg renvoie une erreur
+            raise Exception(f"Erreur lors de la conversion : {e.stderr}")
+
+    @staticmethod
+    def remux_audio(
+        input_path: str,
+        output_path: str,
+        progress_callback: Optional[Callable[[FFmpegProgress], None]] = None,
+        cancel_token: Optional[CancelToken] = None
+    ) -> str:
+        """
+        Copie la piste audio d'une vidéo dans un fichier audio, sans la réencoder
+        (par exemple l'AAC d'un MP4 dans un .m4a). Beaucoup plus rapide que
+        extract_audio : ffmpeg ne fait que recopier les paquets.
+
+        Args:
+            input_path: Chemin du fichier d'entrée
+            output_path: Chemin du fichier audio à créer (.m4a pour de l'AAC, .mp3 pour du MP3)
+            progress_callback: Fonction appelée avec la progression réelle de ffmpeg (optionnel)
+            cancel_token: Jeton d'annulation (optionnel)
+
+        Returns:
+            str: Chemin du fichier audio créé
+        """
+        cmd = [
+            AudioProcessor.get_ffmpeg_path(),
+            '-i', input_path,                  # Fichier d'entrée
+            '-vn',                             # Pas de vidéo
+            '-map', '0:a:0',                   # Seulement la première piste audio
+            '-acodec', 'copy',                 # Copier l'audio sans le réencoder
+            '-y',                              # Écraser le fichier de sortie s'il existe
+            output_path                        # Fichier de sortie
+        ]
+
+        duration = None
+        if progress_callback:
+            try:
+                duration = AudioProcessor.get_audio_duration(input_path)
+            except Exception as e:
+                print(f"Durée inconnue pour {input_path}: {str(e)}")
+
+        try:
+            with trace_span('remux', file=os.path.basename(input_path)) as span:
+                run_ffmpeg(cmd, duration=duration, progress_callback=progress_callback,
+                           cancel_token=cancel_token)
+                span.set(bytes=os.path.getsize(output_path))
+            return output_path
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Erreur lors de la copie de la piste audio : {e.stderr}")
+
     @staticmethod
     def compress_mp3(input_path: str, output_path: str = None, bitrate="128k") -> str:
         """
@@ -201,7 +332,7 @@ class AudioProcessor:
         # Étape 3: Exécuter la commande et gérer les résultats
         try:
             # Exécuter ffmpeg pour compresser le fichier
-            subprocess.run(cmd, capture_output=True, check=True)
+            run_ffmpeg(cmd)
             
             # Si tout s'est bien passé, renvoyer le chemin du fichier compressé
             return output_path
@@ -213,7 +344,14 @@ class AudioProcessor:
             raise Exception(f"Erreur lors de la compression : {str(e)}")
     
     @staticmethod
-    def split_audio(file_path: str, num_parts: int) -> List[Tuple[str, int, float]]:
+    def split_audio(
+        file_path: str,
+        num_parts: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        output_dir: Optional[str] = None,
+        memory_pool: Optional[BufferPool] = None,
+        cancel_token: Optional[CancelToken] = None
+    ) -> List[Tuple[Union[str, MemoryPart], int, float]]:
         """
         Découpe un fichier audio en morceaux de durée égale.
         Par exemple, si on a un fichier de 10 minutes et qu'on veut 5 parties,
@@ -222,10 +360,19 @@ class AudioProcessor:
         Args:
             file_path: Chemin du fichier audio à découper
             num_parts: Nombre de parties souhaitées (combien de morceaux on veut)
+            progress_callback: Fonction appelée avec (morceaux terminés, total) après chaque morceau (optionnel)
+            output_dir: Dossier où écrire les morceaux, par exemple un dossier de session
+                de l'espace de travail (optionnel, sinon un dossier temporaire est créé)
+            memory_pool: Réservoir de tampons (optionnel). S'il est fourni, ffmpeg écrit
+                chaque morceau dans un tube et le morceau reste en mémoire (MemoryPart au
+                lieu d'un chemin). Un morceau qui ne tient pas sous le plafond de mémoire
+                est écrit sur le disque, comme sans réservoir.
+            cancel_token: Jeton d'annulation (optionnel). Une annulation arrête ffmpeg,
+                supprime les morceaux déjà créés et lève CancelledError.
             
         Returns:
-            List[Tuple[str, int, float]]: Liste contenant pour chaque morceau:
-                - le chemin vers le fichier créé
+            List[Tuple[Union[str, MemoryPart], int, float]]: Liste contenant pour chaque morceau:
+                - le chemin vers le fichier créé (ou le MemoryPart en mode mémoire)
                 - son numéro (1, 2, 3, etc.)
                 - sa durée en secondes
         """
@@ -240,17 +387,33 @@ class AudioProcessor:
         # Étape 3: Préparer les variables pour stocker les résultats
         chunks = []  # Liste qui contiendra les informations sur chaque morceau
         
-        # Créer un dossier temporaire pour stocker les morceaux
-        # Ce dossier sera automatiquement supprimé quand le programme se terminera
-        temp_dir = tempfile.mkdtemp()
+        # Dossier où stocker les morceaux : celui fourni, sinon un dossier temporaire
+        # (créé seulement quand un morceau doit réellement être écrit sur le disque)
+        temp_dir = output_dir
+        
+        # Les morceaux gardent le format du fichier découpé (1.mp3, 1.m4a...)
+        extension = os.path.splitext(file_path)[1].lower() or '.mp3'
+
+        # Seul le MP3 peut être écrit dans un tube : un conteneur MP4 doit pouvoir
+        # revenir en arrière dans le fichier pour écrire son index
+        if extension not in PIPE_FORMATS:
+            memory_pool = None
+
+        # Taille du fichier complet, pour estimer la taille de chaque morceau en mémoire
+        file_size = os.path.getsize(file_path) if memory_pool else 0
         
         # Récupérer le chemin vers ffmpeg
         ffmpeg_path = AudioProcessor.get_ffmpeg_path()
         
         # Étape 4: Découper le fichier en morceaux
+        split_span = tracer.start('split', file=os.path.basename(file_path), parts=num_parts,
+                                  in_memory=memory_pool is not None)
         try:
             # Pour chaque partie que nous voulons créer...
             for i in range(num_parts):
+                # S'arrêter entre deux morceaux si le traitement a été annulé
+                check_cancelled(cancel_token)
+                
                 # Calculer le temps de début de ce morceau (en secondes)
                 start_sec = i * duration_per_part
                 
@@ -261,47 +424,138 @@ class AudioProcessor:
                 # Calculer la durée de ce morceau
                 duration = end_sec - start_sec
                 
+                # Mode mémoire : ffmpeg écrit le morceau dans un tube, directement dans un tampon
+                if memory_pool:
+                    part = AudioProcessor._split_part_to_memory(
+                        ffmpeg_path, file_path, memory_pool, i + 1,
+                        start_sec, duration,
+                        # Le MP3 étant à bitrate constant, la taille suit la durée (+5 % de marge)
+                        int(file_size * duration / total_duration * 1.05) + 64 * 1024,
+                        cancel_token
+                    )
+                    if part is not None:
+                        chunks.append((part, i + 1, duration))
+                        if progress_callback:
+                            progress_callback(i + 1, num_parts)
+                        continue
+                
+                # Créer le dossier des morceaux au premier morceau écrit sur le disque
+                if temp_dir is None:
+                    temp_dir = tempfile.mkdtemp()
+                else:
+                    os.makedirs(temp_dir, exist_ok=True)
+                
                 # Étape 5: Créer le nom du fichier pour ce morceau
                 chunk_path = os.path.join(
                     temp_dir,           # Dossier temporaire
-                    f"{i+1}.mp3"        # Nom du fichier (1.mp3, 2.mp3, etc.)
+                    f"{i+1}{extension}" # Nom du fichier (1.mp3, 2.mp3, etc.)
                 )
                 
                 # Étape 6: Préparer la commande ffmpeg pour extraire ce segment
+                pipe_format = PIPE_FORMATS.get(extension)
                 cmd = [
                     ffmpeg_path,              # Chemin vers l'exécutable ffmpeg
                     '-i', file_path,          # Fichier d'entrée
                     '-ss', str(start_sec),    # Temps de début (-ss = start seconds)
                     '-t', str(duration),      # Durée à extraire (-t = time duration)
                     '-acodec', 'copy',         # Copier l'audio sans le réencoder (plus rapide)
-                    '-y',                      # Écraser le fichier s'il existe
-                    chunk_path                 # Chemin du fichier de sortie
                 ]
+                if pipe_format:
+                    # Le MP3 passe par un tube : il est écrit et son empreinte calculée
+                    # pendant que ffmpeg le produit (le manifeste ne relit pas le fichier)
+                    cmd = [cmd[0], '-v', 'error'] + cmd[1:] + ['-f', pipe_format, 'pipe:1']
+                else:
+                    cmd += [
+                        '-y',                  # Écraser le fichier s'il existe
+                        chunk_path             # Chemin du fichier de sortie
+                    ]
                 
                 # Étape 7: Exécuter la commande pour ce morceau
                 try:
-                    subprocess.run(cmd, capture_output=True, check=True)
+                    if pipe_format:
+                        save_part_digest(chunk_path, run_ffmpeg_to_file(cmd, chunk_path, cancel_token))
+                    else:
+                        # Empreinte calculée pendant l'envoi du morceau (voir webhook)
+                        run_ffmpeg(cmd, cancel_token=cancel_token)
                     
                     # Ajouter les informations de ce morceau à notre liste
                     chunks.append((chunk_path, i + 1, duration))
                     
+                    # Signaler l'avancement du découpage
+                    if progress_callback:
+                        progress_callback(i + 1, num_parts)
+                    
                 except subprocess.CalledProcessError as e:  # Si ffmpeg renvoie une erreur
                     raise Exception(f"Erreur lors du découpage du morceau {i+1}: {e.stderr}")
                     
             # Étape 8: Renvoyer la liste des morceaux créés
+            split_span.set(bytes=sum(
+                len(c[0]) if isinstance(c[0], MemoryPart) else os.path.getsize(c[0]) for c in chunks
+            ))
             return chunks
             
         # Étape 9: En cas d'erreur, nettoyer les fichiers temporaires avant de propager l'erreur
         except Exception as e:
+            split_span.fail(e)
+            
             # Extraire juste les chemins des fichiers de notre liste de morceaux
             # et les passer à la fonction de nettoyage
             AudioProcessor.cleanup_chunks([c[0] for c in chunks])
             
             # Propager l'erreur pour que l'appelant sache ce qui s'est passé
             raise e
+        
+        finally:
+            split_span.end()
 
     @staticmethod
-    def cleanup_chunks(chunk_paths: List[str]):
+    def _split_part_to_memory(
+        ffmpeg_path: str,
+        file_path: str,
+        memory_pool: BufferPool,
+        number: int,
+        start_sec: float,
+        duration: float,
+        estimated_size: int,
+        cancel_token: Optional[CancelToken] = None
+    ) -> Optional[MemoryPart]:
+        """
+        Extrait un morceau directement en mémoire.
+        Renvoie None si le plafond de mémoire ne le permet pas (le morceau doit alors
+        être écrit sur le disque).
+        """
+        part = memory_pool.acquire(estimated_size, f"{number}.mp3")
+        if part is None:
+            print(f"Plafond de mémoire atteint : le morceau {number} sera écrit sur le disque")
+            return None
+        
+        cmd = [
+            ffmpeg_path,
+            '-v', 'error',            # Seules les erreurs sur stderr
+            '-i', file_path,          # Fichier d'entrée
+            '-ss', str(start_sec),    # Temps de début
+            '-t', str(duration),      # Durée à extraire
+            '-acodec', 'copy',        # Copier l'audio sans le réencoder
+            '-f', 'mp3',              # Format de sortie (impossible à deviner sans extension)
+            'pipe:1'                  # Écrire sur la sortie standard
+        ]
+        try:
+            run_ffmpeg_to_memory(cmd, part, cancel_token)
+            return part
+        except MemoryCeilingError:
+            part.release()
+            print(f"Le morceau {number} dépasse le plafond de mémoire : écriture sur le disque")
+            return None
+        except subprocess.CalledProcessError as e:
+            part.release()
+            raise Exception(f"Erreur lors du découpage du morceau {number}: {e.stderr}")
+        except BaseException:
+            # Annulation ou erreur imprévue : le tampon n'appartient encore à aucun morceau
+            part.release()
+            raise
+
+    @staticmethod
+    def cleanup_chunks(chunk_paths: List[Union[str, MemoryPart]]):
         """
         Nettoie les fichiers temporaires créés lors du découpage audio.
         Cette fonction s'assure que tous les fichiers temporaires sont supprimés
@@ -309,7 +563,23 @@ class AudioProcessor:
         
         Args:
             chunk_paths: Liste des chemins vers les fichiers à supprimer
+                (les morceaux gardés en mémoire rendent simplement leur tampon)
         """
+        with trace_span('cleanup', parts=len(chunk_paths)) as span:
+            AudioProcessor._cleanup_chunks(chunk_paths, span)
+    
+    @staticmethod
+    def _cleanup_chunks(chunk_paths: List[Union[str, MemoryPart]], span: Span):
+        """Corps de cleanup_chunks ; les octets libérés sont comptés dans span"""
+        # Les morceaux en mémoire n'ont pas de fichier : rendre leur tampon au réservoir
+        freed = 0
+        for part in chunk_paths:
+            if isinstance(part, MemoryPart):
+                freed += len(part)
+                part.release()
+        chunk_paths = [path for path in chunk_paths if not isinstance(path, MemoryPart)]
+        span.set(bytes=freed)
+        
         # Étape 1: Vérifier si la liste est vide
         if not chunk_paths:  # Si la liste est vide...
             return  # ...ne rien faire et terminer la fonction
@@ -324,8 +594,17 @@ class AudioProcessor:
                 # Vérifier si le fichier existe avant d'essayer de le supprimer
                 if os.path.exists(path):
                     # Supprimer le fichier
+                    freed += os.path.getsize(path)
+                    span.set(bytes=freed)
                     os.remove(path)
-                    print(f"Fichier temporaire supprimé: {path}")  # Message de débogage
+                
+                # Supprimer aussi les fichiers associés au morceau (par exemple
+                # le cache d'analyse 1.mp3.analysis.json), sinon le dossier ne serait pas vide
+                sidecar_prefix = os.path.basename(path) + '.'
+                if os.path.isdir(temp_dir):
+                    for name in os.listdir(temp_dir):
+                        if name.startswith(sidecar_prefix):
+                            os.remove(os.path.join(temp_dir, name))
             except Exception as e:  # Si une erreur se produit...
                 # On ignore l'erreur et on continue avec les autres fichiers
                 print(f"Erreur lors de la suppression du fichier {path}: {str(e)}")  
@@ -338,7 +617,6 @@ class AudioProcessor:
             if os.path.exists(temp_dir):
                 # Supprimer le dossier
                 os.rmdir(temp_dir)
-                print(f"Dossier temporaire supprimé: {temp_dir}")  # Message de débogage
         except Exception as e:  # Si une erreur se produit...
             # On ignore l'erreur (le dossier n'est peut-être pas vide)
             print(f"Erreur lors de la suppression du dossier {temp_dir}: {str(e)}")
@@ -0,0 +1,168 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# time : permet de mesurer le temps écoulé et de faire des pauses
+import time
+
+# threading : le limiteur est partagé par tous les threads d'envoi
+import threading
+
+# datetime : permet de savoir dans quelle plage horaire on se trouve
+from datetime import datetime
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import List, Optional, Sequence
+
+# Une attente peut être interrompue par l'annulation de l'envoi
+from .cancellation import CancelToken, sleep_or_cancel
+
+# ===== CONSTANTES =====
+# Volume pouvant partir d'un coup, exprimé en secondes de débit
+# (évite de faire une pause après chaque petit bloc)
+BURST_SECONDS = 0.5
+
+# Profil « heures de bureau » proposé dans l'interface :
+# débit limité du lundi au vendredi de 8 h à 19 h, pleine vitesse le reste du temps
+OFFICE_HOURS_LIMIT = 512 * 1024   # Octets par seconde
+OFFICE_HOURS_START = "08:00"
+OFFICE_HOURS_END = "19:00"
+WEEKDAYS = (0, 1, 2, 3, 4)        # Lundi = 0
+
+
+# ===== PLAGE HORAIRE =====
+class BandwidthProfile:
+    """
+    Plage horaire pendant laquelle le débit d'envoi est limité.
+
+    Attributs:
+        start, end: Heures de début et de fin au format 'HH:MM' ; si end est
+                    avant start, la plage passe minuit (par exemple 22:00-06:00)
+        bytes_per_second: Débit autorisé pendant la plage (None = illimité)
+        days: Jours concernés (0 = lundi ... 6 = dimanche), tous par défaut
+    """
+
+    def __init__(
+        self,
+        start: str,
+        end: str,
+        bytes_per_second: Optional[float],
+        days: Sequence[int] = range(7)
+    ):
+        self.start = _minutes(start)
+        self.end = _minutes(end)
+        self.bytes_per_second = bytes_per_second
+        self.days = set(days)
+
+    def matches(self, moment: datetime) -> bool:
+        """Indique si l'instant donné tombe dans la plage"""
+        minute = moment.hour * 60 + moment.minute
+        if self.start <= self.end:
+            return moment.weekday() in self.days and self.start <= minute < self.end
+        # Plage qui passe minuit : après minuit, c'est la veille qui compte
+        if minute >= self.start:
+            return moment.weekday() in self.days
+        return minute < self.end and (moment.weekday() - 1) % 7 in self.days
+
+    def __repr__(self) -> str:
+        return (f"<BandwidthProfile {self.start // 60:02d}:{self.start % 60:02d}-"
+                f"{self.end // 60:02d}:{self.end % 60:02d} {self.bytes_per_second}>")
+
+
+def _minutes(value: str) -> int:
+    """Convertit 'HH:MM' en minutes depuis minuit"""
+    hours, _, minutes = value.partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def parse_profile(text: str) -> BandwidthProfile:
+    """
+    Lit une plage écrite sur la ligne de commande : 'HH:MM-HH:MM=Ko/s'
+    (par exemple '08:00-19:00=500'). Une valeur de 0 signifie illimité.
+
+    Raises:
+        ValueError: Si le texte n'a pas ce format
+    """
+    try:
+        hours, _, limit = text.partition('=')
+        start, end = hours.split('-')
+        kbps = float(limit)
+        return BandwidthProfile(start.strip(), end.strip(), kbps * 1024 if kbps > 0 else None)
+    except ValueError:
+        raise ValueError(f"Plage de débit invalide : '{text}' (format attendu HH:MM-HH:MM=Ko/s)")
+
+
+def office_hours_profiles() -> List[BandwidthProfile]:
+    """Profil proposé par défaut : limité en heures de bureau, pleine vitesse la nuit"""
+    return [BandwidthProfile(OFFICE_HOURS_START, OFFICE_HOURS_END, OFFICE_HOURS_LIMIT, WEEKDAYS)]
+
+
+# ===== LIMITEUR DE DÉBIT EN OCTETS =====
+class BandwidthLimiter:
+    """
+    Plafond global de débit d'envoi (en octets par seconde), partagé par tous
+    les envois en cours : deux envois simultanés se partagent le même plafond.
+
+    Le limiteur ne garde aucune donnée : le corps de la requête (MultipartBody)
+    l'appelle avec la taille de chaque bloc juste avant de le rendre au réseau,
+    et le thread d'envoi attend le temps nécessaire. La mémoire utilisée ne
+    dépend donc pas du débit choisi.
+
+    Le débit est choisi ainsi :
+    - la première plage horaire (profil) qui correspond à l'heure actuelle
+    - sinon le débit par défaut (None = illimité)
+    Les deux peuvent être changés à tout moment, par exemple depuis l'interface.
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        profiles: Optional[List[BandwidthProfile]] = None
+    ):
+        self.default_limit = bytes_per_second
+        self.profiles = list(profiles or [])
+        self._limit = None         # Débit en vigueur lors du dernier bloc
+        self._tat = 0.0            # Instant où le « seau » sera de nouveau plein
+        self._lock = threading.Lock()
+
+    def set_limit(self, bytes_per_second: Optional[float]):
+        """Change le débit par défaut (None = illimité)"""
+        with self._lock:
+            self.default_limit = bytes_per_second if bytes_per_second else None
+
+    def set_profiles(self, profiles: Optional[List[BandwidthProfile]]):
+        """Remplace les plages horaires (None ou [] = aucune plage)"""
+        with self._lock:
+            self.profiles = list(profiles or [])
+
+    def current_limit(self, moment: Optional[datetime] = None) -> Optional[float]:
+        """Débit autorisé à l'instant donné (maintenant par défaut), None si illimité"""
+        moment = moment or datetime.now()
+        for profile in self.profiles:
+            if profile.matches(moment):
+                return profile.bytes_per_second
+        return self.default_limit
+
+    def reserve(self, nbytes: int) -> float:
+        """Réserve l'envoi de nbytes octets et renvoie le temps d'attente avant de les envoyer"""
+        with self._lock:
+            limit = self.current_limit()
+            now = time.monotonic()
+            if limit != self._limit:
+                # Nouveau débit (changement dans l'interface ou de plage horaire) :
+                # repartir de zéro plutôt que d'hériter du retard calculé avec l'ancien
+                self._limit = limit
+                self._tat = now
+            if not limit:
+                return 0.0
+            tat = max(self._tat, now)
+            wait = tat - BURST_SECONDS - now
+            self._tat = tat + nbytes / limit
+        return max(0.0, wait)
+
+    def consume(self, nbytes: int, cancel_token: Optional[CancelToken] = None):
+        """Attend le droit d'envoyer nbytes octets (CancelledError si l'envoi est annulé)"""
+        wait = self.reserve(nbytes)
+        if wait > 0:
+            sleep_or_cancel(wait, cancel_token)
+
+
+# Limiteur unique du programme : tous les envois de fichiers passent par lui
+bandwidth_limiter = BandwidthLimiter()
@@ -0,0 +1,513 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers
+import os
+
+# re : repérer les références {{module.champ}} des blueprints
+import re
+
+# json : les blueprints Make.com et les latences sont décrits en JSON
+import json
+
+# random : tirage des latences simulées
+import random
+
+# argparse : options de la ligne de commande
+import argparse
+
+# statistics : moyenne et centiles des durées simulées
+import statistics
+
+# collections.Counter : temps cumulé par module
+from collections import Counter
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Tuple
+
+# ===== CONSTANTES =====
+# Blueprints du dépôt
+BLUEPRINTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "blueprints")
+RECEIVER_BLUEPRINT = os.path.join(BLUEPRINTS_DIR, "webhook_receiver.json")
+COUNTER_BLUEPRINT = os.path.join(BLUEPRINTS_DIR, "parts_counter.json")
+
+# Modules qui ne consomment pas d'opération Make
+FREE_MODULES = ("builtin:BasicRouter",)
+
+# Modules qui produisent plusieurs paquets (un par élément trouvé) : le reste du
+# scénario est alors exécuté une fois par paquet, l'un après l'autre
+ITERATOR_MARKERS = (":List", ":Search", "builtin:BasicRepeater", "builtin:BasicFeeder")
+
+# Latences par défaut (en secondes) : par nom exact de module, puis par préfixe
+# d'application ('openai-gpt-3:*'). 'median' et 'sigma' décrivent une loi
+# log-normale ; 'per_audio_second' ajoute un temps proportionnel à l'audio traité
+# ('audio': 'bundle' = le morceau du paquet, 'total' = l'enregistrement entier).
+DEFAULT_LATENCIES: Dict[str, Dict[str, Any]] = {
+    "gateway:CustomWebHook": {"median": 0.3, "sigma": 0.3},
+    "hubspotcrm:UploadFile": {"median": 2.0, "sigma": 0.4, "per_audio_second": 0.002},
+    "hubspotcrm:*": {"median": 0.8, "sigma": 0.4},
+    "http:ActionGetFile": {"median": 1.0, "sigma": 0.4, "per_audio_second": 0.001},
+    "http:*": {"median": 1.0, "sigma": 0.4},
+    # Transcription : environ 40 fois plus rapide que le temps réel
+    "openai-gpt-3:CreateTranscription": {"median": 3.0, "sigma": 0.3, "per_audio_second": 0.025},
+    "openai-gpt-3:messageAssistantAdvanced": {"median": 25.0, "sigma": 0.5},
+    "openai-gpt-3:uploadFile": {"median": 2.0, "sigma": 0.4},
+    "openai-gpt-3:createVectorStoreFileBatch": {"median": 4.0, "sigma": 0.5},
+    "openai-gpt-3:*": {"median": 5.0, "sigma": 0.5},
+    "google-docs:*": {"median": 1.2, "sigma": 0.4},
+    "google-drive:*": {"median": 1.0, "sigma": 0.4},
+    "util:*": {"median": 0.0},
+    "builtin:*": {"median": 0.0},
+    "*": {"median": 1.0, "sigma": 0.5},
+}
+
+# Attente de l'application entre le dernier morceau et le nombre de parties
+# (voir PARTS_COUNT_DELAY dans utils/job_queue.py)
+DEFAULT_PARTS_COUNT_DELAY = 30.0
+
+# Taille maximale d'un fichier accepté par le module de transcription (Whisper) :
+# un morceau plus gros fait échouer le scénario, quel que soit le délai simulé
+TRANSCRIPTION_MAX_BYTES = 25 * 1024 * 1024
+
+_REFERENCE = re.compile(r"\{\{\s*(\d+)\.([\w.]+)\s*\}\}")
+
+
+# ===== LATENCE D'UN MODULE =====
+class Latency:
+    """Loi de latence d'un module : médiane × log-normale + temps par seconde d'audio"""
+
+    def __init__(self, median: float = 1.0, sigma: float = 0.0, per_audio_second: float = 0.0,
+                 audio: str = "bundle"):
+        self.median = median
+        self.sigma = sigma
+        self.per_audio_second = per_audio_second
+        self.audio = audio
+
+    def sample(self, rng: random.Random, bundle_audio: float, total_audio: float) -> float:
+        value = self.median * (rng.lognormvariate(0.0, self.sigma) if self.sigma > 0 else 1.0)
+        if self.per_audio_second:
+            value += self.per_audio_second * (total_audio if self.audio == "total" else bundle_audio)
+        return value
+
+
+class LatencyTable:
+    """Latences par identifiant de module, nom exact, préfixe d'application puis '*'"""
+
+    def __init__(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.entries = {key: Latency(**value) for key, value in DEFAULT_LATENCIES.items()}
+        for key, value in (overrides or {}).items():
+            self.entries[str(key)] = Latency(**value)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "LatencyTable":
+        """Lit un fichier JSON {module: {median, sigma, per_audio_second, audio}}"""
+        if not path:
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def get(self, module: "BlueprintModule") -> Latency:
+        app = module.name.split(':', 1)[0]
+        for key in (str(module.id), module.name, f"{app}:*", "*"):
+            if key in self.entries:
+                return self.entries[key]
+        return Latency()
+
+
+# ===== GRAPHE DU BLUEPRINT =====
+class BlueprintModule:
+    """Un module du scénario, avec son filtre et, pour un routeur, ses routes"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.id = data.get('id')
+        self.name = data.get('module', '')
+        self.mapper = data.get('mapper') or {}
+        self.parameters = data.get('parameters') or {}
+        self.filter = data.get('filter')
+        self.routes: List[List["BlueprintModule"]] = [
+            [BlueprintModule(m) for m in route.get('flow', [])] for route in data.get('routes') or []
+        ]
+
+    @property
+    def label(self) -> str:
+        name = (self.filter or {}).get('name', '').strip()
+        return f"{self.id} {self.name}" + (f" ({name})" if name else "")
+
+    @property
+    def is_iterator(self) -> bool:
+        return any(marker in self.name for marker in ITERATOR_MARKERS)
+
+
+class Blueprint:
+    """Scénario Make.com chargé depuis son export JSON"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get('name', '')
+        self.flow = [BlueprintModule(m) for m in data.get('flow', [])]
+        scenario = data.get('metadata', {}).get('scenario', {})
+        # Un scénario non séquentiel peut traiter plusieurs appels du webhook en même temps
+        self.sequential = bool(scenario.get('sequential', False))
+
+    @classmethod
+    def load(cls, path: str) -> "Blueprint":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def modules(self) -> List[BlueprintModule]:
+        """Tous les modules, routes comprises (ordre du scénario)"""
+        found = []
+
+        def walk(flow):
+            for module in flow:
+                found.append(module)
+                for route in module.routes:
+                    walk(route)
+        walk(self.flow)
+        return found
+
+
+# ===== ÉVALUATION DES FILTRES =====
+def _resolve(value: Any, context: Dict[Any, Dict[str, Any]]) -> Any:
+    """
+    Remplace les références {{module.champ}} par les valeurs simulées.
+    Renvoie None si une référence est inconnue (fonction Make, champ non simulé).
+    """
+    if not isinstance(value, str):
+        return value
+    missing = False
+
+    def lookup(match):
+        nonlocal missing
+        current: Any = context.get(int(match.group(1)), {})
+        for key in match.group(2).split('.'):
+            if not isinstance(current, dict) or key not in current:
+                missing = True
+                return ""
+            current = current[key]
+        return str(current)
+
+    whole = _REFERENCE.fullmatch(value.strip())
+    resolved = _REFERENCE.sub(lookup, value)
+    if missing or '{{' in resolved:
+        return None
+    if whole:
+        # Référence seule : garder le type de la valeur (nombre, liste...)
+        current: Any = context.get(int(whole.group(1)), {})
+        for key in whole.group(2).split('.'):
+            current = current[key]
+        return current
+    return resolved
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _condition(condition: Dict[str, Any], context: Dict[Any, Dict[str, Any]]) -> Optional[bool]:
+    """Résultat d'une condition (None si elle ne peut pas être évaluée hors ligne)"""
+    operator = condition.get('o', '')
+    a = _resolve(condition.get('a'), context)
+    b = _resolve(condition.get('b'), context)
+    if operator == 'exist':
+        return a not in (None, "")
+    if operator == 'notexist':
+        return a in (None, "")
+    if a is None or b is None:
+        return None
+    if operator.startswith('text:'):
+        a, b = str(a), str(b)
+        if operator.endswith(':ci'):
+            a, b = a.lower(), b.lower()
+            operator = operator[:-3]
+        return {
+            'text:equal': a == b,
+            'text:notequal': a != b,
+            'text:contain': b in a,
+            'text:notcontain': b not in a,
+            'text:startwith': a.startswith(b),
+            'text:endwith': a.endswith(b),
+        }.get(operator)
+    if operator.startswith('number:'):
+        x, y = _number(a), _number(b)
+        if x is None or y is None:
+            return None
+        return {
+            'number:equal': x == y,
+            'number:notequal': x != y,
+            'number:greater': x > y,
+            'number:greaterorequal': x >= y,
+            'number:less': x < y,
+            'number:lessorequal': x <= y,
+        }.get(operator)
+    return None
+
+
+def passes_filter(module: BlueprintModule, context: Dict[Any, Dict[str, Any]]) -> bool:
+    """
+    Filtre Make : des groupes reliés par OU, chaque groupe étant un ET de conditions.
+    Une condition impossible à évaluer hors ligne est considérée comme vraie.
+    """
+    groups = (module.filter or {}).get('conditions') or []
+    if not any(groups):
+        return True
+    for group in groups:
+        if all(_condition(c, context) is not False for c in group):
+            return True
+    return False
+
+
+# ===== SIMULATION D'UNE EXÉCUTION =====
+class RunResult:
+    """
+    Résultat d'une exécution simulée d'un scénario.
+
+    Attributs:
+        sequential_seconds: Durée telle que Make l'exécute (routes et paquets l'un après l'autre)
+        critical_path_seconds: Durée si les routes d'un routeur tournaient en parallèle
+            (borne basse atteignable en séparant les routes en scénarios distincts)
+        operations: Nombre d'opérations Make consommées
+        module_seconds: Temps passé dans chaque module (par libellé)
+    """
+
+    def __init__(self):
+        self.sequential_seconds = 0.0
+        self.critical_path_seconds = 0.0
+        self.operations = 0
+        self.module_seconds: Counter = Counter()
+
+
+class _Run:
+    """État d'une exécution en cours (compteurs util:FunctionIncrement, tirages)"""
+
+    def __init__(self, latencies: LatencyTable, rng: random.Random, total_audio: float):
+        self.latencies = latencies
+        self.rng = rng
+        self.total_audio = total_audio
+        self.counters: Dict[Any, int] = {}
+        self.result = RunResult()
+
+    def outputs(self, module: BlueprintModule, context: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Paquets produits par un module simulé"""
+        if module.name == 'util:FunctionIncrement':
+            self.counters[module.id] = self.counters.get(module.id, 0) + 1
+            return [{'i': self.counters[module.id]}]
+        if module.is_iterator:
+            count = _resolve(module.mapper.get('limit', module.mapper.get('repeats')), context)
+            if isinstance(count, list):
+                count = len(count)
+            count = max(0, int(_number(count) or 1))
+            return [{'index': i + 1, '__count__': count} for i in range(count)]
+        # Le déclencheur renvoie le contenu reçu par le webhook (déjà dans le contexte)
+        return [context.get(module.id, {})]
+
+    def duration(self, module: BlueprintModule, bundle_audio: float) -> float:
+        if module.name == 'util:FunctionSleep':
+            return _number(module.mapper.get('duration')) or 0.0
+        return self.latencies.get(module).sample(self.rng, bundle_audio, self.total_audio)
+
+    def flow(self, flow: List[BlueprintModule], context: Dict[Any, Dict[str, Any]],
+             bundle_audio: float) -> Tuple[float, float]:
+        """Exécute un flux à partir de son premier module ; renvoie (séquentiel, chemin critique)"""
+        if not flow:
+            return 0.0, 0.0
+        module, rest = flow[0], flow[1:]
+        if not passes_filter(module, context):
+            return 0.0, 0.0
+
+        if module.routes:
+            # Make exécute les routes l'une après l'autre, avec le même paquet
+            results = [self.flow(route, dict(context), bundle_audio) for route in module.routes]
+            sequential = sum(r[0] for r in results)
+            critical = max((r[1] for r in results), default=0.0)
+            if module.name not in FREE_MODULES:
+                self.result.operations += 1
+            return sequential, critical
+
+        spent = self.duration(module, bundle_audio)
+        self.result.module_seconds[module.label] += spent
+        self.result.operations += module.name not in FREE_MODULES
+
+        sequential = critical = spent
+        for output in self.outputs(module, context):
+            # Un paquet d'itérateur ne porte qu'une partie de l'audio (un morceau)
+            audio = bundle_audio / output['__count__'] if '__count__' in output else bundle_audio
+            child = dict(context)
+            child[module.id] = output
+            seq, crit = self.flow(rest, child, audio)
+            sequential += seq
+            critical += crit
+        return sequential, critical
+
+
+def simulate_run(blueprint: Blueprint, payload: Dict[str, Any], latencies: LatencyTable,
+                 rng: random.Random, audio_seconds: float = 0.0) -> RunResult:
+    """
+    Simule une exécution du scénario déclenchée par payload (contenu reçu par le webhook).
+    audio_seconds est la durée d'audio portée par le déclencheur.
+    """
+    run = _Run(latencies, rng, audio_seconds)
+    trigger = blueprint.flow[0] if blueprint.flow else None
+    context = {trigger.id: payload} if trigger else {}
+    run.result.sequential_seconds, run.result.critical_path_seconds = run.flow(
+        blueprint.flow, context, audio_seconds
+    )
+    return run.result
+
+
+# ===== SIMULATION D'UNE SESSION COMPLÈTE =====
+class SessionResult:
+    """Délai total d'une session (envoi, scénarios Make) et opérations consommées"""
+
+    def __init__(self, turnaround: float, receiver: RunResult, operations: int, race: bool):
+        self.turnaround = turnaround
+        self.receiver = receiver
+        self.operations = operations
+        # Le scénario principal a démarré avant la fin de l'enregistrement de tous les
+        # morceaux : la recherche des fichiers peut en manquer
+        self.race = race
+
+
+def simulate_session(
+    receiver: Blueprint,
+    counter: Blueprint,
+    parts: int,
+    audio_seconds: float,
+    latencies: LatencyTable,
+    rng: random.Random,
+    upload_seconds_per_part: float = 0.0,
+    parts_count_delay: float = DEFAULT_PARTS_COUNT_DELAY
+) -> SessionResult:
+    """
+    Simule une session telle que l'application la déroule :
+    1. chaque morceau est envoyé, puis enregistré par le scénario parts_counter
+    2. après le dernier envoi et parts_count_delay secondes, le nombre de parties
+       déclenche le scénario principal (webhook_receiver)
+    """
+    clock = 0.0
+    counter_done = 0.0
+    operations = 0
+    part_audio = audio_seconds / parts
+    for _ in range(parts):
+        clock += upload_seconds_per_part
+        run = simulate_run(counter, {'file': {'name': 'part.mp3'}}, latencies, rng, part_audio)
+        operations += run.operations
+        start = max(clock, counter_done) if counter.sequential else clock
+        counter_done = max(counter_done, start + run.sequential_seconds)
+
+    receiver_start = clock + parts_count_delay
+    result = simulate_run(receiver, {'parts_count': parts}, latencies, rng, audio_seconds)
+    operations += result.operations
+    return SessionResult(receiver_start + result.sequential_seconds, result, operations,
+                         race=counter_done > receiver_start)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def compare_part_counts(
+    part_counts: List[int],
+    audio_seconds: float,
+    bitrate: str = "192k",
+    runs: int = 200,
+    latencies: Optional[LatencyTable] = None,
+    receiver_path: str = RECEIVER_BLUEPRINT,
+    counter_path: str = COUNTER_BLUEPRINT,
+    seed: Optional[int] = None,
+    parts_count_delay: float = DEFAULT_PARTS_COUNT_DELAY
+) -> List[Dict[str, Any]]:
+    """
+    Simule 'runs' sessions pour chaque nombre de parties et renvoie, pour chacun :
+    délai total (moyenne, médiane, 95e centile), durée du scénario principal,
+    chemin critique, opérations par session et part des sessions en concurrence.
+    L'envoi des morceaux est prévu par l'historique des traitements (voir utils/cost_model.py).
+    """
+    from .cost_model import cost_model
+
+    latencies = latencies or LatencyTable()
+    receiver = Blueprint.load(receiver_path)
+    counter = Blueprint.load(counter_path)
+    rng = random.Random(seed)
+    total_bytes = int(audio_seconds * int(bitrate.rstrip('kK')) * 1000 / 8)
+
+    report = []
+    for parts in part_counts:
+        upload, _ = cost_model.predict_upload(total_bytes // parts, 1)
+        sessions = [
+            simulate_session(receiver, counter, parts, audio_seconds, latencies, rng,
+                             upload, parts_count_delay)
+            for _ in range(runs)
+        ]
+        turnaround = [s.turnaround for s in sessions]
+        modules: Counter = Counter()
+        for s in sessions:
+            modules.update(s.receiver.module_seconds)
+        report.append({
+            'parts': parts,
+            'part_bytes': total_bytes // parts,
+            'fits_transcription': total_bytes / parts <= TRANSCRIPTION_MAX_BYTES,
+            'turnaround_mean': statistics.mean(turnaround),
+            'turnaround_p50': _percentile(turnaround, 0.5),
+            'turnaround_p95': _percentile(turnaround, 0.95),
+            'receiver_seconds': statistics.mean(s.receiver.sequential_seconds for s in sessions),
+            'critical_path_seconds': statistics.mean(s.receiver.critical_path_seconds for s in sessions),
+            'operations': statistics.mean(s.operations for s in sessions),
+            'race_ratio': sum(s.race for s in sessions) / runs,
+            'top_modules': [(label, seconds / runs) for label, seconds in modules.most_common(5)]
+        })
+    return report
+
+
+def _parse_parts(text: str) -> List[int]:
+    """'1-6' ou '2,4,8' -> liste de nombres de parties"""
+    from .resource_governor import parse_cpu_list
+    return [n for n in parse_cpu_list(text) if n > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulation hors ligne des scénarios Make.com")
+    parser.add_argument("--parts", type=_parse_parts, default=[1, 2, 3, 4, 6, 8],
+                        help="Nombres de parties à comparer (par exemple 1-8 ou 2,4,6)")
+    parser.add_argument("--duration", type=float, default=3600,
+                        help="Durée de l'enregistrement en secondes (par défaut : 3600)")
+    parser.add_argument("--bitrate", default="192k")
+    parser.add_argument("--runs", type=int, default=200, help="Sessions simulées par nombre de parties")
+    parser.add_argument("--latencies", default=None,
+                        help="Fichier JSON de latences par module (remplace les valeurs par défaut)")
+    parser.add_argument("--receiver", default=RECEIVER_BLUEPRINT)
+    parser.add_argument("--counter", default=COUNTER_BLUEPRINT)
+    parser.add_argument("--history-file", default=None,
+                        help="Historique des traitements pour prévoir l'envoi (par défaut : ~/baw_history.jsonl)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--breakdown", action="store_true",
+                        help="Afficher les modules les plus lents du scénario principal")
+    args = parser.parse_args()
+
+    from .cost_model import configure_history, DEFAULT_HISTORY_PATH
+    configure_history(args.history_file or DEFAULT_HISTORY_PATH)
+
+    receiver = Blueprint.load(args.receiver)
+    print(f"Scénario principal « {receiver.name} » : {len(receiver.modules())} modules, "
+          f"enregistrement de {args.duration / 60:.0f} min à {args.bitrate}, {args.runs} sessions simulées")
+    results = compare_part_counts(
+        args.parts, args.duration, args.bitrate, args.runs, LatencyTable.load(args.latencies),
+        args.receiver, args.counter, args.seed
+    )
+    print(f"{'Parties':>7} {'Moyenne':>9} {'Médiane':>9} {'95e c.':>9} {'Scénario':>9} "
+          f"{'Critique':>9} {'Opérations':>10} {'Concurrence':>11}")
+    for r in results:
+        print(f"{r['parts']:>7} {r['turnaround_mean']:>8.0f}s {r['turnaround_p50']:>8.0f}s "
+              f"{r['turnaround_p95']:>8.0f}s {r['receiver_seconds']:>8.0f}s "
+              f"{r['critical_path_seconds']:>8.0f}s {r['operations']:>10.0f} {r['race_ratio']:>10.0%}"
+              + ("" if r['fits_transcription'] else "  morceaux > 25 Mo (refusés par la transcription)"))
+        if args.breakdown:
+            for label, seconds in r['top_modules']:
+                print(f"{'':>9}{seconds:>7.1f}s  {label}")
+    valid = [r for r in results if r['fits_transcription']]
+    if valid:
+        best = min(valid, key=lambda r: r['turnaround_p95'])
+        print(f"Délai le plus court (95e centile) : {best['parts']} parties")
+    else:
+        print("Aucun nombre de parties ne donne des morceaux acceptés par la transcription")
@@ -0,0 +1,142 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# threading : le réservoir est partagé entre les threads des tâches
+import threading
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import List, Optional
+
+# ===== CONSTANTES =====
+# Mémoire maximale (en octets) occupée par les morceaux gardés en mémoire
+DEFAULT_MEMORY_CEILING_BYTES = 512 * 1024 * 1024
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class MemoryCeilingError(Exception):
+    """Levée lorsqu'un morceau ne tient plus sous le plafond de mémoire"""
+
+
+# ===== MORCEAU EN MÉMOIRE =====
+class MemoryPart:
+    """
+    Morceau audio gardé en mémoire au lieu d'être écrit sur le disque.
+    Il remplace le chemin du fichier dans les tuples (morceau, numéro, durée)
+    renvoyés par AudioProcessor.split_audio.
+
+    Attributs:
+        name: Nom du fichier tel qu'il sera envoyé (par exemple '1.mp3')
+        length: Nombre d'octets réellement utilisés dans le tampon
+        analysis: Résultat de l'analyse audio du morceau (voir audio_analysis)
+        sha256: Empreinte du contenu, calculée pendant son écriture (voir manifest)
+    """
+
+    def __init__(self, pool: "BufferPool", buffer: bytearray, name: str):
+        self.pool = pool
+        self.buffer = buffer
+        self.name = name
+        self.length = 0
+        self.analysis = None
+        self.sha256 = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def view(self) -> memoryview:
+        """Vue en lecture seule sur le contenu du morceau (sans copie)"""
+        return memoryview(self.buffer)[:self.length].toreadonly()
+
+    def release(self):
+        """Rend le tampon au réservoir (le morceau ne doit plus être utilisé ensuite)"""
+        if self.buffer is not None:
+            self.pool.release(self.buffer)
+            self.buffer = None
+            self.length = 0
+            self.sha256 = None
+
+    def __repr__(self) -> str:
+        return f"<MemoryPart {self.name} ({self.length} octets)>"
+
+
+# ===== RÉSERVOIR DE TAMPONS =====
+class BufferPool:
+    """
+    Réservoir de tampons réutilisables pour les morceaux gardés en mémoire.
+
+    Les tampons libérés sont conservés pour les morceaux suivants (de taille
+    voisine d'une tâche à l'autre), ce qui évite de réallouer des centaines de
+    mégaoctets à chaque enregistrement. La somme des tampons utilisés et conservés
+    ne dépasse jamais le plafond : au-delà, acquire renvoie None et l'appelant
+    écrit le morceau sur le disque.
+    """
+
+    def __init__(self, ceiling_bytes: int = DEFAULT_MEMORY_CEILING_BYTES):
+        self.ceiling_bytes = ceiling_bytes
+        self._in_use = 0
+        self._free: List[bytearray] = []
+        self._lock = threading.Lock()
+
+    @property
+    def in_use(self) -> int:
+        """Octets occupés par les tampons en cours d'utilisation"""
+        return self._in_use
+
+    def _free_bytes(self) -> int:
+        return sum(len(buffer) for buffer in self._free)
+
+    def _take(self, size: int) -> Optional[bytearray]:
+        """Prend un tampon d'au moins size octets (appelé avec le verrou)"""
+        if self._in_use + size > self.ceiling_bytes:
+            return None
+
+        # Réutiliser le plus petit tampon conservé assez grand, si sa taille réelle
+        # (souvent plus grande que size) tient encore sous le plafond
+        candidates = [buffer for buffer in self._free if len(buffer) >= size]
+        buffer = min(candidates, key=len) if candidates else None
+        if buffer is not None and self._in_use + len(buffer) <= self.ceiling_bytes:
+            self._free.remove(buffer)
+        else:
+            # Libérer des tampons conservés jusqu'à ce que le nouveau tienne sous le plafond
+            self._free.sort(key=len)
+            while self._free and self._in_use + self._free_bytes() + size > self.ceiling_bytes:
+                self._free.pop()
+            buffer = bytearray(size)
+
+        self._in_use += len(buffer)
+        return buffer
+
+    def acquire(self, size: int, name: str) -> Optional[MemoryPart]:
+        """
+        Réserve un morceau en mémoire d'au moins size octets.
+
+        Returns:
+            MemoryPart ou None si le plafond de mémoire serait dépassé
+        """
+        with self._lock:
+            buffer = self._take(size)
+        return MemoryPart(self, buffer, name) if buffer is not None else None
+
+    def grow(self, part: MemoryPart, size: int):
+        """
+        Agrandit le tampon d'un morceau en conservant son contenu.
+
+        Raises:
+            MemoryCeilingError: Si le plafond de mémoire serait dépassé
+        """
+        with self._lock:
+            buffer = self._take(size)
+            if buffer is None:
+                raise MemoryCeilingError(
+                    f"Le morceau {part.name} dépasse le plafond de mémoire "
+                    f"({self.ceiling_bytes // (1024 * 1024)} Mo)"
+                )
+            buffer[:part.length] = part.buffer[:part.length]
+            self._give_back(part.buffer)
+        part.buffer = buffer
+
+    def release(self, buffer: bytearray):
+        """Rend un tampon au réservoir"""
+        with self._lock:
+            self._give_back(buffer)
+
+    def _give_back(self, buffer: bytearray):
+        self._in_use -= len(buffer)
+        self._free.append(buffer)
@@ -0,0 +1,92 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# time : pauses sans jeton d'annulation
+import time
+
+# threading : le jeton est annulé depuis le thread Tk et lu par les threads de travail
+import threading
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, List, Optional
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class CancelledError(Exception):
+    """Levée dans un thread de travail lorsque son traitement a été annulé"""
+
+    def __init__(self, message: str = "Traitement annulé"):
+        super().__init__(message)
+
+
+# ===== JETON D'ANNULATION =====
+class CancelToken:
+    """
+    Jeton partagé entre l'interface (qui annule) et un traitement (qui s'arrête).
+
+    L'annulation est coopérative : le traitement vérifie le jeton entre deux
+    étapes (raise_if_cancelled), attend avec sleep plutôt qu'avec time.sleep,
+    et enregistre avec on_cancel ce qui doit être interrompu immédiatement
+    (par exemple tuer le processus ffmpeg en cours).
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Annule le traitement (sans effet s'il est déjà annulé)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Erreur pendant l'annulation : {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Appelle callback dès l'annulation (immédiatement si le jeton est déjà annulé).
+        Renvoie une fonction qui retire le rappel, à appeler quand il n'est plus utile.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        """Lève CancelledError si le traitement a été annulé"""
+        if self._event.is_set():
+            raise CancelledError()
+
+    def sleep(self, seconds: float):
+        """Attend 'seconds' secondes, ou lève CancelledError dès l'annulation"""
+        if self._event.wait(max(0.0, seconds)):
+            raise CancelledError()
+
+
+def check_cancelled(cancel_token: Optional[CancelToken]):
+    """raise_if_cancelled, sans effet si aucun jeton n'est fourni"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+def sleep_or_cancel(seconds: float, cancel_token: Optional[CancelToken] = None):
+    """time.sleep interrompu par l'annulation du jeton (s'il est fourni)"""
+    if cancel_token is None:
+        time.sleep(seconds)
+    else:
+        cancel_token.sleep(seconds)
@@ -0,0 +1,268 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers
+import os
+
+# json : ffprobe décrit le fichier en JSON
+import json
+
+# subprocess : permet de lancer ffprobe
+import subprocess
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Callable, Dict, Optional
+
+# Chemins de ffmpeg/ffprobe, extraction et remultiplexage
+from .audio_processor import AudioProcessor
+from .ffmpeg_runner import FFmpegProgress
+from .cancellation import CancelToken
+
+# ===== CONSTANTES =====
+# Fichiers acceptés en entrée (sélecteurs de fichiers, dossier surveillé)
+INPUT_EXTENSIONS = ('.mp4', '.m4a', '.mp3', '.wav')
+
+# Codecs que le service de transcription accepte tels quels :
+# codec audio -> extension du fichier envoyé
+ACCEPTED_CODECS = {
+    'mp3': '.mp3',
+    'aac': '.m4a',
+}
+
+# Type MIME de chaque extension de morceau envoyé
+AUDIO_MIME_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.m4a': 'audio/mp4',
+    '.wav': 'audio/wav',
+}
+
+# Formats de conteneur (noms ffprobe) qu'on peut envoyer sans les remultiplexer,
+# à condition qu'ils ne contiennent aucune vidéo
+SOURCE_FORMATS = {
+    '.mp3': ('mp3',),
+    '.m4a': ('mov', 'mp4', 'm4a'),
+}
+
+# Seuls les morceaux MP3 peuvent être coupés en octets pour l'envoi (chaque trame MP3
+# se décode seule) ; un morceau M4A coupé perd son index (boîte moov) et devient illisible
+BYTE_SPLIT_EXTENSIONS = ('.mp3',)
+
+# Taille maximale d'une requête vers le webhook (voir webhook.MAX_CHUNK_SIZE_MB)
+MAX_PART_BYTES = 20 * 1024 * 1024
+
+# Marge sur la taille estimée d'un morceau M4A (en-têtes du conteneur, bitrate variable)
+PART_SIZE_MARGIN = 1.1
+
+# Tolérance sur le bitrate : une source un peu au-dessus du bitrate choisi
+# (arrondis de l'encodeur) est tout de même conservée
+BITRATE_TOLERANCE = 1.1
+
+# Actions possibles, de la plus rapide à la plus coûteuse
+ACTION_USE_SOURCE = "source"   # Le fichier d'entrée est découpé directement
+ACTION_REMUX = "remux"         # La piste audio est copiée dans un nouveau conteneur, sans réencodage
+ACTION_ENCODE = "encode"       # La piste audio est réencodée en MP3
+
+
+# ===== DESCRIPTION DU FICHIER D'ENTRÉE =====
+def probe_media(file_path: str) -> Dict[str, Any]:
+    """
+    Décrit un fichier avec ffprobe : format du conteneur, codec et bitrate de la
+    première piste audio, présence d'une piste vidéo.
+
+    Raises:
+        Exception: Si ffprobe échoue ou si le fichier ne contient aucune piste audio
+    """
+    cmd = [
+        AudioProcessor.get_ffprobe_path(),
+        '-v', 'error',
+        '-show_entries', 'format=format_name,bit_rate,duration:stream=codec_type,codec_name,bit_rate',
+        '-of', 'json',
+        file_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Erreur ffprobe : {e.stderr}")
+    data = json.loads(result.stdout)
+
+    streams = data.get('streams', [])
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if audio is None:
+        raise Exception(f"Aucune piste audio dans {os.path.basename(file_path)}")
+    has_video = any(
+        s.get('codec_type') == 'video' and s.get('codec_name') not in ('mjpeg', 'png')  # pochettes
+        for s in streams
+    )
+    fmt = data.get('format', {})
+    bitrate = audio.get('bit_rate')
+    if bitrate is None and not has_video:
+        # Fichier audio seul : le bitrate du conteneur est celui de la piste
+        bitrate = fmt.get('bit_rate')
+    try:
+        duration = float(fmt.get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        'format_names': tuple(fmt.get('format_name', '').split(',')),
+        'codec': audio.get('codec_name'),
+        'bitrate': int(bitrate) if bitrate and str(bitrate).isdigit() else None,
+        'duration': duration,
+        'has_video': has_video
+    }
+
+
+def audio_mime_type(filename: str) -> str:
+    """Type MIME d'un fichier audio d'après son extension ('1.m4a' -> 'audio/mp4')"""
+    extension = os.path.splitext(filename)[1].lower() or filename.lower()
+    return AUDIO_MIME_TYPES.get(extension, 'audio/mpeg')
+
+
+def _bits_per_second(bitrate: str) -> int:
+    """'192k' -> 192000"""
+    value = bitrate.strip().lower()
+    if value.endswith('k'):
+        return int(float(value[:-1]) * 1000)
+    return int(float(value))
+
+
+# ===== PLAN DE CONVERSION =====
+class ConversionPlan:
+    """
+    Ce qu'il faut faire d'un fichier d'entrée pour obtenir l'audio à découper.
+
+    Attributs:
+        action: ACTION_USE_SOURCE, ACTION_REMUX ou ACTION_ENCODE
+        extension: Extension du fichier audio obtenu (et des morceaux) : '.mp3' ou '.m4a'
+        codec: Codec audio de la source (par exemple 'aac')
+        reason: Explication lisible du choix
+    """
+
+    def __init__(self, action: str, extension: str, codec: Optional[str], reason: str):
+        self.action = action
+        self.extension = extension
+        self.codec = codec
+        self.reason = reason
+
+    @property
+    def mime_type(self) -> str:
+        return audio_mime_type(self.extension)
+
+    def output_filename(self, input_path: str) -> str:
+        """Nom du fichier audio complet (l'entrée elle-même si elle est utilisée directement)"""
+        if self.action == ACTION_USE_SOURCE:
+            return os.path.basename(input_path)
+        return os.path.splitext(os.path.basename(input_path))[0] + self.extension
+
+    def describe(self) -> str:
+        """Message affiché pendant la conversion"""
+        if self.action == ACTION_USE_SOURCE:
+            return "Fichier audio utilisé tel quel..."
+        if self.action == ACTION_REMUX:
+            return "Copie de la piste audio (sans réencodage)..."
+        return "Extraction de l'audio..."
+
+    def __repr__(self) -> str:
+        return f"<ConversionPlan {self.action} {self.extension} ({self.reason})>"
+
+
+def plan_conversion(input_path: str, bitrate: str, reencode_required: bool = False,
+                    num_parts: Optional[int] = None) -> ConversionPlan:
+    """
+    Choisit la façon la plus rapide d'obtenir un fichier audio acceptable :
+    - MP3 ou M4A (AAC) sans vidéo, au bitrate choisi ou moins : utilisé directement
+    - piste MP3 ou AAC dans une vidéo : copiée sans réencodage (.mp3 ou .m4a)
+    - tout le reste (WAV, autres codecs, bitrate trop élevé) : réencodé en MP3
+    - AAC dont les morceaux ne tiendraient pas dans une requête : réencodé en MP3
+
+    Args:
+        input_path: Fichier d'entrée (MP4, M4A, MP3 ou WAV)
+        bitrate: Bitrate choisi par l'utilisateur (par exemple '192k')
+        reencode_required: True si l'audio doit de toute façon être décodé
+            (par exemple pour supprimer les silences)
+        num_parts: Nombre de morceaux prévus (optionnel), pour vérifier qu'un morceau
+            M4A tient dans une seule requête
+    """
+    if reencode_required:
+        return ConversionPlan(ACTION_ENCODE, '.mp3', None, "réencodage demandé")
+
+    try:
+        info = probe_media(input_path)
+    except Exception as e:
+        # Sans description du fichier, le réencodage reste la solution sûre
+        return ConversionPlan(ACTION_ENCODE, '.mp3', None, f"analyse impossible : {e}")
+
+    codec = info['codec']
+    if codec not in ACCEPTED_CODECS:
+        return ConversionPlan(ACTION_ENCODE, '.mp3', codec, f"codec {codec} non accepté")
+
+    # Une source plus lourde que le bitrate choisi est réencodée pour réduire sa taille
+    target = _bits_per_second(bitrate)
+    if info['bitrate'] and info['bitrate'] > target * BITRATE_TOLERANCE:
+        return ConversionPlan(
+            ACTION_ENCODE, '.mp3', codec,
+            f"bitrate de la source ({info['bitrate'] // 1000} kb/s) supérieur à {bitrate}"
+        )
+
+    extension = ACCEPTED_CODECS[codec]
+
+    # Un morceau M4A ne peut pas être coupé en plusieurs requêtes : s'il risque de
+    # dépasser la limite du webhook, l'audio est réencodé en MP3
+    if extension not in BYTE_SPLIT_EXTENSIONS and num_parts:
+        part_bytes = _estimate_part_bytes(input_path, info, num_parts)
+        limit_mb = MAX_PART_BYTES // (1024 * 1024)
+        if part_bytes is None:
+            return ConversionPlan(ACTION_ENCODE, '.mp3', codec,
+                                  f"taille des morceaux {extension} inconnue (limite {limit_mb} Mo)")
+        if part_bytes > MAX_PART_BYTES:
+            return ConversionPlan(
+                ACTION_ENCODE, '.mp3', codec,
+                f"morceaux {extension} d'environ {part_bytes / (1024 * 1024):.0f} Mo, "
+                f"trop gros pour une requête ({limit_mb} Mo)"
+            )
+
+    source_extension = os.path.splitext(input_path)[1].lower()
+    accepted_formats = SOURCE_FORMATS.get(source_extension, ())
+    if (source_extension == extension and not info['has_video']
+            and any(name in accepted_formats for name in info['format_names'])):
+        return ConversionPlan(ACTION_USE_SOURCE, extension, codec, f"{codec} déjà au bon format")
+    return ConversionPlan(ACTION_REMUX, extension, codec, f"piste {codec} copiée sans réencodage")
+
+
+def _estimate_part_bytes(input_path: str, info: Dict[str, Any], num_parts: int) -> Optional[int]:
+    """Taille estimée d'un morceau d'après le bitrate de la piste audio (None si inconnue)"""
+    if info['bitrate'] and info['duration']:
+        total = info['bitrate'] / 8 * info['duration']
+    elif not info['has_video']:
+        # Fichier audio seul : sa taille est celle de la piste
+        total = os.path.getsize(input_path)
+    else:
+        return None
+    return int(total / num_parts * PART_SIZE_MARGIN)
+
+
+def execute_plan(
+    plan: ConversionPlan,
+    input_path: str,
+    output_dir: str,
+    bitrate: str,
+    progress_callback: Optional[Callable[[FFmpegProgress], None]] = None,
+    offset_map=None,
+    cancel_token: Optional[CancelToken] = None
+) -> str:
+    """
+    Applique un plan de conversion et renvoie le chemin du fichier audio à découper.
+    Avec ACTION_USE_SOURCE, c'est le fichier d'entrée lui-même : il ne doit pas être supprimé.
+    """
+    if plan.action == ACTION_USE_SOURCE:
+        return input_path
+    output_path = os.path.join(output_dir, plan.output_filename(input_path))
+    if plan.action == ACTION_REMUX:
+        return AudioProcessor.remux_audio(
+            input_path, output_path,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token
+        )
+    return AudioProcessor.extract_audio(
+        input_path, output_path, bitrate,
+        progress_callback=progress_callback,
+        offset_map=offset_map,
+        cancel_token=cancel_token
+    )
@@ -0,0 +1,326 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers
+import os
+
+# json : l'historique est enregistré sous forme d'une ligne JSON par traitement
+import json
+
+# time : horodatage des traitements et mesure du temps écoulé
+import time
+
+# threading : les traitements se terminent dans plusieurs threads à la fois
+import threading
+
+# statistics : médiane des rapports taille / durée
+import statistics
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# ===== CONSTANTES =====
+# Fichier d'historique par défaut (utilisé par main.py, sauf avec --no-history)
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), "baw_history.jsonl")
+
+# Types d'enregistrements de l'historique
+KIND_ENCODE = "encode"   # Conversion, découpage et analyse d'un enregistrement
+KIND_UPLOAD = "upload"   # Envoi de tous les morceaux d'une session
+
+# Seuls les traitements les plus récents sont utilisés : la machine, le réseau
+# et les réglages changent avec le temps
+HISTORY_WINDOW = 200
+
+# Nombre minimal de traitements pour ajuster un modèle (sinon valeurs par défaut)
+MIN_SAMPLES = 3
+
+# Valeurs par défaut, sans historique : vitesse par rapport au temps réel
+# (une heure d'enregistrement encodée en environ une minute et demie)
+DEFAULT_SPEED = {
+    "encode": 40.0,     # Réencodage en MP3
+    "remux": 400.0,     # Copie de la piste audio
+    "source": 2000.0,   # Découpage du fichier d'entrée seulement
+}
+DEFAULT_PART_SECONDS = 1.0                    # Découpage et analyse de chaque morceau
+DEFAULT_THROUGHPUT = 1024 * 1024              # Débit d'envoi (octets par seconde)
+DEFAULT_UPLOAD_PART_SECONDS = 2.0             # Requête, manifeste et attente du serveur par morceau
+
+
+# ===== AJUSTEMENT PAR MOINDRES CARRÉS =====
+def _fit_line(xs: Sequence[float], ys: Sequence[float]) -> Optional[Tuple[float, float]]:
+    """Droite y = a + b·x la plus proche des points ; None si les x sont tous égaux"""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x <= 1e-9:
+        return None
+    b = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return mean_y - b * mean_x, b
+
+
+def _fit_two(x1: Sequence[float], x2: Sequence[float], ys: Sequence[float]) -> Optional[Tuple[float, float]]:
+    """Coefficients (a, b) de y = a·x1 + b·x2 (sans constante) ; None si le système est dégénéré"""
+    s11 = sum(v * v for v in x1)
+    s22 = sum(v * v for v in x2)
+    s12 = sum(u * v for u, v in zip(x1, x2))
+    s1y = sum(u * y for u, y in zip(x1, ys))
+    s2y = sum(v * y for v, y in zip(x2, ys))
+    det = s11 * s22 - s12 * s12
+    if abs(det) <= 1e-9 * max(1.0, s11 * s22):
+        return None
+    return (s1y * s22 - s2y * s12) / det, (s2y * s11 - s1y * s12) / det
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """125 -> '2 min 05 s'"""
+    if seconds is None:
+        return "?"
+    seconds = int(round(max(0.0, seconds)))
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
+
+
+# ===== ESTIMATION D'UN TRAITEMENT =====
+class Estimate:
+    """
+    Prévision pour un enregistrement.
+
+    Attributs:
+        encode_seconds: Durée prévue de la conversion (découpage et analyse compris)
+        upload_seconds: Durée prévue de l'envoi de tous les morceaux
+        output_bytes: Taille totale prévue des morceaux
+        samples: Nombre de traitements de l'historique utilisés (0 = valeurs par défaut)
+    """
+
+    def __init__(self, encode_seconds: float, upload_seconds: float, output_bytes: int, samples: int):
+        self.encode_seconds = encode_seconds
+        self.upload_seconds = upload_seconds
+        self.output_bytes = output_bytes
+        self.samples = samples
+
+    @property
+    def total_seconds(self) -> float:
+        return self.encode_seconds + self.upload_seconds
+
+    def describe(self) -> str:
+        """Texte affiché avant le lancement"""
+        source = f"d'après {self.samples} traitements" if self.samples else "valeurs par défaut"
+        return (
+            f"Estimation : conversion ≈ {format_duration(self.encode_seconds)}, "
+            f"envoi ≈ {format_duration(self.upload_seconds)}, "
+            f"taille ≈ {self.output_bytes / (1024 * 1024):.0f} Mo ({source})"
+        )
+
+
+class EtaTracker:
+    """
+    Temps restant d'un traitement en cours. La prévision de l'étape en cours est
+    corrigée par la vitesse réellement observée, d'autant plus que l'étape avance.
+    """
+
+    STAGES = (KIND_ENCODE, KIND_UPLOAD)
+
+    def __init__(self, estimate: Estimate):
+        self.estimate = estimate
+        self._stage: Optional[str] = None
+        self._stage_start = 0.0
+
+    def start(self, stage: str):
+        """Marque le début d'une étape (KIND_ENCODE ou KIND_UPLOAD)"""
+        self._stage = stage
+        self._stage_start = time.monotonic()
+
+    def remaining(self, fraction: Optional[float] = None) -> Optional[float]:
+        """Secondes restantes, d'après l'avancement (0 à 1) de l'étape en cours"""
+        if self._stage is None:
+            return self.estimate.total_seconds
+        predicted = (self.estimate.encode_seconds if self._stage == KIND_ENCODE
+                     else self.estimate.upload_seconds)
+        elapsed = time.monotonic() - self._stage_start
+        total = predicted
+        if fraction is not None and fraction >= 0.05:
+            # Plus l'étape avance, plus la vitesse observée est fiable
+            fraction = min(fraction, 1.0)
+            total = (1 - fraction) * predicted + fraction * (elapsed / fraction)
+        later = self.estimate.upload_seconds if self._stage == KIND_ENCODE else 0.0
+        return max(0.0, total - elapsed) + later
+
+    def describe(self, fraction: Optional[float] = None) -> str:
+        """Texte ajouté au message de progression"""
+        return f"reste ≈ {format_duration(self.remaining(fraction))}"
+
+
+# ===== HISTORIQUE ET MODÈLE DE COÛT =====
+class CostModel:
+    """
+    Historique des traitements (une ligne JSON par conversion ou par envoi) et
+    prévisions ajustées sur cet historique par moindres carrés :
+    - durée de conversion = a + b·durée de l'enregistrement, pour chaque façon de
+      convertir (réencodage, copie de la piste, fichier utilisé tel quel)
+    - taille des morceaux = durée × bitrate × rapport médian observé
+    - durée d'envoi = a·nombre de morceaux + b·octets (b est l'inverse du débit)
+
+    Sans fichier configuré, rien n'est enregistré et les prévisions utilisent
+    les valeurs par défaut.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._records: List[Dict[str, Any]] = []
+        self.path: Optional[str] = None
+        self.configure(path)
+
+    def configure(self, path: Optional[str]):
+        """Choisit le fichier d'historique (None = ne rien enregistrer) et le relit"""
+        records = []
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue  # Ligne tronquée par un arrêt brutal
+            except OSError as e:
+                print(f"Impossible de lire l'historique {path}: {e}")
+        with self._lock:
+            self.path = path
+            self._records = records
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    # ----- Enregistrement -----
+    def _append(self, record: Dict[str, Any]):
+        record['timestamp'] = round(time.time(), 3)
+        with self._lock:
+            self._records.append(record)
+            if not self.path:
+                return
+            # Une seule écriture en mode ajout (O_APPEND) : l'interface et la surveillance
+            # de dossier peuvent partager l'historique sans que leurs lignes se mélangent
+            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                print(f"Impossible d'enregistrer l'historique : {e}")
+
+    def record_encode(self, input_duration: float, action: str, bitrate: str, parts: int,
+                      seconds: float, output_bytes: int, trimmed: bool = False):
+        """Enregistre une conversion terminée (durée de l'enregistrement en secondes)"""
+        self._append({
+            'kind': KIND_ENCODE,
+            'input_duration': round(input_duration, 3),
+            'action': action,
+            'bitrate_kbps': _kbps(bitrate),
+            'parts': parts,
+            'trimmed': trimmed,
+            'seconds': round(seconds, 3),
+            'output_bytes': output_bytes
+        })
+
+    def record_upload(self, nbytes: int, parts: int, seconds: float):
+        """Enregistre un envoi réussi de tous les morceaux d'une session"""
+        self._append({
+            'kind': KIND_UPLOAD,
+            'bytes': nbytes,
+            'parts': parts,
+            'seconds': round(seconds, 3),
+            'throughput_bps': round(nbytes / seconds) if seconds > 0 else None
+        })
+
+    def _recent(self, kind: str, **match) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = [
+                r for r in self._records
+                if r.get('kind') == kind and all(r.get(k) == v for k, v in match.items())
+            ]
+        return records[-HISTORY_WINDOW:]
+
+    # ----- Prévisions -----
+    def predict_encode(self, input_duration: float, action: str, parts: int) -> Tuple[float, int]:
+        """Durée de conversion prévue et nombre de traitements utilisés"""
+        records = self._recent(KIND_ENCODE, action=action)
+        if len(records) >= MIN_SAMPLES:
+            fit = _fit_line([r['input_duration'] for r in records], [r['seconds'] for r in records])
+            if fit and fit[1] > 0:
+                return max(0.0, fit[0] + fit[1] * input_duration), len(records)
+            # Durées toutes identiques : vitesse moyenne par rapport au temps réel
+            ratio = sum(r['seconds'] for r in records) / max(1e-9, sum(r['input_duration'] for r in records))
+            return ratio * input_duration, len(records)
+        speed = DEFAULT_SPEED.get(action, DEFAULT_SPEED["encode"])
+        return input_duration / speed + DEFAULT_PART_SECONDS * parts, 0
+
+    def predict_output_bytes(self, input_duration: float, action: str, bitrate: str) -> int:
+        """Taille totale prévue des morceaux"""
+        nominal = input_duration * _kbps(bitrate) * 1000 / 8
+        records = [
+            r for r in self._recent(KIND_ENCODE, action=action)
+            if r.get('input_duration') and r.get('bitrate_kbps') and not r.get('trimmed')
+        ]
+        if len(records) >= MIN_SAMPLES:
+            ratio = statistics.median(
+                r['output_bytes'] / (r['input_duration'] * r['bitrate_kbps'] * 1000 / 8) for r in records
+            )
+            return int(nominal * ratio)
+        return int(nominal)
+
+    def predict_upload(self, nbytes: int, parts: int) -> Tuple[float, int]:
+        """Durée d'envoi prévue et nombre d'envois utilisés"""
+        records = self._recent(KIND_UPLOAD)
+        if len(records) >= MIN_SAMPLES:
+            fit = _fit_two([r['parts'] for r in records], [r['bytes'] for r in records],
+                           [r['seconds'] for r in records])
+            if fit and fit[0] >= 0 and fit[1] > 0:
+                return fit[0] * parts + fit[1] * nbytes, len(records)
+            # Coefficients aberrants (historique trop homogène) : débit moyen seulement
+            throughput = sum(r['bytes'] for r in records) / max(1e-9, sum(r['seconds'] for r in records))
+            return nbytes / throughput, len(records)
+        return nbytes / DEFAULT_THROUGHPUT + DEFAULT_UPLOAD_PART_SECONDS * parts, 0
+
+    def estimate(self, input_duration: float, action: str, bitrate: str, parts: int) -> Estimate:
+        """Prévision complète (conversion, taille, envoi) pour un enregistrement"""
+        encode_seconds, encode_samples = self.predict_encode(input_duration, action, parts)
+        output_bytes = self.predict_output_bytes(input_duration, action, bitrate)
+        upload_seconds, upload_samples = self.predict_upload(output_bytes, parts)
+        return Estimate(encode_seconds, upload_seconds, output_bytes, encode_samples + upload_samples)
+
+    def estimate_file(self, input_path: str, bitrate: str, parts: int, trim_silence: bool = False) -> Estimate:
+        """
+        Prévision pour un fichier (durée et façon de le convertir lues avec ffprobe).
+
+        Raises:
+            Exception: Si la durée du fichier ne peut pas être lue
+        """
+        # Import local : conversion_plan charge le traitement audio
+        from .audio_processor import AudioProcessor
+        from .conversion_plan import plan_conversion
+        duration = AudioProcessor.get_audio_duration(input_path)
+        plan = plan_conversion(input_path, bitrate, reencode_required=trim_silence, num_parts=parts)
+        return self.estimate(duration, plan.action, bitrate, parts)
+
+
+def _kbps(bitrate: str) -> int:
+    """'192k' -> 192"""
+    try:
+        return int(str(bitrate).rstrip('kK') or 0)
+    except ValueError:
+        return 0
+
+
+# Modèle unique du programme (sans historique tant que main.py ne l'a pas configuré)
+cost_model = CostModel()
+
+
+def configure_history(path: Optional[str]):
+    """Active l'historique des traitements dans un fichier (None pour le désactiver)"""
+    cost_model.configure(path)
@@ -0,0 +1,463 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# requests : dialogue avec les travailleurs d'encodage (HTTP)
+import requests
+
+# os : chemins et renommage des morceaux terminés
+import os
+
+# threading : répartition des places des travailleurs entre les threads d'envoi
+import threading
+
+# tempfile : dossier des segments envoyés aux travailleurs
+import tempfile
+
+# shutil : suppression des segments envoyés
+import shutil
+
+# subprocess : erreurs de ffmpeg lors de l'encodage local
+import subprocess
+
+# time : délai maximal d'attente d'un travailleur occupé
+import time
+
+# hashlib : empreinte des morceaux reçus, calculée pendant leur écriture
+import hashlib
+
+# socket : couper la connexion d'un encodage annulé pendant qu'un thread la lit
+import socket
+
+# concurrent.futures : un thread par morceau en cours d'encodage
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, List, Optional, Tuple
+
+from .audio_processor import AudioProcessor
+from .ffmpeg_runner import run_ffmpeg, run_ffmpeg_to_file
+from .manifest import save_part_digest
+from .encode_worker import PROTOCOL_VERSION, STREAM_BLOCK_SIZE, TOKEN_HEADER, segment_encode_command
+from .resource_governor import available_cpus, resource_governor
+from .tracing import tracer, trace_span
+from .cancellation import CancelToken, CancelledError, check_cancelled
+
+# ===== CONSTANTES =====
+# Délais d'attente (connexion, réponse) : /status doit répondre tout de suite,
+# un encodage peut mettre du temps avant d'envoyer son premier bloc
+STATUS_TIMEOUT = (3, 5)
+ENCODE_TIMEOUT = (10, 300)
+
+# Échecs consécutifs après lesquels un travailleur n'est plus utilisé
+MAX_WORKER_FAILURES = 2
+
+# Essais d'un morceau sur les travailleurs avant de l'encoder localement
+MAX_PART_ATTEMPTS = 3
+
+# Attente quand toutes les places des travailleurs sont prises (en secondes)
+SLOT_WAIT_SECONDS = 0.2
+
+# Temps maximal pendant lequel un morceau attend des travailleurs occupés par
+# d'autres coordinateurs (503) avant d'être encodé localement (en secondes)
+BUSY_TIMEOUT_SECONDS = 30
+
+# Un morceau reçu porte ce suffixe jusqu'à ce qu'il soit complet
+PARTIAL_SUFFIX = '.partial'
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class WorkerError(Exception):
+    """Un travailleur n'a pas pu encoder un morceau (réseau, ffmpeg ou réponse incomplète)"""
+    pass
+
+
+class WorkerBusyError(WorkerError):
+    """Le travailleur n'a plus de place (il sert aussi un autre coordinateur) : ce n'est pas une panne"""
+    pass
+
+
+# ===== ANNULATION D'UNE REQUÊTE EN COURS =====
+class _CancellableFile:
+    """
+    Segment envoyé au travailleur, lu bloc par bloc par requests : chaque lecture
+    vérifie le jeton, ce qui interrompt l'envoi dès l'annulation
+    """
+
+    def __init__(self, path: str, cancel_token: Optional[CancelToken]):
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._cancel_token = cancel_token
+
+    def __len__(self) -> int:
+        # requests annonce alors un Content-Length au lieu d'un envoi par blocs
+        return self._size
+
+    def read(self, size: int = -1) -> bytes:
+        check_cancelled(self._cancel_token)
+        return self._file.read(size)
+
+    def close(self):
+        self._file.close()
+
+
+def _abort_response(response: requests.Response):
+    """
+    Coupe la connexion d'une réponse lue par un autre thread : sa lecture bloquée
+    se termine aussitôt (fermer la réponse seule ne la réveille pas)
+    """
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        # Connexion déjà fermée
+        pass
+
+
+# ===== TRAVAILLEUR ENREGISTRÉ =====
+class RemoteWorker:
+    """Un travailleur connu du coordinateur et ses places en cours d'utilisation"""
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.name = self.url
+        self.headers = {TOKEN_HEADER: token} if token else {}
+        self.slots = 0
+        self.active = 0
+        self.failures = 0
+        self.alive = False
+        # Le travailleur lit lui-même les fichiers d'un dossier partagé (--shared-storage)
+        self.shared_storage = False
+
+    def probe(self) -> bool:
+        """Interroge /status : le travailleur est utilisable s'il répond avec le bon protocole"""
+        try:
+            response = requests.get(f"{self.url}/status", headers=self.headers, timeout=STATUS_TIMEOUT)
+            response.raise_for_status()
+            status = response.json()
+            if status.get('protocol') != PROTOCOL_VERSION:
+                raise WorkerError(f"protocole {status.get('protocol')} au lieu de {PROTOCOL_VERSION}")
+            self.name = status.get('name') or self.url
+            self.slots = max(1, int(status.get('slots', 1)))
+            self.shared_storage = bool(status.get('shared_storage'))
+            self.failures = 0
+            self.alive = True
+        except Exception as e:
+            print(f"Travailleur d'encodage {self.url} indisponible : {e}")
+            self.alive = False
+        return self.alive
+
+    def describe(self) -> str:
+        state = f"{self.active}/{self.slots} encodage(s)" if self.alive else "indisponible"
+        return f"{self.name} ({self.url}) : {state}"
+
+
+# ===== RÉPARTITEUR =====
+class EncodeDispatcher:
+    """
+    Répartit l'encodage des morceaux d'un enregistrement entre des travailleurs
+    (voir utils/encode_worker.py), sur la même machine ou sur d'autres.
+
+    Les morceaux ont les mêmes bornes qu'avec split_audio (durées égales). Chaque
+    morceau part vers le travailleur le moins chargé qui a une place libre ; le MP3
+    est écrit dans le dossier de sortie au fur et à mesure qu'il revient. Un morceau
+    en échec est réessayé sur un autre travailleur ; un travailleur qui échoue
+    plusieurs fois de suite est écarté. Sans travailleur disponible, le morceau
+    est encodé localement.
+
+    Avec shared_storage, les travailleurs lancés avec un dossier partagé lisent le
+    fichier d'entrée au même chemin que le coordinateur (même machine ou dossier
+    monté au même endroit). Sinon, le coordinateur extrait le segment sans le
+    réencoder et l'envoie dans la requête. token est le jeton d'accès des travailleurs.
+    """
+
+    def __init__(self, worker_urls: List[str], shared_storage: bool = False,
+                 token: Optional[str] = None):
+        self.token = token
+        self.workers = [RemoteWorker(url, token) for url in worker_urls]
+        self.shared_storage = shared_storage
+        self._condition = threading.Condition()
+        # L'encodage local de secours ne doit pas occuper plus de cœurs que la machine n'en a
+        self.local_slots = available_cpus()
+        self._local_slots = threading.Semaphore(self.local_slots)
+        for worker in self.workers:
+            worker.probe()
+
+    def register(self, url: str) -> RemoteWorker:
+        """Ajoute un travailleur (utilisable tout de suite s'il répond)"""
+        worker = RemoteWorker(url, self.token)
+        worker.probe()
+        with self._condition:
+            self.workers.append(worker)
+            self._condition.notify_all()
+        return worker
+
+    def refresh(self):
+        """Interroge de nouveau les travailleurs écartés (ils ont pu redémarrer)"""
+        for worker in self.workers:
+            if not worker.alive:
+                worker.probe()
+
+    @property
+    def capacity(self) -> int:
+        """Nombre total de places des travailleurs disponibles"""
+        with self._condition:
+            return sum(worker.slots for worker in self.workers if worker.alive)
+
+    def describe(self) -> str:
+        with self._condition:
+            return "\n".join(worker.describe() for worker in self.workers)
+
+    # ----- Places -----
+    def _acquire(self, excluded: List[RemoteWorker],
+                 cancel_token: Optional[CancelToken]) -> Optional[RemoteWorker]:
+        """
+        Réserve une place sur le travailleur disponible le moins chargé (hors excluded).
+        Attend qu'une place se libère ; renvoie None s'il n'y a plus aucun travailleur.
+        """
+        with self._condition:
+            while True:
+                check_cancelled(cancel_token)
+                candidates = [w for w in self.workers if w.alive and w not in excluded]
+                if not candidates:
+                    return None
+                free = [w for w in candidates if w.active < w.slots]
+                if free:
+                    worker = min(free, key=lambda w: w.active / w.slots)
+                    worker.active += 1
+                    return worker
+                self._condition.wait(SLOT_WAIT_SECONDS)
+
+    def _release(self, worker: RemoteWorker, failed: bool):
+        with self._condition:
+            worker.active -= 1
+            if failed:
+                worker.failures += 1
+                if worker.failures >= MAX_WORKER_FAILURES:
+                    print(f"Travailleur d'encodage {worker.name} écarté après {worker.failures} échecs")
+                    worker.alive = False
+            else:
+                worker.failures = 0
+            self._condition.notify_all()
+
+    # ----- Encodage -----
+    def encode_parts(
+        self,
+        input_path: str,
+        num_parts: int,
+        bitrate: str,
+        output_dir: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        cancel_token: Optional[CancelToken] = None
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Encode l'enregistrement en num_parts morceaux MP3 de durée égale.
+
+        Args:
+            input_path: Fichier d'entrée (vidéo ou audio)
+            num_parts: Nombre de morceaux
+            bitrate: Bitrate MP3 (par exemple '192k')
+            output_dir: Dossier où écrire les morceaux (1.mp3, 2.mp3, etc.)
+            progress_callback: Fonction appelée avec (morceaux terminés, total)
+            cancel_token: Jeton d'annulation (optionnel). Une annulation interrompt
+                les encodages en cours et lève CancelledError.
+
+        Returns:
+            List[Tuple[str, int, float]]: (chemin, numéro, durée) de chaque morceau,
+                dans l'ordre, comme split_audio
+        """
+        # Étape 1: Calculer les bornes des morceaux, comme split_audio
+        total_duration = AudioProcessor.get_audio_duration(input_path)
+        duration_per_part = total_duration / num_parts
+        parts = []
+        for i in range(num_parts):
+            start_sec = i * duration_per_part
+            end_sec = (i + 1) * duration_per_part if i < num_parts - 1 else total_duration
+            parts.append((i + 1, start_sec, end_sec - start_sec))
+
+        os.makedirs(output_dir, exist_ok=True)
+        segment_dir = None if self.shared_storage else tempfile.mkdtemp(dir=output_dir, prefix="segments_")
+        self.refresh()
+
+        # Étape 2: Encoder les morceaux en parallèle (autant que de places disponibles)
+        span = tracer.start('distributed_encode', file=os.path.basename(input_path), parts=num_parts,
+                            workers=sum(1 for w in self.workers if w.alive), capacity=self.capacity)
+        # Jeton propre à cet encodage : annulé par l'utilisateur, ou au premier échec
+        # pour interrompre les autres morceaux
+        stop = CancelToken()
+        remove_callback = cancel_token.on_cancel(stop.cancel) if cancel_token else (lambda: None)
+        chunks = []
+
+        def encode_part(number, start, duration):
+            # Les étapes mesurées des threads du répartiteur sont rattachées à l'encodage complet
+            # et les ffmpeg locaux se partagent les cœurs (un thread chacun)
+            with tracer.attach(span), resource_governor.shared_by(self.local_slots):
+                return self._encode_part(input_path, output_dir, segment_dir, bitrate,
+                                         number, start, duration, stop)
+
+        try:
+            # Sans travailleur, les morceaux sont encodés localement, un par cœur
+            with ThreadPoolExecutor(max_workers=min(num_parts, self.capacity or available_cpus()),
+                                    thread_name_prefix="encode-dispatch") as executor:
+                futures = [executor.submit(encode_part, *part) for part in parts]
+                try:
+                    for future in as_completed(futures):
+                        chunks.append(future.result())
+                        if progress_callback:
+                            progress_callback(len(chunks), num_parts)
+                except BaseException:
+                    stop.cancel()
+                    raise
+            check_cancelled(cancel_token)
+            chunks.sort(key=lambda chunk: chunk[1])
+            span.set(bytes=sum(os.path.getsize(c[0]) for c in chunks))
+            return chunks
+        except BaseException as e:
+            span.fail(e)
+            # Ne pas laisser de morceaux d'un encodage incomplet
+            for chunk_path, _, _ in chunks:
+                try:
+                    os.remove(chunk_path)
+                except OSError:
+                    pass
+            raise
+        finally:
+            remove_callback()
+            span.end()
+            if segment_dir:
+                shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _encode_part(self, input_path: str, output_dir: str, segment_dir: Optional[str],
+                     bitrate: str, number: int, start: float, duration: float,
+                     cancel_token: CancelToken) -> Tuple[str, int, float]:
+        """Encode un morceau sur un travailleur (ou localement en dernier recours)"""
+        chunk_path = os.path.join(output_dir, f"{number}.mp3")
+        partial_path = chunk_path + PARTIAL_SUFFIX
+        segment_path = None
+        tried: List[RemoteWorker] = []
+        busy_deadline = None
+        try:
+            while len(tried) < MAX_PART_ATTEMPTS:
+                worker = self._acquire(tried, cancel_token)
+                if worker is None:
+                    break
+                error = None
+                try:
+                    with trace_span('remote_encode', part=number, worker=worker.name):
+                        if self.shared_storage and worker.shared_storage:
+                            sha256 = self._request(worker, partial_path, cancel_token,
+                                          {'path': os.path.abspath(input_path),
+                                           'start': f"{start:.3f}", 'duration': f"{duration:.3f}"},
+                                          bitrate)
+                        else:
+                            # Le segment est extrait une seule fois, même s'il est envoyé plusieurs fois
+                            if segment_path is None:
+                                segment_path = self._cut_segment(input_path, segment_dir, number,
+                                                                 start, duration, cancel_token)
+                            sha256 = self._request(worker, partial_path, cancel_token,
+                                                   {'duration': f"{duration:.3f}"}, bitrate, segment_path)
+                    os.replace(partial_path, chunk_path)
+                    save_part_digest(chunk_path, sha256)
+                    return chunk_path, number, duration
+                except CancelledError:
+                    raise
+                except WorkerBusyError:
+                    # Places prises par un autre coordinateur : réessayer un peu plus tard,
+                    # mais pas indéfiniment (le morceau est alors encodé localement)
+                    if busy_deadline is None:
+                        busy_deadline = time.monotonic() + BUSY_TIMEOUT_SECONDS
+                    elif time.monotonic() >= busy_deadline:
+                        print(f"Morceau {number} : travailleurs occupés, encodage local")
+                        break
+                    cancel_token.sleep(SLOT_WAIT_SECONDS)
+                except Exception as e:
+                    error = e
+                    # Le morceau est réessayé sur un autre travailleur
+                    tried.append(worker)
+                    print(f"Morceau {number} : échec sur {worker.name} ({e}), nouvel essai...")
+                finally:
+                    self._release(worker, failed=error is not None)
+
+            # Étape finale: aucun travailleur n'a pu encoder le morceau
+            with self._local_slots, trace_span('local_encode', part=number):
+                check_cancelled(cancel_token)
+                try:
+                    # Le MP3 sort par un tube : son empreinte est calculée pendant l'écriture
+                    sha256 = run_ffmpeg_to_file(segment_encode_command(input_path, bitrate, start, duration),
+                                                partial_path, cancel_token)
+                except subprocess.CalledProcessError as e:
+                    raise Exception(f"Erreur lors de l'encodage du morceau {number}: {e.stderr}")
+            os.replace(partial_path, chunk_path)
+            save_part_digest(chunk_path, sha256)
+            return chunk_path, number, duration
+        finally:
+            for path in (partial_path, segment_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _cut_segment(input_path: str, segment_dir: str, number: int, start: float,
+                     duration: float, cancel_token: CancelToken) -> str:
+        """Extrait la piste audio d'un segment sans la réencoder (ce qui est envoyé au travailleur)"""
+        segment_path = os.path.join(segment_dir, f"{number}.mka")
+        cmd = [
+            AudioProcessor.get_ffmpeg_path(),
+            '-ss', f"{start:.3f}",
+            '-i', input_path,
+            '-t', f"{duration:.3f}",
+            '-vn',
+            '-map', '0:a:0',
+            '-c', 'copy',                # Copie de la piste : rapide, sans perte
+            '-f', 'matroska',            # Accepte tous les codecs audio
+            '-y',
+            segment_path
+        ]
+        try:
+            run_ffmpeg(cmd, duration=duration, cancel_token=cancel_token)
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Erreur lors de l'extraction du segment {number}: {e.stderr}")
+        return segment_path
+
+    @staticmethod
+    def _request(worker: RemoteWorker, partial_path: str, cancel_token: CancelToken,
+                 params: dict, bitrate: str, segment_path: Optional[str] = None) -> str:
+        """
+        Demande l'encodage au travailleur et écrit le MP3 au fur et à mesure qu'il arrive.
+        Renvoie l'empreinte SHA-256 du MP3, calculée pendant l'écriture
+        """
+        params = dict(params, bitrate=bitrate)
+        segment = _CancellableFile(segment_path, cancel_token) if segment_path else None
+        try:
+            response = requests.post(f"{worker.url}/encode", params=params, data=segment,
+                                     headers=worker.headers,
+                                     stream=True, timeout=ENCODE_TIMEOUT)
+        finally:
+            if segment:
+                segment.close()
+        # Une annulation coupe la connexion : la lecture en cours s'arrête sans attendre
+        # le bloc suivant (le travailleur arrête alors son ffmpeg)
+        forget_cancel = cancel_token.on_cancel(lambda: _abort_response(response)) if cancel_token else None
+        try:
+            with response:
+                if response.status_code == 503:
+                    raise WorkerBusyError("aucune place libre")
+                if response.status_code != 200:
+                    raise WorkerError(f"HTTP {response.status_code} : {response.text[:200]}")
+                digest = hashlib.sha256()
+                with open(partial_path, 'wb') as f:
+                    try:
+                        for block in response.iter_content(STREAM_BLOCK_SIZE):
+                            check_cancelled(cancel_token)
+                            f.write(block)
+                            digest.update(block)
+                    except requests.exceptions.RequestException as e:
+                        # Connexion coupée par l'annulation : ce n'est pas une panne du travailleur
+                        check_cancelled(cancel_token)
+                        if not isinstance(e, requests.exceptions.ChunkedEncodingError):
+                            raise
+                        # Le travailleur a fermé la connexion sans le bloc final : ffmpeg a échoué
+                        raise WorkerError(f"réponse incomplète ({e})")
+        finally:
+            if forget_cancel:
+                forget_cancel()
+        return digest.hexdigest()
@@ -0,0 +1,371 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : chemins et fichiers temporaires du travailleur
+import os
+
+# json : réponse de /status
+import json
+
+# socket : nom de la machine, utilisé comme nom par défaut du travailleur
+import socket
+
+# shutil : copie en flux du corps de la requête dans un fichier
+import shutil
+
+# tempfile : dossier où sont gardés les segments reçus pendant leur encodage
+import tempfile
+
+# threading : compte des encodages en cours (le serveur traite les requêtes en parallèle)
+import threading
+
+# subprocess : ffmpeg encode le segment et écrit le MP3 sur sa sortie
+import subprocess
+
+# argparse : options de la ligne de commande (port, nombre d'encodages)
+import argparse
+
+# hmac : comparaison du jeton d'accès en temps constant
+import hmac
+
+# ipaddress : une adresse d'écoute hors de la machine exige un jeton d'accès
+import ipaddress
+
+# urllib.parse : lecture des paramètres de la requête
+from urllib.parse import urlparse, parse_qs
+
+# http.server : serveur HTTP de la bibliothèque standard
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, Dict, List, Optional
+
+# Chemin de ffmpeg, et règles de priorité appliquées à chaque ffmpeg lancé
+from .audio_processor import AudioProcessor
+from .resource_governor import available_cpus, popen_governed, resource_governor
+
+# ===== CONSTANTES =====
+# Version du protocole (à incrémenter si les paramètres ou les réponses changent)
+PROTOCOL_VERSION = 1
+
+DEFAULT_PORT = 8770
+
+# Par défaut, le travailleur n'écoute que les connexions de la machine elle-même
+DEFAULT_HOST = '127.0.0.1'
+
+# En-tête qui porte le jeton d'accès, et variable d'environnement qui peut le fournir
+TOKEN_HEADER = 'X-Worker-Token'
+TOKEN_ENV = 'BAW_WORKER_TOKEN'
+
+# Taille des blocs lus sur la sortie de ffmpeg et renvoyés au coordinateur (en octets)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Type MIME des morceaux encodés
+MP3_MIME_TYPE = 'audio/mpeg'
+
+
+# ===== COMMANDE D'ENCODAGE D'UN SEGMENT =====
+def segment_encode_command(input_path: str, bitrate: str, start: float = 0.0,
+                           duration: Optional[float] = None, output: str = 'pipe:1') -> List[str]:
+    """
+    Commande ffmpeg qui encode en MP3 un segment d'un fichier (par défaut sur sa sortie).
+    -ss avant -i : ffmpeg saute directement au début du segment au lieu de tout décoder.
+    Utilisée par les travailleurs et par le coordinateur quand il encode lui-même un morceau.
+    """
+    cmd = [
+        AudioProcessor.get_ffmpeg_path(),
+        '-v', 'error',                     # Seules les erreurs sur stderr
+        '-nostdin'
+    ]
+    if start:
+        cmd += ['-ss', f"{start:.3f}"]
+    cmd += ['-i', input_path]
+    if duration is not None:
+        cmd += ['-t', f"{duration:.3f}"]
+    cmd += [
+        '-vn',                             # Pas de vidéo
+        '-map', '0:a:0',                   # Seulement la première piste audio
+        '-acodec', 'libmp3lame',           # Codec MP3
+        '-b:a', bitrate,                   # Bitrate
+        '-f', 'mp3',                       # Format de sortie (impossible à deviner depuis un tube)
+        '-y',                              # Écraser le fichier s'il existe
+        output                             # Fichier de sortie, ou pipe:1 pour la sortie standard
+    ]
+    return cmd
+
+
+# ===== TRAVAILLEUR D'ENCODAGE =====
+class EncodeWorker:
+    """
+    Encode des segments d'enregistrement pour un coordinateur (voir utils/encode_dispatcher.py).
+
+    Protocole (HTTP) :
+    - GET /status : JSON {protocol, name, slots, active, shared_storage}
+    - POST /encode?start=..&duration=..&bitrate=..[&path=..] : encode un segment en MP3.
+      Avec path, le fichier est lu directement (stockage partagé avec le coordinateur) ;
+      sinon le corps de la requête contient le segment à encoder. path n'est accepté
+      que sous l'un des dossiers partagés (shared_roots) du travailleur : sans dossier
+      partagé, ou en dehors, la requête est refusée (403), que le fichier existe ou non.
+      Le MP3 est renvoyé au fur et à mesure de l'encodage (Transfer-Encoding: chunked).
+      Si ffmpeg échoue en cours de route, la connexion est fermée sans le bloc final :
+      le coordinateur voit alors une réponse incomplète.
+      503 si toutes les places sont prises, 400 si les paramètres sont invalides.
+    - Avec un jeton (token), toute requête sans l'en-tête X-Worker-Token correspondant
+      est refusée (401).
+    """
+
+    def __init__(self, slots: Optional[int] = None, name: Optional[str] = None,
+                 work_dir: Optional[str] = None, shared_roots: Optional[List[str]] = None,
+                 token: Optional[str] = None):
+        self.slots = slots or available_cpus()
+        self.name = name or socket.gethostname()
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="baw_worker_")
+        # Chemins résolus (liens symboliques compris) des dossiers lisibles via path
+        self.shared_roots = [os.path.realpath(root) for root in (shared_roots or [])]
+        self.token = token or None
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return {'protocol': PROTOCOL_VERSION, 'name': self.name,
+                    'slots': self.slots, 'active': self.active,
+                    'shared_storage': bool(self.shared_roots)}
+
+    def authorized(self, supplied: Optional[str]) -> bool:
+        """Vérifie le jeton d'accès d'une requête (toujours vrai sans jeton configuré)"""
+        if self.token is None:
+            return True
+        return supplied is not None and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def resolve_shared_path(self, path: str) -> Optional[str]:
+        """
+        Chemin réel d'un fichier demandé par le coordinateur, s'il est sous un dossier
+        partagé et existe ; sinon None (sans distinguer les deux cas)
+        """
+        resolved = os.path.realpath(path)
+        for root in self.shared_roots:
+            if os.path.commonpath([root, resolved]) == root and os.path.isfile(resolved):
+                return resolved
+        return None
+
+    def try_acquire(self) -> bool:
+        """Réserve une place d'encodage (False si toutes sont prises)"""
+        with self._lock:
+            if self.active >= self.slots:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+def _make_handler(worker: EncodeWorker):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 : nécessaire pour renvoyer le MP3 par blocs (chunked)
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if not self._check_token():
+                return
+            if urlparse(self.path).path != '/status':
+                self._reply(404, "not found")
+                return
+            self._reply(200, json.dumps(worker.status()), 'application/json')
+
+        def do_POST(self):
+            if not self._check_token():
+                return
+            url = urlparse(self.path)
+            if url.path != '/encode':
+                self._reply(404, "not found")
+                return
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                start = float(params.get('start', 0))
+                duration = float(params['duration']) if 'duration' in params else None
+                bitrate = params.get('bitrate', '192k')
+            except ValueError:
+                self._reply(400, "invalid parameters")
+                return
+
+            if not worker.try_acquire():
+                self._reply(503, "busy")
+                return
+            # La place est libérée dès la fin de ffmpeg, avant le dernier bloc de la réponse :
+            # le coordinateur peut donc envoyer le morceau suivant sans recevoir de 503
+            release = _Once(worker.release)
+            segment_path = None
+            try:
+                # Étape 1: Trouver le fichier à encoder
+                input_path = params.get('path')
+                if input_path is not None:
+                    # Seuls les fichiers des dossiers partagés peuvent être lus
+                    input_path = worker.resolve_shared_path(input_path)
+                    if input_path is None:
+                        self._reply(403, "path not allowed")
+                        return
+                else:
+                    # Le segment arrive dans le corps : le garder le temps de l'encodage
+                    length = int(self.headers.get('Content-Length', 0))
+                    fd, segment_path = tempfile.mkstemp(dir=worker.work_dir, suffix='.segment')
+                    with os.fdopen(fd, 'wb') as f:
+                        shutil.copyfileobj(_LimitedReader(self.rfile, length), f, STREAM_BLOCK_SIZE)
+                    input_path = segment_path
+
+                # Étape 2: Encoder et renvoyer le MP3 pendant l'encodage
+                self._stream_encode(segment_encode_command(input_path, bitrate, start, duration), release)
+            finally:
+                release()
+                if segment_path:
+                    try:
+                        os.remove(segment_path)
+                    except OSError:
+                        pass
+
+        def _stream_encode(self, cmd: List[str], on_exit: Callable[[], None]):
+            # Les cœurs du travailleur sont partagés entre ses places d'encodage
+            with resource_governor.shared_by(worker.slots):
+                process = popen_governed(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                         stdin=subprocess.DEVNULL)
+            # stderr est lu à part pour que ffmpeg ne se bloque jamais dessus
+            errors = []
+            stderr_thread = threading.Thread(
+                target=lambda: errors.append(process.stderr.read()), daemon=True
+            )
+            stderr_thread.start()
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', MP3_MIME_TYPE)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('X-Worker', worker.name)
+                self.end_headers()
+                for block in iter(lambda: process.stdout.read(STREAM_BLOCK_SIZE), b''):
+                    self.wfile.write(f"{len(block):X}\r\n".encode('ascii') + block + b"\r\n")
+                returncode = process.wait()
+                stderr_thread.join(timeout=5)
+                on_exit()
+                if returncode != 0:
+                    # Pas de bloc final : le coordinateur sait que le morceau est incomplet
+                    message = b''.join(errors).decode(errors='replace').strip()
+                    print(f"[{worker.name}] Échec de ffmpeg ({returncode}) : {message[-500:]}")
+                    self.close_connection = True
+                    return
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # Le coordinateur a abandonné (annulation) : arrêter l'encodage
+                self.close_connection = True
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+
+        def _check_token(self) -> bool:
+            """Refuse la requête (401) si le jeton d'accès manque ou est faux"""
+            if worker.authorized(self.headers.get(TOKEN_HEADER)):
+                return True
+            # Le corps éventuel n'est pas lu : fermer la connexion
+            self.close_connection = True
+            self._reply(401, "unauthorized")
+            return False
+
+        def _reply(self, status: int, message: str, content_type: str = 'text/plain; charset=utf-8'):
+            body = message.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Les messages utiles sont affichés par le travailleur lui-même
+            pass
+
+    return Handler
+
+
+class _Once:
+    """Appelle func au plus une fois"""
+
+    def __init__(self, func: Callable[[], None]):
+        self.func = func
+        self.called = False
+
+    def __call__(self):
+        if not self.called:
+            self.called = True
+            self.func()
+
+
+class _LimitedReader:
+    """Lit au plus length octets d'un flux (le corps d'une requête, sans lire au-delà)"""
+
+    def __init__(self, stream, length: int):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+# ===== SERVEUR HTTP =====
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(port: int = DEFAULT_PORT, slots: Optional[int] = None, name: Optional[str] = None,
+          host: str = DEFAULT_HOST, shared_roots: Optional[List[str]] = None,
+          token: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    Crée le serveur d'un travailleur (appeler serve_forever pour le démarrer).
+    Écouter sur une adresse accessible depuis d'autres machines exige un jeton d'accès.
+    """
+    if not _is_loopback(host) and not token:
+        raise ValueError(f"Un jeton d'accès est nécessaire pour écouter sur {host} "
+                         f"(--token ou variable {TOKEN_ENV})")
+    worker = EncodeWorker(slots, name, shared_roots=shared_roots, token=token)
+    server = ThreadingHTTPServer((host, port), _make_handler(worker))
+    server.worker = worker
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Travailleur d'encodage pour le mode réparti")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="Adresse d'écoute (par défaut : cette machine seulement ; "
+                             "une autre adresse, comme 0.0.0.0, exige --token)")
+    parser.add_argument("--slots", type=int, default=None,
+                        help="Nombre d'encodages simultanés (par défaut : nombre de cœurs disponibles)")
+    parser.add_argument("--name", default=None, help="Nom du travailleur (par défaut : nom de la machine)")
+    parser.add_argument("--shared-storage", action="append", default=[], metavar="DOSSIER",
+                        help="Dossier dont le coordinateur peut faire lire les fichiers directement "
+                             "(option répétable ; sans cette option, les segments doivent être envoyés)")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                        help=f"Jeton d'accès exigé des coordinateurs (par défaut : variable {TOKEN_ENV})")
+    args = parser.parse_args()
+
+    try:
+        server = serve(args.port, args.slots, args.name, args.host, args.shared_storage, args.token)
+    except ValueError as e:
+        parser.error(str(e))
+    worker = server.worker
+    print(f"Travailleur « {worker.name} » : http://{args.host}:{args.port}/ ({worker.slots} encodage(s) simultané(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutil.rmtree(worker.work_dir, ignore_errors=True)
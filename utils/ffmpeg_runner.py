@@ -0,0 +1,413 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# subprocess : permet d'exécuter ffmpeg comme un programme externe
+import subprocess
+
+# threading : permet de lire les sorties de ffmpeg sans bloquer
+import threading
+
+# queue : permet de transmettre les lignes lues d'un thread à l'autre
+import queue
+
+# time : permet de mesurer depuis combien de temps ffmpeg n'a pas progressé
+import time
+
+# os : os.wait4 donne le temps CPU consommé par ffmpeg (profilage, voir session_profile)
+import os
+
+# hashlib : empreinte SHA-256 du morceau, calculée pendant qu'il arrive dans le tampon
+import hashlib
+
+# collections.deque : garde seulement les dernières lignes d'erreur de ffmpeg
+from collections import deque
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, List, Optional
+
+# Profil de la session en cours (temps réel et CPU de chaque ffmpeg)
+from .session_profile import session_profiler
+
+# Annulation d'un traitement en cours (ffmpeg est alors arrêté immédiatement)
+from .cancellation import CancelToken, check_cancelled
+
+# Priorité, affinité et plafond de threads de chaque processus ffmpeg
+from .resource_governor import popen_governed
+
+# ===== CONSTANTES =====
+# Après ce délai sans progression (en secondes), ffmpeg est signalé comme bloqué
+STALL_WARNING_SECONDS = 15
+
+# Après ce délai sans progression (en secondes), ffmpeg est arrêté
+STALL_TIMEOUT_SECONDS = 120
+
+# Nombre de lignes de stderr conservées pour les messages d'erreur
+STDERR_TAIL_LINES = 50
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class FFmpegStallError(Exception):
+    """Levée lorsque ffmpeg ne progresse plus pendant trop longtemps"""
+
+
+# ===== ÉTAT DE LA PROGRESSION =====
+class FFmpegProgress:
+    """
+    Progression d'un processus ffmpeg, telle que décrite par sa sortie -progress.
+
+    Attributs:
+        out_time: Temps déjà encodé (en secondes)
+        duration: Durée totale attendue (en secondes, None si inconnue)
+        speed: Vitesse d'encodage en multiple du temps réel (None si inconnue)
+        stalled: True si ffmpeg n'a pas progressé depuis STALL_WARNING_SECONDS
+        finished: True quand ffmpeg a signalé la fin du traitement
+    """
+
+    def __init__(self, duration: Optional[float] = None):
+        self.out_time = 0.0
+        self.duration = duration
+        self.speed: Optional[float] = None
+        self.stalled = False
+        self.finished = False
+
+    @property
+    def percent(self) -> Optional[float]:
+        """Pourcentage réellement encodé (0-100), ou None si la durée est inconnue"""
+        if not self.duration:
+            return None
+        if self.finished:
+            return 100.0
+        return max(0.0, min(100.0, self.out_time / self.duration * 100))
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Temps restant estimé (en secondes), ou None s'il ne peut pas être calculé"""
+        if not self.duration or not self.speed:
+            return None
+        return max(0.0, (self.duration - self.out_time) / self.speed)
+
+    def describe(self) -> str:
+        """Résumé lisible de la progression, par exemple '42 % — 12.3× — reste 0:45'"""
+        parts = []
+        if self.percent is not None:
+            parts.append(f"{self.percent:.0f} %")
+        if self.speed:
+            parts.append(f"{self.speed:.1f}× temps réel")
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            parts.append(f"reste {minutes}:{seconds:02d}")
+        if self.stalled:
+            parts.append("ffmpeg ne progresse plus")
+        return " — ".join(parts)
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    """Convertit la valeur 'speed' de ffmpeg (par exemple '12.3x') en nombre"""
+    value = value.strip().rstrip('x')
+    try:
+        return float(value)
+    except ValueError:
+        # ffmpeg écrit 'N/A' tant que la vitesse n'est pas connue
+        return None
+
+
+def wait_process(process: subprocess.Popen, cmd: List[str], started: float) -> int:
+    """
+    Attend la fin d'un processus et renvoie son code de retour.
+
+    Si le thread participe à une session profilée, le processus est attendu avec
+    os.wait4 (quand il existe) pour relever son temps CPU, puis enregistré dans
+    le profil avec son temps réel. Sinon, c'est un simple process.wait().
+
+    Args:
+        process: Processus lancé avec subprocess.Popen
+        cmd: Commande du processus (pour le rapport)
+        started: Valeur de time.monotonic() au lancement du processus
+    """
+    profile = session_profiler.current()
+    if profile is None:
+        return process.wait()
+
+    usage = None
+    if hasattr(os, 'wait4') and process.returncode is None:
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        except ChildProcessError:
+            # Processus déjà attendu ailleurs
+            usage = None
+    returncode = process.wait()
+    profile.record_process(cmd, time.monotonic() - started, usage, returncode)
+    return returncode
+
+
+def _read_lines(stream, target: queue.Queue):
+    """Lit un flux ligne par ligne et transmet chaque ligne (exécuté dans un thread)"""
+    for line in iter(stream.readline, ''):
+        target.put(line)
+    target.put(None)
+
+
+# ===== EXÉCUTION DE FFMPEG AVEC SUIVI DE PROGRESSION =====
+def run_ffmpeg(
+    cmd: List[str],
+    duration: Optional[float] = None,
+    progress_callback: Optional[Callable[[FFmpegProgress], None]] = None,
+    stall_timeout: float = STALL_TIMEOUT_SECONDS,
+    cancel_token: Optional[CancelToken] = None
+) -> str:
+    """
+    Exécute une commande ffmpeg en lisant sa progression en direct.
+    L'option '-progress pipe:1' demande à ffmpeg d'écrire régulièrement des lignes
+    'clé=valeur' (out_time_us, speed, progress...) sur sa sortie standard.
+
+    Args:
+        cmd: Commande ffmpeg complète (le premier élément est l'exécutable)
+        duration: Durée attendue de la sortie en secondes (pour calculer le pourcentage)
+        progress_callback: Fonction appelée avec un FFmpegProgress à chaque mise à jour
+        stall_timeout: Délai sans progression après lequel ffmpeg est arrêté
+        cancel_token: Jeton d'annulation (optionnel) : son annulation tue ffmpeg
+
+    Returns:
+        str: Les dernières lignes de la sortie d'erreur de ffmpeg
+
+    Raises:
+        subprocess.CalledProcessError: Si ffmpeg se termine avec une erreur
+        FFmpegStallError: Si ffmpeg ne progresse plus pendant stall_timeout secondes
+        CancelledError: Si le traitement a été annulé
+    """
+    check_cancelled(cancel_token)
+
+    # Étape 1: Ajouter les options de progression juste après l'exécutable
+    full_cmd = [cmd[0], '-nostats', '-progress', 'pipe:1'] + list(cmd[1:])
+
+    started = time.monotonic()
+    process = popen_governed(
+        full_cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors='replace'
+    )
+
+    # Étape 2: Lire stdout et stderr dans des threads séparés
+    # Sans cela, ffmpeg pourrait se bloquer si le tampon de stderr se remplit
+    lines: queue.Queue = queue.Queue()
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stdout_thread = threading.Thread(target=_read_lines, args=(process.stdout, lines), daemon=True)
+    stderr_thread = threading.Thread(
+        target=lambda: [stderr_tail.append(line) for line in iter(process.stderr.readline, '')],
+        daemon=True
+    )
+    stdout_thread.start()
+    stderr_thread.start()
+
+    # Une annulation tue ffmpeg tout de suite : sa sortie se ferme et la boucle se termine
+    forget_cancel = cancel_token.on_cancel(process.kill) if cancel_token else None
+
+    # Étape 3: Analyser les blocs de progression au fur et à mesure
+    progress = FFmpegProgress(duration)
+    last_progress_at = time.monotonic()
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=1)
+            except queue.Empty:
+                line = ''
+
+            if line is None:
+                # ffmpeg a fermé sa sortie standard : il a terminé
+                break
+
+            key, _, value = line.strip().partition('=')
+            if key in ('out_time_us', 'out_time_ms'):
+                # Malgré son nom, out_time_ms est lui aussi exprimé en microsecondes
+                try:
+                    out_time = int(value) / 1_000_000
+                except ValueError:
+                    out_time = progress.out_time
+                if out_time > progress.out_time:
+                    progress.out_time = out_time
+                    last_progress_at = time.monotonic()
+                    progress.stalled = False
+            elif key == 'speed':
+                progress.speed = _parse_speed(value)
+            elif key == 'progress':
+                # Fin d'un bloc de progression : c'est le moment de notifier
+                progress.finished = value == 'end'
+                if progress_callback:
+                    progress_callback(progress)
+
+            # Étape 4: Détecter un ffmpeg qui ne progresse plus
+            idle = time.monotonic() - last_progress_at
+            if idle >= STALL_WARNING_SECONDS and not progress.stalled:
+                progress.stalled = True
+                if progress_callback:
+                    progress_callback(progress)
+            if idle >= stall_timeout:
+                process.kill()
+                raise FFmpegStallError(
+                    f"ffmpeg ne progresse plus depuis {int(idle)} secondes"
+                )
+
+        # Étape 5: Attendre la fin du processus et vérifier son code de retour
+        returncode = wait_process(process, cmd, started)
+        stderr_thread.join(timeout=5)
+        check_cancelled(cancel_token)
+        stderr_text = ''.join(stderr_tail)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, full_cmd, stderr=stderr_text)
+        return stderr_text
+
+    finally:
+        if forget_cancel:
+            forget_cancel()
+        # S'assurer que ffmpeg ne continue jamais en arrière-plan après une erreur
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+# ===== EXÉCUTION DE FFMPEG VERS UN TAMPON EN MÉMOIRE =====
+# Agrandissement minimal d'un tampon trop petit (en octets)
+GROW_STEP_BYTES = 1024 * 1024
+
+
+def run_ffmpeg_to_memory(cmd: List[str], part, cancel_token: Optional[CancelToken] = None) -> None:
+    """
+    Exécute une commande ffmpeg dont la sortie est 'pipe:1' et écrit directement
+    ce qu'elle produit dans le tampon d'un MemoryPart, sans passer par le disque.
+    L'empreinte SHA-256 du contenu est calculée au passage (part.sha256), ce qui
+    évite de relire le morceau pour construire le manifeste.
+
+    Args:
+        cmd: Commande ffmpeg complète, terminée par 'pipe:1'
+        part: MemoryPart qui reçoit la sortie (agrandi si nécessaire)
+        cancel_token: Jeton d'annulation (optionnel) : son annulation tue ffmpeg
+
+    Raises:
+        subprocess.CalledProcessError: Si ffmpeg se termine avec une erreur
+        MemoryCeilingError: Si la sortie ne tient pas sous le plafond de mémoire
+        CancelledError: Si le traitement a été annulé
+    """
+    check_cancelled(cancel_token)
+
+    started = time.monotonic()
+    process = popen_governed(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL
+    )
+
+    # Lire stderr dans un thread pour que ffmpeg ne se bloque jamais dessus
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(
+        target=lambda: [stderr_tail.append(line.decode(errors='replace'))
+                        for line in iter(process.stderr.readline, b'')],
+        daemon=True
+    )
+    stderr_thread.start()
+    forget_cancel = cancel_token.on_cancel(process.kill) if cancel_token else None
+
+    try:
+        part.length = 0
+        part.sha256 = None
+        digest = hashlib.sha256()
+        while True:
+            # Tampon plein : l'agrandir (ou abandonner si le plafond serait dépassé)
+            if part.length == len(part.buffer):
+                part.pool.grow(part, len(part.buffer) + max(len(part.buffer) // 4, GROW_STEP_BYTES))
+
+            # readinto écrit directement dans le tampon, sans copie intermédiaire
+            target = memoryview(part.buffer)[part.length:]
+            try:
+                received = process.stdout.readinto(target)
+                if received:
+                    digest.update(target[:received])
+            finally:
+                target.release()
+            if not received:
+                break
+            part.length += received
+
+        returncode = wait_process(process, cmd, started)
+        stderr_thread.join(timeout=5)
+        check_cancelled(cancel_token)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=''.join(stderr_tail))
+        part.sha256 = digest.hexdigest()
+
+    finally:
+        if forget_cancel:
+            forget_cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+# ===== EXÉCUTION DE FFMPEG VERS UN FICHIER, AVEC EMPREINTE =====
+# Taille des blocs lus sur la sortie de ffmpeg (en octets)
+PIPE_BLOCK_SIZE = 64 * 1024
+
+
+def run_ffmpeg_to_file(cmd: List[str], output_path: str,
+                       cancel_token: Optional[CancelToken] = None) -> str:
+    """
+    Exécute une commande ffmpeg dont la sortie est 'pipe:1' et écrit ce qu'elle
+    produit dans output_path, en calculant l'empreinte SHA-256 au passage :
+    le fichier n'a pas à être relu pour construire le manifeste.
+    Réservé aux formats qui s'écrivent dans un tube (MP3) : un conteneur MP4
+    doit pouvoir revenir en arrière dans le fichier pour écrire son index.
+
+    Args:
+        cmd: Commande ffmpeg complète, terminée par 'pipe:1'
+        output_path: Fichier à écrire (remplacé s'il existe)
+        cancel_token: Jeton d'annulation (optionnel) : son annulation tue ffmpeg
+
+    Returns:
+        str: L'empreinte SHA-256 (hexadécimale) du fichier écrit
+
+    Raises:
+        subprocess.CalledProcessError: Si ffmpeg se termine avec une erreur
+        CancelledError: Si le traitement a été annulé
+    """
+    check_cancelled(cancel_token)
+
+    started = time.monotonic()
+    process = popen_governed(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL
+    )
+
+    # Lire stderr dans un thread pour que ffmpeg ne se bloque jamais dessus
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(
+        target=lambda: [stderr_tail.append(line.decode(errors='replace'))
+                        for line in iter(process.stderr.readline, b'')],
+        daemon=True
+    )
+    stderr_thread.start()
+    forget_cancel = cancel_token.on_cancel(process.kill) if cancel_token else None
+
+    try:
+        digest = hashlib.sha256()
+        with open(output_path, 'wb') as f:
+            for block in iter(lambda: process.stdout.read(PIPE_BLOCK_SIZE), b''):
+                f.write(block)
+                digest.update(block)
+
+        returncode = wait_process(process, cmd, started)
+        stderr_thread.join(timeout=5)
+        check_cancelled(cancel_token)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=''.join(stderr_tail))
+        return digest.hexdigest()
+
+    finally:
+        if forget_cancel:
+            forget_cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
@@ -6,7 +6,7 @@ import os
 import math
 
 # typing : permet de spécifier les types de données attendus dans les fonctions
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 # tempfile : permet de créer des fichiers et dossiers temporaires qui seront automatiquement supprimés
 import tempfile
@@ -21,7 +21,7 @@ import time
 import uuid
 
 # ===== FONCTION PRINCIPALE DE DÉCOUPAGE DE FICHIERS =====
-def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, int]]:
+def split_file(file_path: str, max_chunk_size_mb: int = 20, output_dir: Optional[str] = None) -> List[Tuple[str, int]]:
     """
     Découpe un fichier en plusieurs morceaux de taille maximale spécifiée.
     Par exemple, si on a un fichier de 50 Mo et qu'on veut des morceaux de 20 Mo maximum,
@@ -30,6 +30,8 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
     Args:
         file_path: Chemin vers le fichier à découper (où se trouve le fichier)
         max_chunk_size_mb: Taille maximale de chaque morceau en Mo (par défaut 20 Mo)
+        output_dir: Dossier parent dans lequel créer le dossier des morceaux (optionnel,
+            par défaut le dossier temporaire du système)
         
     Returns:
         List[Tuple[str, int]]: Liste de tuples contenant pour chaque morceau:
@@ -53,7 +55,7 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
     # Si le fichier est plus petit que la taille maximale, on fait juste une copie
     if num_chunks <= 1:
         # Créer un dossier temporaire pour stocker la copie
-        temp_dir = tempfile.mkdtemp()  # Ce dossier sera automatiquement supprimé plus tard
+        temp_dir = tempfile.mkdtemp(dir=output_dir)  # Ce dossier sera supprimé par cleanup_chunks
         
         # Ajouter un identifiant unique au nom du fichier pour éviter les conflits
         # On extrait d'abord le nom de base et l'extension du fichier original
@@ -79,7 +81,8 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
     chunks = []
     
     # Créer un dossier temporaire pour stocker tous les morceaux
-    temp_dir = tempfile.mkdtemp()
+    # (un dossier dédié : cleanup_chunks supprime tout son contenu)
+    temp_dir = tempfile.mkdtemp(dir=output_dir)
     
     # Utiliser try/except pour s'assurer de nettoyer les fichiers temporaires en cas d'erreur
     try:
@@ -90,7 +93,7 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
             for chunk_num in range(num_chunks):
                 # Étape 6: Créer un nom de fichier unique pour ce morceau
                 # D'abord, extraire le nom de base du fichier original sans l'extension
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name, extension = os.path.splitext(os.path.basename(file_path))
                 
                 # Créer un identifiant unique pour ce morceau spécifique
                 # Cela garantit que même si on traite plusieurs fichiers avec le même nom,
@@ -98,10 +101,10 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
                 unique_id = f"{int(time.time())}_{str(uuid.uuid4())[:8]}"
                 
                 # Construire le chemin complet pour ce morceau
-                # Le format sera: nom_original_part1of3_identifiant.mp3
+                # Le format sera: nom_original_part1of3_identifiant.mp3 (même extension que l'original)
                 chunk_path = os.path.join(
                     temp_dir,  # Dossier temporaire
-                    f"{base_name}_part{chunk_num + 1}of{num_chunks}_{unique_id}.mp3"
+                    f"{base_name}_part{chunk_num + 1}of{num_chunks}_{unique_id}{extension}"
                 )
                 
                 # Étape 7: Lire et écrire le morceau
@@ -132,6 +135,26 @@ def split_file(file_path: str, max_chunk_size_mb: int = 20) -> List[Tuple[str, i
         # 'raise e' renvoie l'erreur originale avec sa trace d'appel
         raise e
 
+# ===== DÉCOUPAGE D'UN CONTENU EN MÉMOIRE =====
+def split_memory(data: memoryview, max_chunk_size_mb: int = 20) -> List[Tuple[memoryview, int]]:
+    """
+    Découpe un contenu en mémoire en tranches de taille maximale spécifiée.
+    Les tranches d'un memoryview partagent la mémoire d'origine : rien n'est copié.
+    
+    Args:
+        data: Contenu à découper
+        max_chunk_size_mb: Taille maximale de chaque tranche en Mo (par défaut 20 Mo)
+        
+    Returns:
+        List[Tuple[memoryview, int]]: Liste de tuples (tranche, numéro de la tranche)
+    """
+    chunk_size = max_chunk_size_mb * 1024 * 1024
+    num_chunks = max(1, math.ceil(data.nbytes / chunk_size))
+    return [
+        (data[i * chunk_size:(i + 1) * chunk_size], i + 1)
+        for i in range(num_chunks)
+    ]
+
 # ===== FONCTION DE NETTOYAGE DES FICHIERS TEMPORAIRES =====
 def cleanup_chunks(chunks: List[Tuple[str, int]]):
     """
@@ -0,0 +1,470 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# threading : permet d'exécuter plusieurs tâches en parallèle
+import threading
+
+# time : permet de mesurer la durée de chaque étape
+import time
+
+# shutil : permet de supprimer un dossier temporaire et tout son contenu
+import shutil
+
+# contextlib : rattache un thread d'étape à la tâche qu'il traite
+from contextlib import contextmanager
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Importer nos propres modules de traitement audio et d'envoi
+from .audio_processor import AudioProcessor
+from .conversion_plan import plan_conversion, execute_plan, ACTION_ENCODE
+from .webhook import send_chunks_to_webhook, send_parts_count_to_webhook
+from .workspace import WorkspaceManager, estimate_job_bytes, get_workspace
+from .buffer_pool import BufferPool
+from .tracing import tracer
+from .session_profile import session_profiler, attach_profile, close_profile
+from .cancellation import CancelToken, CancelledError, check_cancelled
+from .resource_governor import available_cpus, resource_governor
+from .cost_model import cost_model, EtaTracker, KIND_ENCODE, KIND_UPLOAD
+from .manifest import part_size
+from .pipeline import Pipeline, Stage, StageError
+from .encode_dispatcher import EncodeDispatcher
+
+# ===== CONSTANTES =====
+# États possibles d'une tâche, dans l'ordre où ils sont normalement parcourus
+STATE_QUEUED = "En attente"
+STATE_ENCODING = "Encodage"
+STATE_WAITING_UPLOAD = "En attente d'envoi"
+STATE_UPLOADING = "Envoi"
+STATE_DONE = "Terminé"
+STATE_FAILED = "Erreur"
+STATE_CANCELLED = "Annulé"
+
+# États d'une tâche terminée
+FINISHED_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+# Nombre d'envois simultanés par défaut
+# Le réseau est une ressource partagée : quelques envois en parallèle suffisent
+DEFAULT_NETWORK_SLOTS = 2
+
+# Nombre de tâches encodées pouvant attendre leur envoi avant que l'encodage suivant attende
+DEFAULT_UPLOAD_BACKLOG = 2
+
+# Nombre de tâches pouvant attendre en même temps le délai avant l'envoi du nombre de parties
+PARTS_COUNT_WORKERS = 4
+
+# Délai (en secondes) avant d'envoyer le nombre de parties
+# Cela laisse le temps au serveur de traiter les fichiers audio
+PARTS_COUNT_DELAY = 30
+
+
+# ===== DÉFINITION D'UNE TÂCHE =====
+class Job:
+    """
+    Représente un enregistrement à traiter : conversion, découpage puis envoi au webhook.
+    Les attributs sont modifiés par les threads des étapes et lus par l'interface.
+    """
+
+    # Compteur partagé pour donner un numéro unique à chaque tâche
+    _next_id = 1
+    _id_lock = threading.Lock()
+
+    def __init__(self, input_path: str, bitrate: str = "192k", num_parts: int = 2,
+                 trim_silence: bool = False):
+        with Job._id_lock:
+            self.id = Job._next_id
+            Job._next_id += 1
+
+        # Paramètres de la tâche
+        self.input_path = input_path
+        self.bitrate = bitrate
+        self.num_parts = num_parts
+        self.trim_silence = trim_silence
+
+        # État courant et dernier message à afficher
+        self.state = STATE_QUEUED
+        self.message = ""
+
+        # Horodatages de chaque étape : {étape: [début, fin]}
+        self.timings: Dict[str, List[Optional[float]]] = {}
+        self.created_at = time.time()
+
+        # Morceaux produits par l'encodage (chemin, numéro, durée)
+        self.chunks: List[Tuple[str, int, float]] = []
+
+        # Correspondance des temps si les longs silences ont été supprimés (OffsetMap)
+        self.offset_map = None
+
+        # Fonction appelée avec la tâche quand elle est terminée (succès ou erreur)
+        self.on_finished: Optional[Callable[["Job"], None]] = None
+
+        # Jeton d'annulation : arrête ffmpeg et l'envoi en cours (voir cancel)
+        self.cancel_token = CancelToken()
+
+        # Prévision tirée de l'historique (voir utils/cost_model.py) et avancement
+        # de l'étape en cours (0 à 1), pour le temps restant affiché
+        self.estimate = None
+        self.eta: Optional[EtaTracker] = None
+        self.progress: Optional[float] = None
+
+        # Ressources de la tâche pendant son passage dans le pipeline de l'ordonnanceur :
+        # session de l'espace de travail, étape mesurée 'job' et profil de session
+        self.session = None
+        self.span = None
+        self.profile = None
+
+    @property
+    def filename(self) -> str:
+        """Nom du fichier d'entrée, sans le chemin"""
+        return os.path.basename(self.input_path)
+
+    def cancel(self):
+        """Annule la tâche, qu'elle soit en attente, en cours d'encodage ou d'envoi"""
+        if self.state not in FINISHED_STATES:
+            self.message = "Annulation..."
+            self.cancel_token.cancel()
+
+    def start_stage(self, stage: str):
+        """Marque le début d'une étape"""
+        self.timings[stage] = [time.time(), None]
+
+    def end_stage(self, stage: str):
+        """Marque la fin d'une étape"""
+        if stage in self.timings:
+            self.timings[stage][1] = time.time()
+
+    def stage_duration(self, stage: str) -> Optional[float]:
+        """
+        Renvoie la durée d'une étape en secondes.
+        Si l'étape est en cours, renvoie le temps écoulé depuis son début.
+        """
+        if stage not in self.timings:
+            return None
+        start, end = self.timings[stage]
+        return (end or time.time()) - start
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Temps restant prévu (None sans prévision ou si la tâche est terminée)"""
+        if self.eta is None or self.state in FINISHED_STATES:
+            return None
+        return self.eta.remaining(self.progress)
+
+    def start_eta_stage(self, stage: str):
+        """Démarre le suivi du temps restant d'une étape (KIND_ENCODE ou KIND_UPLOAD)"""
+        self.progress = None
+        if self.eta:
+            self.eta.start(stage)
+
+    def total_duration(self) -> float:
+        """Temps écoulé depuis la mise en file de la tâche (ou jusqu'à sa fin)"""
+        ends = [end for _, end in self.timings.values() if end is not None]
+        if self.state in FINISHED_STATES and ends:
+            return max(ends) - self.created_at
+        return time.time() - self.created_at
+
+
+# ===== ORDONNANCEUR DES TÂCHES =====
+class JobScheduler:
+    """
+    Exécute les tâches en file d'attente dans un pipeline (voir utils/pipeline.py)
+    à trois étapes, chacune avec sa propre limite :
+    - encodage : nombre d'encodages ffmpeg simultanés (limité par le nombre de cœurs)
+    - envoi : nombre d'envois simultanés (limité par le réseau)
+    - nombre de parties : envoi différé du nombre de parties, puis fin de la tâche
+
+    Comme les limites sont séparées, l'envoi d'une tâche peut se faire pendant que
+    la tâche suivante est en cours d'encodage. Au plus upload_backlog tâches encodées
+    attendent leur envoi : au-delà, l'encodage suivant attend, ce qui évite d'accumuler
+    des morceaux sur le disque quand le réseau est plus lent que l'encodage.
+
+    Avec un encode_dispatcher, l'étape d'encodage confie les réencodages en MP3 à des
+    travailleurs (éventuellement sur d'autres machines), morceau par morceau.
+    """
+
+    def __init__(
+        self,
+        webhook_url: str,
+        parts_count_webhook_url: Optional[str] = None,
+        cpu_slots: Optional[int] = None,
+        network_slots: int = DEFAULT_NETWORK_SLOTS,
+        workspace: Optional[WorkspaceManager] = None,
+        memory_pool: Optional[BufferPool] = None,
+        manifest_webhook_url: Optional[str] = None,
+        upload_backlog: int = DEFAULT_UPLOAD_BACKLOG,
+        encode_dispatcher: Optional[EncodeDispatcher] = None
+    ):
+        self.webhook_url = webhook_url
+        self.parts_count_webhook_url = parts_count_webhook_url
+        self.manifest_webhook_url = manifest_webhook_url
+
+        # Par défaut, un encodage par cœur réellement disponible (quota du conteneur compris)
+        self.cpu_slots = cpu_slots or available_cpus()
+        self.network_slots = network_slots
+
+        # Espace de travail qui possède les fichiers intermédiaires de chaque tâche
+        self.workspace = workspace or get_workspace()
+
+        # Réservoir de tampons : s'il est fourni, les morceaux restent en mémoire
+        # entre le découpage et l'envoi (aucun fichier de morceau sur le disque)
+        self.memory_pool = memory_pool
+
+        # Répartiteur vers des travailleurs d'encodage (voir utils/encode_dispatcher.py) :
+        # s'il est fourni, les réencodages en MP3 sont faits morceau par morceau par les travailleurs
+        self.encode_dispatcher = encode_dispatcher
+
+        # Liste de toutes les tâches soumises (dans l'ordre de soumission)
+        self.jobs: List[Job] = []
+        self._lock = threading.Lock()
+
+        # Une étape par ressource : ses threads sont ses places (encodages, envois)
+        # La file d'attente des tâches n'est pas bornée : submit ne bloque jamais l'interface
+        self.pipeline = Pipeline(
+            [
+                Stage("encode", self._encode, workers=self.cpu_slots, queue_size=0),
+                Stage("upload", self._upload, workers=self.network_slots, queue_size=upload_backlog),
+                Stage("parts_count", self._send_parts_count, workers=PARTS_COUNT_WORKERS, queue_size=0)
+            ],
+            on_error=self._on_stage_error,
+            collect=False
+        ).start()
+
+    def submit(self, job: Job) -> Job:
+        """Ajoute une tâche à la file et la démarre dès qu'une place se libère"""
+        with self._lock:
+            self.jobs.append(job)
+        # Profil et étape mesurée de la tâche : elle passe d'un thread à l'autre
+        job.profile = session_profiler.open(f"job{job.id}_{job.filename}")
+        job.span = tracer.start_detached('job', file=job.filename, parts=job.num_parts,
+                                         bitrate=job.bitrate)
+        self.pipeline.submit(job)
+        return job
+
+    def metrics(self) -> List[Dict]:
+        """Compteurs de chaque étape (traitées, en erreur, en attente, temps de travail)"""
+        return self.pipeline.metrics()
+
+    @contextmanager
+    def _job_context(self, job: Job):
+        """Rattache le thread courant au profil et à l'étape mesurée de la tâche"""
+        with attach_profile(job.profile), tracer.attach(job.span):
+            yield
+
+    # ===== ÉTAPE 1: ENCODAGE ET DÉCOUPAGE (LIMITÉ PAR LE CPU) =====
+    def _encode(self, job: Job) -> Job:
+        """Encode et découpe l'enregistrement (exécuté par un thread de l'étape d'encodage)"""
+        cancel_token = job.cancel_token
+        # Les cœurs sont partagés entre les places d'encodage : cpu_slots ffmpeg
+        # simultanés reçoivent chacun sa part des threads, et non tous les cœurs
+        with self._job_context(job), resource_governor.shared_by(self.cpu_slots):
+            # Une tâche annulée pendant son attente ne démarre pas
+            check_cancelled(cancel_token)
+            job.state = STATE_ENCODING
+            job.start_stage(STATE_ENCODING)
+
+            # Réserver la place des fichiers intermédiaires (les sessions
+            # inutilisées les plus anciennes sont évincées si le quota est atteint)
+            job.message = "Préparation de l'espace de travail..."
+            session = job.session = self.workspace.create_session(
+                estimate_job_bytes(job.input_path, job.bitrate)
+            )
+            conversion_dir = session.make_dir("conversion")
+
+            # Repérer les longs silences pour ne pas les encoder ni les envoyer
+            if job.trim_silence:
+                job.message = "Détection des silences..."
+                try:
+                    from .silence_trim import detect_silences
+                    job.offset_map = detect_silences(job.input_path, cancel_token=cancel_token)
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    # La suppression des silences est facultative : encoder l'enregistrement entier
+                    print(f"Détection des silences impossible pour {job.filename}: {e}")
+
+            # Fichier utilisé tel quel, piste copiée sans réencodage, ou réencodage en MP3
+            plan = plan_conversion(job.input_path, job.bitrate,
+                                   reencode_required=bool(job.offset_map), num_parts=job.num_parts)
+            print(f"Conversion de {job.filename} : {plan.reason}")
+
+            # Prévoir la durée de la tâche d'après l'historique des traitements
+            input_duration = None
+            try:
+                input_duration = AudioProcessor.get_audio_duration(job.input_path)
+                job.estimate = cost_model.estimate(input_duration, plan.action,
+                                                   job.bitrate, job.num_parts)
+                job.eta = EtaTracker(job.estimate)
+                job.start_eta_stage(KIND_ENCODE)
+            except Exception as e:
+                print(f"Estimation impossible pour {job.filename}: {e}")
+
+            def on_extract_progress(progress):
+                # L'extraction représente l'essentiel de l'étape, le découpage la fin
+                if progress.percent is not None:
+                    job.progress = progress.percent / 100 * 0.8
+                job.message = f"{plan.describe()} {progress.describe()}"
+
+            encode_started = time.monotonic()
+            # Encodage réparti : chaque travailleur encode directement ses morceaux depuis
+            # le fichier d'entrée. Pas avec la suppression des silences, qui a besoin du
+            # fichier complet réencodé
+            if self.encode_dispatcher is not None and plan.action == ACTION_ENCODE and not job.offset_map:
+
+                def on_part_progress(done, total):
+                    job.progress = done / total
+                    job.message = f"Encodage réparti... ({done}/{total})"
+
+                job.message = "Encodage réparti..."
+                job.chunks = self.encode_dispatcher.encode_parts(
+                    job.input_path,
+                    job.num_parts,
+                    job.bitrate,
+                    session.make_dir("parts"),
+                    progress_callback=on_part_progress,
+                    cancel_token=cancel_token
+                )
+                # Les morceaux ont été encodés depuis le fichier d'entrée
+                output_path = job.input_path
+            else:
+                job.message = plan.describe()
+                # Avec un fichier utilisé tel quel, output_path est le fichier d'entrée
+                output_path = execute_plan(
+                    plan,
+                    job.input_path,
+                    conversion_dir,
+                    job.bitrate,
+                    progress_callback=on_extract_progress,
+                    offset_map=job.offset_map,
+                    cancel_token=cancel_token
+                )
+
+                def on_split_progress(done, total):
+                    job.progress = 0.8 + 0.2 * done / total
+                    job.message = f"Découpage en cours... ({done}/{total})"
+
+                job.message = "Découpage en cours..."
+                job.chunks = AudioProcessor.split_audio(
+                    output_path,
+                    num_parts=job.num_parts,
+                    progress_callback=on_split_progress,
+                    output_dir=session.make_dir("parts"),
+                    memory_pool=self.memory_pool,
+                    cancel_token=cancel_token
+                )
+
+            # Statistiques audio par morceau (ajoutées aux métadonnées d'envoi)
+            job.message = "Analyse audio..."
+            try:
+                from .audio_analysis import analyze_parts
+                analyze_parts(output_path, job.chunks, cancel_token=cancel_token)
+            except CancelledError:
+                raise
+            except Exception as e:
+                # L'analyse est facultative : son échec ne doit pas faire échouer le travail
+                print(f"Analyse audio impossible pour {job.filename}: {e}")
+            job.end_stage(STATE_ENCODING)
+            job.state = STATE_WAITING_UPLOAD
+            output_bytes = sum(part_size(c[0]) for c in job.chunks)
+            if input_duration:
+                cost_model.record_encode(
+                    input_duration, plan.action, job.bitrate, job.num_parts,
+                    time.monotonic() - encode_started, output_bytes,
+                    trimmed=bool(job.offset_map)
+                )
+            job.message = ""
+
+        # Le fichier audio complet n'est plus nécessaire une fois découpé
+        # (le fichier d'entrée, lui, n'est jamais dans ce dossier)
+        shutil.rmtree(conversion_dir, ignore_errors=True)
+        return job
+
+    # ===== ÉTAPE 2: ENVOI (LIMITÉ PAR LE RÉSEAU) =====
+    def _upload(self, job: Job) -> Job:
+        """Envoie les morceaux de la tâche (exécuté par un thread de l'étape d'envoi)"""
+        cancel_token = job.cancel_token
+        session = job.session
+        with self._job_context(job):
+            check_cancelled(cancel_token)
+            job.state = STATE_UPLOADING
+            job.start_stage(STATE_UPLOADING)
+            job.start_eta_stage(KIND_UPLOAD)
+            sent_parts = []
+
+            def update_message(text):
+                job.message = text
+
+            def update_part_status(number, status):
+                if status == "Envoyé":
+                    sent_parts.append(number)
+                    job.progress = len(sent_parts) / len(job.chunks)
+
+            success, message = send_chunks_to_webhook(
+                self.webhook_url,
+                job.chunks,
+                job.num_parts,
+                status_callback=update_message,
+                part_status_callback=update_part_status,
+                work_dir=session.path,
+                manifest_url=self.manifest_webhook_url,
+                offset_map=job.offset_map,
+                cancel_token=cancel_token
+            )
+            job.end_stage(STATE_UPLOADING)
+            if success:
+                cost_model.record_upload(sum(part_size(c[0]) for c in job.chunks), len(job.chunks),
+                                         job.stage_duration(STATE_UPLOADING))
+
+        # send_chunks_to_webhook signale l'annulation par son message, sans exception
+        check_cancelled(cancel_token)
+        if not success:
+            raise Exception(message)
+        return job
+
+    # ===== ÉTAPE 3: ENVOI DU NOMBRE DE PARTIES =====
+    def _send_parts_count(self, job: Job):
+        """Envoie le nombre de parties après un délai, puis termine la tâche"""
+        with self._job_context(job):
+            if self.parts_count_webhook_url:
+                job.message = "Envoi du nombre de parties..."
+                job.cancel_token.sleep(PARTS_COUNT_DELAY)
+                success, message = send_parts_count_to_webhook(
+                    self.parts_count_webhook_url,
+                    job.num_parts
+                )
+                if not success:
+                    raise Exception(message)
+
+        job.state = STATE_DONE
+        job.message = "Terminé"
+        self._finish(job)
+
+    # ===== FIN D'UNE TÂCHE =====
+    def _on_stage_error(self, error: StageError):
+        """Une étape a échoué (ou la tâche a été annulée) : la tâche s'arrête là"""
+        job = error.item
+        # Clore l'étape en cours pour que la durée affichée reste correcte
+        for stage, (start, end) in job.timings.items():
+            if end is None:
+                job.end_stage(stage)
+        job.state = STATE_CANCELLED if isinstance(error.error, CancelledError) else STATE_FAILED
+        job.message = str(error.error)
+        job.span.fail(error.error)
+        self._finish(job)
+
+    def _finish(self, job: Job):
+        """Libère les ressources d'une tâche terminée (succès, erreur ou annulation)"""
+        # Supprimer tous les fichiers intermédiaires de cette tâche, en arrière-plan
+        AudioProcessor.cleanup_chunks([c[0] for c in job.chunks])
+        if job.session:
+            job.session.unpin()
+            job.session.release()
+            job.session = None
+        job.span.end()
+        close_profile(job.profile)
+
+        if job.on_finished:
+            try:
+                job.on_finished(job)
+            except Exception as e:
+                print(f"Erreur dans le rappel de fin de tâche {job.id}: {e}")
@@ -0,0 +1,252 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# json : les manifestes et le nombre de parties sont envoyés en JSON
+import json
+
+# hashlib : permet de vérifier l'empreinte SHA-256 des morceaux reçus
+import hashlib
+
+# threading : le serveur traite plusieurs envois en parallèle
+import threading
+
+# argparse : options de la ligne de commande
+import argparse
+
+# http.server : petit serveur HTTP de la bibliothèque standard
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# email : permet de décoder un corps multipart/form-data
+from email.parser import BytesParser
+from email.policy import HTTP
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, Optional, Tuple
+
+# Valeurs du champ 'message_type' (voir utils/manifest.py)
+from .manifest import MESSAGE_TYPE_MANIFEST
+
+# ===== CONSTANTES =====
+DEFAULT_PORT = 8765
+DEFAULT_OUTPUT_DIR = "received"
+
+
+# ===== ÉTAT D'UNE SESSION REÇUE =====
+class ReceivedSession:
+    """Morceaux attendus (d'après le manifeste) et morceaux déjà reçus d'une session"""
+
+    def __init__(self, session_dir: str, manifest: Optional[Dict[str, Any]] = None):
+        self.session_dir = session_dir
+        self.manifest = manifest
+        self.expected = {p['part_number']: p for p in manifest['parts']} if manifest else {}
+        self.received = set()
+        # Morceaux d'une partie découpée en plusieurs envois : {partie: {numéro: contenu}}
+        self.pieces: Dict[int, Dict[int, bytes]] = {}
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.expected) and self.received == set(self.expected)
+
+
+# ===== RÉCEPTEUR LOCAL =====
+class LocalReceiver:
+    """
+    Remplaçant local des scénarios Make.com, pour tester les envois sans Internet.
+
+    - un manifeste (JSON, message_type='manifest') ouvre la session : le dossier
+      est créé et la place de chaque morceau est réservée sur le disque
+    - chaque morceau (multipart) est vérifié contre le manifeste (taille, SHA-256)
+      puis traité immédiatement, sans attendre les autres
+    - quand tous les morceaux sont arrivés, session_complete.json est écrit
+    - le nombre de parties (ancien protocole) est simplement affiché
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.sessions: Dict[str, ReceivedSession] = {}
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _session(self, session_id: str) -> ReceivedSession:
+        """
+        Renvoie la session (créée au premier message). L'identifiant vient du réseau :
+        il doit rester un simple nom de dossier dans output_dir.
+
+        Raises:
+            ValueError: Si l'identifiant contient un séparateur ou désigne un dossier parent
+        """
+        if session_id in ('', '.', '..') or any(c in session_id for c in '/\\\0'):
+            raise ValueError(f"invalid session_id: {session_id!r}")
+        output_dir = os.path.realpath(self.output_dir)
+        if os.path.dirname(os.path.realpath(os.path.join(output_dir, session_id))) != output_dir:
+            raise ValueError(f"invalid session_id: {session_id!r}")
+        with self._lock:
+            if session_id not in self.sessions:
+                session_dir = os.path.join(self.output_dir, session_id)
+                os.makedirs(session_dir, exist_ok=True)
+                self.sessions[session_id] = ReceivedSession(session_dir)
+            return self.sessions[session_id]
+
+    def handle_json(self, data: Dict[str, Any]) -> Tuple[int, str]:
+        """Traite un message JSON (manifeste ou nombre de parties)"""
+        if data.get('message_type') == MESSAGE_TYPE_MANIFEST:
+            session_id = str(data['session_id'])
+            session = self._session(session_id)
+            session.manifest = data
+            session.expected = {p['part_number']: p for p in data['parts']}
+
+            with open(os.path.join(session.session_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+
+            # Réserver la place de chaque morceau dès maintenant
+            for part in data['parts']:
+                path = self._part_path(session, part['part_number'], part['filename'])
+                if not os.path.exists(path):
+                    with open(path + '.partial', 'wb') as f:
+                        f.truncate(part['size_bytes'])
+
+            print(f"[{session_id}] Manifeste reçu : {data['total_parts']} morceaux, "
+                  f"{data['total_size_bytes'] / (1024 * 1024):.1f} Mo, "
+                  f"{data['total_duration_seconds']:.0f} s")
+            return 200, "manifest accepted"
+
+        if 'parts_count' in data:
+            print(f"Nombre de parties reçu : {data['parts_count']}")
+            return 200, "parts count accepted"
+
+        return 400, "unknown message"
+
+    def handle_part(self, fields: Dict[str, Any], filename: str, content: bytes) -> Tuple[int, str]:
+        """Vérifie, enregistre et traite un morceau reçu"""
+        session_id = str(fields.get('session_id', 'sans_session'))
+        session = self._session(session_id)
+        try:
+            number = int(fields.get('part_number', 0))
+            chunk_number = int(fields.get('chunk_number', 1))
+            total_chunks = int(fields.get('total_chunks', 1))
+        except ValueError:
+            return 400, "invalid part_number"
+
+        # Empreinte calculée par l'envoyeur sur les octets de cette requête (champ placé après le fichier)
+        if 'content_sha256' in fields and hashlib.sha256(content).hexdigest() != fields['content_sha256']:
+            return 422, "content_sha256 mismatch"
+
+        # Une partie de plus de 20 Mo arrive en plusieurs envois : les rassembler
+        if total_chunks > 1:
+            with self._lock:
+                pieces = session.pieces.setdefault(number, {})
+                pieces[chunk_number] = content
+                if len(pieces) < total_chunks:
+                    return 200, "chunk accepted"
+                content = b''.join(pieces[n] for n in sorted(pieces))
+                del session.pieces[number]
+            filename = fields.get('original_filename', filename)
+
+        # Vérifier le morceau contre le manifeste, s'il a été reçu
+        expected = session.expected.get(number)
+        if session.manifest and expected is None:
+            return 422, f"part {number} not in manifest"
+        if expected:
+            if len(content) != expected['size_bytes']:
+                return 422, f"size mismatch: {len(content)} != {expected['size_bytes']}"
+            # Empreinte absente du manifeste : calculée pendant l'envoi (content_sha256)
+            if expected.get('sha256') and hashlib.sha256(content).hexdigest() != expected['sha256']:
+                return 422, "sha256 mismatch"
+
+        # Le nom annoncé dans le manifeste est celui de la place réservée
+        path = self._part_path(session, number, expected['filename'] if expected else filename)
+        with open(path + '.partial', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.partial', path)
+
+        with self._lock:
+            session.received.add(number)
+            complete = session.complete
+
+        self.process_part(session_id, number, path, expected)
+
+        if complete:
+            with open(os.path.join(session.session_dir, 'session_complete.json'), 'w', encoding='utf-8') as f:
+                json.dump({'session_id': session_id, 'parts': sorted(session.received)}, f)
+            print(f"[{session_id}] Session complète ({len(session.received)} morceaux)")
+        return 200, "part accepted"
+
+    def process_part(self, session_id: str, number: int, path: str, expected: Optional[Dict[str, Any]]):
+        """Traitement d'un morceau dès son arrivée (ici : simple affichage)"""
+        session = self.sessions[session_id]
+        if expected:
+            start = expected['start_offset_seconds']
+            end = start + expected['duration_seconds']
+            print(f"[{session_id}] Morceau {number}/{len(session.expected)} prêt "
+                  f"({start:.0f} s → {end:.0f} s) : {path}")
+        else:
+            print(f"[{session_id}] Morceau {number} reçu sans manifeste : {path}")
+
+    @staticmethod
+    def _part_path(session: ReceivedSession, number: int, filename: str) -> str:
+        return os.path.join(session.session_dir, f"{number:03d}_{os.path.basename(filename)}")
+
+
+# ===== SERVEUR HTTP =====
+def _make_handler(receiver: LocalReceiver):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+            content_type = self.headers.get('Content-Type', '')
+            try:
+                if content_type.startswith('application/json'):
+                    status, message = receiver.handle_json(json.loads(body))
+                elif content_type.startswith('multipart/form-data'):
+                    status, message = receiver.handle_part(*self._parse_multipart(content_type, body))
+                else:
+                    status, message = 415, "unsupported content type"
+            except Exception as e:
+                status, message = 400, str(e)
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.end_headers()
+            self.wfile.write(message.encode('utf-8'))
+
+        @staticmethod
+        def _parse_multipart(content_type: str, body: bytes):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body
+            )
+            fields, filename, content = {}, None, b''
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                if part.get_filename() is not None:
+                    filename, content = part.get_filename(), part.get_payload(decode=True)
+                else:
+                    fields[name] = part.get_payload(decode=True).decode('utf-8')
+            if filename is None:
+                raise ValueError("no file in request")
+            return fields, filename, content
+
+        def log_message(self, format, *args):
+            # Les messages utiles sont affichés par LocalReceiver
+            pass
+
+    return Handler
+
+
+def serve(port: int = DEFAULT_PORT, output_dir: str = DEFAULT_OUTPUT_DIR) -> ThreadingHTTPServer:
+    """Crée le serveur du récepteur local (appeler serve_forever pour le démarrer)"""
+    receiver = LocalReceiver(output_dir)
+    return ThreadingHTTPServer(('127.0.0.1', port), _make_handler(receiver))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Récepteur local remplaçant les webhooks Make.com")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Dossier où enregistrer les morceaux reçus")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.output)
+    print(f"Récepteur local : http://127.0.0.1:{args.port}/ (morceaux enregistrés dans {args.output})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,132 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins et la taille des fichiers
+import os
+
+# time : permet d'horodater le manifeste
+import time
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Morceaux gardés en mémoire (voir AudioProcessor.split_audio)
+from .buffer_pool import MemoryPart
+
+# ===== CONSTANTES =====
+# Version du format du manifeste (à incrémenter si sa structure change)
+MANIFEST_VERSION = 1
+
+# Valeur du champ 'message_type' qui distingue les messages reçus par le webhook
+MESSAGE_TYPE_MANIFEST = "manifest"
+MESSAGE_TYPE_PART = "part"
+
+# Suffixe du fichier qui garde l'empreinte d'un morceau sur le disque (1.mp3.sha256,
+# au format de sha256sum), écrit quand le morceau est créé ou, à défaut, envoyé
+DIGEST_SUFFIX = ".sha256"
+
+
+# ===== EMPREINTE ET TAILLE D'UN MORCEAU =====
+def part_filename(part: Union[str, MemoryPart]) -> str:
+    """Nom de fichier d'un morceau, qu'il soit sur le disque ou en mémoire"""
+    return part.name if isinstance(part, MemoryPart) else os.path.basename(part)
+
+
+def part_size(part: Union[str, MemoryPart]) -> int:
+    """Taille d'un morceau en octets"""
+    return len(part) if isinstance(part, MemoryPart) else os.path.getsize(part)
+
+
+def save_part_digest(part: Union[str, MemoryPart], hexdigest: str):
+    """
+    Enregistre l'empreinte SHA-256 d'un morceau, calculée pendant sa création
+    (le manifeste n'a pas à relire le morceau) ou pendant son envoi
+    """
+    # Un morceau en mémoire garde son empreinte avec lui
+    if isinstance(part, MemoryPart):
+        part.sha256 = hexdigest
+        return
+    try:
+        with open(part + DIGEST_SUFFIX, 'w', encoding='utf-8') as f:
+            f.write(f"{hexdigest}  {os.path.basename(part)}\n")
+    except OSError as e:
+        print(f"Impossible d'enregistrer l'empreinte de {part}: {e}")
+
+
+def load_part_digest(part: Union[str, MemoryPart]) -> Optional[str]:
+    """Empreinte enregistrée d'un morceau si elle existe et est à jour, sinon None"""
+    if isinstance(part, MemoryPart):
+        return part.sha256
+    digest_path = part + DIGEST_SUFFIX
+    try:
+        if os.path.getmtime(digest_path) < os.path.getmtime(part):
+            return None
+        with open(digest_path, 'r', encoding='utf-8') as f:
+            value = f.read().split()
+        return value[0] if value and len(value[0]) == 64 else None
+    except OSError:
+        return None
+
+
+def part_sha256(part: Union[str, MemoryPart]) -> Optional[str]:
+    """
+    Empreinte SHA-256 (hexadécimale) d'un morceau, telle qu'enregistrée pendant sa
+    création, ou None si elle n'est pas encore connue (morceau M4A écrit par ffmpeg
+    lui-même) : elle est alors calculée pendant l'envoi. Le morceau n'est jamais relu.
+    """
+    return load_part_digest(part)
+
+
+# ===== CONSTRUCTION DU MANIFESTE =====
+def build_manifest(
+    session_id: str,
+    chunks: List[Tuple[Union[str, MemoryPart], int, float]],
+    num_parts: Optional[int] = None,
+    offset_map=None
+) -> Dict[str, Any]:
+    """
+    Construit le manifeste d'une session, envoyé avant les morceaux.
+    Il permet au destinataire de connaître d'avance tous les morceaux attendus
+    et de traiter chacun dès son arrivée, au lieu d'attendre le nombre de parties.
+
+    Args:
+        session_id: Identifiant de la session (le même que dans les métadonnées des morceaux)
+        chunks: Liste de tuples (morceau, numéro, durée) renvoyée par split_audio
+        num_parts: Nombre de parties choisi par l'utilisateur (optionnel)
+        offset_map: Correspondance des temps si les longs silences ont été supprimés
+            (OffsetMap, voir utils/silence_trim.py). Les positions dans l'enregistrement
+            original sont alors ajoutées au manifeste (optionnel)
+
+    Returns:
+        Dict[str, Any]: Le manifeste, sérialisable en JSON
+    """
+    parts = []
+    offset = 0.0
+    for part, num, duration in chunks:
+        parts.append({
+            'part_number': num,                        # Numéro du morceau (ordre de lecture)
+            'filename': part_filename(part),           # Nom du fichier envoyé
+            'start_offset_seconds': round(offset, 3),  # Début du morceau dans l'enregistrement
+            'duration_seconds': round(duration, 3),    # Durée du morceau
+            'size_bytes': part_size(part),             # Taille exacte du fichier
+            'sha256': part_sha256(part)                # Empreinte (None si calculée à l'envoi)
+        })
+        if offset_map:
+            # Position du morceau dans l'enregistrement original (avant suppression des silences)
+            parts[-1]['original_start_offset_seconds'] = round(offset_map.to_original(offset), 3)
+            parts[-1]['original_end_offset_seconds'] = round(offset_map.to_original(offset + duration), 3)
+        offset += duration
+
+    manifest = {
+        'message_type': MESSAGE_TYPE_MANIFEST,
+        'manifest_version': MANIFEST_VERSION,
+        'session_id': session_id,
+        'total_parts': len(parts),
+        'user_selected_parts': num_parts,
+        'total_duration_seconds': round(offset, 3),
+        'total_size_bytes': sum(p['size_bytes'] for p in parts),
+        'timestamp': int(time.time()),
+        'parts': parts
+    }
+    if offset_map:
+        manifest['original_duration_seconds'] = round(offset_map.original_duration, 3)
+        manifest['offset_map'] = offset_map.to_list()
+    return manifest
@@ -0,0 +1,357 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# threading : chaque étape a ses propres threads de travail
+import threading
+
+# queue : files bornées entre les étapes (une étape trop rapide attend la suivante)
+import queue
+
+# time : mesure du temps de travail et d'attente de chaque étape
+import time
+
+# asyncio : API asynchrone, pour piloter le pipeline depuis une boucle d'événements
+import asyncio
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Annulation de tout le pipeline (les éléments restants ne sont plus traités)
+from .cancellation import CancelToken, CancelledError
+
+# ===== CONSTANTES =====
+# Taille par défaut de la file d'entrée d'une étape (0 = illimitée)
+DEFAULT_QUEUE_SIZE = 2
+
+# Marqueur de fin de flux, transmis d'étape en étape
+_END = object()
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class StageError(Exception):
+    """Un élément a échoué dans une étape (l'erreur d'origine est dans error)"""
+
+    def __init__(self, stage: str, item: Any, error: BaseException):
+        super().__init__(f"{stage} : {error}")
+        self.stage = stage
+        self.item = item
+        self.error = error
+
+
+# ===== DÉFINITION D'UNE ÉTAPE =====
+class Stage:
+    """
+    Une étape du pipeline.
+
+    Args:
+        name: Nom de l'étape (métriques et erreurs)
+        func: Fonction appelée avec chaque élément ; sa valeur de retour est transmise
+            à l'étape suivante
+        workers: Nombre de threads qui traitent des éléments en parallèle
+        queue_size: Nombre d'éléments pouvant attendre devant l'étape (0 = illimité).
+            Quand la file est pleine, l'étape précédente attend : c'est ce qui empêche
+            une étape rapide de produire bien plus que la suivante ne peut absorber
+        fan_out: func renvoie plusieurs éléments (liste ou générateur), transmis un par un
+            à l'étape suivante (par exemple le découpage d'un fichier en morceaux)
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, fan_out: bool = False):
+        if workers < 1:
+            raise ValueError("Une étape a besoin d'au moins un thread")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.fan_out = fan_out
+
+
+# ===== MÉTRIQUES D'UNE ÉTAPE =====
+class StageMetrics:
+    """
+    Compteurs d'une étape, mis à jour par ses threads de travail.
+
+    Attributs:
+        processed: Éléments traités avec succès
+        failed: Éléments en erreur (ou ignorés après une annulation)
+        emitted: Éléments transmis à l'étape suivante (plus que processed avec fan_out)
+        busy_seconds: Temps passé dans la fonction de l'étape (tous threads confondus)
+        blocked_seconds: Temps passé à attendre de la place dans la file suivante
+        max_queue_depth: Plus grand nombre d'éléments observés en attente devant l'étape
+    """
+
+    def __init__(self, stage: Stage, input_queue: queue.Queue):
+        self.name = stage.name
+        self.workers = stage.workers
+        self._queue = input_queue
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.emitted = 0
+        self.active = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Éléments en attente devant l'étape"""
+        return self._queue.qsize()
+
+    def _add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'active': self.active,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'processed': self.processed,
+                'failed': self.failed,
+                'emitted': self.emitted,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'blocked_seconds': round(self.blocked_seconds, 3)
+            }
+
+    def describe(self) -> str:
+        return (f"{self.name} : {self.processed} traité(s), {self.failed} en erreur, "
+                f"{self.active}/{self.workers} actif(s), {self.queue_depth} en attente")
+
+
+# ===== PIPELINE =====
+class Pipeline:
+    """
+    Enchaîne des étapes reliées par des files bornées, chacune avec ses propres threads.
+
+    Utilisation en continu (par exemple une file de tâches) :
+        pipeline = Pipeline([...]).start()
+        pipeline.submit(élément)      # attend si la première file est pleine
+        pipeline.close()              # plus aucun élément : les threads s'arrêtent
+        for résultat in pipeline.results(): ...
+
+    Utilisation en une fois :
+        résultats = Pipeline([...]).run(éléments)          # synchrone
+        résultats = await Pipeline([...]).arun(éléments)   # depuis asyncio
+
+    Un élément en erreur n'arrête pas le pipeline : il ne va pas plus loin et
+    l'erreur est transmise à on_error (sans on_error, elle est gardée dans errors).
+    Si collect est faux, les éléments sortis de la dernière étape sont abandonnés
+    (la dernière étape fait alors elle-même le travail final).
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        cancel_token: Optional[CancelToken] = None,
+        on_error: Optional[Callable[[StageError], None]] = None,
+        collect: bool = True
+    ):
+        if not stages:
+            raise ValueError("Un pipeline a besoin d'au moins une étape")
+        self.stages = stages
+        self.cancel_token = cancel_token or CancelToken()
+        self.on_error = on_error
+        self.collect = collect
+        self.errors: List[StageError] = []
+
+        # Une file devant chaque étape, plus la file des résultats
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._results: queue.Queue = queue.Queue()
+        self._metrics = [StageMetrics(stage, q) for stage, q in zip(stages, self._queues)]
+
+        # Threads encore actifs par étape : le dernier à s'arrêter prévient l'étape suivante
+        self._remaining = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        # Ordonne submit et close : aucun élément ne peut arriver après la fin du flux
+        self._submit_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._closed = False
+
+    # ----- Démarrage et alimentation -----
+    def start(self) -> "Pipeline":
+        """Démarre les threads de toutes les étapes"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(index,), daemon=True,
+                    name=f"{stage.name}-{number + 1}"
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """Ajoute un élément en entrée (attend si la première file est pleine)"""
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Le pipeline est fermé")
+            self._put(0, item, timeout)
+
+    def close(self):
+        """Signale qu'aucun autre élément ne sera soumis (attend les submit en cours)"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in range(self.stages[0].workers):
+            self._queues[0].put(_END)
+
+    def cancel(self):
+        """Annule le pipeline : les éléments en attente ne sont plus traités"""
+        self.cancel_token.cancel()
+
+    def join(self, timeout: Optional[float] = None):
+        """Attend la fin de tous les threads (après close)"""
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # ----- Résultats -----
+    def results(self) -> Iterator[Any]:
+        """Éléments sortis de la dernière étape, au fur et à mesure (jusqu'à la fin du flux)"""
+        while True:
+            item = self._results.get()
+            if item is _END:
+                return
+            yield item
+
+    def iterate(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Traite items et renvoie les résultats au fur et à mesure. items est lu par un
+        thread à part, au rythme où le pipeline peut les accepter (il peut donc être
+        un générateur sans fin, arrêté par une annulation).
+        """
+        self.start()
+
+        def feed():
+            try:
+                for item in items:
+                    if self.cancel_token.cancelled:
+                        break
+                    self.submit(item)
+            finally:
+                self.close()
+
+        threading.Thread(target=feed, daemon=True, name="pipeline-feed").start()
+        yield from self.results()
+        self.join()
+
+    def run(self, items: Iterable[Any], raise_on_error: bool = True) -> List[Any]:
+        """Traite items et renvoie tous les résultats (lève la première StageError si demandé)"""
+        results = list(self.iterate(items))
+        self._raise_first_error(raise_on_error)
+        return results
+
+    async def astream(self, items: Iterable[Any]) -> AsyncIterator[Any]:
+        """Version asynchrone de iterate : les threads du pipeline ne bloquent pas la boucle"""
+        loop = asyncio.get_running_loop()
+        outputs: asyncio.Queue = asyncio.Queue()
+
+        def consume():
+            try:
+                for result in self.iterate(items):
+                    loop.call_soon_threadsafe(outputs.put_nowait, result)
+            finally:
+                loop.call_soon_threadsafe(outputs.put_nowait, _END)
+
+        threading.Thread(target=consume, daemon=True, name="pipeline-async").start()
+        while True:
+            result = await outputs.get()
+            if result is _END:
+                return
+            yield result
+
+    async def arun(self, items: Iterable[Any], raise_on_error: bool = True) -> List[Any]:
+        """Version asynchrone de run"""
+        results = [result async for result in self.astream(items)]
+        self._raise_first_error(raise_on_error)
+        return results
+
+    def _raise_first_error(self, raise_on_error: bool):
+        if raise_on_error and self.errors:
+            raise self.errors[0]
+
+    # ----- Métriques -----
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Instantané des compteurs de chaque étape, dans l'ordre du pipeline"""
+        return [metric.to_dict() for metric in self._metrics]
+
+    def describe(self) -> str:
+        return "\n".join(metric.describe() for metric in self._metrics)
+
+    # ----- Threads de travail -----
+    def _put(self, index: int, item: Any, timeout: Optional[float] = None):
+        """Place un élément devant l'étape index (ou dans les résultats après la dernière)"""
+        if index == len(self.stages):
+            if self.collect:
+                self._results.put(item)
+            return
+        target = self._queues[index]
+        target.put(item, timeout=timeout)
+        metric = self._metrics[index]
+        with metric._lock:
+            metric.max_queue_depth = max(metric.max_queue_depth, target.qsize())
+
+    def _work(self, index: int):
+        """Boucle d'un thread de l'étape index"""
+        stage = self.stages[index]
+        metric = self._metrics[index]
+        source = self._queues[index]
+        while True:
+            item = source.get()
+            if item is _END:
+                break
+
+            # Après une annulation, les éléments restants sont signalés sans être traités
+            if self.cancel_token.cancelled:
+                metric._add(failed=1)
+                self._report(StageError(stage.name, item, CancelledError()))
+                continue
+
+            metric._add(active=1)
+            started = time.monotonic()
+            blocked = 0.0
+            try:
+                produced = stage.func(item)
+                for result in (produced if stage.fan_out else (produced,)):
+                    waited = time.monotonic()
+                    self._put(index + 1, result)
+                    blocked += time.monotonic() - waited
+                    metric._add(emitted=1)
+            except Exception as e:
+                metric._add(failed=1)
+                self._report(StageError(stage.name, item, e))
+            else:
+                metric._add(processed=1)
+            finally:
+                metric._add(active=-1, busy_seconds=time.monotonic() - started - blocked,
+                            blocked_seconds=blocked)
+
+        # Dernier thread de l'étape : la fin du flux passe à l'étape suivante
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last:
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    self._queues[index + 1].put(_END)
+            else:
+                self._results.put(_END)
+
+    def _report(self, error: StageError):
+        """Transmet l'erreur d'un élément (une erreur du rappel ne doit pas arrêter le thread)"""
+        if self.on_error is None:
+            with self._lock:
+                self.errors.append(error)
+            return
+        try:
+            self.on_error(error)
+        except Exception as e:
+            print(f"Erreur dans le rappel d'erreur du pipeline : {e}")
@@ -0,0 +1,283 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : priorité et affinité des processus, nombre de cœurs
+import os
+
+# sys : permet de savoir sur quel système on tourne
+import sys
+
+# math : arrondi au supérieur du quota de CPU
+import math
+
+# platform : architecture du processeur (numéro de l'appel système ioprio_set)
+import platform
+
+# subprocess : constantes de priorité des processus sous Windows
+import subprocess
+
+# threading : nombre d'encodages simultanés propre à chaque thread
+import threading
+
+# contextlib : bloc 'with' qui partage les cœurs entre plusieurs encodages
+from contextlib import contextmanager
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Sequence
+
+# ===== CONSTANTES =====
+# Priorité par défaut des processus ffmpeg (0 = normale, 19 = la plus basse) :
+# l'interface Tk et les autres services de la machine passent avant l'encodage
+DEFAULT_NICE = 10
+
+# Priorités d'entrées/sorties disques proposées
+IO_PRIORITY_NORMAL = "normal"   # Comme les autres programmes
+IO_PRIORITY_LOW = "low"         # Au mieux, avec la plus faible priorité (par défaut)
+IO_PRIORITY_IDLE = "idle"       # Seulement quand le disque n'est pas utilisé par ailleurs
+IO_PRIORITIES = (IO_PRIORITY_NORMAL, IO_PRIORITY_LOW, IO_PRIORITY_IDLE)
+DEFAULT_IO_PRIORITY = IO_PRIORITY_LOW
+
+# Fichiers de quota CPU des conteneurs (cgroup v2, puis cgroup v1)
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+# Appel système ioprio_set de Linux (absent de la bibliothèque standard) :
+# son numéro dépend de l'architecture
+IOPRIO_SET_SYSCALLS = {
+    'x86_64': 251,
+    'amd64': 251,
+    'i386': 289,
+    'i686': 289,
+    'aarch64': 30,
+    'arm64': 30,
+    'armv7l': 314,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASSES = {IO_PRIORITY_LOW: (2, 7), IO_PRIORITY_IDLE: (3, 0)}  # (classe, niveau)
+
+
+# ===== CŒURS RÉELLEMENT DISPONIBLES =====
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    Quota de CPU imposé au conteneur (en nombre de cœurs, par exemple 1.5),
+    ou None s'il n'y a pas de quota (ou hors de Linux).
+    """
+    try:
+        # cgroup v2 : "max 100000" (pas de quota) ou "150000 100000"
+        with open(CGROUP_V2_CPU_MAX, 'r') as f:
+            quota, _, period = f.read().strip().partition(' ')
+        if quota == 'max':
+            return None
+        return int(quota) / int(period or 100000)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1 : un quota de -1 signifie « pas de quota »
+        with open(CGROUP_V1_QUOTA, 'r') as f:
+            quota = int(f.read().strip())
+        with open(CGROUP_V1_PERIOD, 'r') as f:
+            period = int(f.read().strip())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """
+    Nombre de cœurs réellement utilisables par le programme : le plus petit entre
+    les cœurs de la machine, ceux autorisés par l'affinité du processus et le
+    quota du conteneur (cgroup). os.cpu_count() seul compte tous les cœurs de
+    l'hôte, même dans un conteneur limité à un ou deux cœurs.
+    """
+    count = os.cpu_count() or 1
+    if hasattr(os, 'sched_getaffinity'):
+        try:
+            count = min(count, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    limit = cgroup_cpu_limit()
+    if limit:
+        count = min(count, math.ceil(limit))
+    return max(1, count)
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """
+    Lit une liste de cœurs écrite comme pour taskset : '0-3', '0,2,4' ou '0-1,6'.
+
+    Raises:
+        ValueError: Si le texte n'a pas ce format
+    """
+    cpus = set()
+    try:
+        for item in text.split(','):
+            start, _, end = item.strip().partition('-')
+            cpus.update(range(int(start), int(end or start) + 1))
+    except ValueError:
+        raise ValueError(f"Liste de cœurs invalide : '{text}' (exemples : 0-3 ou 0,2,4)")
+    if not cpus:
+        raise ValueError(f"Liste de cœurs invalide : '{text}'")
+    return sorted(cpus)
+
+
+# ===== RÉGULATEUR DES PROCESSUS FFMPEG =====
+class ResourceGovernor:
+    """
+    Règles appliquées à chaque processus ffmpeg lancé par le programme :
+    - priorité CPU basse (nice sous Linux/macOS, « inférieure à la normale » sous Windows)
+    - priorité d'entrées/sorties basse (ionice sous Linux)
+    - affinité : cœurs sur lesquels ffmpeg a le droit de tourner (optionnel)
+    - nombre maximal de threads de ffmpeg (option -threads)
+
+    Sans plafond explicite, les cœurs réellement disponibles (voir available_cpus)
+    sont partagés entre les encodages lancés en même temps (voir shared_by) :
+    dans un conteneur, ffmpeg ne voit sinon que les cœurs de l'hôte, et N encodages
+    simultanés de N threads chacun occuperaient N² threads sur N cœurs.
+
+    Sous Windows, l'affinité et la priorité disque nécessitent psutil (optionnel).
+    """
+
+    def __init__(
+        self,
+        nice: int = DEFAULT_NICE,
+        io_priority: str = DEFAULT_IO_PRIORITY,
+        cpu_affinity: Optional[Sequence[int]] = None,
+        threads: Optional[int] = None,
+        enabled: bool = True
+    ):
+        self.configure(nice, io_priority, cpu_affinity, threads, enabled)
+        # Nombre d'encodages simultanés déclaré par le thread courant (voir shared_by)
+        self._local = threading.local()
+
+    def configure(
+        self,
+        nice: int = DEFAULT_NICE,
+        io_priority: str = DEFAULT_IO_PRIORITY,
+        cpu_affinity: Optional[Sequence[int]] = None,
+        threads: Optional[int] = None,
+        enabled: bool = True
+    ):
+        """Change les règles (appliquées aux processus lancés ensuite)"""
+        if io_priority not in IO_PRIORITIES:
+            raise ValueError(f"Priorité disque inconnue : {io_priority} (choisir parmi {', '.join(IO_PRIORITIES)})")
+        self.nice = max(0, min(19, nice))
+        self.io_priority = io_priority
+        self.cpu_affinity = list(cpu_affinity) if cpu_affinity else None
+        self.threads = threads
+        self.enabled = enabled
+
+    def thread_cap(self, concurrency: Optional[int] = None) -> int:
+        """
+        Nombre de threads donné à chaque ffmpeg : les cœurs disponibles divisés
+        par le nombre d'encodages lancés en même temps (au moins 1).
+
+        Args:
+            concurrency: Nombre d'encodages simultanés (par défaut, celui déclaré
+                par le thread courant avec shared_by, sinon 1)
+        """
+        if self.threads:
+            return self.threads
+        cores = available_cpus()
+        if self.cpu_affinity:
+            cores = min(len(self.cpu_affinity), cores)
+        if concurrency is None:
+            concurrency = getattr(self._local, 'concurrency', None) or 1
+        return max(1, cores // max(1, concurrency))
+
+    @contextmanager
+    def shared_by(self, concurrency: int):
+        """
+        Déclare que les ffmpeg lancés dans le bloc 'with' (dans ce thread) tournent
+        en même temps que concurrency - 1 autres : chacun reçoit sa part des cœurs
+        """
+        previous = getattr(self._local, 'concurrency', None)
+        self._local.concurrency = concurrency
+        try:
+            yield
+        finally:
+            self._local.concurrency = previous
+
+    def command(self, cmd: List[str]) -> List[str]:
+        """
+        Ajoute le plafond de threads à une commande ffmpeg. L'option est placée
+        juste avant la sortie (dernier élément) : elle s'applique alors à l'encodage.
+        """
+        if not self.enabled or '-threads' in cmd or len(cmd) < 2:
+            return cmd
+        return list(cmd[:-1]) + ['-threads', str(self.thread_cap()), cmd[-1]]
+
+    def popen_kwargs(self) -> Dict[str, Any]:
+        """Arguments supplémentaires de subprocess.Popen (priorité dès le lancement sous Windows)"""
+        if self.enabled and sys.platform == "win32" and self.nice > 0:
+            return {'creationflags': subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+        return {}
+
+    def apply(self, pid: int):
+        """
+        Applique la priorité, la priorité disque et l'affinité à un processus lancé.
+        Une règle qui ne peut pas être appliquée est ignorée (le processus tourne quand même).
+        """
+        if not self.enabled:
+            return
+        if sys.platform != "win32":
+            if self.nice > 0:
+                try:
+                    # Ne jamais remonter la priorité d'un processus déjà plus bas
+                    if os.getpriority(os.PRIO_PROCESS, pid) < self.nice:
+                        os.setpriority(os.PRIO_PROCESS, pid, self.nice)
+                except (AttributeError, OSError) as e:
+                    print(f"Impossible de baisser la priorité de ffmpeg : {e}")
+            if self.cpu_affinity and hasattr(os, 'sched_setaffinity'):
+                try:
+                    os.sched_setaffinity(pid, self.cpu_affinity)
+                except OSError as e:
+                    print(f"Impossible de fixer les cœurs de ffmpeg : {e}")
+            if self.io_priority != IO_PRIORITY_NORMAL and sys.platform.startswith('linux'):
+                _set_linux_io_priority(pid, self.io_priority)
+        elif self.io_priority != IO_PRIORITY_NORMAL or self.cpu_affinity:
+            _apply_with_psutil(pid, self.io_priority, self.cpu_affinity)
+
+
+def _set_linux_io_priority(pid: int, io_priority: str):
+    """Équivalent de 'ionice' pour un processus (appel système ioprio_set)"""
+    number = IOPRIO_SET_SYSCALLS.get(platform.machine().lower())
+    if number is None:
+        return
+    io_class, level = IOPRIO_CLASSES[io_priority]
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(number, IOPRIO_WHO_PROCESS, pid, (io_class << IOPRIO_CLASS_SHIFT) | level) != 0:
+            print(f"Impossible de baisser la priorité disque de ffmpeg : {os.strerror(ctypes.get_errno())}")
+    except (OSError, AttributeError) as e:
+        print(f"Impossible de baisser la priorité disque de ffmpeg : {e}")
+
+
+def _apply_with_psutil(pid: int, io_priority: str, cpu_affinity: Optional[List[int]]):
+    """Priorité disque et affinité sous Windows, si psutil est installé"""
+    try:
+        import psutil
+    except ImportError:
+        return
+    try:
+        process = psutil.Process(pid)
+        if io_priority != IO_PRIORITY_NORMAL:
+            process.ionice(psutil.IOPRIO_VERYLOW if io_priority == IO_PRIORITY_IDLE else psutil.IOPRIO_LOW)
+        if cpu_affinity:
+            process.cpu_affinity(cpu_affinity)
+    except (psutil.Error, AttributeError, ValueError) as e:
+        print(f"Impossible d'appliquer les limites de ffmpeg : {e}")
+
+
+# Régulateur unique du programme : tous les processus ffmpeg passent par lui
+resource_governor = ResourceGovernor()
+
+
+def popen_governed(cmd: List[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen d'une commande ffmpeg, avec les règles du régulateur appliquées"""
+    cmd = resource_governor.command(cmd)
+    process = subprocess.Popen(cmd, **resource_governor.popen_kwargs(), **kwargs)
+    resource_governor.apply(process.pid)
+    return process
@@ -0,0 +1,305 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# sys : donne accès à la pile d'appels de chaque thread (sys._current_frames)
+import sys
+
+# io : permet de récupérer le texte de pstats dans une chaîne
+import io
+
+# json : le rapport de chaque session est enregistré en JSON
+import json
+
+# time : permet de mesurer les durées
+import time
+
+# threading : l'échantillonneur tourne dans son propre thread
+import threading
+
+# cProfile, pstats : profil déterministe de Python (mode 'cprofile')
+import cProfile
+import pstats
+
+# collections.Counter : comptage des échantillons par fonction
+from collections import Counter
+
+# contextlib : attach_profile s'utilise dans un bloc 'with'
+from contextlib import contextmanager
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional
+
+# ===== CONSTANTES =====
+# Modes de profilage disponibles
+MODE_SAMPLE = "sample"      # Échantillonnage de tous les threads (faible surcoût)
+MODE_CPROFILE = "cprofile"  # cProfile dans les threads de la session (précis mais plus lent)
+MODES = (MODE_SAMPLE, MODE_CPROFILE)
+
+# Dossier par défaut des rapports
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Intervalle entre deux échantillons (en secondes)
+SAMPLE_INTERVAL = 0.01
+
+# Nombre de fonctions conservées dans les classements du rapport
+TOP_FUNCTIONS = 30
+
+# Catégorie d'un échantillon selon les modules présents dans la pile (du plus
+# profond au moins profond) : le premier trouvé l'emporte
+CATEGORY_MODULES = (
+    ("ffmpeg", ("ffmpeg_runner.py", "subprocess.py")),
+    ("network", ("socket.py", "ssl.py", "http/client.py", "urllib3", "requests")),
+    ("tk", ("tkinter",)),
+    ("idle", ("threading.py", "queue.py", "selectors.py")),
+)
+
+
+def _category(frame) -> str:
+    """Classe une pile d'appels : ffmpeg, réseau, Tk, attente ou Python"""
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace('\\', '/')
+        for category, modules in CATEGORY_MODULES:
+            if any(module in filename for module in modules):
+                return category
+        frame = frame.f_back
+    return "python"
+
+
+def _function_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+# ===== PROFIL D'UNE SESSION =====
+class SessionProfile:
+    """
+    Profil d'une session (une tâche de la file, ou une conversion puis son envoi).
+
+    Il rassemble dans un seul rapport :
+    - le temps passé par Python (échantillons de tous les threads, ou cProfile)
+    - le temps réel et le temps CPU de chaque processus ffmpeg lancé par la session
+
+    Un thread participe à la session entre attach et detach (voir attach_profile).
+    """
+
+    def __init__(self, profiler: "SessionProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.ffmpeg: List[Dict[str, Any]] = []
+        # Échantillons : par catégorie, par thread et par fonction
+        self.samples = 0
+        self.by_category: Counter = Counter()
+        self.by_thread: Dict[str, Counter] = {}
+        self.self_counts: Counter = Counter()
+        self.cumulative_counts: Counter = Counter()
+        self._cprofiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.closed = False
+
+    # ----- Processus ffmpeg -----
+    def record_process(self, cmd: List[str], wall: float, usage=None, returncode: Optional[int] = None):
+        """Enregistre un processus ffmpeg terminé (usage : résultat de os.wait4, si disponible)"""
+        entry = {
+            'command': ' '.join(os.path.basename(arg) if i == 0 else arg for i, arg in enumerate(cmd[:12])),
+            'wall_seconds': round(wall, 3),
+            'user_cpu_seconds': round(usage.ru_utime, 3) if usage else None,
+            'system_cpu_seconds': round(usage.ru_stime, 3) if usage else None,
+            # ru_maxrss est en Ko sous Linux
+            'max_rss_kb': usage.ru_maxrss if usage else None,
+            'returncode': returncode
+        }
+        with self._lock:
+            self.ffmpeg.append(entry)
+
+    # ----- Échantillons -----
+    def add_sample(self, thread_name: str, frame):
+        category = _category(frame)
+        leaf = _function_name(frame.f_code)
+        stack = set()
+        while frame is not None:
+            stack.add(_function_name(frame.f_code))
+            frame = frame.f_back
+        with self._lock:
+            self.samples += 1
+            self.by_category[category] += 1
+            self.by_thread.setdefault(thread_name, Counter())[category] += 1
+            self.self_counts[leaf] += 1
+            self.cumulative_counts.update(stack)
+
+    # ----- Rapport -----
+    def report(self) -> Dict[str, Any]:
+        """Construit le rapport de la session sous forme de dictionnaire"""
+        wall = time.perf_counter() - self._start
+        with self._lock:
+            ffmpeg = list(self.ffmpeg)
+            total = self.samples or 1
+
+            def top(counter: Counter) -> List[Dict[str, Any]]:
+                return [
+                    {'function': name, 'samples': count, 'percent': round(count / total * 100, 1)}
+                    for name, count in counter.most_common(TOP_FUNCTIONS)
+                ]
+
+            report = {
+                'session': self.name,
+                'mode': self.profiler.mode,
+                'started_at': round(self.started_at, 3),
+                'wall_seconds': round(wall, 3),
+                # Temps CPU de tout le processus Python (tous les threads) pendant la session
+                'python_cpu_seconds': round(time.process_time() - self._cpu_start, 3),
+                'ffmpeg': {
+                    'count': len(ffmpeg),
+                    'wall_seconds': round(sum(p['wall_seconds'] for p in ffmpeg), 3),
+                    'user_cpu_seconds': round(sum(p['user_cpu_seconds'] or 0 for p in ffmpeg), 3),
+                    'system_cpu_seconds': round(sum(p['system_cpu_seconds'] or 0 for p in ffmpeg), 3),
+                    'processes': ffmpeg
+                }
+            }
+            if self.profiler.mode == MODE_SAMPLE:
+                report['samples'] = {
+                    'interval_seconds': SAMPLE_INTERVAL,
+                    'total': self.samples,
+                    'by_category': dict(self.by_category),
+                    'by_thread': {name: dict(counts) for name, counts in self.by_thread.items()},
+                    'top_self': top(self.self_counts),
+                    'top_cumulative': top(self.cumulative_counts)
+                }
+
+        if self._cprofiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*self._cprofiles, stream=stream)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            report['cprofile'] = stream.getvalue().splitlines()
+        return report
+
+    def close(self) -> Optional[str]:
+        """Termine la session et enregistre son rapport ; renvoie le chemin du rapport"""
+        if self.closed:
+            return None
+        self.closed = True
+        self.profiler._unregister(self)
+        report = self.report()
+
+        safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in self.name)[:60]
+        path = os.path.join(
+            self.profiler.directory,
+            f"profile_{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}_{safe_name}.json"
+        )
+        try:
+            os.makedirs(self.profiler.directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"Impossible d'enregistrer le profil de {self.name}: {e}")
+            return None
+        print(f"Profil de la session enregistré : {path}")
+        return path
+
+
+# ===== PROFILEUR DU PROGRAMME =====
+class SessionProfiler:
+    """
+    Interrupteur du profilage : tant qu'il n'est pas activé (enable), open renvoie
+    None et rien n'est mesuré, ce qui rend le surcoût négligeable.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.directory = DEFAULT_PROFILE_DIR
+        self._sessions: List[SessionProfile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    def enable(self, mode: str = MODE_SAMPLE, directory: Optional[str] = None):
+        """Active le profilage de toutes les sessions suivantes"""
+        if mode not in MODES:
+            raise ValueError(f"Mode de profilage inconnu : {mode} (choisir parmi {', '.join(MODES)})")
+        self.mode = mode
+        self.directory = directory or DEFAULT_PROFILE_DIR
+
+    def open(self, name: str) -> Optional[SessionProfile]:
+        """Démarre le profil d'une session (None si le profilage est désactivé)"""
+        if not self.enabled:
+            return None
+        profile = SessionProfile(self, name)
+        with self._lock:
+            self._sessions.append(profile)
+            if self.mode == MODE_SAMPLE and self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._sampler.start()
+        return profile
+
+    def _unregister(self, profile: SessionProfile):
+        with self._lock:
+            if profile in self._sessions:
+                self._sessions.remove(profile)
+
+    def current(self) -> Optional[SessionProfile]:
+        """Session à laquelle participe le thread courant"""
+        return getattr(self._local, 'profile', None)
+
+    def _sample_loop(self):
+        """Relève la pile de tous les threads à intervalle régulier, tant qu'une session est ouverte"""
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._sampler = None
+                    return
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                for profile in sessions:
+                    profile.add_sample(names.get(ident, str(ident)), frame)
+            time.sleep(SAMPLE_INTERVAL)
+
+
+# Profileur unique du programme (désactivé par défaut)
+session_profiler = SessionProfiler()
+
+
+@contextmanager
+def attach_profile(profile: Optional[SessionProfile]):
+    """
+    Fait participer le thread courant à une session pendant le bloc 'with' :
+    les processus ffmpeg qu'il lance y sont enregistrés (et, en mode cprofile,
+    son code Python est profilé). Sans effet si profile est None.
+    """
+    if profile is None:
+        yield
+        return
+    local = session_profiler._local
+    previous = getattr(local, 'profile', None)
+    local.profile = profile
+    cprofile = None
+    if session_profiler.mode == MODE_CPROFILE:
+        cprofile = cProfile.Profile()
+        try:
+            cprofile.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif (depuis Python 3.12, un seul à la fois)
+            cprofile = None
+    try:
+        yield
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            with profile._lock:
+                profile._cprofiles.append(cprofile)
+        local.profile = previous
+
+
+def close_profile(profile: Optional[SessionProfile]):
+    """Termine une session et écrit son rapport (sans effet si profile est None)"""
+    if profile is not None:
+        profile.close()
@@ -0,0 +1,163 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Tuple
+
+# numpy : calcul vectorisé sur les niveaux des trames
+import numpy as np
+
+# Décodage en flux et détection de parole déjà utilisés par l'analyse des morceaux
+from .audio_analysis import FRAME_SECONDS, frame_energies, iter_pcm_frames, speech_frames
+from .cancellation import CancelToken
+
+# ===== CONSTANTES =====
+# Seuls les silences plus longs que cette durée (en secondes) sont supprimés :
+# salle d'attente avant le début, pauses, fin d'enregistrement
+MIN_SILENCE_SECONDS = 20.0
+
+# Silence conservé de chaque côté d'une coupure, pour ne pas couper une phrase net
+KEEP_MARGIN_SECONDS = 1.0
+
+# Un bruit isolé plus court que cette durée (clic, toux...) au milieu d'un silence
+# n'est pas considéré comme de la parole
+MIN_SPEECH_SECONDS = 0.5
+
+
+# ===== CORRESPONDANCE DES TEMPS =====
+class OffsetMap:
+    """
+    Correspondance entre les temps de l'enregistrement raccourci (sans les silences)
+    et ceux de l'enregistrement original.
+
+    Attributs:
+        segments: Passages conservés, [(début, fin)] en secondes dans l'original
+        original_duration: Durée de l'enregistrement original (en secondes)
+    """
+
+    def __init__(self, segments: List[Tuple[float, float]], original_duration: float):
+        self.segments = segments
+        self.original_duration = original_duration
+
+    @property
+    def trimmed_duration(self) -> float:
+        """Durée de l'enregistrement une fois les silences supprimés"""
+        return sum(end - start for start, end in self.segments)
+
+    @property
+    def removed_seconds(self) -> float:
+        """Durée totale des silences supprimés"""
+        return max(0.0, self.original_duration - self.trimmed_duration)
+
+    def to_original(self, seconds: float) -> float:
+        """Convertit un temps de l'enregistrement raccourci en temps de l'original"""
+        elapsed = 0.0
+        for start, end in self.segments:
+            if seconds < elapsed + (end - start):
+                return start + max(0.0, seconds - elapsed)
+            elapsed += end - start
+        # Au-delà de la fin : la fin du dernier passage conservé
+        return self.segments[-1][1] if self.segments else seconds
+
+    def select_filter(self) -> str:
+        """Filtre audio ffmpeg qui ne garde que les passages conservés, mis bout à bout"""
+        expression = '+'.join(f'between(t,{start:.3f},{end:.3f})' for start, end in self.segments)
+        return f"aselect='{expression}',asetpts=N/SR/TB"
+
+    def to_list(self) -> List[Dict[str, float]]:
+        """Forme sérialisable en JSON (envoyée dans le manifeste)"""
+        items = []
+        elapsed = 0.0
+        for start, end in self.segments:
+            items.append({
+                'trimmed_start_seconds': round(elapsed, 3),   # Début dans le fichier envoyé
+                'original_start_seconds': round(start, 3),    # Début dans l'enregistrement original
+                'duration_seconds': round(end - start, 3)
+            })
+            elapsed += end - start
+        return items
+
+    @classmethod
+    def from_list(cls, items: List[Dict[str, Any]], original_duration: float) -> "OffsetMap":
+        """Reconstruit la correspondance à partir de to_list (par exemple depuis un manifeste)"""
+        segments = [
+            (item['original_start_seconds'], item['original_start_seconds'] + item['duration_seconds'])
+            for item in items
+        ]
+        return cls(segments, original_duration)
+
+    def __repr__(self) -> str:
+        return (f"<OffsetMap {len(self.segments)} passages, "
+                f"{self.removed_seconds:.0f} s supprimées sur {self.original_duration:.0f} s>")
+
+
+# ===== DÉTECTION DES SILENCES =====
+def detect_silences(
+    file_path: str,
+    min_silence_seconds: float = MIN_SILENCE_SECONDS,
+    margin_seconds: float = KEEP_MARGIN_SECONDS,
+    cancel_token: Optional[CancelToken] = None
+) -> Optional[OffsetMap]:
+    """
+    Repère les longs passages sans parole d'un enregistrement (audio ou vidéo).
+
+    L'audio est décodé en flux (voir iter_pcm_frames) : seule l'énergie de chaque
+    trame de 20 ms est conservée, soit quelques centaines de Ko pour plusieurs heures.
+
+    Args:
+        file_path: Fichier à analyser (le MP4 d'origine convient : la vidéo est ignorée)
+        min_silence_seconds: Durée minimale d'un silence pour qu'il soit supprimé
+        margin_seconds: Silence conservé de chaque côté d'une coupure
+        cancel_token: Jeton d'annulation (optionnel) : son annulation arrête le décodage
+
+    Returns:
+        OffsetMap des passages à conserver, ou None s'il n'y a rien à supprimer
+        (aucun silence assez long, ou aucune parole détectée du tout)
+    """
+    # Étape 1: Énergie de chaque trame, calculée bloc par bloc pendant le décodage
+    energies = [frame_energies(frames) for frames in iter_pcm_frames(file_path, cancel_token=cancel_token)]
+    if not energies:
+        return None
+    speech = speech_frames(np.concatenate(energies))
+    total_frames = len(speech)
+
+    min_silence = int(round(min_silence_seconds / FRAME_SECONDS))
+    min_speech = int(round(MIN_SPEECH_SECONDS / FRAME_SECONDS))
+    margin = int(round(margin_seconds / FRAME_SECONDS))
+
+    # Étape 2: Passages de parole [début, fin[ (en trames), sans les bruits isolés
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+    runs = runs[runs[:, 1] - runs[:, 0] >= min_speech]
+    if not len(runs):
+        # Par prudence, un enregistrement sans parole détectée n'est pas raccourci
+        print(f"Aucune parole détectée dans {file_path} : les silences ne sont pas supprimés")
+        return None
+
+    # Étape 3: Regrouper les passages séparés par un silence trop court pour être supprimé
+    kept = []
+    start, end = runs[0]
+    if start < min_silence:
+        start = 0
+    for run_start, run_end in runs[1:]:
+        if run_start - end < min_silence:
+            end = run_end
+        else:
+            kept.append((start, end))
+            start, end = run_start, run_end
+    if total_frames - end < min_silence:
+        end = total_frames
+    kept.append((start, end))
+
+    # Étape 4: Ajouter la marge autour de chaque coupure et convertir en secondes
+    segments = []
+    for start, end in kept:
+        start, end = max(0, start - margin), min(total_frames, end + margin)
+        # Deux marges qui se chevauchent (silence minimal très court) : fusionner
+        if segments and start <= segments[-1][1]:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+    segments = [(float(start * FRAME_SECONDS), float(end * FRAME_SECONDS)) for start, end in segments]
+    offset_map = OffsetMap(segments, float(total_frames * FRAME_SECONDS))
+    if offset_map.removed_seconds < FRAME_SECONDS:
+        return None
+    return offset_map
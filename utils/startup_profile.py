@@ -0,0 +1,139 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# sys : donne accès à la liste des chercheurs de modules (sys.meta_path)
+import sys
+
+# time : permet de mesurer précisément les durées
+import time
+
+# json : permet d'enregistrer le rapport dans un fichier
+import json
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Dict, List, Optional, Tuple
+
+# ===== CONSTANTES =====
+# Budget de démarrage (en millisecondes) jusqu'au premier affichage de la fenêtre
+# Au-delà, le rapport signale une régression
+FIRST_FRAME_BUDGET_MS = 1500
+
+# Nombre de modules les plus lents affichés dans le rapport
+TOP_IMPORTS = 15
+
+
+# ===== CHRONOMÉTRAGE DES IMPORTS =====
+class _TimedLoader:
+    """Enveloppe un loader de module pour mesurer la durée de son exécution"""
+
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter_import()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit_import(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        # Tout le reste (get_resource_reader, is_package...) est délégué au vrai loader
+        return getattr(self._loader, name)
+
+
+class _TimingFinder:
+    """Chercheur placé en tête de sys.meta_path qui enveloppe les loaders trouvés"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self._profiler)
+                return spec
+        return None
+
+
+# ===== PROFIL DE DÉMARRAGE =====
+class StartupProfiler:
+    """
+    Mesure le temps de démarrage de l'application :
+    - la durée d'import de chaque module (temps propre, sans ses sous-imports)
+    - les étapes clés du démarrage (fenêtre créée, premier affichage, onglets prêts)
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        # {module: (temps total, temps propre)} en secondes
+        self.imports: Dict[str, Tuple[float, float]] = {}
+        # Pile du temps passé dans les sous-imports du module en cours
+        self._child_time: List[float] = []
+        self._finder: Optional[_TimingFinder] = None
+
+    @classmethod
+    def install(cls) -> "StartupProfiler":
+        """Crée le profileur et commence à chronométrer les imports"""
+        profiler = cls()
+        profiler._finder = _TimingFinder(profiler)
+        sys.meta_path.insert(0, profiler._finder)
+        return profiler
+
+    def uninstall(self):
+        """Arrête le chronométrage des imports"""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def _enter_import(self):
+        self._child_time.append(0.0)
+
+    def _exit_import(self, name: str, elapsed: float):
+        children = self._child_time.pop()
+        self.imports[name] = (elapsed, elapsed - children)
+        if self._child_time:
+            self._child_time[-1] += elapsed
+
+    def mark(self, label: str):
+        """Enregistre une étape du démarrage"""
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def report(self) -> dict:
+        """Construit le rapport de démarrage sous forme de dictionnaire"""
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+        first_frame = dict(self.marks).get("premier affichage")
+        return {
+            'marks_ms': {label: round(t * 1000, 1) for label, t in self.marks},
+            'imports_total_ms': round(sum(own for _, own in self.imports.values()) * 1000, 1),
+            'slowest_imports_ms': [
+                {'module': name, 'self': round(own * 1000, 1), 'cumulative': round(total * 1000, 1)}
+                for name, (total, own) in slowest[:TOP_IMPORTS]
+            ],
+            'first_frame_budget_ms': FIRST_FRAME_BUDGET_MS,
+            'over_budget': first_frame is not None and first_frame * 1000 > FIRST_FRAME_BUDGET_MS
+        }
+
+    def print_report(self, output_path: Optional[str] = None):
+        """Affiche le rapport sur stderr et l'enregistre en JSON si un chemin est donné"""
+        report = self.report()
+        lines = ["===== Profil de démarrage ====="]
+        for label, ms in report['marks_ms'].items():
+            lines.append(f"  {label:<25} {ms:>8.1f} ms")
+        lines.append(f"  Temps total d'import : {report['imports_total_ms']:.1f} ms")
+        lines.append("  Imports les plus lents (temps propre / cumulé) :")
+        for entry in report['slowest_imports_ms']:
+            lines.append(f"    {entry['module']:<40} {entry['self']:>8.1f} / {entry['cumulative']:.1f} ms")
+        if report['over_budget']:
+            lines.append(f"  ATTENTION : budget de premier affichage dépassé ({FIRST_FRAME_BUDGET_MS} ms)")
+        print("\n".join(lines), file=sys.stderr)
+
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
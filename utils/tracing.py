@@ -0,0 +1,303 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# json : chaque étape terminée est écrite sous forme d'une ligne JSON
+import json
+
+# time : permet de mesurer la durée des étapes
+import time
+
+# uuid : identifiant unique de chaque étape
+import uuid
+
+# threading : les étapes sont mesurées depuis plusieurs threads à la fois
+import threading
+
+# atexit : écrire les métriques une dernière fois à la fermeture du programme
+import atexit
+
+# contextlib : permet d'écrire trace_span sous forme de bloc 'with'
+from contextlib import contextmanager
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Dict, List, Optional, Tuple
+
+# Une étape interrompue par l'utilisateur n'est pas comptée comme une erreur
+from .cancellation import CancelledError
+
+# ===== CONSTANTES =====
+# Dossier par défaut des traces (utilisé par main.py avec --trace)
+DEFAULT_TRACE_DIR = os.path.join(os.path.expanduser("~"), "baw_traces")
+
+# Nom du fichier de métriques au format texte de Prometheus
+# (compatible avec le « textfile collector » de node_exporter)
+METRICS_FILENAME = "metrics.prom"
+
+# Nom de l'instance quand aucun n'est donné : chaque processus qui écrit dans le
+# même dossier (interface et surveillance de dossier) a ainsi ses propres fichiers
+DEFAULT_INSTANCE = "baw"
+
+# Délai minimal entre deux réécritures du fichier de métriques (en secondes)
+METRICS_WRITE_INTERVAL = 5.0
+
+# Limites des tranches de durée (en secondes) : de quelques millisecondes pour un
+# nettoyage à plusieurs dizaines de minutes pour l'encodage d'un long webinaire
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Résultat d'une étape terminée sans erreur
+OUTCOME_OK = "ok"
+
+# Résultat d'une étape annulée par l'utilisateur
+OUTCOME_CANCELLED = "cancelled"
+
+
+# ===== ÉTAPE MESURÉE =====
+class Span:
+    """
+    Une étape mesurée (sonde, extraction, découpage, tentative d'envoi, nettoyage...).
+
+    Attributs:
+        name: Nom de l'étape (par exemple 'extract')
+        attrs: Informations complémentaires (fichier, numéro de morceau, tentative...)
+        bytes: Nombre d'octets traités par l'étape
+        outcome: Résultat ('ok', 'error', 'cancelled', 'http_429'...)
+        error: Message d'erreur éventuel
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.bytes = 0
+        self.outcome = OUTCOME_OK
+        self.error: Optional[str] = None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        # Toutes les étapes d'un même traitement partagent l'identifiant de la première
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attrs):
+        """Ajoute des informations à l'étape (bytes=... met à jour le nombre d'octets)"""
+        if 'bytes' in attrs:
+            self.bytes = attrs.pop('bytes') or 0
+        self.attrs.update(attrs)
+
+    def fail(self, error: BaseException, outcome: Optional[str] = None):
+        """Marque l'étape comme échouée (ou annulée, pour une CancelledError)"""
+        if outcome is None:
+            outcome = OUTCOME_CANCELLED if isinstance(error, CancelledError) else "error"
+        self.outcome = outcome
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        """Termine l'étape et l'enregistre (sans effet si elle est déjà terminée)"""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': round(self.started_at, 3),
+            'duration_seconds': round(self.duration or 0.0, 6),
+            'bytes': self.bytes,
+            'outcome': self.outcome,
+            'error': self.error,
+            'attrs': self.attrs
+        }
+
+
+# ===== ENREGISTREMENT DES ÉTAPES =====
+class Tracer:
+    """
+    Mesure les étapes du traitement et les enregistre dans un dossier :
+    - spans-<instance>-AAAAMMJJ.jsonl : une ligne JSON par étape terminée (durée, octets, résultat)
+    - metrics-<instance>.prom : compteurs et histogrammes de durée par étape, au format
+      Prometheus (avec l'étiquette instance)
+
+    Le nom d'instance sépare les fichiers des processus qui partagent le même dossier :
+    sinon chacun réécrirait le fichier de métriques de l'autre.
+    Sans dossier configuré, les étapes sont mesurées mais rien n'est écrit.
+    Les étapes imbriquées (dans un même thread) sont reliées à leur parente.
+    """
+
+    def __init__(self, directory: Optional[str] = None, instance: str = DEFAULT_INSTANCE):
+        self.directory = None
+        self.instance = instance
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Métriques cumulées par (étape, résultat) : [nombre, durée totale, octets, tranches]
+        self._metrics: Dict[Tuple[str, str], List[Any]] = {}
+        self._last_metrics_write = 0.0
+        self.configure(directory, instance)
+
+    def configure(self, directory: Optional[str], instance: Optional[str] = None):
+        """Choisit le dossier des traces (None = ne rien écrire) et le nom de l'instance"""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        if instance:
+            # Le nom sert dans des noms de fichiers : seulement lettres, chiffres, - et _
+            self.instance = ''.join(c if c.isalnum() or c in '-_' else '_' for c in instance)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self) -> Optional[Span]:
+        """Étape en cours dans ce thread (la plus imbriquée)"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def start(self, name: str, **attrs) -> Span:
+        """
+        Démarre une étape ; elle doit être terminée par span.end().
+        Préférer trace_span quand l'étape tient dans un bloc 'with'.
+        """
+        nbytes = attrs.pop('bytes', 0)
+        span = Span(self, name, self.current(), attrs)
+        span.bytes = nbytes or 0
+        self._stack().append(span)
+        return span
+
+    def start_detached(self, name: str, **attrs) -> Span:
+        """
+        Démarre une étape qui n'appartient à aucun thread (par exemple une tâche qui
+        passe d'une étape de pipeline à l'autre) ; voir attach.
+        """
+        nbytes = attrs.pop('bytes', 0)
+        span = Span(self, name, None, attrs)
+        span.bytes = nbytes or 0
+        return span
+
+    @contextmanager
+    def attach(self, span: Optional[Span]):
+        """Rattache les étapes du bloc 'with' (dans ce thread) à span (sans effet si None)"""
+        if span is None:
+            yield
+            return
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield
+        finally:
+            if span in stack:
+                stack.remove(span)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Mesure le bloc 'with' ; une exception marque l'étape en erreur puis est propagée"""
+        span = self.start(name, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            span.end()
+
+    def _finish(self, span: Span):
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        if not self.enabled:
+            return
+
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            # Étape 1: Cumuler les métriques de l'étape
+            key = (span.name, span.outcome)
+            metric = self._metrics.setdefault(key, [0, 0.0, 0, [0] * len(DURATION_BUCKETS)])
+            metric[0] += 1
+            metric[1] += span.duration
+            metric[2] += span.bytes
+            for index, limit in enumerate(DURATION_BUCKETS):
+                if span.duration <= limit:
+                    metric[3][index] += 1
+
+            # Étape 2: Ajouter la ligne au fichier du jour
+            try:
+                path = os.path.join(self.directory, time.strftime(f"spans-{self.instance}-%Y%m%d.jsonl"))
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                print(f"Impossible d'enregistrer la trace : {e}")
+
+            # Étape 3: Réécrire les métriques de temps en temps
+            if time.monotonic() - self._last_metrics_write >= METRICS_WRITE_INTERVAL:
+                self._write_metrics()
+
+    def flush(self):
+        """Écrit immédiatement le fichier de métriques"""
+        if self.enabled:
+            with self._lock:
+                self._write_metrics()
+
+    def _write_metrics(self):
+        """Écrit metrics.prom (appelé avec le verrou)"""
+        self._last_metrics_write = time.monotonic()
+        lines = [
+            "# HELP baw_stage_duration_seconds Durée des étapes du traitement",
+            "# TYPE baw_stage_duration_seconds histogram"
+        ]
+        for (name, outcome), (count, total, _, buckets) in sorted(self._metrics.items()):
+            labels = f'instance="{self.instance}",stage="{name}",outcome="{outcome}"'
+            for limit, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'baw_stage_duration_seconds_bucket{{{labels},le="{limit}"}} {value}')
+            lines.append(f'baw_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'baw_stage_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'baw_stage_duration_seconds_count{{{labels}}} {count}')
+        lines += [
+            "# HELP baw_stage_bytes_total Octets traités par les étapes du traitement",
+            "# TYPE baw_stage_bytes_total counter"
+        ]
+        for (name, outcome), (_, _, nbytes, _) in sorted(self._metrics.items()):
+            lines.append(f'baw_stage_bytes_total{{instance="{self.instance}",stage="{name}",'
+                         f'outcome="{outcome}"}} {nbytes}')
+
+        # Écrire dans un fichier temporaire puis le renommer : un lecteur ne voit
+        # jamais un fichier à moitié écrit
+        base, extension = os.path.splitext(METRICS_FILENAME)
+        path = os.path.join(self.directory, f"{base}-{self.instance}{extension}")
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Impossible d'écrire les métriques : {e}")
+
+
+# Traceur unique du programme
+tracer = Tracer()
+atexit.register(tracer.flush)
+
+
+def configure_tracing(directory: Optional[str], instance: Optional[str] = None):
+    """
+    Active l'écriture des traces dans un dossier (None pour la désactiver).
+    instance distingue les fichiers des processus qui écrivent dans le même dossier.
+    """
+    tracer.configure(directory, instance)
+
+
+def trace_span(name: str, **attrs):
+    """
+    Mesure une étape dans un bloc 'with' :
+
+        with trace_span('extract', file=chemin) as span:
+            ...
+            span.set(bytes=taille)
+    """
+    return tracer.span(name, **attrs)
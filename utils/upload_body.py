@@ -0,0 +1,214 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de connaître la taille d'un fichier
+import os
+
+# hashlib : empreinte SHA-256 calculée pendant l'envoi
+import hashlib
+
+# uuid : permet de générer une frontière (boundary) unique entre les champs
+import uuid
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+# Annulation d'un envoi en cours de route
+from .cancellation import CancelToken, check_cancelled
+
+# xxhash (optionnel) : empreinte bien plus rapide que SHA-256, ajoutée si disponible
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# ===== CONSTANTES =====
+# Taille des blocs lus dans un fichier pendant l'envoi (en octets)
+READ_BLOCK_SIZE = 64 * 1024
+
+# Préfixe des champs d'empreinte ajoutés après le fichier (content_sha256, content_xxh3_64)
+DIGEST_FIELD_PREFIX = 'content_'
+
+# Empreintes calculées pendant l'envoi : SHA-256 toujours, xxh3 si xxhash est installé
+UPLOAD_DIGESTS = ('sha256', 'xxh3_64') if xxhash is not None else ('sha256',)
+
+
+def new_hasher(algorithm: str):
+    """Crée un calcul d'empreinte ('sha256', 'xxh3_64' ou tout nom connu de hashlib)"""
+    if algorithm == 'xxh3_64':
+        if xxhash is None:
+            raise ValueError("xxh3_64 nécessite le module xxhash")
+        return xxhash.xxh3_64()
+    return hashlib.new(algorithm)
+
+
+def _quote(value: str) -> str:
+    """Échappe un nom de champ ou de fichier pour l'en-tête Content-Disposition"""
+    return value.replace('\\', '\\\\').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+# ===== CORPS MULTIPART LU EN FLUX =====
+class MultipartBody:
+    """
+    Corps de requête multipart/form-data (champs + un fichier) lu au fur et à mesure.
+
+    Contrairement à requests.post(files=...), qui assemble toute la requête en
+    mémoire avant l'envoi, ce corps n'est lu qu'au moment où le réseau en a besoin :
+    - depuis un fichier sur le disque, par blocs de READ_BLOCK_SIZE
+    - depuis un memoryview (morceau gardé en mémoire), sans aucune copie
+
+    La taille totale est connue d'avance (__len__), requests envoie donc un
+    en-tête Content-Length normal. Un corps ne peut être lu qu'une fois :
+    chaque tentative d'envoi doit en créer un nouveau.
+
+    Si throttle est fourni, il est appelé avec la taille de chaque bloc avant
+    que celui-ci soit rendu (voir utils/bandwidth.py) : c'est lui qui ralentit
+    l'envoi, sans qu'aucun bloc supplémentaire soit gardé en mémoire.
+
+    Si cancel_token est fourni, chaque lecture vérifie le jeton : une annulation
+    lève CancelledError au bloc suivant, ce qui interrompt la requête en plein
+    envoi (la connexion est alors abandonnée par la couche HTTP).
+
+    Si digests est fourni (par exemple UPLOAD_DIGESTS), les empreintes du contenu
+    du fichier sont calculées sur les blocs au moment où ils sont envoyés, sans
+    relire le fichier, puis ajoutées en champs après le fichier
+    (DIGEST_FIELD_PREFIX + algorithme). Leur longueur étant fixe, Content-Length
+    reste connu d'avance. hexdigests() les renvoie une fois le corps entièrement lu.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Any],
+        file_field: str,
+        filename: str,
+        source: Union[str, memoryview],
+        file_content_type: str = 'application/octet-stream',
+        boundary: Optional[str] = None,
+        throttle: Optional[Callable[[int], None]] = None,
+        cancel_token: Optional[CancelToken] = None,
+        digests: Sequence[str] = ()
+    ):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.source = source
+        self.throttle = throttle
+        self.cancel_token = cancel_token
+        self._hashers = {algorithm: new_hasher(algorithm) for algorithm in digests}
+
+        # Étape 1: Préparer l'en-tête (champs texte + en-tête du fichier)
+        head = []
+        for name, value in fields.items():
+            # Comme requests, les valeurs None ne sont pas envoyées
+            if value is None:
+                continue
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            head.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'.encode('utf-8')
+                + value + b'\r\n'
+            )
+        head.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{_quote(file_field)}"; filename="{_quote(filename)}"\r\n'
+            f'Content-Type: {file_content_type}\r\n\r\n'.encode('utf-8')
+        )
+        self._head = b''.join(head)
+        # La fin est construite quand le fichier a été lu (elle contient les empreintes) :
+        # seule sa longueur est nécessaire avant
+        self._tail = self._build_tail({
+            algorithm: '0' * (hasher.digest_size * 2) for algorithm, hasher in self._hashers.items()
+        })
+
+        # Étape 2: Taille du contenu du fichier
+        if isinstance(source, memoryview):
+            self._file_size = source.nbytes
+        else:
+            self._file_size = os.path.getsize(source)
+
+        # Position de lecture : 0 = en-tête, 1 = fichier, 2 = fin, 3 = terminé
+        self._segment = 0
+        self._offset = 0
+        self._file = None
+
+    def _build_tail(self, hexdigests: Dict[str, str]) -> bytes:
+        """Fin du corps : champs d'empreinte éventuels, puis frontière finale"""
+        tail = ['\r\n']
+        for algorithm, value in hexdigests.items():
+            tail.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{DIGEST_FIELD_PREFIX}{algorithm}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        tail.append(f'--{self.boundary}--\r\n')
+        return ''.join(tail).encode('utf-8')
+
+    def hexdigests(self) -> Dict[str, str]:
+        """Empreintes du contenu envoyé, ou {} si le fichier n'a pas encore été entièrement lu"""
+        if self._segment < 2:
+            return {}
+        return {algorithm: hasher.hexdigest() for algorithm, hasher in self._hashers.items()}
+
+    @property
+    def content_type(self) -> str:
+        """Valeur de l'en-tête Content-Type de la requête"""
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def read(self, size: int = -1):
+        """
+        Renvoie le bloc suivant du corps (bytes ou memoryview), ou b'' à la fin.
+        Appelé par la couche HTTP pendant l'envoi.
+        """
+        if size is None or size <= 0:
+            size = READ_BLOCK_SIZE
+        check_cancelled(self.cancel_token)
+
+        while self._segment < 3:
+            if self._segment == 0:
+                block = self._head[self._offset:self._offset + size]
+            elif self._segment == 1:
+                block = self._read_file(size)
+            else:
+                block = self._tail[self._offset:self._offset + size]
+
+            if block:
+                self._offset += len(block)
+                if self._segment == 1:
+                    # Empreinte des octets exacts envoyés (aucune relecture du fichier)
+                    for hasher in self._hashers.values():
+                        hasher.update(block)
+                if self.throttle is not None:
+                    self.throttle(len(block))
+                    # L'attente du plafond de débit a pu durer : revérifier l'annulation
+                    check_cancelled(self.cancel_token)
+                return block
+
+            # Segment terminé : passer au suivant
+            self._segment += 1
+            self._offset = 0
+            if self._segment == 2:
+                self.close()
+                if self._hashers:
+                    self._tail = self._build_tail(self.hexdigests())
+        return b''
+
+    def _read_file(self, size: int):
+        if isinstance(self.source, memoryview):
+            # Une tranche de memoryview ne copie pas les données
+            return self.source[self._offset:self._offset + size]
+        if self._file is None:
+            self._file = open(self.source, 'rb')
+        return self._file.read(size)
+
+    def __iter__(self):
+        while True:
+            block = self.read(READ_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+    def close(self):
+        """Ferme le fichier source s'il a été ouvert"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,160 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# threading : le régulateur est partagé par tous les threads d'envoi
+import threading
+
+# contextlib : slot s'utilise dans un bloc 'with'
+from contextlib import contextmanager
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Dict, Optional, Tuple
+
+# Une attente de place peut être interrompue par l'annulation de l'envoi
+from .cancellation import CancelToken, check_cancelled
+
+# ===== CONSTANTES =====
+# Nombre de requêtes d'envoi simultanées (tous envois confondus)
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 4
+
+# Délai d'attente d'une requête (en secondes) : connexion, puis réponse du serveur
+CONNECT_TIMEOUT = 10
+MIN_READ_TIMEOUT = 30
+MAX_READ_TIMEOUT = 600
+TIMEOUT_SAFETY = 3.0           # Marge par rapport à la durée prévue d'après le débit mesuré
+
+# Poids de la dernière mesure dans la moyenne glissante du débit
+THROUGHPUT_SMOOTHING = 0.3
+
+# Une place de plus n'est gardée que si elle apporte au moins ce gain de débit total
+MIN_CONCURRENCY_GAIN = 1.1
+
+# Résultats d'une requête, tels que le régulateur les interprète
+RESULT_OK = "ok"
+RESULT_THROTTLED = "throttled"   # 429 ou 520 : le webhook demande de ralentir
+RESULT_TIMEOUT = "timeout"       # Délai dépassé : le réseau ne suit plus
+RESULT_ERROR = "error"           # Erreur réseau ou HTTP
+
+
+# ===== RÉGULATEUR D'ENVOI =====
+class UploadController:
+    """
+    Ajuste en continu, d'après les requêtes terminées :
+    - le nombre de requêtes simultanées, façon AIMD (augmentation additive après
+      chaque succès, division par deux après un refus, un délai dépassé ou une erreur).
+      Une place supplémentaire n'est conservée que si le débit total mesuré augmente.
+    - le délai d'attente de la réponse, proportionnel à la durée prévue de la requête
+
+    La taille des requêtes n'est pas ajustée : un morceau part toujours en une seule
+    requête (jusqu'à la limite du webhook), car le scénario Make ne sait pas
+    réassembler un morceau coupé en plusieurs requêtes.
+
+    Le limiteur de débit par URL (voir webhook.RateLimiter) reste appliqué à chaque
+    requête : le régulateur ne fait qu'en répartir l'usage.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self._condition = threading.Condition()
+        self.max_concurrency = max(MIN_CONCURRENCY, max_concurrency)
+        self.concurrency = float(MIN_CONCURRENCY)
+        self.throughput: Optional[float] = None       # Débit d'une requête (octets/s)
+        self._level_throughput: Dict[int, float] = {}  # Débit total mesuré par nombre de places
+        self._ceiling = self.max_concurrency           # Au-delà, le débit total n'augmente plus
+        self._active = 0
+
+    def configure(self, max_concurrency: int):
+        """Change le nombre maximal de requêtes simultanées"""
+        with self._condition:
+            self.max_concurrency = max(MIN_CONCURRENCY, max_concurrency)
+            self._ceiling = self.max_concurrency
+            self.concurrency = min(self.concurrency, self.max_concurrency)
+            self._condition.notify_all()
+
+    @property
+    def limit(self) -> int:
+        """Nombre de requêtes autorisées en même temps"""
+        return max(MIN_CONCURRENCY, int(self.concurrency))
+
+    # ----- Places -----
+    @contextmanager
+    def slot(self, cancel_token: Optional[CancelToken] = None):
+        """Occupe une place d'envoi pendant le bloc 'with' (attend qu'une place se libère)"""
+        with self._condition:
+            while self._active >= self.limit:
+                check_cancelled(cancel_token)
+                # Attente courte : une annulation est vue rapidement
+                self._condition.wait(0.2)
+            check_cancelled(cancel_token)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    # ----- Réglages en cours -----
+    def timeout(self, nbytes: int) -> Tuple[float, float]:
+        """Délais (connexion, réponse) de requests pour une requête de nbytes octets"""
+        with self._condition:
+            throughput = self.throughput
+        if not throughput:
+            return CONNECT_TIMEOUT, float(MAX_READ_TIMEOUT)
+        expected = nbytes / throughput
+        return CONNECT_TIMEOUT, min(MAX_READ_TIMEOUT, max(MIN_READ_TIMEOUT, expected * TIMEOUT_SAFETY))
+
+    # ----- Mesures -----
+    def record(self, nbytes: int, seconds: float, result: str):
+        """Enregistre une requête terminée et ajuste les réglages"""
+        with self._condition:
+            if result == RESULT_OK:
+                self._on_success(nbytes, seconds)
+            else:
+                # Diminution multiplicative : le réseau ou le webhook sature
+                self.concurrency = max(float(MIN_CONCURRENCY), self.concurrency / 2)
+                if result == RESULT_THROTTLED:
+                    # Le webhook a fixé la limite : ne plus dépasser le niveau actuel
+                    self._ceiling = max(MIN_CONCURRENCY, self.limit)
+            self._condition.notify_all()
+
+    def _on_success(self, nbytes: int, seconds: float):
+        """Succès (appelé avec le verrou)"""
+        if seconds > 0 and nbytes > 0:
+            measured = nbytes / seconds
+            self.throughput = measured if self.throughput is None else (
+                THROUGHPUT_SMOOTHING * measured + (1 - THROUGHPUT_SMOOTHING) * self.throughput
+            )
+            # Débit total à ce nombre de places : débit d'une requête × requêtes en cours
+            level = self.limit
+            total = measured * max(1, self._active)
+            previous = self._level_throughput.get(level)
+            self._level_throughput[level] = total if previous is None else (
+                THROUGHPUT_SMOOTHING * total + (1 - THROUGHPUT_SMOOTHING) * previous
+            )
+            lower = self._level_throughput.get(level - 1)
+            if lower and self._level_throughput[level] < lower * MIN_CONCURRENCY_GAIN:
+                # Une place de plus n'apporte rien : le lien est saturé
+                self._ceiling = max(MIN_CONCURRENCY, level - 1)
+                self.concurrency = float(self._ceiling)
+                return
+        # Augmentation additive : environ une place de plus par « tour » de requêtes
+        ceiling = min(self.max_concurrency, self._ceiling)
+        self.concurrency = min(float(ceiling), self.concurrency + 1 / self.concurrency)
+
+    def reset(self):
+        """Oublie les mesures (par exemple après un changement de réseau)"""
+        with self._condition:
+            self.concurrency = float(MIN_CONCURRENCY)
+            self.throughput = None
+            self._level_throughput.clear()
+            self._ceiling = self.max_concurrency
+            self._condition.notify_all()
+
+    def describe(self) -> str:
+        """Résumé lisible des réglages actuels"""
+        with self._condition:
+            speed = f"{self.throughput / 1024:.0f} Ko/s" if self.throughput else "débit inconnu"
+            return f"{self.limit} envoi(s) en parallèle, {speed}"
+
+
+# Régulateur unique du programme : tous les envois de morceaux passent par lui
+upload_controller = UploadController()
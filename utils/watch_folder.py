@@ -0,0 +1,269 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# sys : permet de savoir sur quel système d'exploitation on tourne
+import sys
+
+# json : permet de sauvegarder l'état des fichiers déjà traités
+import json
+
+# time : permet de mesurer depuis combien de temps un fichier n'a pas changé
+import time
+
+# threading : permet de protéger l'état partagé entre les threads
+import threading
+
+# select : permet d'attendre des événements inotify avec un délai maximum
+import select
+
+# struct : permet de décoder les événements binaires renvoyés par inotify
+import struct
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import Dict, Optional
+
+# Importer notre ordonnanceur de tâches
+from .job_queue import Job, JobScheduler, STATE_DONE
+from .conversion_plan import INPUT_EXTENSIONS
+
+# ===== CONSTANTES =====
+# Extensions des fichiers surveillés (les mêmes que celles acceptées à la main)
+WATCHED_EXTENSIONS = INPUT_EXTENSIONS
+
+# Un fichier est considéré comme complet lorsque sa taille et sa date de
+# modification n'ont pas changé pendant ce nombre de secondes
+STABLE_SECONDS = 10
+
+# Intervalle entre deux vérifications de stabilité (en secondes)
+POLL_INTERVAL = 2
+
+# Nom du fichier d'état créé dans le dossier surveillé
+STATE_FILENAME = ".baw_watch_state.json"
+
+# Masques inotify (voir <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+# ===== SURVEILLANCE INOTIFY =====
+class InotifyWatcher:
+    """
+    Surveille un dossier avec inotify (Linux uniquement) via ctypes.
+    Si inotify n'est pas disponible, available vaut False et l'appelant
+    se contente de parcourir le dossier régulièrement.
+    """
+
+    def __init__(self, folder: str):
+        self.fd = None
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+            if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            # Bibliothèque C introuvable ou sans inotify
+            self.fd = None
+
+    @property
+    def available(self) -> bool:
+        return self.fd is not None
+
+    def wait(self, timeout: float) -> list:
+        """
+        Attend des événements pendant au plus 'timeout' secondes.
+
+        Returns:
+            list: Noms des fichiers concernés par les événements reçus
+        """
+        if self.fd is None:
+            time.sleep(timeout)
+            return []
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        # Chaque événement : wd (int), mask (uint32), cookie (uint32), len (uint32), nom
+        names = []
+        offset = 0
+        header_size = struct.calcsize("iIII")
+        while offset + header_size <= len(data):
+            _, _, _, name_len = struct.unpack_from("iIII", data, offset)
+            raw_name = data[offset + header_size:offset + header_size + name_len]
+            names.append(os.fsdecode(raw_name.rstrip(b"\0")))
+            offset += header_size + name_len
+        return names
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# ===== ÉTAT PERSISTANT =====
+class WatchState:
+    """
+    Mémorise les fichiers déjà traités dans un fichier JSON.
+    Un fichier est identifié par son chemin, sa taille et sa date de modification :
+    un enregistrement remplacé par une nouvelle version sera donc traité à nouveau.
+    """
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Impossible de relire l'état {state_path}: {e}")
+
+    @staticmethod
+    def key(path: str, size: int, mtime: float) -> str:
+        return f"{os.path.abspath(path)}|{size}|{int(mtime)}"
+
+    def is_known(self, key: str) -> bool:
+        """Indique si le fichier a déjà été traité avec succès"""
+        with self._lock:
+            return self.entries.get(key, {}).get('status') == STATE_DONE
+
+    def record(self, key: str, status: str, message: str = ""):
+        """Enregistre le résultat d'un traitement et sauvegarde immédiatement"""
+        with self._lock:
+            self.entries[key] = {
+                'status': status,
+                'message': message,
+                'updated_at': int(time.time())
+            }
+            # Écrire dans un fichier temporaire puis le renommer :
+            # l'état n'est jamais à moitié écrit en cas d'arrêt brutal
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+
+
+# ===== DÉMON DE SURVEILLANCE =====
+class FolderWatcher:
+    """
+    Surveille un dossier et lance la conversion puis l'envoi de chaque nouveau MP4
+    une fois qu'il a fini d'être écrit.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        scheduler: JobScheduler,
+        bitrate: str = "192k",
+        num_parts: int = 2,
+        state_path: Optional[str] = None,
+        stable_seconds: float = STABLE_SECONDS,
+        trim_silence: bool = False
+    ):
+        self.folder = os.path.abspath(folder)
+        self.scheduler = scheduler
+        self.bitrate = bitrate
+        self.num_parts = num_parts
+        self.trim_silence = trim_silence
+        self.stable_seconds = stable_seconds
+        self.state = WatchState(state_path or os.path.join(self.folder, STATE_FILENAME))
+
+        # Fichiers en cours d'écriture : {chemin: (taille, mtime, stable_depuis)}
+        self._candidates: Dict[str, tuple] = {}
+
+        # Fichiers déjà confiés à l'ordonnanceur pendant cette exécution
+        self._submitted = set()
+
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _is_watched(self, name: str) -> bool:
+        return name.lower().endswith(WATCHED_EXTENSIONS) and not name.startswith('.')
+
+    def _scan_folder(self):
+        """Ajoute tous les fichiers surveillés du dossier à la liste des candidats"""
+        try:
+            for entry in os.scandir(self.folder):
+                if entry.is_file() and self._is_watched(entry.name):
+                    self._candidates.setdefault(entry.path, None)
+        except OSError as e:
+            print(f"Erreur lors du parcours du dossier {self.folder}: {e}")
+
+    def _check_candidates(self):
+        """Soumet les candidats dont la taille et la date n'ont plus changé"""
+        now = time.time()
+        for path, previous in list(self._candidates.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Le fichier a été supprimé ou renommé entre-temps
+                del self._candidates[path]
+                continue
+
+            signature = (stat.st_size, stat.st_mtime)
+            if previous is None or previous[:2] != signature:
+                # Le fichier a changé : on repart de zéro
+                self._candidates[path] = signature + (now,)
+                continue
+
+            if now - previous[2] < self.stable_seconds or stat.st_size == 0:
+                continue
+
+            # Le fichier est stable : on peut le traiter
+            del self._candidates[path]
+            key = WatchState.key(path, stat.st_size, stat.st_mtime)
+            if key in self._submitted or self.state.is_known(key):
+                continue
+            self._submitted.add(key)
+            self._submit(path, key)
+
+    def _submit(self, path: str, key: str):
+        print(f"Nouveau fichier détecté : {path}")
+        job = Job(path, self.bitrate, self.num_parts, self.trim_silence)
+        job.on_finished = lambda finished_job: self.state.record(
+            key, finished_job.state, finished_job.message
+        )
+        self.scheduler.submit(job)
+
+    def run(self):
+        """Boucle principale (bloquante) jusqu'à l'appel de stop()"""
+        watcher = InotifyWatcher(self.folder)
+        mode = "inotify" if watcher.available else "parcours périodique"
+        print(f"Surveillance de {self.folder} ({mode})")
+
+        # Les fichiers déjà présents au démarrage sont aussi pris en compte
+        self._scan_folder()
+        try:
+            while not self._stop.is_set():
+                # Les événements inotify réveillent la boucle immédiatement ;
+                # sinon on revérifie les candidats toutes les POLL_INTERVAL secondes
+                for name in watcher.wait(POLL_INTERVAL):
+                    if self._is_watched(name):
+                        self._candidates.setdefault(os.path.join(self.folder, name), None)
+                if not watcher.available:
+                    self._scan_folder()
+                self._check_candidates()
+        finally:
+            watcher.close()
@@ -6,32 +6,192 @@ import requests
 import os
 
 # typing : permet de spécifier les types de données attendus dans les fonctions
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Union
 
 # tempfile : permet de créer des fichiers et dossiers temporaires
 import tempfile
 
 # Importer les fonctions de notre propre module file_splitter
 # Le point (.) signifie "depuis le même package"
-from .file_splitter import split_file, cleanup_chunks
+from .file_splitter import split_file, split_memory, cleanup_chunks
+
+# Corps de requête multipart lu en flux, et morceaux gardés en mémoire
+from .upload_body import MultipartBody, UPLOAD_DIGESTS, DIGEST_FIELD_PREFIX
+from .buffer_pool import MemoryPart
+
+# Plafond global de débit d'envoi, partagé par tous les envois en cours
+from .bandwidth import bandwidth_limiter
+
+# Mesure des étapes (durée, octets et résultat de chaque tentative d'envoi)
+from .tracing import trace_span
+
+# Type MIME des morceaux (MP3, M4A ou WAV), et formats qu'on peut couper en octets
+from .conversion_plan import audio_mime_type, BYTE_SPLIT_EXTENSIONS
+
+# Manifeste de session envoyé avant les morceaux
+from .manifest import build_manifest, part_size, save_part_digest, MESSAGE_TYPE_PART
+
+# Annulation d'un envoi : attentes interrompues et corps de requête abandonné en cours de route
+from .cancellation import CancelToken, CancelledError, check_cancelled, sleep_or_cancel
+
+# Régulateur d'envoi : requêtes simultanées et délai adaptés au réseau mesuré
+from .upload_controller import (
+    upload_controller, RESULT_OK, RESULT_THROTTLED, RESULT_TIMEOUT, RESULT_ERROR
+)
 
 # time : permet de faire des pauses dans l'exécution du programme
 import time
 
+# threading : le limiteur de débit est partagé par tous les threads d'envoi
+import threading
+
+# concurrent.futures : les morceaux d'une session sont envoyés en parallèle
+from concurrent.futures import ThreadPoolExecutor
+
+# email.utils : permet de lire un en-tête Retry-After exprimé sous forme de date
+from email.utils import parsedate_to_datetime
+
 # ===== CONSTANTES =====
 # Limite de taille de fichier par morceau (en Mo)
 # Cette constante définit la taille maximale de chaque morceau lorsqu'on découpe un fichier
 # Les fichiers plus grands que cette taille seront découpés en plusieurs parties
 MAX_CHUNK_SIZE_MB = 20
 
+# Débit autorisé par défaut pour chaque URL de webhook
+# Make.com limite et facture chaque appel : au-delà, il répond 429 (ou 520)
+DEFAULT_RATE_PER_SECOND = 1.0   # Nombre moyen de requêtes par seconde
+DEFAULT_BURST = 3               # Nombre de requêtes pouvant partir d'un coup
+
+# Attente maximale (en secondes) après un refus du serveur, quoi qu'annonce Retry-After
+MAX_RETRY_AFTER = 300
+
+# Message renvoyé par les fonctions d'envoi quand l'utilisateur a annulé
+CANCELLED_MESSAGE = "Envoi annulé"
+
+
+# ===== LIMITEUR DE DÉBIT PARTAGÉ =====
+class TokenBucket:
+    """
+    Seau à jetons d'une URL : le seau contient au plus 'burst' jetons et se remplit
+    de 'rate' jetons par seconde ; chaque requête consomme un jeton.
+
+    Il est implémenté sous forme de « temps d'arrivée théorique » (GCRA) : chaque
+    appelant réserve son créneau sous verrou puis attend en dehors du verrou.
+    Les threads passent donc dans leur ordre d'arrivée, sans se bousculer.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tat = 0.0            # Instant où le seau sera de nouveau plein
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Réserve un jeton et renvoie le temps d'attente avant de pouvoir l'utiliser"""
+        interval = 1.0 / self.rate
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            # Le jeton est disponible dès que le seau a assez de marge
+            wait = tat - (self.burst - 1) * interval - now
+            self._tat = tat + interval
+        return max(0.0, wait)
+
+    def acquire(self, cancel_token: Optional[CancelToken] = None):
+        """Attend qu'un jeton soit disponible (CancelledError si l'envoi est annulé)"""
+        wait = self.reserve()
+        if wait > 0:
+            sleep_or_cancel(wait, cancel_token)
+
+    def pause(self, seconds: float):
+        """Vide le seau et bloque toutes les requêtes pendant 'seconds' secondes"""
+        with self._lock:
+            resume = time.monotonic() + seconds
+            # Après la pause, le seau repart vide : une seule requête passe immédiatement
+            self._tat = max(self._tat, resume + (self.burst - 1) / self.rate)
+
+
+class RateLimiter:
+    """Seaux à jetons de toutes les URL de webhook, partagés par tout le programme"""
+
+    def __init__(self, rate: float = DEFAULT_RATE_PER_SECOND, burst: int = DEFAULT_BURST):
+        self.default_rate = rate
+        self.default_burst = burst
+        self._limits: Dict[str, Tuple[float, int]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, webhook_url: Optional[str], rate: float, burst: int):
+        """
+        Fixe le débit d'une URL (requêtes par seconde et rafale).
+        Avec webhook_url=None, change le débit par défaut des URL non configurées.
+        """
+        with self._lock:
+            if webhook_url is None:
+                self.default_rate, self.default_burst = rate, burst
+                # Les seaux des URL sans réglage propre suivent le nouveau défaut
+                for url in list(self._buckets):
+                    if url not in self._limits:
+                        del self._buckets[url]
+            else:
+                self._limits[webhook_url] = (rate, burst)
+                self._buckets.pop(webhook_url, None)
+
+    def bucket(self, webhook_url: str) -> TokenBucket:
+        with self._lock:
+            if webhook_url not in self._buckets:
+                rate, burst = self._limits.get(webhook_url, (self.default_rate, self.default_burst))
+                self._buckets[webhook_url] = TokenBucket(rate, burst)
+            return self._buckets[webhook_url]
+
+    def acquire(self, webhook_url: str, cancel_token: Optional[CancelToken] = None):
+        """Attend le droit d'envoyer une requête à cette URL"""
+        self.bucket(webhook_url).acquire(cancel_token)
+
+    def pause(self, webhook_url: str, seconds: float):
+        """Suspend toutes les requêtes vers cette URL (après un 429 ou un 520)"""
+        self.bucket(webhook_url).pause(seconds)
+
+
+# Limiteur unique du programme : toutes les fonctions d'envoi passent par lui
+rate_limiter = RateLimiter()
+
+
+def configure_rate_limit(webhook_url: Optional[str], rate: float, burst: int = DEFAULT_BURST):
+    """Règle le débit autorisé vers une URL de webhook (ou le débit par défaut si None)"""
+    rate_limiter.configure(webhook_url, rate, burst)
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Lit l'en-tête Retry-After (en secondes ou sous forme de date), s'il existe"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def _post(webhook_url: str, cancel_token: Optional[CancelToken] = None, **kwargs):
+    """requests.post, après avoir attendu son tour auprès du limiteur de débit"""
+    rate_limiter.acquire(webhook_url, cancel_token)
+    return requests.post(webhook_url, **kwargs)
+
 # ===== FONCTION PRINCIPALE D'ENVOI DE FICHIER AU WEBHOOK =====
 def send_file_to_webhook(
     webhook_url: str,
-    file_path: str,
+    file_path: Union[str, MemoryPart],
     metadata: Dict[str, Any],
     progress_callback: Optional[callable] = None,
     max_retries: int = 3,
-    retry_delay: int = 5
+    retry_delay: int = 5,
+    work_dir: Optional[str] = None,
+    cancel_token: Optional[CancelToken] = None
 ) -> tuple[bool, str]:
     """
     Envoie un fichier au webhook spécifié, en le découpant si nécessaire.
@@ -39,11 +199,16 @@ def send_file_to_webhook(
     
     Args:
         webhook_url: L'URL du webhook (adresse web où envoyer les données)
-        file_path: Chemin vers le fichier à envoyer (où se trouve le fichier sur l'ordinateur)
+        file_path: Chemin vers le fichier à envoyer (où se trouve le fichier sur l'ordinateur),
+            ou morceau gardé en mémoire (MemoryPart), envoyé directement depuis son tampon
         metadata: Métadonnées à envoyer avec le fichier (informations supplémentaires comme le titre, etc.)
         progress_callback: Fonction qui sera appelée pour mettre à jour la progression (optionnel)
         max_retries: Nombre maximum de tentatives en cas d'erreur (par défaut 3)
         retry_delay: Délai en secondes entre les tentatives (par défaut 5 secondes)
+        work_dir: Dossier où placer les fichiers temporaires de l'envoi, par exemple
+            le dossier de session de l'espace de travail (optionnel)
+        cancel_token: Jeton d'annulation (optionnel). Une annulation interrompt la requête
+            en cours au bloc suivant, ainsi que les attentes entre les tentatives
         
     Returns:
         tuple[bool, str]: Un tuple contenant:
@@ -52,19 +217,35 @@ def send_file_to_webhook(
     """
     # Utiliser try/except pour capturer toutes les erreurs possibles
     try:
+        # Un morceau en mémoire n'a pas de fichier : il est envoyé depuis son tampon
+        in_memory = isinstance(file_path, MemoryPart)
+        
         # Étape 1: Vérifier que le fichier existe avant d'essayer de l'envoyer
-        if not os.path.exists(file_path):
+        if not in_memory and not os.path.exists(file_path):
             # Si le fichier n'existe pas, renvoyer une erreur immédiatement
             return False, f"Le fichier {file_path} n'existe pas"
         
         # Étape 2: Calculer la taille du fichier en mégaoctets (Mo)
         # os.path.getsize renvoie la taille en octets, donc on divise par 1024*1024 pour avoir des Mo
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        file_size = len(file_path) if in_memory else os.path.getsize(file_path)
+        file_size_mb = file_size / (1024 * 1024)
+        original_filename = file_path.name if in_memory else os.path.basename(file_path)
         
         # Étape 3: Découper le fichier en morceaux si nécessaire
-        # On utilise la fonction split_file de notre module file_splitter
-        # Cette fonction renvoie une liste de tuples (chemin_du_morceau, numéro_du_morceau)
-        chunks = split_file(file_path, MAX_CHUNK_SIZE_MB)
+        # On utilise les fonctions de notre module file_splitter, qui renvoient une liste
+        # de tuples (morceau, numéro_du_morceau)
+        extension = os.path.splitext(original_filename)[1].lower()
+        if file_size_mb > MAX_CHUNK_SIZE_MB and extension not in BYTE_SPLIT_EXTENSIONS:
+            # Un conteneur M4A coupé en octets serait illisible, et le webhook refuse
+            # une requête plus grosse que la limite : ne rien envoyer
+            # (plan_conversion réencode en MP3 les morceaux M4A trop gros)
+            return False, (f"{original_filename} ({file_size_mb:.1f} Mo) dépasse {MAX_CHUNK_SIZE_MB} Mo "
+                           f"et ne peut pas être coupé : réencodez-le en MP3")
+        if in_memory:
+            # Tranches de memoryview : aucune copie, aucun fichier temporaire
+            chunks = split_memory(file_path.view(), MAX_CHUNK_SIZE_MB)
+        else:
+            chunks = split_file(file_path, MAX_CHUNK_SIZE_MB, output_dir=work_dir)
         
         # Compter le nombre total de morceaux
         total_chunks = len(chunks)
@@ -75,6 +256,8 @@ def send_file_to_webhook(
             # Étape 4: Envoyer chaque morceau un par un
             # On parcourt la liste des morceaux (chunks) avec une boucle for
             for chunk_path, chunk_num in chunks:
+                check_cancelled(cancel_token)
+                
                 # Étape 4.1: Mettre à jour l'interface utilisateur avec la progression
                 # Si une fonction de callback a été fournie...
                 if progress_callback:
@@ -94,105 +277,187 @@ def send_file_to_webhook(
                 
                 # Ajouter des informations spécifiques à ce morceau
                 chunk_metadata.update({
-                    'total_parts': total_chunks,      # Nombre total de morceaux
-                    'part_number': chunk_num,        # Numéro de ce morceau
+                    'chunk_number': chunk_num,        # Numéro de ce morceau dans le fichier
+                    'total_chunks': total_chunks,     # Nombre de morceaux du fichier
                     'total_size_mb': f"{file_size_mb:.1f}",  # Taille totale avec 1 décimale
                     'is_multipart': total_chunks > 1,  # Indique si le fichier est en plusieurs parties
-                    'original_filename': os.path.basename(file_path)  # Nom du fichier original
+                    'original_filename': original_filename  # Nom du fichier original
                 })
+                # Si l'appelant envoie une partie audio numérotée (send_chunks_to_webhook),
+                # son numéro est conservé ; sinon le numéro du morceau en tient lieu
+                chunk_metadata.setdefault('part_number', chunk_num)
+                chunk_metadata.setdefault('total_parts', total_chunks)
                 
-                # Étape 4.3: Préparer le fichier pour l'envoi
-                # Ouvrir le fichier en mode binaire ('rb' = read binary)
-                with open(chunk_path, 'rb') as f:
-                    # Créer un dictionnaire pour le format attendu par requests.post
-                    # La clé 'file' est le nom du paramètre attendu par le serveur
-                    files = {
-                        'file': (
-                            os.path.basename(chunk_path),  # Nom du fichier à envoyer
-                            f,                            # Contenu du fichier (objet fichier ouvert)
-                            'audio/mpeg'                  # Type MIME du fichier (format audio MP3)
+                # Étape 4.3: Préparer le nom du fichier envoyé
+                # Une tranche de mémoire n'a pas de nom : on reprend le format de split_file
+                if not in_memory:
+                    chunk_name = os.path.basename(chunk_path)
+                elif total_chunks == 1:
+                    chunk_name = original_filename
+                else:
+                    base_name, ext = os.path.splitext(original_filename)
+                    chunk_name = f"{base_name}_part{chunk_num}of{total_chunks}{ext}"
+                mime_type = audio_mime_type(chunk_name)
+                
+                # Étape 4.4: Tentatives d'envoi avec système de réessai
+                # Boucle pour essayer plusieurs fois en cas d'échec
+                for attempt in range(max_retries):
+                    try:
+                        # Construire un nouveau corps de requête à chaque tentative :
+                        # il est lu au fur et à mesure de l'envoi et ne peut pas être relu
+                        # (réutiliser le même fichier ouvert renverrait un fichier vide)
+                        body = MultipartBody(
+                            chunk_metadata,   # Les métadonnées à envoyer avec le fichier
+                            'file',           # Nom du paramètre attendu par le serveur
+                            chunk_name,       # Nom du fichier à envoyer
+                            chunk_path,       # Chemin du fichier ou memoryview
+                            mime_type,        # Type MIME du fichier (selon son extension)
+                            # Respecter le plafond de débit (attente interrompue par une annulation)
+                            throttle=lambda nbytes: bandwidth_limiter.consume(nbytes, cancel_token),
+                            # Une annulation interrompt le corps en plein envoi
+                            cancel_token=cancel_token,
+                            # Empreintes des octets envoyés, ajoutées après le fichier
+                            digests=UPLOAD_DIGESTS
                         )
-                    }
-                    
-                    # Étape 4.4: Tentatives d'envoi avec système de réessai
-                    # Boucle pour essayer plusieurs fois en cas d'échec
-                    for attempt in range(max_retries):
-                        try:
-                            # Envoyer la requête POST au webhook
-                            # - webhook_url: l'adresse où envoyer les données
-                            # - files: le fichier à envoyer
-                            # - data: les métadonnées à envoyer avec le fichier
-                            # - timeout: temps maximum d'attente (30 secondes)
-                            response = requests.post(
-                                webhook_url,
-                                files=files,
-                                data=chunk_metadata,
-                                timeout=30
-                            )
-                            
-                            # Étape 4.5: Vérifier le résultat de la requête
-                            
-                            # Si le code de statut est 200, cela signifie que tout s'est bien passé
-                            # 200 est le code standard pour "OK" en HTTP
+                        
+                        # Envoyer la requête POST au webhook
+                        # - webhook_url: l'adresse où envoyer les données
+                        # - data: le corps multipart, lu en flux pendant l'envoi
+                        # - timeout: (connexion, réponse), adapté par le régulateur à la
+                        #   taille de la requête et au débit mesuré
+                        with upload_controller.slot(cancel_token), trace_span(
+                            'upload_attempt',
+                            file=chunk_name,
+                            session=chunk_metadata.get('session_id'),
+                            part=chunk_metadata['part_number'],
+                            chunk=chunk_num,
+                            attempt=attempt + 1,
+                            in_memory=in_memory,
+                            bytes=len(body)
+                        ) as span:
+                            # Attendre son tour auprès du limiteur avant de chronométrer :
+                            # le régulateur ne mesure que la durée de la requête elle-même
+                            rate_limiter.acquire(webhook_url, cancel_token)
+                            started = time.monotonic()
+                            try:
+                                response = requests.post(
+                                    webhook_url,
+                                    data=body,
+                                    headers={'Content-Type': body.content_type},
+                                    timeout=upload_controller.timeout(len(body))
+                                )
+                            except requests.Timeout:
+                                upload_controller.record(len(body), time.monotonic() - started, RESULT_TIMEOUT)
+                                raise
+                            except requests.RequestException:
+                                upload_controller.record(len(body), time.monotonic() - started, RESULT_ERROR)
+                                raise
+                            finally:
+                                body.close()
                             if response.status_code == 200:
-                                # Sortir de la boucle des tentatives et passer au morceau suivant
-                                break
-                                
-                            # Si erreur 520 (erreur spécifique à Cloudflare), on peut réessayer
-                            if response.status_code == 520:
-                                # Vérifier s'il nous reste des tentatives
-                                if attempt < max_retries - 1:
-                                    # Attendre le délai spécifié avant de réessayer
-                                    time.sleep(retry_delay)
-                                    # Continuer avec la prochaine itération de la boucle
-                                    continue
-                                else:
-                                    # Si on a épuisé toutes les tentatives, renvoyer une erreur
-                                    return False, f"Erreur Cloudflare (520) après {max_retries} tentatives"
-                                    
-                            # Étape 4.6: Gérer les autres types d'erreurs HTTP
-                            # Pour les autres codes d'erreur, créer un message d'erreur détaillé
-                            error_msg = (
-                                f"Erreur HTTP {response.status_code}"  # Code d'erreur HTTP
-                                # Ajouter le texte de la réponse s'il y en a un
-                                f"{f' - {response.text}' if response.text else ''}"
-                            )
-                            # Renvoyer l'échec avec le message d'erreur
-                            return False, error_msg
-                            
-                        # Étape 4.7: Gérer les différents types d'exceptions
+                                result = RESULT_OK
+                            elif response.status_code in (429, 520):
+                                result = RESULT_THROTTLED
+                            else:
+                                result = RESULT_ERROR
+                            upload_controller.record(len(body), time.monotonic() - started, result)
+                            span.set(status_code=response.status_code)
+                            if response.status_code == 200:
+                                # Garder les empreintes envoyées dans la trace de l'envoi
+                                sent_digests = body.hexdigests()
+                                span.set(**{DIGEST_FIELD_PREFIX + algorithm: value
+                                            for algorithm, value in sent_digests.items()})
+                                # Envoyé en une seule requête, le morceau doit correspondre
+                                # à l'empreinte annoncée (manifeste) : sinon il a changé entre-temps
+                                expected = chunk_metadata.get('sha256')
+                                if total_chunks == 1 and expected and sent_digests.get('sha256') != expected:
+                                    span.set(digest_mismatch=True)
+                                    span.outcome = "digest_mismatch"
+                                    return False, (f"L'empreinte de {chunk_name} ne correspond pas "
+                                                   f"au manifeste : la partie a changé depuis sa création")
+                                # Empreinte calculée pendant l'envoi : la garder à côté de la
+                                # partie (M4A), pour que le manifeste n'ait pas à la relire
+                                if total_chunks == 1 and not in_memory and not expected:
+                                    save_part_digest(file_path, sent_digests['sha256'])
+                            if response.status_code != 200:
+                                span.outcome = f"http_{response.status_code}"
                         
-                        # Gérer les erreurs de timeout (délai d'attente dépassé)
-                        except requests.Timeout:
-                            # Vérifier s'il nous reste des tentatives
-                            if attempt < max_retries - 1:
-                                # Attendre avant de réessayer
-                                time.sleep(retry_delay)
-                                continue  # Passer à la tentative suivante
-                            # Si on a épuisé toutes les tentatives
-                            return False, "Timeout lors de l'envoi"
+                        # Étape 4.5: Vérifier le résultat de la requête
+                        
+                        # Si le code de statut est 200, cela signifie que tout s'est bien passé
+                        # 200 est le code standard pour "OK" en HTTP
+                        if response.status_code == 200:
+                            # Sortir de la boucle des tentatives et passer au morceau suivant
+                            break
                             
-                        # Gérer les erreurs de requête (problèmes réseau, DNS, etc.)
-                        except requests.RequestException as e:
+                        # Si erreur 429 (trop de requêtes) ou 520 (erreur spécifique à Cloudflare),
+                        # le serveur est surchargé : on peut réessayer plus tard
+                        if response.status_code in (429, 520):
                             # Vérifier s'il nous reste des tentatives
                             if attempt < max_retries - 1:
-                                # Attendre avant de réessayer
-                                time.sleep(retry_delay)
-                                continue  # Passer à la tentative suivante
-                            # Si on a épuisé toutes les tentatives
-                            return False, f"Erreur réseau lors de l'envoi : {str(e)}"
-                            
-                        # Gérer toutes les autres erreurs imprévues
-                        except Exception as e:
-                            # Pour les autres types d'erreurs, on ne réessaie pas
-                            # car ce sont probablement des erreurs qui ne se résoudront pas en réessayant
-                            return False, f"Erreur lors de l'envoi : {str(e)}"
-                            
-                    # Étape 4.8: Gérer le cas où toutes les tentatives ont échoué
-                    # Cette partie s'exécute si la boucle for se termine normalement (sans break)
-                    # ce qui signifie que toutes les tentatives ont échoué
-                    else:
-                        return False, "Erreur lors de l'envoi"
+                                # Suspendre toutes les requêtes vers cette URL, pas seulement
+                                # celle-ci : les autres envois en cours attendent aussi.
+                                # Le délai suit Retry-After s'il est fourni, sinon il double
+                                # à chaque tentative
+                                delay = _retry_after_seconds(response)
+                                if delay is None:
+                                    delay = retry_delay * (2 ** attempt)
+                                rate_limiter.pause(webhook_url, delay)
+                                # Continuer avec la prochaine itération de la boucle
+                                continue
+                            elif response.status_code == 429:
+                                return False, f"Trop de requêtes (429) après {max_retries} tentatives"
+                            else:
+                                # Si on a épuisé toutes les tentatives, renvoyer une erreur
+                                return False, f"Erreur Cloudflare (520) après {max_retries} tentatives"
+                                
+                        # Étape 4.6: Gérer les autres types d'erreurs HTTP
+                        # Pour les autres codes d'erreur, créer un message d'erreur détaillé
+                        error_msg = (
+                            f"Erreur HTTP {response.status_code}"  # Code d'erreur HTTP
+                            # Ajouter le texte de la réponse s'il y en a un
+                            f"{f' - {response.text}' if response.text else ''}"
+                        )
+                        # Renvoyer l'échec avec le message d'erreur
+                        return False, error_msg
+                        
+                    # Étape 4.7: Gérer les différents types d'exceptions
+                    
+                    # Gérer les erreurs de timeout (délai d'attente dépassé)
+                    except requests.Timeout:
+                        # Vérifier s'il nous reste des tentatives
+                        if attempt < max_retries - 1:
+                            # Attendre avant de réessayer (sauf si l'envoi est annulé)
+                            sleep_or_cancel(retry_delay, cancel_token)
+                            continue  # Passer à la tentative suivante
+                        # Si on a épuisé toutes les tentatives
+                        return False, "Timeout lors de l'envoi"
+                        
+                    # Gérer les erreurs de requête (problèmes réseau, DNS, etc.)
+                    except requests.RequestException as e:
+                        # Vérifier s'il nous reste des tentatives
+                        if attempt < max_retries - 1:
+                            # Attendre avant de réessayer (sauf si l'envoi est annulé)
+                            sleep_or_cancel(retry_delay, cancel_token)
+                            continue  # Passer à la tentative suivante
+                        # Si on a épuisé toutes les tentatives
+                        return False, f"Erreur réseau lors de l'envoi : {str(e)}"
+                        
+                    # Une annulation n'est pas une erreur : ne pas réessayer
+                    except CancelledError:
+                        raise
+                        
+                    # Gérer toutes les autres erreurs imprévues
+                    except Exception as e:
+                        # Pour les autres types d'erreurs, on ne réessaie pas
+                        # car ce sont probablement des erreurs qui ne se résoudront pas en réessayant
+                        return False, f"Erreur lors de l'envoi : {str(e)}"
+                        
+                # Étape 4.8: Gérer le cas où toutes les tentatives ont échoué
+                # Cette partie s'exécute si la boucle for se termine normalement (sans break)
+                # ce qui signifie que toutes les tentatives ont échoué
+                else:
+                    return False, "Erreur lors de l'envoi"
                     
             # Étape 5: Finaliser l'envoi après avoir envoyé tous les morceaux
             
@@ -206,16 +471,20 @@ def send_file_to_webhook(
         # Étape 6: Nettoyer les fichiers temporaires
         # Le bloc 'finally' s'exécute toujours, que l'envoi ait réussi ou échoué
         finally:
-            # Nettoyer les fichiers temporaires si le fichier a été découpé en plusieurs parties
-            # Si total_chunks > 1, cela signifie que nous avons créé des fichiers temporaires
-            if total_chunks > 1:
-                # Appeler la fonction de nettoyage pour supprimer tous les fichiers temporaires
+            # split_file crée toujours des fichiers temporaires, y compris la copie
+            # faite quand le fichier tient en un seul morceau : il faut donc toujours nettoyer
+            # (les tranches de mémoire, elles, ne créent aucun fichier)
+            if not in_memory:
                 cleanup_chunks(chunks)
             
     # Étape 7: Gérer les erreurs globales (en dehors de la boucle d'envoi)
     # Ces gestionnaires d'exceptions attrapent les erreurs qui pourraient se produire
     # avant même de commencer à envoyer les morceaux
     
+    # L'utilisateur a annulé : les fichiers temporaires ont déjà été supprimés (finally)
+    except CancelledError:
+        return False, CANCELLED_MESSAGE
+    
     # Gérer les erreurs de timeout
     except requests.Timeout:
         return False, "Le délai d'attente a été dépassé lors de l'envoi"
@@ -229,6 +498,226 @@ def send_file_to_webhook(
         return False, f"Erreur lors de l'envoi : {str(e)}"
 
 
+# ===== LECTURE DES STATISTIQUES AUDIO D'UN MORCEAU =====
+def _load_part_analysis(path: Union[str, MemoryPart]) -> Optional[Dict[str, Any]]:
+    """Renvoie l'analyse en cache d'un morceau, ou None si elle n'existe pas"""
+    if isinstance(path, MemoryPart):
+        return path.analysis
+    try:
+        # Import local : le module d'analyse dépend de numpy, qui est optionnel pour l'envoi
+        from .audio_analysis import load_analysis
+    except ImportError:
+        return None
+    return load_analysis(path)
+
+
+# ===== FONCTION D'ENVOI DE TOUS LES MORCEAUX D'UNE SESSION =====
+def send_chunks_to_webhook(
+    webhook_url: str,
+    chunks: List[Tuple[str, int, float]],
+    num_parts: Optional[int] = None,
+    session_id: Optional[str] = None,
+    status_callback: Optional[callable] = None,
+    part_status_callback: Optional[callable] = None,
+    work_dir: Optional[str] = None,
+    manifest_url: Optional[str] = None,
+    offset_map=None,
+    cancel_token: Optional[CancelToken] = None
+) -> tuple[bool, str]:
+    """
+    Envoie tous les morceaux audio d'une même session au webhook, plusieurs à la fois
+    selon le régulateur d'envoi (voir utils/upload_controller.py).
+    Tous les morceaux partagent le même identifiant de session pour que le serveur
+    puisse les regrouper.
+
+    Args:
+        webhook_url: L'URL du webhook (adresse web où envoyer les données)
+        chunks: Liste de tuples (chemin, numéro, durée) renvoyée par AudioProcessor.split_audio
+        num_parts: Nombre de parties choisi par l'utilisateur (optionnel)
+        session_id: Identifiant de la session (généré automatiquement si absent)
+        status_callback: Fonction appelée avec un message texte avant chaque envoi (optionnel)
+        part_status_callback: Fonction appelée avec (numéro, statut) quand l'état d'un morceau change (optionnel)
+        work_dir: Dossier où placer les fichiers temporaires de l'envoi (optionnel)
+        manifest_url: URL du webhook qui reçoit le manifeste de la session avant les
+            morceaux (optionnel, voir utils/manifest.py)
+        offset_map: Correspondance des temps si les longs silences ont été supprimés
+            (optionnel, voir utils/silence_trim.py)
+        cancel_token: Jeton d'annulation (optionnel) : son annulation interrompt l'envoi
+            en cours et les morceaux suivants ne sont pas envoyés
+
+    Returns:
+        tuple[bool, str]: Un tuple contenant:
+            - Un booléen indiquant si l'envoi a réussi (True) ou échoué (False)
+            - Un message décrivant le résultat ou l'erreur
+    """
+    # Étape 1: Générer un identifiant unique pour cette session d'envoi si besoin
+    # Cela évite que des fichiers de sessions précédentes soient traités par erreur
+    if session_id is None:
+        import uuid
+        session_id = f"{int(time.time())}_{str(uuid.uuid4())[:8]}"
+
+    # Mesurer l'envoi complet : les tentatives d'envoi de chaque morceau y sont rattachées
+    with trace_span('upload', session=session_id, parts=len(chunks)) as span:
+        success, message = _send_session_chunks(
+            webhook_url, chunks, num_parts, session_id, status_callback,
+            part_status_callback, work_dir, manifest_url, offset_map, cancel_token
+        )
+        if success:
+            span.set(bytes=sum(part_size(path) for path, _, _ in chunks))
+        else:
+            span.outcome = "cancelled" if cancel_token and cancel_token.cancelled else "error"
+            span.error = message
+        return success, message
+
+
+def _send_session_chunks(
+    webhook_url: str,
+    chunks: List[Tuple[str, int, float]],
+    num_parts: Optional[int],
+    session_id: str,
+    status_callback: Optional[callable],
+    part_status_callback: Optional[callable],
+    work_dir: Optional[str],
+    manifest_url: Optional[str],
+    offset_map,
+    cancel_token: Optional[CancelToken] = None
+) -> tuple[bool, str]:
+    """Corps de send_chunks_to_webhook (mêmes paramètres, session_id déjà choisi)"""
+    total_chunks = len(chunks)
+
+    # Étape 2: Vérifier que tous les morceaux existent encore
+    for path, num, duration in chunks:
+        if not isinstance(path, MemoryPart) and not os.path.exists(path):
+            if part_status_callback:
+                part_status_callback(num, "Fichier manquant")
+            return False, f"Erreur: Le fichier {os.path.basename(path)} n'existe plus"
+
+    # Étape 3: Construire le manifeste (tailles, positions et empreintes de tous les morceaux)
+    # et l'envoyer en premier : le destinataire sait alors exactement quoi attendre
+    if status_callback:
+        status_callback("Préparation du manifeste...")
+    manifest = build_manifest(session_id, chunks, num_parts, offset_map)
+    parts_info = {part['part_number']: part for part in manifest['parts']}
+    if manifest_url:
+        if status_callback:
+            status_callback("Envoi du manifeste...")
+        success, message = send_manifest_to_webhook(manifest_url, manifest, cancel_token)
+        if not success and cancel_token and cancel_token.cancelled:
+            return False, CANCELLED_MESSAGE
+        if not success:
+            return False, f"Erreur lors de l'envoi du manifeste: {message}"
+
+    # Étape 4: Envoyer les morceaux, plusieurs à la fois si le régulateur d'envoi le permet
+    # (le destinataire connaît déjà la liste complète grâce au manifeste, l'ordre d'arrivée
+    # n'a donc pas d'importance). Après le premier échec, les morceaux pas encore partis
+    # ne sont plus envoyés
+    failed = threading.Event()
+
+    def send_part(path, num, duration) -> Optional[str]:
+        """Envoie un morceau ; renvoie None en cas de succès, sinon le message d'erreur"""
+        if failed.is_set() or (cancel_token and cancel_token.cancelled):
+            return None
+        if status_callback:
+            status_callback(f"Envoi du morceau {num}/{total_chunks}...")
+        if part_status_callback:
+            part_status_callback(num, "Envoi...")
+
+        # Un morceau peut être gardé en mémoire (voir AudioProcessor.split_audio)
+        in_memory = isinstance(path, MemoryPart)
+        part_info = parts_info[num]
+
+        # Vérifier que le fichier existe toujours avant d'essayer de l'envoyer
+        if not in_memory and not os.path.exists(path):
+            if part_status_callback:
+                part_status_callback(num, "Fichier manquant")
+            failed.set()
+            return f"Erreur: Le fichier {os.path.basename(path)} n'existe plus"
+
+        # Préparer les métadonnées envoyées avec le fichier
+        metadata = {
+            'message_type': MESSAGE_TYPE_PART,    # Distingue les morceaux du manifeste
+            'part_number': num,                   # Numéro de ce morceau
+            'total_parts': total_chunks,          # Nombre total de morceaux
+            'duration_seconds': duration,         # Durée en secondes
+            'start_offset_seconds': part_info['start_offset_seconds'],  # Début dans l'enregistrement
+            'size_bytes': part_info['size_bytes'],  # Taille exacte du fichier
+            'sha256': part_info['sha256'],        # Empreinte, comme dans le manifeste
+            'filename': part_info['filename'],    # Nom du fichier
+            'user_selected_parts': num_parts,     # Nombre de parties choisi par l'utilisateur
+            'session_id': session_id,             # Identifiant unique de cette session
+            'timestamp': int(time.time())         # Horodatage actuel
+        }
+
+        # Position dans l'enregistrement original si les silences ont été supprimés
+        if 'original_start_offset_seconds' in part_info:
+            metadata['original_start_offset_seconds'] = part_info['original_start_offset_seconds']
+            metadata['original_end_offset_seconds'] = part_info['original_end_offset_seconds']
+
+        # Ajouter les statistiques audio du morceau si elles ont été calculées
+        # (niveau moyen, niveau de crête et proportion de parole)
+        analysis = _load_part_analysis(path)
+        if analysis:
+            metadata.update({
+                'rms_dbfs': analysis['rms_dbfs'],
+                'peak_dbfs': analysis['peak_dbfs'],
+                'speech_ratio': analysis['speech_ratio']
+            })
+
+        success, message = send_file_to_webhook(webhook_url, path, metadata, work_dir=work_dir,
+                                                cancel_token=cancel_token)
+        cancelled = not success and cancel_token is not None and cancel_token.cancelled
+
+        if part_status_callback:
+            part_status_callback(num, "Envoyé" if success else "Annulé" if cancelled else "Erreur")
+        if success or cancelled:
+            return None
+        failed.set()
+        return f"Erreur lors de l'envoi du morceau {num}: {message}"
+
+    # Au plus MAX_CONCURRENCY morceaux en cours : chaque requête attend en plus
+    # une place auprès du régulateur, dont la limite varie selon le réseau
+    with ThreadPoolExecutor(max_workers=upload_controller.max_concurrency,
+                            thread_name_prefix="upload") as executor:
+        futures = [executor.submit(send_part, path, num, duration) for path, num, duration in chunks]
+        errors = [error for error in (future.result() for future in futures) if error]
+
+    # Si l'envoi a été annulé ou a échoué, signaler le premier échec (dans l'ordre des morceaux)
+    if cancel_token and cancel_token.cancelled:
+        return False, CANCELLED_MESSAGE
+    if errors:
+        return False, errors[0]
+
+    # Étape 5: Tous les morceaux ont été envoyés
+    return True, "Tous les morceaux ont été envoyés !"
+
+
+# ===== FONCTION D'ENVOI DU MANIFESTE DE SESSION =====
+def send_manifest_to_webhook(webhook_url: str, manifest: Dict[str, Any],
+                             cancel_token: Optional[CancelToken] = None) -> tuple[bool, str]:
+    """
+    Envoie le manifeste d'une session (voir utils/manifest.py) au format JSON.
+    
+    Args:
+        webhook_url: L'URL du webhook (adresse web où envoyer les données)
+        manifest: Le manifeste construit par build_manifest
+        cancel_token: Jeton d'annulation (optionnel)
+        
+    Returns:
+        tuple[bool, str]: Un tuple contenant:
+            - Un booléen indiquant si l'envoi a réussi (True) ou échoué (False)
+            - Un message décrivant le résultat ou l'erreur
+    """
+    try:
+        response = _post(webhook_url, cancel_token, json=manifest, timeout=30)
+        if response.status_code == 200:
+            return True, "Manifeste envoyé avec succès"
+        return False, f"Erreur HTTP {response.status_code}{f' - {response.text}' if response.text else ''}"
+    except CancelledError:
+        return False, CANCELLED_MESSAGE
+    except requests.exceptions.RequestException as e:
+        return False, f"Erreur lors de l'envoi : {str(e)}"
+
+
 # ===== FONCTION D'ENVOI DU NOMBRE DE PARTIES AU WEBHOOK =====
 def send_parts_count_to_webhook(webhook_url: str, parts_count: int) -> tuple[bool, str]:
     """
@@ -250,7 +739,7 @@ def send_parts_count_to_webhook(webhook_url: str, parts_count: int) -> tuple[boo
         # - webhook_url: l'adresse où envoyer les données
         # - json: les données à envoyer au format JSON
         # - timeout: temps maximum d'attente (30 secondes)
-        response = requests.post(
+        response = _post(
             webhook_url,
             json={'parts_count': parts_count},  # Envoyer un objet JSON simple
             timeout=30
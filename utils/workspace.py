@@ -0,0 +1,409 @@
+# ===== IMPORTATION DES BIBLIOTHÈQUES =====
+# os : permet de travailler avec les chemins de fichiers et les dossiers
+import os
+
+# shutil : permet de supprimer un dossier et tout son contenu
+import shutil
+
+# tempfile : donne le dossier temporaire du système
+import tempfile
+
+# threading : le nettoyage se fait dans un thread séparé pour ne jamais bloquer l'interface
+import threading
+
+# queue : file des dossiers à supprimer, transmise au thread de nettoyage
+import queue
+
+# time : permet de dater les sessions (pour évincer les plus anciennes)
+import time
+
+# uuid : permet de générer des noms de dossiers uniques
+import uuid
+
+# atexit : permet de nettoyer les sessions restantes à la fermeture du programme
+import atexit
+
+# typing : permet de spécifier les types de données attendus dans les fonctions
+from typing import List, Optional
+
+# Mesure des étapes (durée et octets libérés par chaque nettoyage)
+from .tracing import trace_span, tracer
+
+# Verrouillage de fichier : fcntl sous Linux/macOS, msvcrt sous Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# ===== CONSTANTES =====
+# Dossier racine de l'espace de travail sur le disque
+WORKSPACE_DIRNAME = "baw_workspace"
+
+# Dossier en mémoire vive (Linux) utilisé pour les petites tâches
+RAM_ROOT = "/dev/shm"
+
+# Taille maximale (en octets) d'une tâche placée en mémoire vive
+RAM_JOB_MAX_BYTES = 256 * 1024 * 1024
+
+# Quota de l'espace de travail sur le disque (en octets)
+DEFAULT_QUOTA_BYTES = 10 * 1024 * 1024 * 1024
+
+# Nom du fichier verrou qui signale qu'une instance de l'application est vivante
+LOCK_SUFFIX = ".lock"
+
+
+# ===== EXCEPTION SPÉCIFIQUE =====
+class WorkspaceQuotaError(Exception):
+    """Levée lorsque l'espace de travail ne peut pas libérer assez de place"""
+
+
+class WorkspaceLockError(Exception):
+    """Levée lorsque le verrou du dossier de cette instance ne peut pas être pris"""
+
+
+# ===== OUTILS =====
+def _directory_size(path: str) -> int:
+    """Taille totale (en octets) des fichiers contenus dans un dossier"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                # Le fichier a été supprimé entre-temps
+                pass
+    return total
+
+
+def _try_lock(handle) -> bool:
+    """Pose un verrou exclusif non bloquant sur un fichier ouvert"""
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def estimate_job_bytes(input_path: str, bitrate: str) -> int:
+    """
+    Estime la place nécessaire à une conversion : le MP3 complet plus ses morceaux,
+    soit deux fois la durée multipliée par le bitrate.
+    """
+    kbps = int(bitrate.rstrip('kK') or 0)
+    try:
+        from .audio_processor import AudioProcessor
+        duration = AudioProcessor.get_audio_duration(input_path)
+        return int(duration * kbps * 1000 / 8 * 2)
+    except Exception:
+        # Sans durée, la taille de la vidéo est une borne supérieure raisonnable
+        try:
+            return os.path.getsize(input_path)
+        except OSError:
+            return 0
+
+
+# ===== SESSION DE TRAVAIL =====
+class Session:
+    """
+    Dossier qui contient tous les fichiers intermédiaires d'une conversion
+    (MP3 complet, morceaux, caches d'analyse, copies pour l'envoi).
+
+    Une session est créée protégée : elle ne peut pas être évincée tant que son
+    traitement n'a pas appelé unpin(). Ensuite, ses fichiers restent disponibles
+    mais peuvent être supprimés si le quota est atteint. Une session encore utilisée
+    (par exemple par la vue des morceaux, pour l'écoute et l'envoi) reste protégée
+    jusqu'à release().
+    """
+
+    def __init__(self, manager: "WorkspaceManager", path: str, in_ram: bool, reserved_bytes: int = 0):
+        self.manager = manager
+        self.path = path
+        self.in_ram = in_ram
+        # Place annoncée à la création, comptée dans le quota avant même d'être écrite
+        self.reserved_bytes = reserved_bytes
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.released = False
+        self._pins = 1
+
+    def make_dir(self, name: str) -> str:
+        """Crée (si besoin) un sous-dossier de la session et renvoie son chemin"""
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def pin(self):
+        """Protège la session de l'éviction (à équilibrer par unpin)"""
+        with self.manager._lock:
+            self._pins += 1
+
+    def unpin(self):
+        """Rend la session de nouveau évinçable"""
+        with self.manager._lock:
+            self._pins -= 1
+            self.last_used = time.time()
+
+    @property
+    def pinned(self) -> bool:
+        return self._pins > 0
+
+    def size(self) -> int:
+        """Taille actuelle de la session en octets"""
+        return _directory_size(self.path)
+
+    def release(self):
+        """Supprime la session en arrière-plan (ne bloque pas l'appelant)"""
+        self.manager.release(self)
+
+
+# ===== GESTIONNAIRE DE L'ESPACE DE TRAVAIL =====
+class WorkspaceManager:
+    """
+    Possède tous les fichiers intermédiaires de l'application, rangés par session :
+
+        <racine>/<instance>/<session>/...
+        <racine>/<instance>.lock
+
+    - le fichier <instance>.lock reste verrouillé tant que l'application tourne :
+      au démarrage, tout dossier d'instance dont le verrou est libre vient d'un
+      programme arrêté brutalement et est supprimé (sweep_orphans)
+    - un quota limite la place occupée sur le disque : les sessions inutilisées
+      les plus anciennes sont évincées pour faire de la place
+    - les petites tâches peuvent être placées en mémoire vive (/dev/shm)
+    - les suppressions se font dans un thread dédié
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        quota_bytes: int = DEFAULT_QUOTA_BYTES,
+        ram_root: Optional[str] = RAM_ROOT,
+        ram_job_max_bytes: int = RAM_JOB_MAX_BYTES
+    ):
+        self.root = root or os.path.join(tempfile.gettempdir(), WORKSPACE_DIRNAME)
+        self.quota_bytes = quota_bytes
+        self.ram_job_max_bytes = ram_job_max_bytes
+        self.instance_id = f"{int(time.time())}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+        # Racines utilisables : le disque, et la mémoire vive si elle existe
+        self.ram_root = None
+        if ram_root and os.path.isdir(ram_root) and os.access(ram_root, os.W_OK):
+            self.ram_root = os.path.join(ram_root, WORKSPACE_DIRNAME)
+
+        self.sessions: List[Session] = []
+        self._lock = threading.Lock()
+        self._reserve_lock = threading.Lock()
+        self._lock_files = {}
+
+        # Thread de nettoyage, démarré à la première suppression
+        self._cleanup_queue: queue.Queue = queue.Queue()
+        self._cleanup_thread: Optional[threading.Thread] = None
+
+        atexit.register(self.shutdown)
+
+    # ----- Dossiers d'instance -----
+    def _instance_dir(self, root: str) -> str:
+        """
+        Renvoie le dossier de cette instance dans une racine, en le verrouillant puis en le créant.
+        Le verrou est pris avant la création du dossier : sweep_orphans, lancé par une autre
+        instance, ne voit donc jamais un dossier sans verrou qui serait encore utilisé.
+
+        Raises:
+            WorkspaceLockError: Si le verrou ne peut pas être pris
+        """
+        instance_dir = os.path.join(root, self.instance_id)
+        if root not in self._lock_files:
+            os.makedirs(root, exist_ok=True)
+            handle = open(instance_dir + LOCK_SUFFIX, 'a+')
+            if not _try_lock(handle):
+                handle.close()
+                raise WorkspaceLockError(f"Impossible de verrouiller {instance_dir + LOCK_SUFFIX}")
+            self._lock_files[root] = handle
+            os.makedirs(instance_dir, exist_ok=True)
+        return instance_dir
+
+    # ----- Sessions -----
+    def create_session(self, expected_bytes: int = 0) -> Session:
+        """
+        Crée une nouvelle session de travail, protégée de l'éviction jusqu'à unpin().
+
+        Args:
+            expected_bytes: Place estimée des fichiers intermédiaires (voir estimate_job_bytes)
+
+        Raises:
+            WorkspaceQuotaError: Si le quota ne permet pas d'accueillir la session
+        """
+        # Les créations sont sérialisées : deux tâches lancées en même temps ne
+        # doivent pas toutes deux compter sur la même place libre
+        with self._reserve_lock:
+            in_ram = self._fits_in_ram(expected_bytes)
+            root = self.ram_root if in_ram else self.root
+            if not in_ram:
+                self.ensure_space(expected_bytes)
+
+            path = os.path.join(self._instance_dir(root), f"session_{uuid.uuid4().hex[:8]}")
+            os.makedirs(path)
+            session = Session(self, path, in_ram, expected_bytes)
+            with self._lock:
+                self.sessions.append(session)
+            return session
+
+    def _fits_in_ram(self, expected_bytes: int) -> bool:
+        """Une tâche va en mémoire vive si elle est petite et que la place est disponible"""
+        if not self.ram_root or not expected_bytes or expected_bytes > self.ram_job_max_bytes:
+            return False
+        try:
+            # Garder au moins la moitié de la mémoire vive libre pour le reste du système
+            free = shutil.disk_usage(os.path.dirname(self.ram_root)).free
+        except OSError:
+            return False
+        return expected_bytes < free / 2
+
+    def usage(self) -> int:
+        """
+        Place occupée par l'espace de travail sur le disque (toutes instances confondues),
+        plus la place réservée mais pas encore écrite par les sessions en cours
+        """
+        used = _directory_size(self.root) if os.path.isdir(self.root) else 0
+        with self._lock:
+            pending = [s for s in self.sessions if s.pinned and not s.in_ram]
+        for session in pending:
+            used += max(session.reserved_bytes - session.size(), 0)
+        return used
+
+    def ensure_space(self, needed_bytes: int):
+        """
+        Évince les sessions inutilisées les plus anciennes jusqu'à ce que
+        needed_bytes tiennent dans le quota.
+        """
+        if needed_bytes > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"Espace de travail insuffisant : {needed_bytes // (1024 * 1024)} Mo nécessaires, "
+                f"quota de {self.quota_bytes // (1024 * 1024)} Mo"
+            )
+
+        usage = self.usage()
+        if usage + needed_bytes <= self.quota_bytes:
+            return
+
+        with self._lock:
+            candidates = sorted(
+                (s for s in self.sessions if not s.in_ram and not s.pinned),
+                key=lambda s: s.last_used
+            )
+
+        for session in candidates:
+            if usage + needed_bytes <= self.quota_bytes:
+                break
+            usage -= session.size()
+            print(f"Quota atteint : suppression de la session {session.path}")
+            # Suppression immédiate : la place doit être libérée avant l'encodage
+            self._forget(session)
+            shutil.rmtree(session.path, ignore_errors=True)
+
+        if usage + needed_bytes > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"Espace de travail insuffisant : {needed_bytes // (1024 * 1024)} Mo nécessaires, "
+                f"{max(self.quota_bytes - usage, 0) // (1024 * 1024)} Mo disponibles"
+            )
+
+    def _forget(self, session: Session):
+        with self._lock:
+            session.released = True
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def release(self, session: Session):
+        """Programme la suppression d'une session dans le thread de nettoyage"""
+        if session.released:
+            return
+        self._forget(session)
+        self._schedule_removal(session.path)
+
+    # ----- Nettoyage asynchrone -----
+    def _schedule_removal(self, path: str):
+        with self._lock:
+            if self._cleanup_thread is None or not self._cleanup_thread.is_alive():
+                self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+                self._cleanup_thread.start()
+        self._cleanup_queue.put(path)
+
+    def _cleanup_loop(self):
+        while True:
+            path = self._cleanup_queue.get()
+            try:
+                with trace_span('workspace_cleanup', path=os.path.basename(path)) as span:
+                    # Mesurer la place libérée seulement si les traces sont enregistrées
+                    if tracer.enabled:
+                        span.set(bytes=_directory_size(path))
+                    shutil.rmtree(path, ignore_errors=True)
+                    # Le verrou d'une instance orpheline est supprimé avec son dossier
+                    if os.path.exists(path + LOCK_SUFFIX):
+                        os.remove(path + LOCK_SUFFIX)
+            except OSError as e:
+                print(f"Erreur lors du nettoyage de {path}: {e}")
+            finally:
+                self._cleanup_queue.task_done()
+
+    def sweep_orphans(self) -> int:
+        """
+        Supprime en arrière-plan les dossiers laissés par des instances arrêtées
+        brutalement. Renvoie le nombre de dossiers programmés pour suppression.
+        """
+        count = 0
+        for root in filter(None, (self.root, self.ram_root)):
+            if not os.path.isdir(root):
+                continue
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if name == self.instance_id or not os.path.isdir(path):
+                    continue
+                # Si le verrou peut être pris, plus aucune instance ne l'utilise
+                try:
+                    with open(path + LOCK_SUFFIX, 'a+') as handle:
+                        if not _try_lock(handle):
+                            continue
+                except OSError:
+                    continue
+                self._schedule_removal(path)
+                count += 1
+        return count
+
+    def wait_for_cleanup(self):
+        """Attend la fin des suppressions en cours"""
+        self._cleanup_queue.join()
+
+    def shutdown(self):
+        """Supprime toutes les sessions de cette instance (appelé à la fermeture)"""
+        with self._lock:
+            self.sessions.clear()
+        for root, handle in list(self._lock_files.items()):
+            instance_dir = os.path.join(root, self.instance_id)
+            shutil.rmtree(instance_dir, ignore_errors=True)
+            handle.close()
+            try:
+                os.remove(instance_dir + LOCK_SUFFIX)
+            except OSError:
+                pass
+        self._lock_files.clear()
+
+
+# ===== ESPACE DE TRAVAIL PARTAGÉ =====
+_workspace: Optional[WorkspaceManager] = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace() -> WorkspaceManager:
+    """Renvoie l'espace de travail de l'application (créé au premier appel)"""
+    global _workspace
+    with _workspace_lock:
+        if _workspace is None:
+            _workspace = WorkspaceManager()
+        return _workspace